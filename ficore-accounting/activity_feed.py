@@ -0,0 +1,425 @@
+import base64
+import json
+import logging
+import os
+from datetime import datetime
+from bson import ObjectId
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from translations import trans
+
+logger = logging.getLogger('ficore_app')
+
+MAX_FEED_LIMIT = 50
+ACTIVITY_RETENTION_DAYS = int(os.getenv('ACTIVITY_RETENTION_DAYS', 180))
+
+# Display metadata per event type. 'descriptions' maps an action to its
+# (translation key, default text); 'created' is the fallback for other actions.
+ACTIVITY_TYPES = {
+    'bill': {
+        'icon': 'bi-receipt',
+        'descriptions': {
+            'created': ('recent_activity_bill_added', 'Added bill: {name}'),
+            'updated': ('recent_activity_bill_updated', 'Updated bill: {name}'),
+            'deleted': ('recent_activity_bill_deleted', 'Deleted bill: {name}')
+        }
+    },
+    'budget': {
+        'icon': 'bi-cash-coin',
+        'descriptions': {
+            'created': ('recent_activity_budget_created', 'Created budget with income: {amount}'),
+            'updated': ('recent_activity_budget_updated', 'Updated budget with income: {amount}'),
+            'deleted': ('recent_activity_budget_deleted', 'Deleted budget with income: {amount}')
+        }
+    },
+    'shopping_list': {
+        'icon': 'bi-cart',
+        'descriptions': {
+            'created': ('recent_activity_shopping_list_created', 'Created shopping list: {name}'),
+            'updated': ('recent_activity_shopping_list_updated', 'Updated shopping list: {name}'),
+            'deleted': ('recent_activity_shopping_list_deleted', 'Deleted shopping list: {name}')
+        }
+    },
+    'shopping_item': {
+        'icon': 'bi-check-circle',
+        'descriptions': {
+            'bought': ('recent_activity_shopping_item_bought', 'Bought item: {name}'),
+            'created': ('recent_activity_shopping_item_added', 'Added shopping item: {name}'),
+            'deleted': ('recent_activity_shopping_item_deleted', 'Removed shopping item: {name}')
+        }
+    },
+    'ficore_credit': {
+        'icon': 'bi-wallet2',
+        'descriptions': {
+            'created': ('recent_activity_ficore_credit', '{action}: {amount} credits')
+        }
+    },
+    'food_order': {
+        'icon': 'bi-box-seam',
+        'descriptions': {
+            'created': ('recent_activity_food_order_created', 'Created food order: {name}'),
+            'updated': ('recent_activity_food_order_updated', 'Updated food order: {name}'),
+            'deleted': ('recent_activity_food_order_deleted', 'Deleted food order: {name}')
+        }
+    },
+    'debt_added': {
+        'icon': None,
+        'descriptions': {
+            'created': ('recent_activity_debt_added', 'Owe {name}'),
+            'updated': ('recent_activity_debt_updated', 'Updated debt for {name}'),
+            'deleted': ('recent_activity_debt_deleted', 'Removed debt for {name}')
+        }
+    },
+    'trader_registered': {
+        'icon': None,
+        'descriptions': {
+            'created': ('recent_activity_trader_registered', 'Owed by {name}'),
+            'updated': ('recent_activity_trader_updated', 'Updated debt to {name}'),
+            'deleted': ('recent_activity_trader_deleted', 'Removed debt to {name}')
+        }
+    },
+    'money_in': {
+        'icon': None,
+        'descriptions': {
+            'created': ('recent_activity_money_in', 'Received from {name}'),
+            'updated': ('recent_activity_money_in_updated', 'Updated receipt from {name}'),
+            'deleted': ('recent_activity_money_in_deleted', 'Removed receipt from {name}')
+        }
+    },
+    'money_out': {
+        'icon': None,
+        'descriptions': {
+            'created': ('recent_activity_money_out', 'Paid to {name}'),
+            'updated': ('recent_activity_money_out_updated', 'Updated payment to {name}'),
+            'deleted': ('recent_activity_money_out_deleted', 'Removed payment to {name}')
+        }
+    },
+    'trader_registration': {'icon': 'bi-person-plus', 'descriptions': {}},
+    'credit_request': {'icon': 'bi-coin', 'descriptions': {}},
+    'report_generation': {'icon': 'bi-file-earmark-text', 'descriptions': {}}
+}
+
+PERSONAL_ACTIVITY_TYPES = ['bill', 'budget', 'shopping_list', 'shopping_item', 'ficore_credit', 'food_order']
+BUSINESS_ACTIVITY_TYPES = ['debt_added', 'trader_registered', 'money_in', 'money_out']
+AGENT_ACTIVITY_TYPES = ['trader_registration', 'credit_request', 'report_generation']
+
+def record_activity(db, user_id, activity_type, action='created', name=None, amount=None, details=None,
+                    source=None, source_id=None, ts=None, session_id=None):
+    """
+    Append an event to the user's activity timeline.
+
+    Failures are logged and swallowed so a timeline problem never fails the write
+    that triggered it. The insert deliberately runs outside any caller transaction
+    for the same reason.
+
+    Args:
+        db: MongoDB database instance
+        user_id: Owner of the event
+        activity_type: Key of ACTIVITY_TYPES
+        action: 'created', 'updated', 'deleted', 'bought', ... (default: 'created')
+        name: Display name of the affected document (optional)
+        amount: Amount shown next to the event (optional)
+        details: Extra fields rendered by the dashboards (optional)
+        source: Collection the event came from (optional)
+        source_id: ID of the affected document (optional)
+        ts: Event time (default: now)
+        session_id: Session that wrote the document; anonymous events are read back by it (optional)
+    """
+    if not user_id and not session_id:
+        return
+    event = _build_event(user_id, activity_type, action, name, amount, details, source, source_id, ts, session_id)
+    try:
+        db.activity_events.insert_one(event)
+    except DuplicateKeyError:
+        pass
+    except PyMongoError as e:
+        logger.error(f"Failed to record {activity_type}/{action} activity for user {user_id}: {str(e)}",
+                     extra={'session_id': 'no-session-id'})
+
+def _build_event(user_id, activity_type, action, name, amount, details, source, source_id, ts, session_id=None):
+    # Creation events get a deterministic ID so the backfill can upsert without duplicating them
+    if action == 'created' and source and source_id:
+        event_id = f"{source}:{source_id}:created"
+    else:
+        event_id = str(ObjectId())
+    return {
+        '_id': event_id,
+        'user_id': str(user_id) if user_id else None,
+        'session_id': session_id or None,
+        'ts': ts or datetime.utcnow(),
+        'type': activity_type,
+        'action': action,
+        'name': name,
+        'amount': amount,
+        'details': details or {},
+        'source': source,
+        'source_id': str(source_id) if source_id else None
+    }
+
+def encode_cursor(timestamp, activity_id):
+    """Encode the position of the last returned activity as an opaque string."""
+    payload = json.dumps({'ts': timestamp.isoformat(), 'id': activity_id})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Returns:
+        tuple: (datetime, activity_id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return datetime.fromisoformat(payload['ts']), str(payload['id'])
+    except (KeyError, TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid activity cursor: {str(e)}")
+
+def get_timeline_events(db, query, types=None, limit=10, cursor=None):
+    """
+    Read one page of raw timeline events with a single indexed query.
+
+    Args:
+        db: MongoDB database instance
+        query: Ownership filter ({'user_id': ...}, {'session_id': ..., 'user_id': None}
+               for anonymous sessions, or {} for admins)
+        types: Restrict to these event types (optional)
+        limit: Maximum number of events (capped at MAX_FEED_LIMIT)
+        cursor: Opaque cursor returned by a previous page (optional)
+
+    Returns:
+        tuple: (list of event documents, next cursor string or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = max(1, min(int(limit), MAX_FEED_LIMIT))
+    match = dict(query)
+    if types:
+        match['type'] = {'$in': list(types)}
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        match['$or'] = [
+            {'ts': {'$lt': cursor_ts}},
+            {'ts': cursor_ts, '_id': {'$lt': cursor_id}}
+        ]
+    events = list(db.activity_events.find(match).sort([('ts', DESCENDING), ('_id', DESCENDING)]).limit(limit + 1))
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1]['ts'], events[-1]['_id'])
+    return events, next_cursor
+
+def format_activity(event):
+    """
+    Convert a timeline event into the shape the dashboard scripts render.
+
+    Args:
+        event: activity_events document
+
+    Returns:
+        dict: id, type, action, description_key, description, timestamp, amount, details and icon
+    """
+    config = ACTIVITY_TYPES.get(event['type'], {'icon': None, 'descriptions': {}})
+    action = event.get('action', 'created')
+    description_key, default_description = config['descriptions'].get(
+        action,
+        config['descriptions'].get('created', (f"recent_activity_{event['type']}", event['type'].replace('_', ' ').title()))
+    )
+    amount = event.get('amount')
+    activity = {
+        'id': event['_id'],
+        'type': event['type'],
+        'action': action,
+        'description_key': description_key,
+        'description': trans(
+            description_key,
+            default=default_description,
+            name=event.get('name') or 'Unknown',
+            amount=abs(amount) if isinstance(amount, (int, float)) else (amount or 0),
+            action=(event.get('details') or {}).get('action', 'Transaction')
+        ),
+        'timestamp': event['ts'].isoformat(),
+        'amount': amount or 0,
+        'details': event.get('details') or {}
+    }
+    if config['icon']:
+        activity['icon'] = config['icon']
+    return activity
+
+def get_activity_feed(db, query, limit=10, cursor=None, types=None):
+    """
+    Fetch one formatted page of the activity timeline.
+
+    Args:
+        db: MongoDB database instance
+        query: Ownership filter ({} for admins)
+        limit: Maximum number of activities (capped at MAX_FEED_LIMIT)
+        cursor: Opaque cursor returned by a previous page (optional)
+        types: Restrict to these event types (default: PERSONAL_ACTIVITY_TYPES)
+
+    Returns:
+        tuple: (list of activity dicts, next cursor string or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    events, next_cursor = get_timeline_events(db, query, types=types or PERSONAL_ACTIVITY_TYPES, limit=limit, cursor=cursor)
+    activities = []
+    for event in events:
+        try:
+            activities.append(format_activity(event))
+        except Exception as e:
+            logger.warning(f"Skipping invalid activity event {event.get('_id')}: {str(e)}",
+                           extra={'session_id': 'no-session-id'})
+    return activities, next_cursor
+
+def _food_order_activity(doc):
+    return ('food_order', doc.get('name'), doc.get('total_cost'), {
+        'vendor': doc.get('vendor', 'Unknown'),
+        'total_cost': doc.get('total_cost', 0)
+    })
+
+# How to describe a document from each source collection as a timeline event.
+# Used by record_document_activity on live writes and by the backfill.
+ACTIVITY_SOURCES = {
+    'bills': {
+        'ts_field': 'created_at',
+        'build': lambda doc: ('bill', doc.get('bill_name'), doc.get('amount'), {
+            'amount': doc.get('amount', 0),
+            'due_date': doc['due_date'].strftime('%Y-%m-%d') if isinstance(doc.get('due_date'), datetime) else str(doc.get('due_date', 'N/A')),
+            'status': doc.get('status', 'Unknown')
+        })
+    },
+    'budgets': {
+        'ts_field': 'created_at',
+        'build': lambda doc: ('budget', None, doc.get('income'), {
+            'income': doc.get('income', 0),
+            'surplus_deficit': doc.get('surplus_deficit', 0)
+        })
+    },
+    'shopping_lists': {
+        'ts_field': 'created_at',
+        'build': lambda doc: ('shopping_list', doc.get('name'), doc.get('budget'), {
+            'budget': doc.get('budget', 0),
+            'total_spent': doc.get('total_spent', 0)
+        })
+    },
+    'shopping_items': {
+        'ts_field': 'created_at',
+        'build': lambda doc: ('shopping_item', doc.get('name'), doc.get('price'), {
+            'quantity': doc.get('quantity', 1),
+            'price': doc.get('price', 0),
+            'store': doc.get('store', 'Unknown'),
+            'status': doc.get('status', 'to_buy')
+        })
+    },
+    'ficore_credit_transactions': {
+        # Wallet routes write 'date'; the personal tools write 'timestamp' and 'action'
+        'ts_field': ('date', 'timestamp'),
+        'build': lambda doc: ('ficore_credit', None, doc.get('amount'), {
+            'amount': doc.get('amount', 0),
+            'action': doc.get('type', doc.get('action', 'Unknown'))
+        })
+    },
+    'FoodOrder': {'ts_field': 'created_at', 'build': _food_order_activity},
+    'food_orders': {'ts_field': 'created_at', 'build': _food_order_activity},
+    'records': {
+        'ts_field': 'created_at',
+        'build': lambda doc: ('debt_added' if doc.get('type') == 'debtor' else 'trader_registered',
+                              doc.get('name'), doc.get('amount_owed', 0), {'record_type': doc.get('type')})
+    },
+    'cashflows': {
+        'ts_field': 'created_at',
+        'build': lambda doc: ('money_in' if doc.get('type') == 'receipt' else 'money_out',
+                              doc.get('party_name'), doc.get('amount', 0), {'cashflow_type': doc.get('type')})
+    },
+    'agent_activities': {
+        'ts_field': 'timestamp',
+        'owner_field': 'agent_id',
+        'build': lambda doc: (doc.get('activity_type'), doc.get('trader_id'), (doc.get('details') or {}).get('amount'),
+                              dict(doc.get('details') or {}, trader_id=doc.get('trader_id')))
+    }
+}
+
+def _ts_fields(config):
+    ts_field = config['ts_field']
+    return ts_field if isinstance(ts_field, tuple) else (ts_field,)
+
+def _document_ts(doc, config):
+    for field in _ts_fields(config):
+        if isinstance(doc.get(field), datetime):
+            return doc[field]
+    return None
+
+def record_document_activity(db, collection, doc, action='created'):
+    """
+    Record a timeline event for a document written to one of ACTIVITY_SOURCES.
+
+    Args:
+        db: MongoDB database instance
+        collection: Name of the collection the document belongs to
+        doc: The inserted document, or the document as it was before a delete
+        action: 'created', 'updated', 'deleted', 'bought', ... (default: 'created')
+    """
+    if not doc:
+        return
+    config = ACTIVITY_SOURCES[collection]
+    activity_type, name, amount, details = config['build'](doc)
+    ts = _document_ts(doc, config) if action == 'created' else None
+    record_activity(db, doc.get(config.get('owner_field', 'user_id')), activity_type, action=action, name=name,
+                    amount=amount, details=details, source=collection, source_id=doc.get('_id'),
+                    ts=ts, session_id=doc.get('session_id'))
+
+def backfill_activity_events(db, batch_size=500, collections=None):
+    """
+    Build the activity timeline from existing collections in _id-ordered batches.
+
+    Creation events are upserted under the same deterministic IDs record_activity
+    uses, so the backfill is safe to re-run and to run alongside live writes.
+
+    Args:
+        db: MongoDB database instance
+        batch_size: Documents read and written per batch (default: 500)
+        collections: Restrict to these source collections (optional)
+
+    Returns:
+        dict: Number of events upserted per source collection
+    """
+    totals = {}
+    for collection, config in ACTIVITY_SOURCES.items():
+        if collections and collection not in collections:
+            continue
+        owner_field = config.get('owner_field', 'user_id')
+        last_id = None
+        upserted = 0
+        while True:
+            batch_query = {
+                '$and': [
+                    {'$or': [{owner_field: {'$nin': [None, '']}}, {'session_id': {'$nin': [None, '']}}]},
+                    {'$or': [{field: {'$type': 'date'}} for field in _ts_fields(config)]}
+                ]
+            }
+            if last_id is not None:
+                batch_query['_id'] = {'$gt': last_id}
+            docs = list(db[collection].find(batch_query).sort('_id', 1).limit(batch_size))
+            if not docs:
+                break
+            operations = []
+            for doc in docs:
+                activity_type, name, amount, details = config['build'](doc)
+                if not activity_type:
+                    continue
+                event = _build_event(doc.get(owner_field), activity_type, 'created', name, amount, details,
+                                     collection, doc['_id'], _document_ts(doc, config), doc.get('session_id'))
+                operations.append(UpdateOne({'_id': event['_id']}, {'$setOnInsert': event}, upsert=True))
+            if operations:
+                result = db.activity_events.bulk_write(operations, ordered=False)
+                upserted += result.upserted_count
+            last_id = docs[-1]['_id']
+            logger.info(f"Backfilled {collection} up to _id {last_id} ({upserted} events so far)",
+                        extra={'session_id': 'no-session-id'})
+        totals[collection] = upserted
+    return totals
@@ -1,11 +1,11 @@
 import logging
 from bson import ObjectId
-from flask import Blueprint, render_template, redirect, url_for, flash, request, session, Response
+from flask import Blueprint, render_template, redirect, url_for, flash, request, session, Response, jsonify
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, FloatField, SelectField, SubmitField, TextAreaField, DateField, IntegerField, validators, BooleanField
 from wtforms.validators import DataRequired, NumberRange, ValidationError
-from translations import trans
+from translations import trans, get_translation_stats, get_translation_load_stats
 import utils
 import datetime
 from reportlab.lib.pagesizes import A4
@@ -16,6 +16,8 @@ from io import BytesIO, StringIO
 import csv
 import re
 from models import get_budgets, get_bills
+from job_metrics import get_job_stats, get_job_trends, get_local_job_stats, JOB_RUNS_RETENTION_DAYS
+from user_cache import invalidate_user
 from werkzeug.utils import secure_filename
 import os
 from credits import ApproveCreditRequestForm
@@ -335,6 +337,7 @@ def suspend_user(user_id):
             user_query,
             {'$set': {'suspended': True, 'updated_at': datetime.datetime.utcnow()}}
         )
+        invalidate_user(user['_id'])
         if result.modified_count == 0:
             flash(trans('admin_user_not_updated', default='User could not be suspended'), 'danger')
         else:
@@ -362,12 +365,14 @@ def delete_user(user_id):
             return redirect(url_for('admin.manage_users'))
         db.data_records.delete_many({'user_id': user_id})
         db.cashflows.delete_many({'user_id': user_id})
+        db.user_balances.delete_one({'_id': str(user_id)})
         db.ficore_credit_transactions.delete_many({'user_id': user_id})
         db.credit_requests.delete_many({'user_id': user_id})
         db.audit_logs.delete_many({'details.user_id': user_id})
         db.budgets.delete_many({'user_id': user_id})
         db.bills.delete_many({'user_id': user_id})
         result = db.users.delete_one(user_query)
+        invalidate_user(user['_id'])
         if result.deleted_count == 0:
             flash(trans('admin_user_not_deleted', default='User could not be deleted'), 'danger')
         else:
@@ -514,6 +519,48 @@ def audit():
         flash(trans('admin_database_error', default='An error occurred while accessing the database'), 'danger')
         return render_template('admin/audit.html', logs=[])
 
+@admin_bp.route('/job-metrics', methods=['GET'])
+@login_required
+@utils.requires_role('admin')
+@utils.limiter.limit("50 per hour")
+def job_metrics():
+    """View scheduler job duration percentiles, this worker's own runs and daily throughput trends."""
+    try:
+        db = utils.get_mongo_db()
+        days = min(max(request.args.get('days', 14, type=int), 1), JOB_RUNS_RETENTION_DAYS)
+        stats = get_job_stats(db)
+        trends = get_job_trends(db, days=days)
+        schedule = [{
+            'id': job['_id'],
+            'next_run_at': datetime.datetime.utcfromtimestamp(job['next_run_time']) if job.get('next_run_time') else None,
+            'last_run_at': job.get('last_run_at'),
+            'last_status': job.get('last_status'),
+            'last_error': job.get('last_error')
+        } for job in db.scheduler_jobs.find({}, {'job_state': 0}).sort('_id', 1)]
+        return render_template(
+            'admin/job_metrics.html',
+            stats=stats,
+            local_stats=get_local_job_stats(),
+            worker_pid=os.getpid(),
+            trends=trends,
+            schedule=schedule,
+            days=days,
+            title=trans('admin_job_metrics_title', default='Job Metrics')
+        )
+    except Exception as e:
+        logger.error(f"Error loading job metrics for admin {current_user.id}: {str(e)}")
+        flash(trans('admin_database_error', default='An error occurred while accessing the database'), 'danger')
+        return render_template('admin/job_metrics.html', stats={}, local_stats=get_local_job_stats(), worker_pid=os.getpid(),
+                               trends={}, schedule=[], days=14)
+
+@admin_bp.route('/translation-stats', methods=['GET'])
+@login_required
+@utils.requires_role('admin')
+@utils.limiter.limit("50 per hour")
+def translation_stats():
+    """Per-endpoint translation memo hit rates and loaded translation tables for the worker serving this request."""
+    return jsonify({'endpoints': get_translation_stats(), 'loading': get_translation_load_stats()})
+
 @admin_bp.route('/budgets', methods=['GET'])
 @login_required
 @utils.requires_role('admin')
@@ -964,6 +1011,7 @@ def manage_user_roles():
                 {'_id': ObjectId(user_id)},
                 {'$set': {'role': new_role, 'updated_at': datetime.datetime.utcnow()}}
             )
+            invalidate_user(user['_id'])
             logger.info(f"User role updated: id={user_id}, new_role={new_role}, user={current_user.id}")
             log_audit_action('update_user_role', {'user_id': user_id, 'new_role': new_role})
             flash(trans('user_role_updated', default='User role updated successfully'), 'success')
@@ -9,6 +9,8 @@ import logging
 import uuid
 import utils
 from translations import trans
+from balances import get_user_balances
+from activity_feed import record_document_activity, get_timeline_events, AGENT_ACTIVITY_TYPES
 
 logger = logging.getLogger(__name__)
 
@@ -78,12 +80,15 @@ def agent_portal():
             'created_at': {'$gte': today}
         }) or 0
         
-        # Get recent activities
-        recent_activities = list(db.agent_activities.find({
-            'agent_id': agent_id
-        }).sort('timestamp', -1).limit(10)) or []
-        for activity in recent_activities:
-            activity['_id'] = str(activity['_id'])
+        # Get recent activities from the timeline
+        events, _ = get_timeline_events(db, {'user_id': str(agent_id)}, types=AGENT_ACTIVITY_TYPES, limit=10)
+        recent_activities = [{
+            '_id': event['_id'],
+            'activity_type': event['type'],
+            'trader_id': event['details'].get('trader_id'),
+            'details': event['details'],
+            'timestamp': event['ts']
+        } for event in events]
         
         # Get traders this agent has assisted
         assisted_traders = list(db.users.find({
@@ -176,7 +181,7 @@ def register_trader():
             db.temp_credentials.create_index('expires_at', expireAfterSeconds=0)
             
             # Log agent activity
-            db.agent_activities.insert_one({
+            agent_activity = {
                 'agent_id': current_user.id,
                 'activity_type': 'trader_registration',
                 'trader_id': username,
@@ -185,7 +190,9 @@ def register_trader():
                     'industry': form.industry.data
                 },
                 'timestamp': datetime.utcnow()
-            })
+            }
+            db.agent_activities.insert_one(agent_activity)
+            record_document_activity(db, 'agent_activities', agent_activity)
             
             # Credit signup bonus
             db.ficore_credit_transactions.insert_one({
@@ -270,7 +277,7 @@ def manage_credits():
             })
             
             # Log agent activity
-            db.agent_activities.insert_one({
+            agent_activity = {
                 'agent_id': current_user.id,
                 'activity_type': 'credit_request',
                 'trader_id': trader_username,
@@ -280,7 +287,9 @@ def manage_credits():
                     'business_name': trader.get('business_details', {}).get('name', 'N/A')
                 },
                 'timestamp': datetime.utcnow()
-            })
+            }
+            db.agent_activities.insert_one(agent_activity)
+            record_document_activity(db, 'agent_activities', agent_activity)
             
             flash(trans('agents_credit_request_submitted', default=f'Credit request for {amount} FCs submitted for {trader_username}'), 'success')
             logger.info(f"Agent {current_user.id} submitted credit request for {amount} FCs for trader {trader_username} at {datetime.utcnow()}")
@@ -374,32 +383,14 @@ def generate_trader_report(trader_id):
             return redirect(url_for('agents_bp.agent_portal'))
         
         # Calculate financial summary
-        total_debtors = list(db.records.aggregate([
-            {'$match': {'user_id': trader_id, 'type': 'debtor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]))
-        total_debtors_amount = total_debtors[0]['total'] if total_debtors else 0
-        
-        total_creditors = list(db.records.aggregate([
-            {'$match': {'user_id': trader_id, 'type': 'creditor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]))
-        total_creditors_amount = total_creditors[0]['total'] if total_creditors else 0
-        
-        total_receipts = list(db.cashflows.aggregate([
-            {'$match': {'user_id': trader_id, 'type': 'receipt'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]))
-        total_receipts_amount = total_receipts[0]['total'] if total_receipts else 0
-        
-        total_payments = list(db.cashflows.aggregate([
-            {'$match': {'user_id': trader_id, 'type': 'payment'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]))
-        total_payments_amount = total_payments[0]['total'] if total_payments else 0
+        balances = get_user_balances(db, trader_id)
+        total_debtors_amount = balances['total_i_am_owed']
+        total_creditors_amount = balances['total_i_owe']
+        total_receipts_amount = balances['total_receipts']
+        total_payments_amount = balances['total_payments']
         
         # Log agent activity
-        db.agent_activities.insert_one({
+        agent_activity = {
             'agent_id': current_user.id,
             'activity_type': 'report_generation',
             'trader_id': trader_id,
@@ -409,7 +400,9 @@ def generate_trader_report(trader_id):
                 'total_creditors': total_creditors_amount
             },
             'timestamp': datetime.utcnow()
-        })
+        }
+        db.agent_activities.insert_one(agent_activity)
+        record_document_activity(db, 'agent_activities', agent_activity)
         
         logger.info(f"Agent {current_user.id} generated report for trader {trader_id} at {datetime.utcnow()}")
         return render_template(
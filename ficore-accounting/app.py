@@ -9,7 +9,7 @@ import uuid
 from datetime import datetime, date, timedelta
 from flask import (
     Flask, jsonify, request, render_template, redirect, url_for, flash,
-    make_response, has_request_context, g, send_from_directory, session, Response, current_app, abort
+    make_response, has_request_context, send_from_directory, session, Response, current_app, abort
 )
 from flask_session import Session
 from flask_cors import CORS
@@ -26,13 +26,18 @@ from models import (
     to_dict_payment_location, to_dict_tax_reminder, to_dict_vat_rule, initialize_app_data
 )
 import utils
+from user_cache import load_user_document, get_user_field, invalidate_user, user_object_cache, credit_balance_cache
 from session_utils import create_anonymous_session
-from translations import register_translation, trans, get_translations, get_all_translations, get_module_translations
+from translations import register_translation, trans, get_translations, get_module_translations, get_request_translator, get_translation_payload, translation_modules
 from flask_login import LoginManager, login_required, current_user, UserMixin, logout_user
 from flask_wtf.csrf import CSRFError
 from jinja2.exceptions import TemplateNotFound
 import time
+import click
 from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+from db_manager import MongoConnectionManager
+from activity_feed import backfill_activity_events
 import certifi
 from credits.routes import credits_bp
 import re
@@ -258,9 +263,7 @@ class User(UserMixin):
 
     def get(self, key, default=None):
         try:
-            with current_app.app_context():
-                user = current_app.extensions['mongo']['ficodb'].users.find_one({'_id': self.id})
-                return user.get(key, default) if user else default
+            return get_user_field(self.id, key, default)
         except Exception as e:
             logger.error(f'Error fetching user data for {self.id}: {str(e)}', exc_info=True)
             return default
@@ -268,9 +271,8 @@ class User(UserMixin):
     @property
     def is_active(self):
         try:
-            with current_app.app_context():
-                user = current_app.extensions['mongo']['ficodb'].users.find_one({'_id': self.id})
-                return user.get('is_active', True) if user else False
+            user = load_user_document(self.id)
+            return user.get('is_active', True) if user else False
         except Exception as e:
             logger.error(f'Error checking active status for user {self.id}: {str(e)}', exc_info=True)
             return False
@@ -280,11 +282,10 @@ class User(UserMixin):
 
     def get_first_name(self):
         try:
-            with current_app.app_context():
-                user = current_app.extensions['mongo']['ficodb'].users.find_one({'_id': self.id})
-                if user and 'personal_details' in user:
-                    return user['personal_details'].get('first_name', self.display_name)
-                return self.display_name
+            user = load_user_document(self.id)
+            if user and user.get('personal_details'):
+                return user['personal_details'].get('first_name', self.display_name)
+            return self.display_name
         except Exception as e:
             logger.error(f'Error fetching first name for user {self.id}: {str(e)}', exc_info=True)
             return self.display_name
@@ -340,14 +341,20 @@ def create_app():
         app.extensions = getattr(app, 'extensions', {})
         app.extensions['mongo'] = client
         client.admin.command('ping')
+        mongo_manager = MongoConnectionManager(
+            client,
+            db_name='ficodb',
+            health_check_interval=int(os.getenv('MONGO_HEALTH_CHECK_INTERVAL', 30))
+        )
+        app.extensions['mongo_manager'] = mongo_manager
+        mongo_manager.start_health_monitor()
         logger.info('MongoDB client initialized successfully')
         
         def shutdown_mongo_client():
             try:
-                mongo = app.extensions.get('mongo')
-                if mongo:
-                    mongo.close()
-                    logger.info('MongoDB client closed successfully')
+                manager = app.extensions.get('mongo_manager')
+                if manager:
+                    manager.close()
             except Exception as e:
                 logger.error(f'Error closing MongoDB client: {str(e)}', exc_info=True)
         
@@ -372,7 +379,7 @@ def create_app():
     def load_user(user_id):
         try:
             with app.app_context():
-                user = app.extensions['mongo']['ficodb'].users.find_one({'_id': user_id})
+                user = load_user_document(user_id, db=app.extensions['mongo_manager'].get_db())
                 if not user:
                     return None
                 return User(
@@ -676,21 +683,22 @@ def create_app():
             format_date=utils.format_date
         )
     
+    # Language picker entries per display language; built once, not per render
+    available_languages_by_lang = {}
+
     @app.context_processor
     def inject_globals():
-        lang = session.get('lang', 'en')
-        def context_trans(key, **kwargs):
-            used_lang = kwargs.pop('lang', lang)
-            return utils.trans(
-                key,
-                lang=used_lang,
-                logger=g.get('logger', logger) if has_request_context() else logger,
-                **kwargs
-            )
-        supported_languages = app.config.get('SUPPORTED_LANGUAGES', ['en', 'ha'])
+        translator = get_request_translator()
+        lang = translator.lang if translator else 'en'
+        available_languages = available_languages_by_lang.get(lang)
+        if available_languages is None:
+            available_languages = available_languages_by_lang[lang] = [
+                {'code': code, 'name': trans(f'lang_{code}', lang=lang, default=code.capitalize())}
+                for code in app.config.get('SUPPORTED_LANGUAGES', ['en', 'ha'])
+            ]
         return {
             'google_client_id': app.config.get('GOOGLE_CLIENT_ID', ''),
-            'trans': context_trans,
+            'trans': translator or trans,
             'get_translations': get_translations,
             'current_year': datetime.now().year,
             'LINKEDIN_URL': app.config.get('LINKEDIN_URL', 'https://linkedin.com/company/ficoreafrica'),
@@ -701,10 +709,7 @@ def create_app():
             'CONSULTANCY_FORM_URL': app.config.get('CONSULTANCY_FORM_URL', '#'),
             'current_lang': lang,
             'current_user': current_user if has_request_context() else None,
-            'available_languages': [
-                {'code': code, 'name': utils.trans(f'lang_{code}', lang=lang, default=code.capitalize())}
-                for code in supported_languages
-            ],
+            'available_languages': available_languages,
             'dialogflow_agent_id': app.config.get('DIALOGFLOW_PROJECT_ID', 'ficoreassistant-kywl')
         }
     
@@ -742,6 +747,7 @@ def create_app():
                                 {'_id': current_user.id},
                                 {'$set': {'language': new_lang}}
                             )
+                            invalidate_user(current_user.id)
                         except Exception as e:
                             logger.warning(f'Could not update user language preference: {str(e)}')
                 
@@ -828,31 +834,53 @@ def create_app():
     def health():
         logger.info('Performing health check')
         status = {'status': 'healthy'}
+        manager = app.extensions['mongo_manager']
         try:
-            with app.app_context():
-                app.extensions['mongo'].admin.command('ping')
+            if not manager.ping():
+                manager.reconnect()
+            status['mongo'] = manager.get_stats()
+            status['user_cache'] = user_object_cache.get_stats()
+            status['credit_balance_cache'] = credit_balance_cache.get_stats()
             return jsonify(status), 200
         except Exception as e:
             logger.error(f'Health check failed: {str(e)}')
             status['status'] = 'unhealthy'
             status['details'] = str(e)
+            status['mongo'] = manager.get_stats()
             return jsonify(status), 500
     
     @app.route('/api/translations/<lang>')
-    @utils.limiter.limit('10 per minute')
+    @utils.limiter.exempt
     def get_translations_api(lang):
+        """
+        Serve the merged translations for a language from a payload built at startup.
+        
+        Supports ?modules=bill,budget for a module subset, If-None-Match
+        revalidation against a content-hash ETag, and a pre-gzipped body.
+        """
         try:
             supported_languages = app.config.get('SUPPORTED_LANGUAGES', ['en', 'ha'])
             if lang not in supported_languages:
                 return jsonify({'error': utils.trans('invalid_language')}), 400
             
-            all_translations = get_all_translations()
-            result = {}
-            for module_name, module_translations in all_translations.items():
-                if lang in module_translations:
-                    result.update(module_translations[lang])
+            modules = [name.strip() for name in request.args.get('modules', '').split(',') if name.strip()]
+            unknown_modules = [name for name in modules if name not in translation_modules]
+            if unknown_modules:
+                return jsonify({'error': utils.trans('invalid_module', default='Unknown translation module'), 'modules': unknown_modules}), 400
             
-            return jsonify({'translations': result})
+            payload = get_translation_payload(lang, modules or None)
+            etag = payload['etag']
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            elif 'gzip' in request.accept_encodings:
+                response = Response(payload['gzip'], mimetype='application/json')
+                response.headers['Content-Encoding'] = 'gzip'
+            else:
+                response = Response(payload['body'], mimetype='application/json')
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = f"public, max-age={app.config.get('TRANSLATIONS_CACHE_MAX_AGE', 86400)}"
+            response.vary.add('Accept-Encoding')
+            return response
         except Exception as e:
             logger.error(f'Translation API error: {str(e)}')
             return jsonify({'error': utils.trans('error')}), 500
@@ -889,6 +917,7 @@ def create_app():
                         {'_id': current_user.id},
                         {'$set': {'language': new_lang}}
                     )
+                    invalidate_user(current_user.id)
                 except Exception as e:
                     logger.warning(
                         f'Could not update user language for user {current_user.id}: {str(e)}',
@@ -1081,6 +1110,12 @@ def create_app():
                 title=utils.trans('not_found', lang=session.get('lang', 'en'))
             ), 404
 
+    @app.errorhandler(ConnectionFailure)
+    def handle_mongo_connection_error(e):
+        logger.error(f'MongoDB connection error: {str(e)}')
+        app.extensions['mongo_manager'].report_failure(e)
+        return internal_server_error(e)
+
     @app.errorhandler(500)
     def internal_server_error(e):
         logger.error(f'Server error: {str(e)}')
@@ -1150,20 +1185,16 @@ def create_app():
         if current_user.is_authenticated:
             session['last_activity'] = datetime.utcnow()
 
-    scheduler_shutdown_done = False
     mongo_client_closed = False
 
-    @app.teardown_appcontext
-    def cleanup_scheduler(exception):
-        nonlocal scheduler_shutdown_done
-        scheduler = app.config.get('SCHEDULER')
-        if scheduler and scheduler.running and not scheduler_shutdown_done:
-            try:
-                scheduler.shutdown()
-                logger.info('Scheduler shutdown')
-                scheduler_shutdown_done = True
-            except Exception as e:
-                logger.error(f'Scheduler shutdown error: {str(e)}')
+    @app.cli.command('backfill-activity')
+    @click.option('--batch-size', default=500, show_default=True, help='Documents read and written per batch.')
+    @click.option('--collection', 'collections', multiple=True, help='Restrict to a source collection (repeatable).')
+    def backfill_activity_command(batch_size, collections):
+        """Build the activity_events timeline from existing collections."""
+        totals = backfill_activity_events(app.extensions['mongo']['ficodb'], batch_size=batch_size, collections=collections or None)
+        for collection_name, count in totals.items():
+            click.echo(f'{collection_name}: {count} events')
 
     return app
 
@@ -0,0 +1,230 @@
+import logging
+from datetime import datetime
+from pymongo import ReplaceOne
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger('ficore_app')
+
+# user_balances holds one document per trader, keyed by user ID:
+#   {'_id': user_id, 'total_i_owe', 'total_i_am_owed', 'total_receipts',
+#    'total_payments', 'monthly': {'YYYY-MM': {'receipts', 'payments'}}, 'updated_at'}
+# Writers apply $inc deltas; reconcile_user_balances() rebuilds it from source.
+
+RECORD_TOTALS = {
+    'debtor': 'total_i_am_owed',
+    'creditor': 'total_i_owe'
+}
+
+CASHFLOW_TOTALS = {
+    'receipt': ('total_receipts', 'receipts'),
+    'payment': ('total_payments', 'payments')
+}
+
+BALANCE_FIELDS = ('total_i_owe', 'total_i_am_owed', 'total_receipts', 'total_payments')
+
+def month_key(when):
+    """Return the 'YYYY-MM' bucket for a datetime."""
+    return when.strftime('%Y-%m')
+
+def _empty_balance(user_id):
+    balance = {'_id': user_id, 'monthly': {}}
+    for field in BALANCE_FIELDS:
+        balance[field] = 0
+    return balance
+
+def _add(increments, field, amount):
+    if amount:
+        increments[field] = increments.get(field, 0) + amount
+
+def _record_increments(doc, sign, increments):
+    field = RECORD_TOTALS.get(doc.get('type'))
+    if field:
+        _add(increments, field, sign * float(doc.get('amount_owed') or 0))
+
+def _cashflow_increments(doc, sign, increments):
+    fields = CASHFLOW_TOTALS.get(doc.get('type'))
+    if not fields:
+        return
+    amount = sign * float(doc.get('amount') or 0)
+    total_field, monthly_field = fields
+    _add(increments, total_field, amount)
+    created_at = doc.get('created_at')
+    if isinstance(created_at, datetime):
+        _add(increments, f"monthly.{month_key(created_at)}.{monthly_field}", amount)
+
+def _apply_change(db, old_doc, new_doc, build_increments):
+    """
+    $inc the owner's snapshot by (new_doc - old_doc).
+
+    Call after the source write. Either side may be None for creates and deletes.
+    Errors are logged and swallowed; the reconciliation job repairs any snapshot
+    that misses a delta.
+    """
+    increments_by_user = {}
+    for doc, sign in ((old_doc, -1), (new_doc, 1)):
+        if doc and doc.get('user_id'):
+            build_increments(doc, sign, increments_by_user.setdefault(str(doc['user_id']), {}))
+    for user_id, increments in increments_by_user.items():
+        increments = {field: value for field, value in increments.items() if value}
+        if not increments:
+            continue
+        try:
+            result = db.user_balances.update_one(
+                {'_id': user_id},
+                {'$inc': increments, '$set': {'updated_at': datetime.utcnow()}}
+            )
+            if result.matched_count == 0:
+                # No snapshot yet: seed it from source, which already includes this write
+                reconcile_user_balances(db, user_id)
+        except PyMongoError as e:
+            logger.error(f"Failed to update balance snapshot for user {user_id}: {str(e)}",
+                         exc_info=True, extra={'session_id': 'no-session-id'})
+
+def apply_record_change(db, old_doc=None, new_doc=None):
+    """
+    Apply a debtor/creditor record create, edit or delete to user_balances.
+
+    Args:
+        db: MongoDB database instance
+        old_doc: Record before the write (None on create)
+        new_doc: Record after the write (None on delete)
+    """
+    _apply_change(db, old_doc, new_doc, _record_increments)
+
+def apply_cashflow_change(db, old_doc=None, new_doc=None):
+    """
+    Apply a receipt/payment create, edit or delete to user_balances.
+
+    Args:
+        db: MongoDB database instance
+        old_doc: Cashflow before the write (None on create)
+        new_doc: Cashflow after the write (None on delete)
+    """
+    _apply_change(db, old_doc, new_doc, _cashflow_increments)
+
+def _compute_balances(db, match=None):
+    """Aggregate records and cashflows into snapshot documents keyed by user ID."""
+    match = match or {}
+    balances = {}
+
+    def balance_for(user_id):
+        user_id = str(user_id)
+        if user_id not in balances:
+            balances[user_id] = _empty_balance(user_id)
+        return balances[user_id]
+
+    records_pipeline = [
+        {'$match': {**match, 'type': {'$in': list(RECORD_TOTALS)}}},
+        {'$group': {'_id': {'user_id': '$user_id', 'type': '$type'}, 'total': {'$sum': '$amount_owed'}}}
+    ]
+    for row in db.records.aggregate(records_pipeline):
+        balance_for(row['_id']['user_id'])[RECORD_TOTALS[row['_id']['type']]] += row['total']
+
+    cashflows_pipeline = [
+        {'$match': {**match, 'type': {'$in': list(CASHFLOW_TOTALS)}}},
+        {'$group': {
+            '_id': {
+                'user_id': '$user_id',
+                'type': '$type',
+                'month': {'$dateToString': {'format': '%Y-%m', 'date': '$created_at'}}
+            },
+            'total': {'$sum': '$amount'}
+        }}
+    ]
+    for row in db.cashflows.aggregate(cashflows_pipeline):
+        balance = balance_for(row['_id']['user_id'])
+        total_field, monthly_field = CASHFLOW_TOTALS[row['_id']['type']]
+        balance[total_field] += row['total']
+        month = row['_id'].get('month')
+        if month:
+            month_totals = balance['monthly'].setdefault(month, {})
+            month_totals[monthly_field] = month_totals.get(monthly_field, 0) + row['total']
+    return balances
+
+def _drifted(stored, computed):
+    if stored is None:
+        return True
+    for field in BALANCE_FIELDS:
+        if round(stored.get(field, 0), 2) != round(computed[field], 2):
+            return True
+    stored_monthly = stored.get('monthly', {})
+    for month in set(stored_monthly) | set(computed['monthly']):
+        stored_month = stored_monthly.get(month, {})
+        computed_month = computed['monthly'].get(month, {})
+        for field in ('receipts', 'payments'):
+            if round(stored_month.get(field, 0), 2) != round(computed_month.get(field, 0), 2):
+                return True
+    return False
+
+def reconcile_user_balances(db, user_id=None):
+    """
+    Rebuild user_balances from records and cashflows, rewriting drifted snapshots.
+
+    Args:
+        db: MongoDB database instance
+        user_id: Reconcile a single user (default: every user with records or cashflows)
+
+    Returns:
+        dict: checked, repaired and removed snapshot counts
+    """
+    match = {'user_id': str(user_id)} if user_id is not None else {}
+    computed = _compute_balances(db, match)
+    if user_id is not None:
+        # Keep an empty snapshot so users with no data are not rebuilt on every read
+        computed.setdefault(str(user_id), _empty_balance(str(user_id)))
+    stored_query = {'_id': str(user_id)} if user_id is not None else {}
+    stored = {doc['_id']: doc for doc in db.user_balances.find(stored_query)}
+
+    now = datetime.utcnow()
+    operations = []
+    for uid, balance in computed.items():
+        if _drifted(stored.get(uid), balance):
+            operations.append(ReplaceOne({'_id': uid}, {**balance, 'updated_at': now, 'reconciled_at': now}, upsert=True))
+    if operations:
+        db.user_balances.bulk_write(operations, ordered=False)
+
+    orphaned = [uid for uid in stored if uid not in computed]
+    if orphaned:
+        db.user_balances.delete_many({'_id': {'$in': orphaned}})
+
+    result = {'checked': len(computed), 'repaired': len(operations), 'removed': len(orphaned)}
+    if operations or orphaned:
+        logger.warning(f"Reconciled user balances: {result}", extra={'session_id': 'no-session-id'})
+    else:
+        logger.info(f"Reconciled user balances: {result}", extra={'session_id': 'no-session-id'})
+    return result
+
+def get_user_balances(db, user_id):
+    """
+    Read a trader's balance snapshot with a single find_one.
+
+    Users without a snapshot yet (e.g. data written before snapshots existed)
+    are rebuilt from source on first read.
+
+    Args:
+        db: MongoDB database instance
+        user_id: ID of the user
+
+    Returns:
+        dict: Snapshot document with all totals defaulted to 0
+    """
+    user_id = str(user_id)
+    balance = db.user_balances.find_one({'_id': user_id})
+    if balance is None:
+        reconcile_user_balances(db, user_id)
+        balance = db.user_balances.find_one({'_id': user_id}) or _empty_balance(user_id)
+    for field in BALANCE_FIELDS:
+        balance.setdefault(field, 0)
+    balance.setdefault('monthly', {})
+    return balance
+
+def get_month_totals(balance, when=None):
+    """
+    Return (receipts, payments) for the month containing when (default: now).
+
+    Args:
+        balance: Snapshot returned by get_user_balances
+        when: datetime within the month (optional)
+    """
+    month_totals = balance.get('monthly', {}).get(month_key(when or datetime.utcnow()), {})
+    return month_totals.get('receipts', 0), month_totals.get('payments', 0)
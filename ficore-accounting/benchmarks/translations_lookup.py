@@ -0,0 +1,92 @@
+"""
+Time trans() lookups: the per-call prefix scan it used to do against the
+compiled table it uses now.
+
+Both run outside a request, so the request memo is not involved. The key
+mix is every key in every module plus a share of missing keys, which fall
+through the whole prefix list.
+
+Run from the app directory:
+    python benchmarks/translations_lookup.py
+    python benchmarks/translations_lookup.py --lang ha --number 20
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from translations import (COMPILED_TRANSLATIONS, GENERAL_SPECIFIC_KEYS, KEY_PREFIX_TO_MODULE, SUPPORTED_LANGUAGES,
+                          _translate, translation_modules)
+
+def prefix_scan(key, lang, default=None, **kwargs):
+    """trans() before the compiled table, minus its logging."""
+    module_name = 'general'
+    for prefix, mod in KEY_PREFIX_TO_MODULE.items():
+        if key.startswith(prefix):
+            module_name = mod
+            break
+    if key in GENERAL_SPECIFIC_KEYS:
+        module_name = 'general'
+    module = translation_modules.get(module_name, translation_modules['general'])
+    translation = module.get(lang, {}).get(key)
+    if translation is None:
+        translation = module.get('en', {}).get(key, default or key)
+    if kwargs:
+        try:
+            return translation.format(**kwargs)
+        except (KeyError, ValueError):
+            return translation
+    return translation
+
+def formats_cleanly(key, lang, kwargs):
+    try:
+        prefix_scan(key, lang, **kwargs)
+        return True
+    except IndexError:
+        # Positional placeholders such as '{}' raise in trans() too
+        return False
+
+def compiled(key, lang, default=None, **kwargs):
+    return _translate(key, lang, default, kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lang', choices=SUPPORTED_LANGUAGES, default='en')
+    parser.add_argument('--number', type=int, default=10, help='passes over the key mix per repeat')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--missing', type=float, default=0.05, help='share of lookups for keys that do not exist')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    keys = sorted({key for module in translation_modules.values() for table in module.values() for key in table})
+    rng = random.Random(args.seed)
+    missing = [f"{rng.choice(['bill_', 'reports_', 'tax_', ''])}missing_{index}" for index in range(int(len(keys) * args.missing))]
+    mix = keys + missing
+    rng.shuffle(mix)
+    # Load the table and log each missing key once before timing; startup cost is
+    # measured by translations_startup.py
+    logging.getLogger('ficore_app').setLevel(logging.CRITICAL)
+    COMPILED_TRANSLATIONS[args.lang]
+    for key in mix:
+        compiled(key, args.lang)
+
+    print(f"{len(mix)} lookups per pass ({len(keys)} keys, {len(missing)} missing), lang={args.lang}")
+    results = {}
+    for name, function in (('prefix scan', prefix_scan), ('compiled', compiled)):
+        for label, kwargs in (('plain', {}), ('kwargs', {'amount': '100'})):
+            lookups = [key for key in mix if formats_cleanly(key, args.lang, kwargs)]
+            def run():
+                for key in lookups:
+                    function(key, args.lang, **kwargs)
+            best = min(timeit.repeat(run, number=args.number, repeat=args.repeat)) / args.number
+            results[name, label] = best
+            print(f"{name:>11}, {label:>6}: {best / len(lookups) * 1e9:7.0f} ns/lookup")
+    for label in ('plain', 'kwargs'):
+        print(f"speedup ({label}): {results['prefix scan', label] / results['compiled', label]:.1f}x")
+
+if __name__ == '__main__':
+    main()
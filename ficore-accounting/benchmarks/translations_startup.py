@@ -0,0 +1,82 @@
+"""
+Measure what importing translations costs a fresh worker, in time and peak RSS.
+
+Each scenario runs in its own subprocess, which reports the elapsed time of
+its steps and ru_maxrss at the end:
+
+    flask only     import flask (translations imports it; the baseline)
+    import         import translations
+    first trans    import, then trans() in en with an empty marshal cache
+    cached trans   the same with the cache the previous run wrote
+    all modules    import, then every translation module and a full compile,
+                   which is what every worker did at import before lazy loading
+
+Run from the app directory:
+    python benchmarks/translations_startup.py
+    python benchmarks/translations_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import flask
+flask_seconds = time.perf_counter() - started
+steps = {}
+if SCENARIO != 'flask only':
+    started = time.perf_counter()
+    import translations
+    steps['import'] = time.perf_counter() - started
+    started = time.perf_counter()
+    if SCENARIO in ('first trans', 'cached trans'):
+        translations.trans('general_welcome', lang='en')
+    elif SCENARIO == 'all modules':
+        dict(translations.translation_modules)
+        translations.compile_translations()
+    steps['after import'] = time.perf_counter() - started
+maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in KiB on Linux and bytes on macOS
+maxrss_mib = maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+print(json.dumps({'flask': flask_seconds, 'steps': steps, 'maxrss_mib': maxrss_mib,
+                  'modules': len(translations.translation_modules.loaded) if SCENARIO != 'flask only' else 0}))
+"""
+
+SCENARIOS = ('flask only', 'import', 'first trans', 'cached trans', 'all modules')
+
+def run_child(scenario, cache_dir):
+    env = dict(os.environ, TRANSLATIONS_CACHE_DIR=cache_dir)
+    code = f"SCENARIO = {scenario!r}\n{CHILD}"
+    output = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='subprocesses per scenario; medians are reported')
+    args = parser.parse_args()
+
+    print(f"{'scenario':<13} {'flask ms':>9} {'import ms':>10} {'after ms':>9} {'total ms':>9} {'maxrss MiB':>11} {'modules':>8}")
+    for scenario in SCENARIOS:
+        samples = []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                if scenario == 'cached trans':
+                    run_child('first trans', cache_dir)
+                samples.append(run_child(scenario, cache_dir))
+        flask_ms = statistics.median(s['flask'] for s in samples) * 1000
+        import_ms = statistics.median(s['steps'].get('import', 0) for s in samples) * 1000
+        after_ms = statistics.median(s['steps'].get('after import', 0) for s in samples) * 1000
+        maxrss = statistics.median(s['maxrss_mib'] for s in samples)
+        print(f"{scenario:<13} {flask_ms:>9.1f} {import_ms:>10.1f} {after_ms:>9.1f} {import_ms + after_ms:>9.1f} "
+              f"{maxrss:>11.1f} {samples[0]['modules']:>8}")
+
+if __name__ == '__main__':
+    main()
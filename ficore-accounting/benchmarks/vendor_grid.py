@@ -0,0 +1,62 @@
+"""
+Time VendorGrid.nearest against a full haversine scan of every vendor.
+
+Vendors and queries are drawn with a fixed seed over Nigeria's bounding box,
+so runs are comparable. Grid results are checked against the full scan for
+the first --check queries.
+
+Run from the app directory:
+    python benchmarks/vendor_grid.py
+    python benchmarks/vendor_grid.py --vendors 100000 --queries 500 --cell-degrees 0.1
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vendor_locator import VENDOR_RESULTS_LIMIT, VendorGrid, haversine_m
+
+LAT_RANGE = (4.0, 14.0)
+LNG_RANGE = (3.0, 15.0)
+
+def full_scan(vendors, lat, lng, limit, radius_m):
+    matches = [(haversine_m(lat, lng, vendor_lat, vendor_lng), name) for name, vendor_lat, vendor_lng in vendors]
+    return [(name, distance) for distance, name in heapq.nsmallest(limit, [m for m in matches if m[0] <= radius_m])]
+
+def per_query_ms(function, queries):
+    start = time.perf_counter()
+    results = [function(lat, lng) for lat, lng in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vendors', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--check', type=int, default=20, help='queries also run as a full scan')
+    parser.add_argument('--cell-degrees', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vendors = [(f"vendor{index}", rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for index in range(args.vendors)]
+    queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.queries)]
+    checked = queries[:args.check]
+
+    start = time.perf_counter()
+    grid = VendorGrid(vendors, cell_degrees=args.cell_degrees)
+    print(f"{args.vendors} vendors, {len(grid.cells)} cells of {args.cell_degrees} degrees, "
+          f"built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for radius_km in (5, 25, 200):
+        radius_m = radius_km * 1000
+        grid_results, grid_ms = per_query_ms(lambda lat, lng: grid.nearest(lat, lng, VENDOR_RESULTS_LIMIT, radius_m), queries)
+        scan_results, scan_ms = per_query_ms(lambda lat, lng: full_scan(vendors, lat, lng, VENDOR_RESULTS_LIMIT, radius_m), checked)
+        assert grid_results[:len(checked)] == scan_results, f"grid and full scan disagree at {radius_km} km"
+        print(f"radius {radius_km:>3} km: grid {grid_ms:8.3f} ms/query, full scan {scan_ms:8.1f} ms/query "
+              f"({scan_ms / grid_ms:,.0f}x)")
+
+if __name__ == '__main__':
+    main()
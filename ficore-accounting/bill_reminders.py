@@ -0,0 +1,209 @@
+import logging
+import os
+from datetime import datetime, date, timedelta
+from flask import url_for
+from mailersend_email import send_email, EMAIL_CONFIG
+from translations import trans
+from notifications import NotificationDispatcher
+from utils import send_sms_reminder, send_whatsapp_reminder, to_due_datetime
+
+logger = logging.getLogger('ficore_app')
+
+REMINDER_STATUSES = ['unpaid', 'pending', 'overdue']
+DEFAULT_REMINDER_DAYS = 7
+# Upper bound on reminder_days enforced by BillFormProcessor
+MAX_REMINDER_DAYS = 30
+MS_PER_DAY = 24 * 60 * 60 * 1000
+
+REMINDER_USER_BATCH_SIZE = int(os.getenv('BILL_REMINDER_USER_BATCH_SIZE', 200))
+
+# Notifications sent per channel per run. When a channel runs out the run stops
+# and the next one resumes from the checkpoint.
+CHANNEL_LIMITS = {
+    'email': int(os.getenv('BILL_REMINDER_EMAIL_LIMIT', 500)),
+    'sms': int(os.getenv('BILL_REMINDER_SMS_LIMIT', 100)),
+    'whatsapp': int(os.getenv('BILL_REMINDER_WHATSAPP_LIMIT', 100))
+}
+
+# job_checkpoints document: {'_id': CHECKPOINT_ID, 'run_date': 'YYYY-MM-DD',
+#   'last_email': str or None, 'completed': bool, 'updated_at'}
+CHECKPOINT_ID = 'send_bill_reminders'
+
+def due_bills_pipeline(today, after=None):
+    """
+    Group bills that are due inside their reminder window (or already past due)
+    by recipient email, ordered by email for keyset resumption.
+
+    The leading $match is served by the (send_notifications, due_date) index;
+    the per-bill reminder_days window is applied with $expr on that subset.
+
+    Args:
+        today: date the run is for
+        after: Resume after this email (exclusive)
+    """
+    start = to_due_datetime(today)
+    match = {
+        'send_notifications': True,
+        'due_date': {'$lte': start + timedelta(days=MAX_REMINDER_DAYS)},
+        'status': {'$in': REMINDER_STATUSES},
+        'user_email': {'$gt': after} if after else {'$nin': [None, '']},
+        '$expr': {'$lte': ['$due_date', {'$add': [
+            start,
+            {'$multiply': [{'$ifNull': ['$reminder_days', DEFAULT_REMINDER_DAYS]}, MS_PER_DAY]}
+        ]}]}
+    }
+    return [
+        {'$match': match},
+        {'$sort': {'due_date': 1}},
+        {'$group': {
+            '_id': '$user_email',
+            'first_name': {'$first': '$first_name'},
+            'user_phone': {'$first': '$user_phone'},
+            'send_email': {'$max': '$send_email'},
+            'send_sms': {'$max': '$send_sms'},
+            'send_whatsapp': {'$max': '$send_whatsapp'},
+            'bills': {'$push': {
+                'bill_name': '$bill_name',
+                'amount': '$amount',
+                'due_date': '$due_date',
+                'category': '$category',
+                'status': '$status'
+            }}
+        }},
+        {'$sort': {'_id': 1}}
+    ]
+
+def _load_checkpoint(db, today):
+    checkpoint = db.job_checkpoints.find_one({'_id': CHECKPOINT_ID})
+    if not checkpoint or checkpoint.get('run_date') != today.isoformat():
+        return {'last_email': None, 'completed': False}
+    return checkpoint
+
+def _save_checkpoint(db, today, last_email, completed=False):
+    db.job_checkpoints.update_one(
+        {'_id': CHECKPOINT_ID},
+        {'$set': {
+            'run_date': today.isoformat(),
+            'last_email': last_email,
+            'completed': completed,
+            'updated_at': datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+def _channels_for(group, phone):
+    channels = []
+    if group.get('send_email'):
+        channels.append('email')
+    if phone and group.get('send_sms'):
+        channels.append('sms')
+    if phone and group.get('send_whatsapp'):
+        channels.append('whatsapp')
+    return channels
+
+def _send_bill_email(app, email, data, lang):
+    """Send the bill reminder email, returning (success, response) like the SMS/WhatsApp senders."""
+    send_email(
+        app=app,
+        logger=logger,
+        to_email=email,
+        subject=trans(EMAIL_CONFIG['bill_reminder']['subject_key'], lang=lang),
+        template_key='bill_reminder',
+        data=data,
+        lang=lang
+    )
+    return True, {}
+
+def _queue_user_reminders(app, dispatcher, email, group, user, phone, channels, counts):
+    """Queue one user's reminders on each of their channels."""
+    lang = user.get('lang', 'en') if user else 'en'
+    bills = [{
+        'bill_name': bill['bill_name'],
+        'amount': bill['amount'],
+        'due_date': bill['due_date'].strftime('%Y-%m-%d'),
+        'category': trans(f"bill_category_{bill['category']}", lang=lang),
+        'status': trans(f"bill_status_{bill['status']}", lang=lang)
+    } for bill in group['bills']]
+    reminder_data = {
+        'email': email,
+        'first_name': group.get('first_name') or 'User',
+        'phone': phone,
+        'bills': bills,
+        'lang': lang,
+        'cta_url': url_for('personal.bill.main', tab='dashboard', _external=True),
+        'unsubscribe_url': url_for('personal.bill.unsubscribe', _external=True)
+    }
+    if 'email' in channels:
+        dispatcher.submit('email', _send_bill_email, reminder_data, app, email, dict(reminder_data), lang)
+    for channel, sender in (('sms', send_sms_reminder), ('whatsapp', send_whatsapp_reminder)):
+        if channel in channels:
+            message = trans(f"bill_reminder_{channel}", lang=lang, bill_count=len(bills), due_date=bills[0]['due_date'])
+            dispatcher.submit(channel, sender, reminder_data, phone, message)
+    for channel in channels:
+        counts[channel] += 1
+
+def send_due_bill_reminders(app, db, today=None):
+    """
+    Send bill reminders for users with bills inside their reminder window.
+
+    Users are processed in email order in batches of REMINDER_USER_BATCH_SIZE,
+    with one users.find($in) per batch. Each batch is sent concurrently through
+    a NotificationDispatcher, which writes the delivery results to
+    bill_reminders in bulk. Progress is checkpointed in job_checkpoints after
+    every batch, so a run that hits a channel limit or fails is resumed by the
+    next run on the same day instead of starting over.
+
+    Args:
+        app: Flask application instance
+        db: MongoDB database instance
+        today: date to remind for (default: today)
+
+    Returns:
+        dict: users reminded, notifications per channel, failures and whether the day is complete
+    """
+    today = today or date.today()
+    checkpoint = _load_checkpoint(db, today)
+    counts = {'users': 0, 'email': 0, 'sms': 0, 'whatsapp': 0, 'failed': 0, 'completed': True}
+    if checkpoint.get('completed'):
+        return counts
+
+    last_email = checkpoint.get('last_email')
+    groups = db.bills.aggregate(due_bills_pipeline(today, after=last_email), allowDiskUse=True,
+                                batchSize=REMINDER_USER_BATCH_SIZE)
+    exhausted = False
+    with NotificationDispatcher(app, db) as dispatcher:
+        while not exhausted:
+            batch = []
+            for group in groups:
+                batch.append(group)
+                if len(batch) >= REMINDER_USER_BATCH_SIZE:
+                    break
+            if not batch:
+                break
+            users = {user['email']: user for user in db.users.find(
+                {'email': {'$in': [group['_id'] for group in batch]}},
+                {'email': 1, 'lang': 1, 'phone': 1}
+            )}
+            for group in batch:
+                email = group['_id']
+                user = users.get(email)
+                phone = (user.get('phone') if user else None) or group.get('user_phone')
+                channels = _channels_for(group, phone)
+                if any(counts[channel] >= CHANNEL_LIMITS[channel] for channel in channels):
+                    exhausted = True
+                    break
+                _queue_user_reminders(app, dispatcher, email, group, user, phone, channels, counts)
+                if channels:
+                    counts['users'] += 1
+                last_email = email
+            counts['failed'] += dispatcher.flush()['failed']
+            _save_checkpoint(db, today, last_email)
+
+    counts['completed'] = not exhausted
+    counts['items'] = counts['users']
+    if not exhausted:
+        _save_checkpoint(db, today, last_email, completed=True)
+    logger.info(f"Sent bill reminders to {counts['users']} users "
+                f"(email={counts['email']}, sms={counts['sms']}, whatsapp={counts['whatsapp']}, failed={counts['failed']}), "
+                f"{'finished' if not exhausted else 'paused at channel limit'} for {today.isoformat()}")
+    return counts
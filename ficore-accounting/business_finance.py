@@ -1,8 +1,10 @@
 from flask import Blueprint, jsonify, render_template, session, request, redirect, url_for
 from flask_login import current_user, login_required
-from datetime import datetime
 import utils
 from utils import logger
+from activity_feed import get_activity_feed, BUSINESS_ACTIVITY_TYPES
+from balances import get_user_balances, get_month_totals
+from credit_ledger import get_balance as get_credit_balance
 
 business = Blueprint('business', __name__, url_prefix='/business')
 
@@ -25,39 +27,14 @@ def home():
         user_id = current_user.id
         lang = session.get('lang', 'en')
 
-        # Fetch Ficore Credit balance
-        user = db.users.find_one({'_id': user_id})
-        ficore_credit_balance = user.get('ficore_credit_balance', 0) if user else 0
+        # Fetch Ficore Credit balance from the ledger's balance cache
+        ficore_credit_balance = get_credit_balance(db, user_id) or 0
 
-        # Fetch debt summary
-        creditors_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'creditor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]
-        creditors_result = list(db.records.aggregate(creditors_pipeline))
-        total_i_owe = creditors_result[0]['total'] if creditors_result else 0
-        debtors_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'debtor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]
-        debtors_result = list(db.records.aggregate(debtors_pipeline))
-        total_i_am_owed = debtors_result[0]['total'] if debtors_result else 0
-
-        # Fetch cashflow summary
-        today = datetime.utcnow()
-        start_of_month = datetime(today.year, today.month, 1)
-        receipts_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'receipt', 'created_at': {'$gte': start_of_month}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]
-        receipts_result = list(db.cashflows.aggregate(receipts_pipeline))
-        total_receipts = receipts_result[0]['total'] if receipts_result else 0
-        payments_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'payment', 'created_at': {'$gte': start_of_month}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]
-        payments_result = list(db.cashflows.aggregate(payments_pipeline))
-        total_payments = payments_result[0]['total'] if payments_result else 0
+        # Fetch debt and month-to-date cashflow summary from the balance snapshot
+        balances = get_user_balances(db, user_id)
+        total_i_owe = balances['total_i_owe']
+        total_i_am_owed = balances['total_i_am_owed']
+        total_receipts, total_payments = get_month_totals(balances)
         net_cashflow = total_receipts - total_payments
 
         logger.info(f"Rendered business finance homepage for user {user_id}", 
@@ -191,18 +168,9 @@ def debt_summary():
     try:
         db = utils.get_mongo_db()
         user_id = current_user.id
-        creditors_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'creditor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]
-        creditors_result = list(db.records.aggregate(creditors_pipeline))
-        total_i_owe = creditors_result[0]['total'] if creditors_result else 0
-        debtors_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'debtor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]
-        debtors_result = list(db.records.aggregate(debtors_pipeline))
-        total_i_am_owed = debtors_result[0]['total'] if debtors_result else 0
+        balances = get_user_balances(db, user_id)
+        total_i_owe = balances['total_i_owe']
+        total_i_am_owed = balances['total_i_am_owed']
         logger.info(f"Fetched debt summary for user {user_id}: I Owe={total_i_owe}, I Am Owed={total_i_am_owed}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({
@@ -222,20 +190,7 @@ def cashflow_summary():
     try:
         db = utils.get_mongo_db()
         user_id = current_user.id
-        today = datetime.utcnow()
-        start_of_month = datetime(today.year, today.month, 1)
-        receipts_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'receipt', 'created_at': {'$gte': start_of_month}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]
-        receipts_result = list(db.cashflows.aggregate(receipts_pipeline))
-        total_receipts = receipts_result[0]['total'] if receipts_result else 0
-        payments_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'payment', 'created_at': {'$gte': start_of_month}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]
-        payments_result = list(db.cashflows.aggregate(payments_pipeline))
-        total_payments = payments_result[0]['total'] if payments_result else 0
+        total_receipts, total_payments = get_month_totals(get_user_balances(db, user_id))
         net_cashflow = total_receipts - total_payments
         logger.info(f"Fetched cashflow summary for user {user_id}: Net Cashflow={net_cashflow}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
@@ -257,35 +212,7 @@ def recent_activity():
     try:
         db = utils.get_mongo_db()
         user_id = current_user.id
-        activities = []
-        
-        # Fetch recent debt records
-        records = db.records.find({'user_id': user_id}).sort('created_at', -1).limit(3)
-        for record in records:
-            activity_type = 'debt_added' if record.get('type') == 'debtor' else 'trader_registered'
-            description = f'{"Owe" if record.get("type") == "debtor" else "Owed by"} {record.get("name")}'
-            activities.append({
-                'type': activity_type,
-                'description': description,
-                'amount': record.get('amount_owed', 0),
-                'timestamp': record.get('created_at').isoformat()
-            })
-        
-        # Fetch recent cashflows
-        cashflows = db.cashflows.find({'user_id': user_id}).sort('created_at', -1).limit(3)
-        for cashflow in cashflows:
-            activity_type = 'money_in' if cashflow.get('type') == 'receipt' else 'money_out'
-            description = f'{"Received from" if cashflow.get("type") == "receipt" else "Paid to"} {cashflow.get("party_name")}'
-            activities.append({
-                'type': activity_type,
-                'description': description,
-                'amount': cashflow.get('amount', 0),
-                'timestamp': cashflow.get('created_at').isoformat()
-            })
-        
-        # Sort activities by timestamp (descending)
-        activities.sort(key=lambda x: x['timestamp'], reverse=True)
-        activities = activities[:5]
+        activities, _ = get_activity_feed(db, {'user_id': str(user_id)}, limit=5, types=BUSINESS_ACTIVITY_TYPES)
         
         logger.info(f"Fetched {len(activities)} recent activities for user {user_id}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
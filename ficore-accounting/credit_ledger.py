@@ -0,0 +1,193 @@
+import logging
+from datetime import datetime
+from bson import ObjectId
+from flask import has_request_context, session
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from user_cache import invalidate_user, credit_balance_cache
+from utils import run_in_transaction
+from activity_feed import record_document_activity
+
+logger = logging.getLogger('ficore_app')
+
+# Every Ficore Credit spend goes through this module. A debit is one
+# conditional update on users plus one ficore_credit_transactions insert in
+# the same MongoDB transaction, retried on transient errors:
+#   users: {'_id': user_id, 'ficore_credit_balance': {'$gte': amount}} -> $inc -amount
+#   ficore_credit_transactions: {'user_id', 'amount' (negative), 'type': 'spend', 'ref',
+#       'date', 'action', 'session_id', 'status': 'completed', <reference ids>}
+# The balance check and the decrement are a single atomic operation, so
+# concurrent debits can never take a balance below zero. Balances are read
+# through get_balance(), which is served from credit_balance_cache; debits
+# store the balance they wrote there.
+
+def _session_id():
+    return session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'
+
+def _transaction(user_id, amount, action, ref, session_id, now, details):
+    return {
+        '_id': ObjectId(),
+        'user_id': user_id,
+        'amount': -amount,
+        'type': 'spend',
+        'ref': ref or action,
+        'date': now,
+        'action': action,
+        'session_id': session_id,
+        'status': 'completed',
+        **{field: str(value) if value is not None else None for field, value in details.items()}
+    }
+
+class _Rollback(Exception):
+    """Raised inside the debit transaction to abort it when the balance is too low."""
+
+def get_balance(db, user_id):
+    """
+    Return a user's Ficore Credit balance, served from credit_balance_cache when fresh.
+
+    Args:
+        db: MongoDB database instance
+        user_id: ID of the user
+
+    Returns:
+        float or int: The balance, or None if the user does not exist
+    """
+    user_id = str(user_id)
+    balance = credit_balance_cache.get(user_id)
+    if balance is None:
+        user = db.users.find_one({'_id': user_id}, {'ficore_credit_balance': 1})
+        if user is None:
+            return None
+        balance = user.get('ficore_credit_balance', 0)
+        credit_balance_cache.put(user_id, balance)
+    return balance
+
+def has_balance(db, user_id, amount):
+    """Whether a user's cached or stored balance covers amount; the debit itself re-checks atomically."""
+    balance = get_balance(db, user_id)
+    return balance is not None and balance >= amount
+
+def debit_credits(db, user_id, amount, action, ref=None, write=None, session_id=None, **details):
+    """
+    Debit Ficore Credits from a user if their balance covers the amount.
+
+    The debit runs in its own transaction through utils.run_in_transaction, so
+    a WriteConflict with a concurrent debit of the same user is retried rather
+    than reported as a failed debit.
+
+    Args:
+        db: MongoDB database instance
+        user_id: ID of the user to debit
+        amount: Positive number of credits
+        action: What the credits were spent on (e.g. 'add_bill')
+        ref: Human-readable reference (default: action)
+        write: Optional write(mongo_session) run in the same transaction before the
+               debit; it is rolled back when the debit fails and may run more than once
+        session_id: Session recorded on the transaction (default: the request's)
+        **details: Reference IDs stored on the transaction (e.g. bill_id=...)
+
+    Returns:
+        dict: The committed credit transaction, or None if the user is missing,
+              the balance is too low or the write failed
+    """
+    if amount <= 0:
+        logger.error(f"Invalid debit amount {amount} for user {user_id}, action: {action}",
+                     extra={'session_id': session_id or _session_id()})
+        return None
+    user_id = str(user_id)
+    session_id = session_id or _session_id()
+    transaction = _transaction(user_id, amount, action, ref, session_id, datetime.utcnow(), details)
+
+    def operation(mongo_session):
+        if write is not None:
+            write(mongo_session)
+        user = db.users.find_one_and_update(
+            {'_id': user_id, 'ficore_credit_balance': {'$gte': amount}},
+            {'$inc': {'ficore_credit_balance': -amount}},
+            projection={'ficore_credit_balance': 1},
+            return_document=ReturnDocument.AFTER,
+            session=mongo_session
+        )
+        if user is None:
+            raise _Rollback()
+        db.ficore_credit_transactions.insert_one(transaction, session=mongo_session)
+        return user['ficore_credit_balance']
+
+    try:
+        balance = run_in_transaction(db, operation)
+    except _Rollback:
+        # A cached balance let the caller through; read it fresh next time
+        credit_balance_cache.invalidate(user_id)
+        logger.warning(f"Insufficient Ficore Credits for user {user_id}: required {amount}, action: {action}",
+                       extra={'session_id': session_id})
+        return None
+    except PyMongoError as e:
+        logger.error(f"Failed to debit {amount} Ficore Credits for {action} by user {user_id}: {str(e)}",
+                     exc_info=True, extra={'session_id': session_id})
+        return None
+    record_debits(db, [transaction])
+    credit_balance_cache.put(user_id, balance)
+    logger.info(f"Debited {amount} Ficore Credits for {action} by user {user_id}", extra={'session_id': session_id})
+    return transaction
+
+def debit_credits_batch(db, debits, mongo_session):
+    """
+    Apply many debits inside the caller's transaction with one conditional
+    update per user and one insert_many.
+
+    Each user's debits are all-or-nothing: if the balance does not cover the
+    user's total, none of their debits are applied. Other users are unaffected.
+    Nothing outside the transaction is touched; pass the returned transactions
+    to record_debits() once the caller's transaction has committed.
+
+    Args:
+        db: MongoDB database instance
+        debits: Dicts with 'user_id', 'amount', 'action' and optional 'ref',
+                'session_id' and 'details' (reference IDs)
+        mongo_session: Session whose transaction the debits join
+
+    Returns:
+        tuple: (indexes into debits that were applied, credit transactions written)
+
+    Raises:
+        PyMongoError: If the writes fail
+    """
+    now = datetime.utcnow()
+    totals = {}
+    for debit in debits:
+        user_id = str(debit['user_id'])
+        totals[user_id] = totals.get(user_id, 0) + debit['amount']
+    applied_users = set()
+    for user_id, total in totals.items():
+        result = db.users.update_one(
+            {'_id': user_id, 'ficore_credit_balance': {'$gte': total}},
+            {'$inc': {'ficore_credit_balance': -total}},
+            session=mongo_session
+        )
+        if result.modified_count:
+            applied_users.add(user_id)
+    transactions = [
+        _transaction(str(debit['user_id']), debit['amount'], debit['action'], debit.get('ref'),
+                     debit.get('session_id') or 'no-session-id', now, debit.get('details') or {})
+        for debit in debits if str(debit['user_id']) in applied_users
+    ]
+    if transactions:
+        db.ficore_credit_transactions.insert_many(transactions, session=mongo_session)
+    rejected = set(totals) - applied_users
+    for user_id in rejected:
+        credit_balance_cache.invalidate(user_id)
+    if rejected:
+        logger.warning(f"Insufficient Ficore Credits for batch debits of users {sorted(rejected)}",
+                       extra={'session_id': 'no-session-id'})
+    return [index for index, debit in enumerate(debits) if str(debit['user_id']) in applied_users], transactions
+
+def record_debits(db, transactions):
+    """
+    Drop cached copies of the debited users and add the debits to the activity feed.
+
+    Call only after the transaction that wrote them has committed.
+    """
+    for user_id in {transaction['user_id'] for transaction in transactions}:
+        invalidate_user(user_id)
+    for transaction in transactions:
+        record_document_activity(db, 'ficore_credit_transactions', transaction)
@@ -10,6 +10,9 @@ import io
 import re
 import urllib.parse
 import utils
+from credit_ledger import debit_credits
+from activity_feed import record_document_activity
+from balances import apply_record_change
 from translations import trans
 
 logger = logging.getLogger(__name__)
@@ -152,16 +155,8 @@ def share(id):
         message = f"Hi {creditor['name']}, this is an IOU for {utils.format_currency(creditor['amount_owed'])} recorded on FiCore Records on {utils.format_date(creditor['created_at'])}. Details: {creditor.get('description', 'No description provided')}."
         whatsapp_link = f"https://wa.me/{contact}?text={urllib.parse.quote(message)}"
         
-        if not utils.is_admin():
-            user_query = utils.get_user_query(str(current_user.id))
-            db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -1}})
-            db.ficore_credit_transactions.insert_one({
-                'user_id': str(current_user.id),
-                'amount': -1,
-                'type': 'spend',
-                'date': datetime.utcnow(),
-                'ref': f"IOU shared for {creditor['name']} (Ficore Credits)"
-            })
+        if not utils.is_admin() and not debit_credits(db, current_user.id, 1, 'share_creditor_iou', ref=f"IOU shared for {creditor['name']} (Ficore Credits)", record_id=id):
+            return jsonify({'success': False, 'message': trans('debtors_insufficient_credits', default='Insufficient credits to share IOU')}), 400
         
         return jsonify({'success': True, 'whatsapp_link': whatsapp_link})
     except Exception as e:
@@ -211,18 +206,16 @@ def send_reminder():
                 success, api_response = send_whatsapp_reminder(recipient, message)
         
         if success:
-            db.records.update_one({'_id': ObjectId(debt_id)}, update_data)
+            def update_record(mongo_session):
+                db.records.update_one({'_id': ObjectId(debt_id)}, update_data, session=mongo_session)
             
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -credit_cost}})
-                db.ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -credit_cost,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': f"{'Reminder sent' if recipient else 'Snooze set'} for {creditor['name']} (Ficore Credits)"
-                })
+                if not debit_credits(db, current_user.id, credit_cost, 'send_creditor_reminder' if recipient else 'snooze_creditor_reminder',
+                                     ref=f"{'Reminder sent' if recipient else 'Snooze set'} for {creditor['name']} (Ficore Credits)",
+                                     write=update_record, record_id=debt_id):
+                    return jsonify({'success': False, 'message': trans('debtors_insufficient_credits', default='Insufficient credits to send reminder')}), 400
+            else:
+                update_record(None)
             
             db.reminder_logs.insert_one({
                 'user_id': str(current_user.id),
@@ -293,16 +286,9 @@ def generate_iou(id):
         p.showPage()
         p.save()
         
-        if not utils.is_admin():
-            user_query = utils.get_user_query(str(current_user.id))
-            db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -1}})
-            db.ficore_credit_transactions.insert_one({
-                'user_id': str(current_user.id),
-                'amount': -1,
-                'type': 'spend',
-                'date': datetime.utcnow(),
-                'ref': f"IOU generated for {creditor['name']} (Ficore Credits)"
-            })
+        if not utils.is_admin() and not debit_credits(db, current_user.id, 1, 'generate_creditor_iou_pdf', ref=f"IOU generated for {creditor['name']} (Ficore Credits)", record_id=id):
+            flash(trans('debtors_insufficient_credits', default='Insufficient credits to generate IOU'), 'danger')
+            return redirect(url_for('credits.request_credits'))
         
         buffer.seek(0)
         return Response(
@@ -331,6 +317,7 @@ def add():
         try:
             db = utils.get_mongo_db()
             record = {
+                '_id': ObjectId(),
                 'user_id': str(current_user.id),
                 'type': 'creditor',
                 'name': form.name.data,
@@ -340,20 +327,17 @@ def add():
                 'reminder_count': 0,
                 'created_at': datetime.utcnow()
             }
-            db.records.insert_one(record)
+            def insert_record(mongo_session):
+                db.records.insert_one(record, session=mongo_session)
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(
-                    user_query,
-                    {'$inc': {'ficore_credit_balance': -1}}
-                )
-                db.ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -1,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': f"Creditor creation: {record['name']} (Ficore Credits)"
-                })
+                if not debit_credits(db, current_user.id, 1, 'add_creditor', ref=f"Creditor creation: {record['name']} (Ficore Credits)",
+                                     write=insert_record, record_id=record['_id']):
+                    flash(trans('debtors_insufficient_credits', default='Insufficient credits to create a creditor. Request more credits.'), 'danger')
+                    return redirect(url_for('credits.request_credits'))
+            else:
+                insert_record(None)
+            record_document_activity(db, 'records', record)
+            apply_record_change(db, new_doc=record)
             flash(trans('creditors_create_success', default='Creditor created successfully'), 'success')
             return redirect(url_for('creditors.index'))
         except Exception as e:
@@ -398,6 +382,8 @@ def edit(id):
                     {'_id': ObjectId(id)},
                     {'$set': updated_record}
                 )
+                record_document_activity(db, 'records', {**creditor, **updated_record}, action='updated')
+                apply_record_change(db, creditor, {**creditor, **updated_record})
                 flash(trans('creditors_edit_success', default='Creditor updated successfully'), 'success')
                 return redirect(url_for('creditors.index'))
             except Exception as e:
@@ -430,6 +416,8 @@ def delete(id):
             return redirect(url_for('creditors.index'))
         result = db.records.delete_one(query)
         if result.deleted_count:
+            record_document_activity(db, 'records', creditor, action='deleted')
+            apply_record_change(db, old_doc=creditor)
             db.ficore_credit_transactions.insert_one({
                 'user_id': str(current_user.id),
                 'creditor_id': str(creditor['_id']),
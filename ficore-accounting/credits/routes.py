@@ -1,7 +1,7 @@
 from flask import Blueprint, session, request, render_template, redirect, url_for, flash, jsonify, current_app
 from models import (
-    get_user, get_user_by_email, create_credit_request, update_credit_request,
-    get_credit_requests, to_dict_credit_request, get_ficore_credit_transactions, to_dict_ficore_credit_transaction
+    create_credit_request, update_credit_request,
+    get_credit_requests, to_dict_credit_request, get_credit_history_page, to_dict_ficore_credit_transaction
 )
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
@@ -10,6 +10,8 @@ from gridfs import GridFS
 from wtforms import SelectField, SubmitField, validators
 from translations import trans
 import utils
+from user_cache import invalidate_user
+from credit_ledger import debit_credits, get_balance as get_credit_balance
 from bson import ObjectId
 from datetime import datetime
 from logging import getLogger
@@ -84,6 +86,7 @@ def credit_ficore_credits(user_id: str, amount: int, ref: str, type: str = 'add'
                         {'$inc': {'ficore_credit_balance': amount}},
                         session=mongo_session
                     )
+                    invalidate_user(user_id)
                     if result.matched_count == 0:
                         logger.error(f"No user found for ID {user_id} to credit Ficore Credits, ref: {ref}")
                         raise ValueError(f"No user found for ID {user_id}")
@@ -216,6 +219,22 @@ def request_credits():
         title=trans('credits_request_title', default='Request Ficore Credits', lang=session.get('lang', 'en'))
     )
 
+def _history_cursor(position):
+    """Encode the (date, _id) of the last transaction on a history page for the ?before= parameter."""
+    date, tx_id = position
+    return f"{date.isoformat()}_{tx_id}"
+
+def _parse_history_cursor(value):
+    """Decode a ?before= value into (date, _id), or None for the first page."""
+    if not value or '_' not in value:
+        return None
+    date_str, tx_id = value.split('_', 1)
+    try:
+        date = datetime.fromisoformat(date_str)
+    except ValueError:
+        return None
+    return date, ObjectId(tx_id) if ObjectId.is_valid(tx_id) else tx_id
+
 @credits_bp.route('/history', methods=['GET'])
 @login_required
 @limiter.limit("100 per hour")
@@ -224,50 +243,21 @@ def history():
     try:
         logger.debug(f"Loading utils module: {utils.__file__}")
         db = utils.get_mongo_db()
-        # Clear cache to ensure fresh data
-        get_user.cache_clear()
-        get_user_by_email.cache_clear()
-        user = get_user(db, str(current_user.id))
         query = {} if utils.is_admin() else {'user_id': str(current_user.id)}
-
-        # Query ficore_credit_transactions
-        ficore_transactions = get_ficore_credit_transactions(db, query)
-
-        # Query legacy credit_transactions safely
-        try:
-            legacy_transactions = list(db.credit_transactions.find(query))
-            valid_legacy_transactions = [
-                tx for tx in legacy_transactions
-                if 'date' in tx and isinstance(tx['date'], datetime)
-            ]
-            if len(valid_legacy_transactions) < len(legacy_transactions):
-                logger.warning(f"Filtered out {len(legacy_transactions) - len(valid_legacy_transactions)} invalid credit_transactions for user {current_user.id}")
-        except errors.PyMongoError as e:
-            logger.warning(f"Failed to query legacy credit_transactions for user {current_user.id}: {str(e)}")
-            valid_legacy_transactions = []
-
-        # Combine and sort transactions by date in descending order
-        all_transactions = ficore_transactions + valid_legacy_transactions
-        all_transactions.sort(key=lambda x: x.get('date', datetime.min), reverse=True)
-
-        # Format dates in Python before passing to template
-        formatted_transactions = []
-        for tx in all_transactions:
-            tx_dict = to_dict_ficore_credit_transaction(tx)
-            if 'date' in tx and isinstance(tx['date'], datetime):
-                tx_dict['date_str'] = tx['date'].strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                tx_dict['date_str'] = None
-            formatted_transactions.append(tx_dict)
+        before = _parse_history_cursor(request.args.get('before'))
+        transactions, next_position = get_credit_history_page(db, query, before=before)
+        formatted_transactions = [to_dict_ficore_credit_transaction(tx) for tx in transactions]
 
         requests = get_credit_requests(db, query)
         formatted_requests = [to_dict_credit_request(req) for req in requests]
-        logger.info(f"Fetched {len(ficore_transactions)} ficore_credit_transactions, {len(valid_legacy_transactions)} credit_transactions, and {len(requests)} requests for user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
+        logger.info(f"Fetched {len(transactions)} credit transactions and {len(requests)} requests for user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
         return render_template(
             'credits/history.html',
             transactions=formatted_transactions,
             requests=formatted_requests,
-            ficore_credit_balance=user.ficore_credit_balance if user else 0,
+            ficore_credit_balance=get_credit_balance(db, current_user.id) or 0,
+            is_first_page=before is None,
+            next_cursor=_history_cursor(next_position) if next_position else None,
             title=trans('credits_history_title', default='Ficore Credit Transaction History', lang=session.get('lang', 'en')),
             is_admin=utils.is_admin()
         )
@@ -404,7 +394,6 @@ def receipt_upload():
             return redirect(url_for('credits.request_credits'))
         if form.validate_on_submit():
             db = utils.get_mongo_db()
-            client = db.client
             fs = GridFS(db)
             receipt_file = form.receipt.data
             ref = f"RECEIPT_UPLOAD_{datetime.utcnow().isoformat()}"
@@ -423,35 +412,19 @@ def receipt_upload():
                 flash(trans('credits_file_upload_failed', default='Failed to upload receipt file'), 'danger')
                 return redirect(url_for('credits.receipt_upload'))
 
-            # Step 2: Perform database operations within a transaction
+            # Step 2: Record the upload and deduct the Ficore Credit in one ledger transaction
+            def log_upload(mongo_session):
+                db.audit_logs.insert_one({
+                    'admin_id': 'system',
+                    'action': 'receipt_upload',
+                    'details': {'user_id': str(current_user.id), 'file_id': str(file_id), 'ref': ref},
+                    'timestamp': datetime.utcnow()
+                }, session=mongo_session)
             try:
-                with client.start_session() as mongo_session:
-                    with mongo_session.start_transaction():
-                        if not utils.is_admin():
-                            user_query = utils.get_user_query(str(current_user.id))
-                            result = db.users.update_one(
-                                user_query,
-                                {'$inc': {'ficore_credit_balance': -1}},
-                                session=mongo_session
-                            )
-                            if result.matched_count == 0:
-                                logger.error(f"No user found for ID {current_user.id} to deduct Ficore Credits, ref: {ref}")
-                                raise ValueError(f"No user found for ID {current_user.id}")
-                            db.ficore_credit_transactions.insert_one({
-                                'user_id': str(current_user.id),
-                                'amount': -1,
-                                'type': 'spend',
-                                'ref': ref,
-                                'payment_method': None,
-                                'facilitated_by_agent': 'system',
-                                'date': datetime.utcnow()
-                            }, session=mongo_session)
-                        db.audit_logs.insert_one({
-                            'admin_id': 'system',
-                            'action': 'receipt_upload',
-                            'details': {'user_id': str(current_user.id), 'file_id': str(file_id), 'ref': ref},
-                            'timestamp': datetime.utcnow()
-                        }, session=mongo_session)
+                if utils.is_admin():
+                    log_upload(None)
+                elif not debit_credits(db, current_user.id, 1, 'receipt_upload', ref=ref, write=log_upload, file_id=file_id):
+                    raise ValueError(f"Could not deduct Ficore Credits for user {current_user.id}")
             except (ValueError, errors.PyMongoError) as e:
                 logger.error(f"Error during transaction for receipt upload for user {current_user.id}, ref {ref}: {str(e)}")
                 try:
@@ -559,10 +532,8 @@ def view_receipt(file_id):
 def get_balance():
     """API endpoint to get current user's Ficore Credit balance."""
     try:
-        db = utils.get_mongo_db()
-        user = get_user(db, str(current_user.id))
-        balance = user.ficore_credit_balance if user else 0
-        return jsonify({'balance': balance})
+        balance = get_credit_balance(utils.get_mongo_db(), current_user.id)
+        return jsonify({'balance': balance or 0})
     except AttributeError as e:
         logger.error(f"AttributeError fetching Ficore Credit balance for user {current_user.id}: {str(e)}")
         return jsonify({'error': 'Failed to fetch balance due to module configuration'}), 500
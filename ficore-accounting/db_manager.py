@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+
+logger = logging.getLogger('ficore_app')
+
+class MongoConnectionManager:
+    """
+    Own the process-wide MongoClient and hand out the database handle cheaply.
+
+    Health is verified by a background thread on a fixed interval, or right after a
+    caller reports a real connection failure, instead of pinging on every lookup.
+    """
+
+    def __init__(self, client, db_name='ficodb', health_check_interval=30, max_retries=3, retry_delay=1):
+        """
+        Args:
+            client: Connected MongoClient instance
+            db_name: Name of the application database (default: 'ficodb')
+            health_check_interval: Seconds between background pings (default: 30)
+            max_retries: Reconnect attempts before giving up (default: 3)
+            retry_delay: Base delay in seconds between reconnect attempts (default: 1)
+        """
+        self.client = client
+        self.db_name = db_name
+        self.db = client[db_name]
+        self.health_check_interval = health_check_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._healthy = True
+        self._last_check = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._monitor_thread = None
+        self._stats = {
+            'pings_skipped': 0,
+            'pings_performed': 0,
+            'failures_reported': 0,
+            'reconnects': 0,
+            'last_reconnect_seconds': None,
+            'last_failure': None
+        }
+
+    def get_db(self):
+        """
+        Return the database handle, reconnecting first only if a failure was recorded.
+
+        Returns:
+            Database object
+
+        Raises:
+            RuntimeError: If the database is unhealthy and reconnection fails
+        """
+        if self._healthy:
+            self._stats['pings_skipped'] += 1
+            return self.db
+        self.reconnect()
+        return self.db
+
+    @property
+    def is_healthy(self):
+        return self._healthy
+
+    def ping(self):
+        """
+        Run a single ping against the server and update the health flag.
+
+        Returns:
+            bool: True if the server answered, False otherwise
+        """
+        self._stats['pings_performed'] += 1
+        try:
+            self.client.admin.command('ping')
+            self._healthy = True
+            return True
+        except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+            self._mark_unhealthy(e)
+            return False
+        finally:
+            self._last_check = time.monotonic()
+
+    def report_failure(self, error=None):
+        """
+        Record a connection failure seen by a caller so the next get_db() revalidates.
+
+        Args:
+            error: The exception raised by the failed operation (optional)
+        """
+        self._stats['failures_reported'] += 1
+        self._mark_unhealthy(error)
+
+    def _mark_unhealthy(self, error):
+        self._healthy = False
+        self._stats['last_failure'] = str(error) if error else 'unknown'
+        logger.warning(f"MongoDB marked unhealthy: {self._stats['last_failure']}", extra={'session_id': 'no-session-id'})
+
+    def reconnect(self):
+        """
+        Re-establish connectivity with retries, recording how long recovery took.
+
+        Raises:
+            RuntimeError: If the server is still unreachable after max_retries attempts
+        """
+        with self._lock:
+            if self._healthy:
+                return
+            start_time = time.monotonic()
+            for attempt in range(self.max_retries):
+                if self.ping():
+                    duration = time.monotonic() - start_time
+                    self._stats['reconnects'] += 1
+                    self._stats['last_reconnect_seconds'] = round(duration, 3)
+                    logger.info(f"MongoDB reconnected after {attempt + 1} attempt(s) in {duration:.3f}s",
+                                extra={'session_id': 'no-session-id'})
+                    return
+                logger.warning(f"Attempt {attempt + 1}/{self.max_retries} to reconnect to MongoDB failed",
+                               extra={'session_id': 'no-session-id'})
+                if attempt < self.max_retries - 1:
+                    time.sleep(self.retry_delay * (attempt + 1))
+            raise RuntimeError(f"Failed to connect to MongoDB after {self.max_retries} attempts: {self._stats['last_failure']}")
+
+    def start_health_monitor(self):
+        """Start the background thread that pings the server every health_check_interval seconds."""
+        if self._monitor_thread and self._monitor_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, name='mongo-health-monitor', daemon=True)
+        self._monitor_thread.start()
+        logger.info(f"MongoDB health monitor started with interval={self.health_check_interval}s",
+                    extra={'session_id': 'no-session-id'})
+
+    def _monitor_loop(self):
+        while not self._stop_event.wait(self.health_check_interval):
+            try:
+                if not self.ping():
+                    self.reconnect()
+            except Exception as e:
+                logger.error(f"MongoDB health monitor error: {str(e)}", extra={'session_id': 'no-session-id'})
+
+    def get_stats(self):
+        """
+        Return a snapshot of connection health counters.
+
+        Returns:
+            dict: healthy flag, ping counters, reconnect count and duration, seconds since last check
+        """
+        return {
+            'healthy': self._healthy,
+            'seconds_since_last_check': round(time.monotonic() - self._last_check, 3),
+            **self._stats
+        }
+
+    def close(self):
+        """Stop the health monitor and close the client."""
+        self._stop_event.set()
+        try:
+            self.client.close()
+            logger.info('MongoDB client closed successfully', extra={'session_id': 'no-session-id'})
+        except Exception as e:
+            logger.error(f'Error closing MongoDB client: {str(e)}', exc_info=True, extra={'session_id': 'no-session-id'})
@@ -12,6 +12,9 @@ import requests
 import re
 import urllib.parse
 import utils
+from credit_ledger import debit_credits
+from activity_feed import record_document_activity
+from balances import apply_record_change
 from translations import trans
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
@@ -150,16 +153,8 @@ def share(id):
         message = f"Hi {debtor['name']}, this is an IOU for {utils.format_currency(debtor['amount_owed'])} recorded on FiCore Records on {utils.format_date(debtor['created_at'])}. Details: {debtor.get('description', 'No description provided')}."
         whatsapp_link = f"https://wa.me/{contact}?text={urllib.parse.quote(message)}"
         
-        if not utils.is_admin():
-            user_query = utils.get_user_query(str(current_user.id))
-            db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -1}})
-            db.ficore_credit_transactions.insert_one({
-                'user_id': str(current_user.id),
-                'amount': -1,
-                'type': 'spend',
-                'date': datetime.utcnow(),
-                'ref': f"IOU shared for {debtor['name']}"
-            })
+        if not utils.is_admin() and not debit_credits(db, current_user.id, 1, 'share_debtor_iou', ref=f"IOU shared for {debtor['name']}", record_id=id):
+            return jsonify({'success': False, 'message': trans('debtors_insufficient_credits', default='Insufficient Ficore Credits to share IOU')}), 400
         
         return jsonify({'success': True, 'whatsapp_link': whatsapp_link})
     except Exception as e:
@@ -207,18 +202,16 @@ def send_reminder():
                 success, api_response = send_whatsapp_reminder(recipient, message)
         
         if success:
-            db.records.update_one({'_id': ObjectId(debt_id)}, update_data)
+            def update_record(mongo_session):
+                db.records.update_one({'_id': ObjectId(debt_id)}, update_data, session=mongo_session)
             
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -credit_cost}})
-                db.ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -credit_cost,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': f"{'Reminder sent' if recipient else 'Snooze set'} for {debtor['name']}"
-                })
+                if not debit_credits(db, current_user.id, credit_cost, 'send_debtor_reminder' if recipient else 'snooze_debtor_reminder',
+                                     ref=f"{'Reminder sent' if recipient else 'Snooze set'} for {debtor['name']}",
+                                     write=update_record, record_id=debt_id):
+                    return jsonify({'success': False, 'message': trans('debtors_insufficient_credits', default='Insufficient Ficore Credits to send reminder')}), 400
+            else:
+                update_record(None)
             
             db.reminder_logs.insert_one({
                 'user_id': str(current_user.id),
@@ -288,16 +281,9 @@ def generate_iou(id):
         p.showPage()
         p.save()
         
-        if not utils.is_admin():
-            user_query = utils.get_user_query(str(current_user.id))
-            db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -1}})
-            db.ficore_credit_transactions.insert_one({
-                'user_id': str(current_user.id),
-                'amount': -1,
-                'type': 'spend',
-                'date': datetime.utcnow(),
-                'ref': f"IOU generated for {debtor['name']}"
-            })
+        if not utils.is_admin() and not debit_credits(db, current_user.id, 1, 'generate_debtor_iou_pdf', ref=f"IOU generated for {debtor['name']}", record_id=id):
+            flash(trans('debtors_insufficient_credits', default='Insufficient Ficore Credits to generate IOU'), 'danger')
+            return redirect(url_for('agents_bp.manage_credits'))
         
         buffer.seek(0)
         return Response(
@@ -344,16 +330,9 @@ def generate_iou_csv(id):
         output.append([''])
         output.append([trans('debtors_iou_footer', default='This document serves as an IOU recorded on FiCore Records.')])
         
-        if not utils.is_admin():
-            user_query = utils.get_user_query(str(current_user.id))
-            db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -1}})
-            db.ficore_credit_transactions.insert_one({
-                'user_id': str(current_user.id),
-                'amount': -1,
-                'type': 'spend',
-                'date': datetime.utcnow(),
-                'ref': f"IOU CSV generated for {debtor['name']}"
-            })
+        if not utils.is_admin() and not debit_credits(db, current_user.id, 1, 'generate_debtor_iou_csv', ref=f"IOU CSV generated for {debtor['name']}", record_id=id):
+            flash(trans('debtors_insufficient_credits', default='Insufficient Ficore Credits to generate IOU'), 'danger')
+            return redirect(url_for('agents_bp.manage_credits'))
         
         buffer = io.BytesIO()
         writer = csv.writer(buffer, lineterminator='\n')
@@ -387,6 +366,7 @@ def add():
         try:
             db = utils.get_mongo_db()
             debtor_data = {
+                '_id': ObjectId(),
                 'user_id': str(current_user.id),
                 'type': 'debtor',
                 'name': form.name.data,
@@ -396,18 +376,18 @@ def add():
                 'created_at': datetime.utcnow(),
                 'reminder_count': 0
             }
-            db.records.insert_one(debtor_data)
+            def insert_record(mongo_session):
+                db.records.insert_one(debtor_data, session=mongo_session)
             
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -1}})
-                db.ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -1,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': f"Debtor added: {form.name.data}"
-                })
+                if not debit_credits(db, current_user.id, 1, 'add_debtor', ref=f"Debtor added: {form.name.data}",
+                                     write=insert_record, record_id=debtor_data['_id']):
+                    flash(trans('debtors_insufficient_credits', default='Insufficient Ficore Credits to add debtor'), 'danger')
+                    return redirect(url_for('agents_bp.manage_credits'))
+            else:
+                insert_record(None)
+            record_document_activity(db, 'records', debtor_data)
+            apply_record_change(db, new_doc=debtor_data)
             
             flash(trans('debtors_add_success', default='Debtor added successfully'), 'success')
             return redirect(url_for('debtors.index'))
@@ -455,6 +435,8 @@ def edit(id):
                     {'_id': ObjectId(id)},
                     {'$set': updated_record}
                 )
+                record_document_activity(db, 'records', {**debtor, **updated_record}, action='updated')
+                apply_record_change(db, debtor, {**debtor, **updated_record})
                 flash(trans('debtors_edit_success', default='Debtor updated successfully'), 'success')
                 return redirect(url_for('debtors.index'))
             except Exception as e:
@@ -480,8 +462,10 @@ def delete(id):
     try:
         db = utils.get_mongo_db()
         query = {'_id': ObjectId(id), 'type': 'debtor'} if utils.is_admin() else {'_id': ObjectId(id), 'user_id': str(current_user.id), 'type': 'debtor'}
-        result = db.records.delete_one(query)
-        if result.deleted_count:
+        deleted_debtor = db.records.find_one_and_delete(query)
+        if deleted_debtor:
+            record_document_activity(db, 'records', deleted_debtor, action='deleted')
+            apply_record_change(db, old_doc=deleted_debtor)
             flash(trans('debtors_delete_success', default='Debtor deleted successfully'), 'success')
         else:
             flash(trans('debtors_record_not_found', default='Record not found'), 'danger')
@@ -0,0 +1,237 @@
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from bson import ObjectId
+from activity_feed import record_document_activity
+from credit_ledger import debit_credits_batch, record_debits
+from utils import run_in_transaction
+
+logger = logging.getLogger('ficore_app')
+
+# pending_deletions document:
+#   {'kind': 'shopping_list' | 'food_order', 'target_id': str, 'user_id': str or None,
+#    'session_id', 'credit_cost': float (0 when the deletion is free), 'status': 'pending' | 'failed',
+#    'created_at', 'expires_at' (when the deletion is due), 'lease_owner', 'lease_until', 'attempts', 'error'}
+# Documents written by older releases only carry list_id or order_id;
+# migrate_legacy_pending_deletions() converts them.
+
+DELETION_DELAY_SECONDS = int(os.getenv('DELETION_DELAY_SECONDS', 20))
+DELETION_POLL_SECONDS = int(os.getenv('DELETION_POLL_SECONDS', 10))
+DELETION_BATCH_SIZE = int(os.getenv('DELETION_BATCH_SIZE', 200))
+DELETION_CREDIT_COST = 0.5
+# A claimed batch not finished within the lease is picked up again by the next run
+DELETION_LEASE = timedelta(minutes=5)
+DELETION_MAX_ATTEMPTS = 5
+
+def _find_shopping_lists(db, target_ids, mongo_session):
+    object_ids = [ObjectId(target_id) for target_id in target_ids if ObjectId.is_valid(target_id)]
+    return {str(doc['_id']): doc for doc in db.shopping_lists.find({'_id': {'$in': object_ids}}, session=mongo_session)}
+
+def _delete_shopping_lists(db, docs, mongo_session):
+    db.shopping_items.delete_many({'list_id': {'$in': [str(doc['_id']) for doc in docs]}}, session=mongo_session)
+    db.shopping_lists.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}}, session=mongo_session)
+
+def _find_food_orders(db, target_ids, mongo_session):
+    return {doc['id']: doc for doc in db.FoodOrder.find({'id': {'$in': list(target_ids)}}, session=mongo_session)}
+
+def _delete_food_orders(db, docs, mongo_session):
+    db.FoodOrder.delete_many({'id': {'$in': [doc['id'] for doc in docs]}}, session=mongo_session)
+
+# kind -> (collection for activity records, finder, deleter, credit action, credit transaction reference field)
+DELETION_KINDS = {
+    'shopping_list': ('shopping_lists', _find_shopping_lists, _delete_shopping_lists, 'delete_shopping_list', 'item_id'),
+    'food_order': ('FoodOrder', _find_food_orders, _delete_food_orders, 'delete_food_order', 'order_id')
+}
+
+# Field that identified the target in documents written by older releases
+LEGACY_TARGET_FIELDS = {
+    'shopping_list': 'list_id',
+    'food_order': 'order_id'
+}
+
+def schedule_deletion(db, kind, target_id, user_id=None, session_id=None, credit_cost=0, delay=DELETION_DELAY_SECONDS):
+    """
+    Schedule a document for deletion once delay seconds have passed.
+
+    Scheduling the same target again while it is pending is a no-op.
+
+    Args:
+        db: MongoDB database instance
+        kind: Key of DELETION_KINDS
+        target_id: ID of the shopping list or food order
+        user_id: Requesting user, charged credit_cost when the deletion runs
+        session_id: Requesting session ID
+        credit_cost: Ficore Credits charged on deletion (0 for admins and anonymous users)
+        delay: Seconds before the deletion is due (default: DELETION_DELAY_SECONDS)
+
+    Returns:
+        bool: True if scheduled, False if the target was already pending
+    """
+    if kind not in DELETION_KINDS:
+        raise ValueError(f"Unknown deletion kind: {kind}")
+    now = datetime.utcnow()
+    result = db.pending_deletions.update_one(
+        {'kind': kind, 'target_id': str(target_id), 'status': 'pending'},
+        {'$setOnInsert': {
+            LEGACY_TARGET_FIELDS[kind]: str(target_id),
+            'user_id': str(user_id) if user_id else None,
+            'session_id': session_id,
+            'credit_cost': credit_cost,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=delay),
+            'lease_until': None,
+            'attempts': 0
+        }},
+        upsert=True
+    )
+    return result.upserted_id is not None
+
+def migrate_legacy_pending_deletions(db):
+    """
+    Give pending deletions written by older releases a kind and target_id.
+
+    Those deletions were never charged, so they are converted with no credit cost.
+
+    Returns:
+        int: Number of documents converted
+    """
+    converted = 0
+    for kind, field in LEGACY_TARGET_FIELDS.items():
+        converted += db.pending_deletions.update_many(
+            {'kind': {'$exists': False}, field: {'$exists': True}},
+            [{'$set': {'kind': kind, 'target_id': f'${field}', 'status': 'pending', 'credit_cost': 0, 'attempts': 0}}]
+        ).modified_count
+    if converted:
+        logger.info(f"Converted {converted} legacy pending deletions", extra={'session_id': 'no-session-id'})
+    return converted
+
+def _claim_batch(db, now, batch_size):
+    """Lease up to batch_size due deletions to this run and return them."""
+    claimable = {
+        'status': 'pending',
+        'expires_at': {'$lte': now},
+        '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]
+    }
+    ids = [doc['_id'] for doc in db.pending_deletions.find(claimable, {'_id': 1}).sort('expires_at', 1).limit(batch_size)]
+    if not ids:
+        return []
+    owner = uuid.uuid4().hex
+    db.pending_deletions.update_many(
+        {'_id': {'$in': ids}, **claimable},
+        {'$set': {'lease_owner': owner, 'lease_until': now + DELETION_LEASE}, '$inc': {'attempts': 1}}
+    )
+    return list(db.pending_deletions.find({'lease_owner': owner}))
+
+def _release_batch(db, batch, error):
+    """Return a failed batch to the queue, or mark deletions that ran out of attempts as failed."""
+    ids = [pending['_id'] for pending in batch]
+    db.pending_deletions.update_many(
+        {'_id': {'$in': ids}, 'attempts': {'$gte': DELETION_MAX_ATTEMPTS}},
+        {'$set': {'status': 'failed', 'error': error}}
+    )
+    db.pending_deletions.update_many(
+        {'_id': {'$in': ids}, 'status': 'pending'},
+        {'$set': {'lease_until': None, 'error': error}}
+    )
+
+def _process_batch(db, batch, counts):
+    """
+    Delete a claimed batch and charge its credits in one transaction.
+
+    Targets that no longer exist are dropped without charge. Credits are
+    debited per user through debit_credits_batch; when a user cannot cover
+    all of their deletions in the batch, those deletions are marked failed
+    and their targets kept.
+    """
+    pendings_by_kind = {}
+    for pending in batch:
+        if pending.get('kind') in DELETION_KINDS:
+            # The same target scheduled twice is only deleted and charged once
+            pendings_by_kind.setdefault(pending['kind'], {}).setdefault(pending['target_id'], pending)
+    unknown = [pending['_id'] for pending in batch if pending.get('kind') not in DELETION_KINDS]
+
+    def process(mongo_session):
+        # with_transaction may run this more than once; every attempt starts clean
+        found = {}
+        for kind, pendings in pendings_by_kind.items():
+            docs = DELETION_KINDS[kind][1](db, pendings.keys(), mongo_session)
+            found[kind] = [(pending, docs[target_id]) for target_id, pending in pendings.items() if target_id in docs]
+        debits, debited_pendings = [], []
+        for kind, matches in found.items():
+            action, reference_field = DELETION_KINDS[kind][3:]
+            for pending, _ in matches:
+                if pending.get('user_id') and pending.get('credit_cost'):
+                    debits.append({
+                        'user_id': pending['user_id'],
+                        'amount': pending['credit_cost'],
+                        'action': action,
+                        'session_id': pending.get('session_id'),
+                        'details': {reference_field: pending['target_id']}
+                    })
+                    debited_pendings.append(pending['_id'])
+        applied_indexes, transactions = debit_credits_batch(db, debits, mongo_session)
+        applied = {debited_pendings[index] for index in applied_indexes}
+        rejected = [pending_id for pending_id in debited_pendings if pending_id not in applied]
+        deleted = []
+        for kind, matches in found.items():
+            docs = [doc for pending, doc in matches if pending['_id'] not in rejected]
+            if docs:
+                DELETION_KINDS[kind][2](db, docs, mongo_session)
+                deleted.extend((kind, doc) for doc in docs)
+        for failed_ids, error in ((rejected, 'insufficient_credits'), (unknown, 'unknown_kind')):
+            if failed_ids:
+                db.pending_deletions.update_many({'_id': {'$in': failed_ids}},
+                                                 {'$set': {'status': 'failed', 'error': error}}, session=mongo_session)
+        done = [pending['_id'] for pending in batch if pending['_id'] not in rejected and pending['_id'] not in unknown]
+        db.pending_deletions.delete_many({'_id': {'$in': done}}, session=mongo_session)
+        return deleted, rejected, transactions
+
+    deleted, rejected, transactions = run_in_transaction(db, process)
+    record_debits(db, transactions)
+    for kind, doc in deleted:
+        record_document_activity(db, DELETION_KINDS[kind][0], doc, action='deleted')
+    counts['deleted'] += len(deleted)
+    counts['missing'] += len(batch) - len(deleted) - len(rejected) - len(unknown)
+    counts['charged'] += len(transactions)
+    counts['failed'] += len(rejected) + len(unknown)
+
+def process_due_deletions(db, now=None, batch_size=DELETION_BATCH_SIZE):
+    """
+    Run every deletion whose delay has passed, in leased batches.
+
+    Each batch is claimed with a lease, so a batch abandoned by a crashed run
+    is retried after DELETION_LEASE, and is processed in a single transaction:
+    bulk deletes per kind plus one conditional debit per charged user and one
+    insert_many of credit transactions through the credit ledger. A batch that fails is released for the next run;
+    deletions that failed DELETION_MAX_ATTEMPTS times are marked failed.
+
+    Args:
+        db: MongoDB database instance
+        now: Current UTC time (default: utcnow)
+        batch_size: Deletions claimed per batch (default: DELETION_BATCH_SIZE)
+
+    Returns:
+        dict: items claimed, deleted, missing (target already gone), charged and failed counts
+    """
+    now = now or datetime.utcnow()
+    counts = {'items': 0, 'deleted': 0, 'missing': 0, 'charged': 0, 'failed': 0}
+    while True:
+        batch = _claim_batch(db, now, batch_size)
+        if not batch:
+            break
+        counts['items'] += len(batch)
+        try:
+            _process_batch(db, batch, counts)
+        except Exception as e:
+            logger.error(f"Failed to process {len(batch)} pending deletions: {str(e)}", exc_info=True,
+                         extra={'session_id': 'no-session-id'})
+            _release_batch(db, batch, str(e))
+            break
+        if len(batch) < batch_size:
+            break
+    if counts['items']:
+        logger.info(f"Processed {counts['items']} pending deletions: deleted={counts['deleted']}, "
+                    f"missing={counts['missing']}, charged={counts['charged']}, failed={counts['failed']}",
+                    extra={'session_id': 'no-session-id'})
+    return counts
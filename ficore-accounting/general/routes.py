@@ -7,6 +7,7 @@ from models import create_feedback
 from flask_wtf.csrf import CSRFError
 from flask import current_app
 import utils
+from user_cache import invalidate_user
 
 general_bp = Blueprint('general_bp', __name__, url_prefix='/general')
 
@@ -140,6 +141,7 @@ def feedback():
                     result = get_mongo_db().users.update_one(query, {'$inc': {'coin_balance': -1}})
                     if result.matched_count == 0:
                         raise ValueError(f'No user found for ID {current_user.id}')
+                    invalidate_user(str(current_user.id))
                     get_mongo_db().coin_transactions.insert_one({
                         'user_id': str(current_user.id),
                         'amount': -1,
@@ -1,3 +1,4 @@
+import threading
 from flask import current_app
 from reportlab.lib.utils import ImageReader
 from reportlab.lib import colors
@@ -12,13 +13,32 @@ TOP_MARGIN = 10.5  # in inches, adjusted to match new y_start
 FICORE_MARKETING = "Empowering Africa's Businesses and Households. Contact: FicoreAfrica@gmail.com  | +234-xxx-xxxx"
 FICORE_BRAND = "Ficore Africa"
 
+# Decoded logo per path, shared by every PDF rendered in this process
+_logo_cache = {}
+_logo_lock = threading.Lock()
+
+def get_ficore_logo():
+    """
+    Return the decoded Ficore logo, reading it from the static folder only once per process.
+
+    Returns:
+        ImageReader or None if the logo cannot be read
+    """
+    logo_path = f"{current_app.static_folder}/{FICORE_LOGO_PATH}"
+    if logo_path not in _logo_cache:
+        with _logo_lock:
+            if logo_path not in _logo_cache:
+                try:
+                    _logo_cache[logo_path] = ImageReader(logo_path)
+                except Exception:
+                    _logo_cache[logo_path] = None
+    return _logo_cache[logo_path]
+
 def draw_ficore_pdf_header(canvas, user, y_start=10.5):
     """
     Draw Ficore branding and user info at the top of a PDF page with a shaded background and separator line.
     """
     inch = 72  # 1 inch in points
-    static_folder = current_app.static_folder
-    logo_path = f"{static_folder}/{FICORE_LOGO_PATH}"
 
    # Improved header dimensions
     header_height = 1.05       # big enough to cover everything + some padding
@@ -43,11 +63,12 @@ def draw_ficore_pdf_header(canvas, user, y_start=10.5):
 
 
     # Draw logo
-    try:
-        logo = ImageReader(logo_path)
-        canvas.drawImage(logo, 1 * inch, y_logo * inch, width=0.5 * inch, height=0.5 * inch, mask='auto')
-    except Exception:
-        pass  # Don't break PDF if logo fails
+    logo = get_ficore_logo()
+    if logo is not None:
+        try:
+            canvas.drawImage(logo, 1 * inch, y_logo * inch, width=0.5 * inch, height=0.5 * inch, mask='auto')
+        except Exception:
+            pass  # Don't break PDF if logo fails
 
     # Brand name
     canvas.setFont("Helvetica-Bold", 16)
@@ -0,0 +1,148 @@
+import os
+import tempfile
+from datetime import datetime
+from flask import send_file
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from translations import trans
+import utils
+from helpers.branding_helpers import draw_ficore_pdf_header
+
+# Bytes of rendered PDF kept in memory before the output spills to a temp file
+PDF_SPOOL_MAX_MEMORY = int(os.getenv('PDF_SPOOL_MAX_MEMORY', 1024 * 1024))
+
+class PDFReport:
+    """
+    Paginated table report drawn with the Ficore header on every page.
+
+    Rows are drawn as they arrive, so callers can pass a lazily mapped cursor
+    instead of a list. Output is written to a SpooledTemporaryFile and sent with
+    send_file, so large exports go to disk instead of the worker's memory.
+    """
+
+    HEADER_HEIGHT = 0.7
+    EXTRA_SPACE = 0.2
+    BOTTOM_MARGIN = 0.5
+    MAX_Y = 10.5
+
+    def __init__(self, user, title, font_size=12, row_height=0.3, margin_x=1, pagesize=A4):
+        """
+        Args:
+            user: User shown in the page header
+            title: Report title drawn on the first page
+            font_size: Body font size (default: 12)
+            row_height: Row height in inches (default: 0.3)
+            margin_x: Left margin for title and totals in inches (default: 1)
+            pagesize: reportlab page size (default: A4)
+        """
+        self.user = user
+        self.font_size = font_size
+        self.row_height = row_height
+        self.margin_x = margin_x
+        self.title_y = self.MAX_Y - self.HEADER_HEIGHT - self.EXTRA_SPACE
+        self.top_y = self.title_y - 0.6
+        page_height = (self.MAX_Y - self.BOTTOM_MARGIN) * inch
+        self.rows_per_page = int((page_height - self.top_y * inch) / (row_height * inch))
+        self.row_count = 0
+        self.section_title = None
+        self.headers = []
+        self.x_positions = []
+
+        self.file = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_MEMORY)
+        self.canvas = canvas.Canvas(self.file, pagesize=pagesize)
+        draw_ficore_pdf_header(self.canvas, user, y_start=self.MAX_Y)
+        self.canvas.setFont("Helvetica", font_size)
+        self.canvas.drawString(margin_x * inch, self.title_y * inch, title)
+        self.canvas.drawString(margin_x * inch, (self.title_y - 0.3) * inch,
+                               f"{trans('reports_generated_on', default='Generated on')}: {utils.format_date(datetime.utcnow())}")
+        self.y = self.top_y
+
+    def new_page(self):
+        """Start a new page below the Ficore header."""
+        self.canvas.showPage()
+        draw_ficore_pdf_header(self.canvas, self.user, y_start=self.MAX_Y)
+        self.canvas.setFont("Helvetica", self.font_size)
+        self.y = self.top_y
+        self.row_count = 0
+
+    def _draw_table_headers(self):
+        if self.section_title:
+            self.canvas.setFont("Helvetica-Bold", 12)
+            self.canvas.drawString(1 * inch, self.y * inch, self.section_title)
+            self.canvas.setFont("Helvetica", self.font_size)
+            self.y -= self.row_height
+        self.canvas.setFillColor(colors.black)
+        for header, x in zip(self.headers, self.x_positions):
+            self.canvas.drawString(x, self.y * inch, header)
+        self.y -= self.row_height
+
+    def start_table(self, headers, x_positions, section_title=None):
+        """
+        Draw column headers; they are repeated on every page the table spans.
+
+        Args:
+            headers: Column header strings
+            x_positions: Column x positions in points
+            section_title: Optional bold title drawn above the headers
+        """
+        if section_title and self.row_count + 3 >= self.rows_per_page:
+            self.new_page()
+        self.headers = headers
+        self.x_positions = x_positions
+        self.section_title = section_title
+        self._draw_table_headers()
+        if section_title:
+            self.row_count += 2
+
+    def add_row(self, values):
+        """Draw one row, breaking the page when it is full."""
+        if self.row_count >= self.rows_per_page:
+            self.new_page()
+            self._draw_table_headers()
+        for value, x in zip(values, self.x_positions):
+            self.canvas.drawString(x, self.y * inch, str(value))
+        self.y -= self.row_height
+        self.row_count += 1
+
+    def add_totals(self, lines, x=None):
+        """
+        Draw summary lines after a blank row, or at the top of a new page if they do not fit.
+
+        Args:
+            lines: Summary strings
+            x: x position in points (default: left margin)
+        """
+        x = self.margin_x * inch if x is None else x
+        if self.row_count + len(lines) <= self.rows_per_page:
+            self.y -= self.row_height
+        else:
+            self.new_page()
+        for line in lines:
+            self.canvas.drawString(x, self.y * inch, line)
+            self.y -= self.row_height
+
+    def add_space(self, height):
+        """Leave height inches of vertical space."""
+        self.y -= height
+
+    def finish(self):
+        """
+        Finish the document.
+
+        Returns:
+            The spooled output file positioned at 0
+        """
+        self.canvas.save()
+        self.file.seek(0)
+        return self.file
+
+    def response(self, filename):
+        """
+        Finish the document and send it as an attachment.
+
+        Args:
+            filename: Download file name
+        """
+        return send_file(self.finish(), mimetype='application/pdf', as_attachment=True, download_name=filename)
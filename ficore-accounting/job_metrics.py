@@ -0,0 +1,173 @@
+import logging
+import math
+import os
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger('ficore_app')
+
+# Runs per job kept in the in-process window and used for percentiles
+JOB_METRICS_WINDOW = int(os.getenv('JOB_METRICS_WINDOW', 200))
+JOB_RUNS_RETENTION_DAYS = int(os.getenv('JOB_RUNS_RETENTION_DAYS', 90))
+
+_recent_runs = defaultdict(lambda: deque(maxlen=JOB_METRICS_WINDOW))
+_recent_lock = threading.Lock()
+
+def items_processed(result):
+    """
+    Items a job reports as processed: an int result, or the 'items' entry of a dict result.
+    """
+    if isinstance(result, bool):
+        return 0
+    if isinstance(result, int):
+        return result
+    if isinstance(result, dict):
+        return int(result.get('items') or 0)
+    return 0
+
+def record_job_run(db, job_name, started_at, duration, memory_start, memory_end, result=None, error=None):
+    """
+    Record one job run in the in-process window and the job_runs collection.
+
+    Args:
+        db: MongoDB database instance
+        job_name: Name passed to log_job_metrics
+        started_at: UTC start time
+        duration: Run time in seconds
+        memory_start: RSS in MB before the run
+        memory_end: RSS in MB after the run
+        result: Value returned by the job (counts dict or int)
+        error: Exception raised by the job, if any
+
+    Returns:
+        dict: The recorded run
+    """
+    items = items_processed(result)
+    run = {
+        'job_name': job_name,
+        'started_at': started_at,
+        'finished_at': started_at + timedelta(seconds=duration),
+        'duration': round(duration, 3),
+        'items': items,
+        'items_per_second': round(items / duration, 2) if duration > 0 else float(items),
+        'memory_start_mb': round(memory_start, 2),
+        'memory_end_mb': round(memory_end, 2),
+        'memory_delta_mb': round(memory_end - memory_start, 2),
+        'status': 'failed' if error else 'succeeded',
+        'error': str(error) if error else None,
+        'counts': dict(result) if isinstance(result, dict) else None
+    }
+    with _recent_lock:
+        _recent_runs[job_name].append(run)
+    try:
+        db.job_runs.insert_one(dict(run))
+    except PyMongoError as e:
+        logger.error(f"Failed to record run of job '{job_name}': {str(e)}", extra={'session_id': 'no-session-id'})
+    return run
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers, or None if it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def summarize_runs(runs):
+    """
+    Summarize runs of one job.
+
+    Args:
+        runs: Run dicts, newest first
+
+    Returns:
+        dict: run and failure counts, p50/p95 duration and throughput, average memory delta and last run
+    """
+    durations = [run['duration'] for run in runs]
+    throughput = [run['items_per_second'] for run in runs if run['status'] == 'succeeded']
+    memory_deltas = [run.get('memory_delta_mb', 0) for run in runs]
+    return {
+        'runs': len(runs),
+        'failures': sum(1 for run in runs if run['status'] == 'failed'),
+        'p50_duration': percentile(durations, 50),
+        'p95_duration': percentile(durations, 95),
+        'p50_items_per_second': percentile(throughput, 50),
+        'p95_items_per_second': percentile(throughput, 95),
+        'avg_memory_delta_mb': round(sum(memory_deltas) / len(memory_deltas), 2) if memory_deltas else None,
+        'last_run_at': runs[0]['started_at'] if runs else None,
+        'last_status': runs[0]['status'] if runs else None
+    }
+
+def get_local_job_stats():
+    """
+    Summaries of the runs in this process's rolling window.
+
+    Only the process holding the scheduler lease runs jobs, so other
+    processes return an empty dict; use get_job_stats for fleet-wide numbers.
+    """
+    with _recent_lock:
+        snapshot = {name: list(runs) for name, runs in _recent_runs.items()}
+    return {name: summarize_runs(runs[::-1]) for name, runs in snapshot.items()}
+
+def get_job_stats(db, window=JOB_METRICS_WINDOW):
+    """
+    Per-job summaries over each job's most recent runs in job_runs.
+
+    Args:
+        db: MongoDB database instance
+        window: Runs per job to summarize (default: JOB_METRICS_WINDOW)
+
+    Returns:
+        dict: job_name -> summarize_runs() result
+    """
+    stats = {}
+    for job_name in sorted(db.job_runs.distinct('job_name')):
+        runs = list(db.job_runs.find(
+            {'job_name': job_name},
+            {'started_at': 1, 'duration': 1, 'items_per_second': 1, 'memory_delta_mb': 1, 'status': 1}
+        ).sort('started_at', -1).limit(window))
+        stats[job_name] = summarize_runs(runs)
+    return stats
+
+def get_job_trends(db, days=14):
+    """
+    Daily duration and throughput per job.
+
+    Args:
+        db: MongoDB database instance
+        days: Number of days back to include (default: 14)
+
+    Returns:
+        dict: job_name -> list of {'day', 'runs', 'failures', 'avg_duration',
+              'max_duration', 'items', 'items_per_second'}, oldest day first
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    pipeline = [
+        {'$match': {'started_at': {'$gte': since}}},
+        {'$group': {
+            '_id': {
+                'job_name': '$job_name',
+                'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$started_at'}}
+            },
+            'runs': {'$sum': 1},
+            'failures': {'$sum': {'$cond': [{'$eq': ['$status', 'failed']}, 1, 0]}},
+            'avg_duration': {'$avg': '$duration'},
+            'max_duration': {'$max': '$duration'},
+            'total_duration': {'$sum': '$duration'},
+            'items': {'$sum': '$items'}
+        }},
+        {'$sort': {'_id.job_name': 1, '_id.day': 1}}
+    ]
+    trends = {}
+    for row in db.job_runs.aggregate(pipeline):
+        trends.setdefault(row['_id']['job_name'], []).append({
+            'day': row['_id']['day'],
+            'runs': row['runs'],
+            'failures': row['failures'],
+            'avg_duration': round(row['avg_duration'], 3),
+            'max_duration': round(row['max_duration'], 3),
+            'items': row['items'],
+            'items_per_second': round(row['items'] / row['total_duration'], 2) if row['total_duration'] else None
+        })
+    return trends
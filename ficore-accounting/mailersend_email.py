@@ -1,11 +1,12 @@
 import logging
 import os
 import smtplib
-import requests
+import time
 from email.mime.text import MIMEText
 from flask import Flask, render_template, current_app
 from typing import Dict, Optional
 from translations import trans
+from notifications import get_http_session
 
 # Email configuration dictionary with provider-specific templates
 EMAIL_CONFIG = {
@@ -150,7 +151,7 @@ def send_email(
             if provider == 'mailersend':
                 api_token = os.getenv('MAILERSEND_API_TOKEN')
                 from_email = os.getenv('MAILERSEND_FROM_EMAIL')
-                url = "https://api.mailersend.com/v1/email"
+                url = os.getenv('MAILERSEND_API_URL', "https://api.mailersend.com/v1/email")
                 headers = {
                     "Authorization": f"Bearer {api_token}",
                     "Content-Type": "application/json"
@@ -162,21 +163,12 @@ def send_email(
                     "html": html_content
                 }
 
-                max_retries = 3
-                for attempt in range(1, max_retries + 1):
-                    try:
-                        response = requests.post(url, json=payload, headers=headers, timeout=10)
-                        if 200 <= response.status_code < 300:
-                            logger.info(f"Email sent successfully to {to_email} via {provider}", extra={'session_id': session_id, 'provider': provider})
-                            return
-                        else:
-                            raise RuntimeError(f"MailerSend API error: {response.status_code} {response.text}")
-                    except requests.RequestException as e:
-                        if attempt < max_retries:
-                            delay = 2 ** attempt
-                            logger.warning(f"Network error sending email to {to_email} via {provider}: {str(e)}. Retrying... (attempt {attempt})", extra={'session_id': session_id, 'provider': provider})
-                            continue
-                        raise
+                # The pooled session retries connection errors, 429 and 503 with backoff
+                response = get_http_session('mailersend').post(url, json=payload, headers=headers, timeout=10)
+                if 200 <= response.status_code < 300:
+                    logger.info(f"Email sent successfully to {to_email} via {provider}", extra={'session_id': session_id, 'provider': provider})
+                    return
+                raise RuntimeError(f"MailerSend API error: {response.status_code} {response.text}")
 
             elif provider == 'gmail':
                 smtp_user = os.getenv('GMAIL_EMAIL')
@@ -198,6 +190,7 @@ def send_email(
                         if attempt < max_retries:
                             delay = 2 ** attempt
                             logger.warning(f"Gmail SMTP error sending email to {to_email}: {str(e)}. Retrying... (attempt {attempt})", extra={'session_id': session_id, 'provider': provider})
+                            time.sleep(delay)
                             continue
                         raise RuntimeError(f"Gmail SMTP error: {str(e)}")
 
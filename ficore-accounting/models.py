@@ -1,12 +1,18 @@
 from datetime import datetime
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, UpdateOne, ReplaceOne
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, DuplicateKeyError, OperationFailure
 from werkzeug.security import generate_password_hash
 from bson import ObjectId
 import logging
 from translations import trans
-from utils import get_mongo_db, logger
-from functools import lru_cache
+from utils import get_mongo_db, logger, to_due_datetime
+from user_cache import invalidate_user, user_object_cache
+from credit_ledger import get_balance
+from activity_feed import record_document_activity, ACTIVITY_RETENTION_DAYS
+from job_metrics import JOB_RUNS_RETENTION_DAYS
+from balances import apply_record_change, apply_cashflow_change
+from vendor_locator import migrate_vendor_locations
+from delayed_deletions import migrate_legacy_pending_deletions
 import traceback
 import time
 import uuid
@@ -15,6 +21,11 @@ import uuid
 logger = logging.getLogger('ficore_app')
 logger.setLevel(logging.INFO)
 
+BILL_MIGRATION_BATCH_SIZE = 1000
+SHOPPING_LISTS_PAGE_SIZE = 10
+CREDIT_HISTORY_PAGE_SIZE = 20
+CREDIT_MIGRATION_BATCH_SIZE = 1000
+
 def get_db():
     """
     Get MongoDB database connection using the global client from utils.py.
@@ -23,9 +34,7 @@ def get_db():
         Database object
     """
     try:
-        db = get_mongo_db()
-        logger.info(f"Successfully connected to MongoDB database: {db.name}", extra={'session_id': 'no-session-id'})
-        return db
+        return get_mongo_db()
     except Exception as e:
         logger.error(f"Error connecting to database: {str(e)}", exc_info=True, extra={'session_id': 'no-session-id'})
         raise
@@ -118,7 +127,7 @@ def initialize_app_data(app):
                     'indexes': [
                         {'key': [('email', ASCENDING)], 'unique': True},
                         {'key': [('reset_token', ASCENDING)], 'sparse': True},
-                        {'key': [('role', ASCENDING)]}
+                        {'key': [('role', ASCENDING), ('_id', ASCENDING)]}
                     ]
                 },
                 'records': {
@@ -173,10 +182,13 @@ def initialize_app_data(app):
                             'required': ['user_id', 'amount', 'type', 'date'],
                             'properties': {
                                 'user_id': {'bsonType': 'string'},
-                                'amount': {'bsonType': 'int'},
+                                'amount': {'bsonType': 'number'},
                                 'type': {'enum': ['add', 'spend', 'purchase', 'admin_credit', 'create_shopping_list']},
                                 'ref': {'bsonType': ['string', 'null']},
                                 'date': {'bsonType': 'date'},
+                                'action': {'bsonType': ['string', 'null']},
+                                'session_id': {'bsonType': ['string', 'null']},
+                                'status': {'bsonType': ['string', 'null']},
                                 'facilitated_by_agent': {'bsonType': ['string', 'null']},
                                 'payment_method': {'bsonType': ['string', 'null']},
                                 'cash_amount': {'bsonType': ['number', 'null']},
@@ -186,7 +198,10 @@ def initialize_app_data(app):
                     },
                     'indexes': [
                         {'key': [('user_id', ASCENDING)]},
-                        {'key': [('date', DESCENDING)]}
+                        {'key': [('date', DESCENDING)]},
+                        # Keyset pagination of credit history, per user and for admins
+                        {'key': [('user_id', ASCENDING), ('date', DESCENDING), ('_id', DESCENDING)]},
+                        {'key': [('date', DESCENDING), ('_id', DESCENDING)]}
                     ]
                 },
                 'credit_requests': {
@@ -309,7 +324,7 @@ def initialize_app_data(app):
                         }
                     },
                     'indexes': [
-                        {'key': [('user_id', ASCENDING)]},
+                        {'key': [('user_id', ASCENDING), ('due_date', ASCENDING)]},
                         {'key': [('session_id', ASCENDING)]},
                         {'key': [('due_date', ASCENDING)]}
                     ]
@@ -377,6 +392,7 @@ def initialize_app_data(app):
                     },
                     'indexes': [
                         {'key': [('user_id', ASCENDING), ('list_id', ASCENDING)]},
+                        {'key': [('list_id', ASCENDING), ('created_at', DESCENDING)]},
                         {'key': [('created_at', DESCENDING)]}
                     ]
                 },
@@ -403,24 +419,33 @@ def initialize_app_data(app):
                     },
                     'indexes': [
                         {'key': [('user_id', ASCENDING), ('status', ASCENDING), ('updated_at', DESCENDING)]},
-                        {'key': [('session_id', ASCENDING), ('status', ASCENDING), ('updated_at', DESCENDING)]}
+                        {'key': [('session_id', ASCENDING), ('status', ASCENDING), ('updated_at', DESCENDING)]},
+                        {'key': [('user_id', ASCENDING), ('created_at', DESCENDING)]},
+                        {'key': [('session_id', ASCENDING), ('created_at', DESCENDING)]}
                     ]
                 },
                 'pending_deletions': {
                     'validator': {
                         '$jsonSchema': {
                             'bsonType': 'object',
-                            'required': ['list_id', 'created_at', 'expires_at'],
+                            'required': ['created_at', 'expires_at'],
                             'properties': {
+                                'kind': {'enum': ['shopping_list', 'food_order']},
+                                'target_id': {'bsonType': 'string'},
                                 'list_id': {'bsonType': 'string'},
+                                'order_id': {'bsonType': 'string'},
                                 'user_id': {'bsonType': ['string', 'null']},
+                                'status': {'enum': ['pending', 'failed']},
                                 'created_at': {'bsonType': 'date'},
                                 'expires_at': {'bsonType': 'date'}
                             }
                         }
                     },
                     'indexes': [
-                        {'key': [('list_id', ASCENDING), ('user_id', ASCENDING)]}
+                        {'key': [('list_id', ASCENDING), ('user_id', ASCENDING)]},
+                        {'key': [('status', ASCENDING), ('expires_at', ASCENDING)]},
+                        {'key': [('kind', ASCENDING), ('target_id', ASCENDING), ('status', ASCENDING)]},
+                        {'key': [('lease_owner', ASCENDING)], 'sparse': True}
                     ]
                 },
                 'feedback': {
@@ -519,7 +544,9 @@ def initialize_app_data(app):
                     'indexes': [
                         {'key': [('user_id', ASCENDING), ('due_date', ASCENDING)]},
                         {'key': [('session_id', ASCENDING), ('due_date', ASCENDING)]},
-                        {'key': [('status', ASCENDING)]}
+                        {'key': [('status', ASCENDING), ('due_date', ASCENDING)]},
+                        {'key': [('user_id', ASCENDING), ('status', ASCENDING)]},
+                        {'key': [('send_notifications', ASCENDING), ('due_date', ASCENDING)]}
                     ]
                 },
                 'bill_reminders': {
@@ -559,6 +586,42 @@ def initialize_app_data(app):
                         {'key': [('expiration', ASCENDING)], 'expireAfterSeconds': 0}
                     ]
                 },
+                'user_balances': {
+                    'indexes': []
+                },
+                'job_checkpoints': {
+                    'indexes': []
+                },
+                'vendors': {
+                    'indexes': [
+                        # index_information() reports the 2dsphere version, so it is spelled out to match
+                        {'key': [('geo_location', '2dsphere')], '2dsphereIndexVersion': 3}
+                    ]
+                },
+                'scheduler_leases': {
+                    'indexes': []
+                },
+                'job_runs': {
+                    'indexes': [
+                        {'key': [('job_name', ASCENDING), ('started_at', DESCENDING)]},
+                        {'key': [('started_at', ASCENDING)], 'expireAfterSeconds': JOB_RUNS_RETENTION_DAYS * 86400}
+                    ]
+                },
+                'report_jobs': {
+                    'indexes': [
+                        {'key': [('user_id', ASCENDING), ('created_at', DESCENDING)]},
+                        {'key': [('status', ASCENDING), ('created_at', ASCENDING)]}
+                    ]
+                },
+                'activity_events': {
+                    'indexes': [
+                        {'key': [('user_id', ASCENDING), ('ts', DESCENDING)]},
+                        {'key': [('user_id', ASCENDING), ('type', ASCENDING), ('ts', DESCENDING)]},
+                        {'key': [('session_id', ASCENDING), ('ts', DESCENDING)],
+                         'partialFilterExpression': {'session_id': {'$type': 'string'}}},
+                        {'key': [('ts', ASCENDING)], 'expireAfterSeconds': ACTIVITY_RETENTION_DAYS * 86400}
+                    ]
+                },
                 'food_orders': {
                     'validator': {
                         '$jsonSchema': {
@@ -602,7 +665,7 @@ def initialize_app_data(app):
             }
             
             for collection_name, config in collection_schemas.items():
-                if collection_name == 'credit_requests' and collection_name in collections:
+                if collection_name in ('credit_requests', 'pending_deletions', 'ficore_credit_transactions') and collection_name in collections:
                     try:
                         db_instance.command('collMod', collection_name, validator=config.get('validator', {}))
                         logger.info(f"Updated validator for collection: {collection_name}", 
@@ -742,13 +805,37 @@ def initialize_app_data(app):
                     logger.error(f"Failed to insert VAT rules: {str(e)}", exc_info=True, extra={'session_id': 'no-session-id'})
                     raise
             
+            # Convert bill due dates stored as 'YYYY-MM-DD' strings by older releases
+            try:
+                migrate_bill_due_dates(db_instance)
+            except OperationFailure as e:
+                logger.error(f"Failed to migrate bill due dates: {str(e)}", exc_info=True, extra={'session_id': 'no-session-id'})
+            
+            # Add GeoJSON points to vendors that only have {'lat', 'lng'} locations
+            try:
+                migrate_vendor_locations(db_instance)
+            except OperationFailure as e:
+                logger.error(f"Failed to migrate vendor locations: {str(e)}", exc_info=True, extra={'session_id': 'no-session-id'})
+            
+            # Convert pending deletions written before they carried a kind and target_id
+            try:
+                migrate_legacy_pending_deletions(db_instance)
+            except OperationFailure as e:
+                logger.error(f"Failed to migrate pending deletions: {str(e)}", exc_info=True, extra={'session_id': 'no-session-id'})
+            
+            # Fold the legacy credit_transactions collection into ficore_credit_transactions
+            try:
+                migrate_legacy_credit_transactions(db_instance)
+            except OperationFailure as e:
+                logger.error(f"Failed to migrate legacy credit transactions: {str(e)}", exc_info=True, extra={'session_id': 'no-session-id'})
+            
         except Exception as e:
             logger.error(f"{trans('general_database_initialization_failed', default='Failed to initialize database')}: {str(e)}", 
                         exc_info=True, extra={'session_id': 'no-session-id'})
             raise
 
 class User:
-    def __init__(self, id, email, display_name=None, role='personal', username=None, is_admin=False, setup_complete=False, coin_balance=0, ficore_credit_balance=0, language='en', dark_mode=False):
+    def __init__(self, id, email, display_name=None, role='personal', username=None, is_admin=False, setup_complete=False, coin_balance=0, language='en', dark_mode=False):
         self.id = id
         self.email = email
         self.username = username or display_name or email.split('@')[0]
@@ -757,10 +844,14 @@ class User:
         self.is_admin = is_admin
         self.setup_complete = setup_complete
         self.coin_balance = coin_balance
-        self.ficore_credit_balance = ficore_credit_balance
         self.language = language
         self.dark_mode = dark_mode
 
+    @property
+    def ficore_credit_balance(self):
+        # Not stored on the object: User instances are cached, balances change on every debit
+        return get_balance(get_mongo_db(), self.id) or 0
+
     @property
     def is_authenticated(self):
         return True
@@ -816,8 +907,7 @@ def create_user(db, user_data):
         db.users.insert_one(user_doc)
         logger.info(f"{trans('general_user_created', default='Created user with ID')}: {user_id}", 
                    extra={'session_id': 'no-session-id'})
-        get_user.cache_clear()
-        get_user_by_email.cache_clear()
+        invalidate_user(user_id)
         return User(
             id=user_doc['_id'],
             email=user_doc['email'],
@@ -827,7 +917,6 @@ def create_user(db, user_data):
             is_admin=user_doc['is_admin'],
             setup_complete=user_doc['setup_complete'],
             coin_balance=user_doc['coin_balance'],
-            ficore_credit_balance=user_doc['ficore_credit_balance'],
             language=user_doc['language'],
             dark_mode=user_doc['dark_mode']
         )
@@ -840,10 +929,9 @@ def create_user(db, user_data):
                     exc_info=True, extra={'session_id': 'no-session-id'})
         raise
 
-@lru_cache(maxsize=128)
 def get_user_by_email(db, email):
     """
-    Retrieve a user by email from the users collection.
+    Retrieve a user by email, served from the TTL user cache when fresh.
     
     Args:
         db: MongoDB database instance
@@ -852,12 +940,15 @@ def get_user_by_email(db, email):
     Returns:
         User: User object or None if not found
     """
+    cached_user = user_object_cache.get_by_email(email)
+    if cached_user is not None:
+        return cached_user
     try:
         logger.debug(f"Calling get_user_by_email for email: {email}, stack: {''.join(traceback.format_stack()[-5:])}", 
                     extra={'session_id': 'no-session-id'})
         user_doc = db.users.find_one({'email': email.lower()})
         if user_doc:
-            return User(
+            user = User(
                 id=user_doc['_id'],
                 email=user_doc['email'],
                 username=user_doc['_id'],
@@ -866,20 +957,20 @@ def get_user_by_email(db, email):
                 is_admin=user_doc.get('is_admin', False),
                 setup_complete=user_doc.get('setup_complete', False),
                 coin_balance=user_doc.get('coin_balance', 0),
-                ficore_credit_balance=user_doc.get('ficore_credit_balance', 0),
                 language=user_doc.get('language', 'en'),
                 dark_mode=user_doc.get('dark_mode', False)
             )
+            user_object_cache.put(user)
+            return user
         return None
     except Exception as e:
         logger.error(f"{trans('general_user_fetch_error', default='Error getting user by email')} {email}: {str(e)}", 
                     exc_info=True, extra={'session_id': 'no-session-id'})
         raise
 
-@lru_cache(maxsize=128)
 def get_user(db, user_id):
     """
-    Retrieve a user by ID from the users collection.
+    Retrieve a user by ID, served from the TTL user cache when fresh.
     
     Args:
         db: MongoDB database instance
@@ -888,12 +979,15 @@ def get_user(db, user_id):
     Returns:
         User: User object or None if not found
     """
+    cached_user = user_object_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
     try:
         logger.debug(f"Calling get_user for user_id: {user_id}, stack: {''.join(traceback.format_stack()[-5:])}", 
                     extra={'session_id': 'no-session-id'})
         user_doc = db.users.find_one({'_id': user_id})
         if user_doc:
-            return User(
+            user = User(
                 id=user_doc['_id'],
                 email=user_doc['email'],
                 username=user_doc['_id'],
@@ -902,10 +996,11 @@ def get_user(db, user_id):
                 is_admin=user_doc.get('is_admin', False),
                 setup_complete=user_doc.get('setup_complete', False),
                 coin_balance=user_doc.get('coin_balance', 0),
-                ficore_credit_balance=user_doc.get('ficore_credit_balance', 0),
                 language=user_doc.get('language', 'en'),
                 dark_mode=user_doc.get('dark_mode', False)
             )
+            user_object_cache.put(user)
+            return user
         return None
     except Exception as e:
         logger.error(f"{trans('general_user_fetch_error', default='Error getting user by ID')} {user_id}: {str(e)}", 
@@ -1071,6 +1166,41 @@ def get_budgets(db, filter_kwargs):
                     exc_info=True, extra={'session_id': 'no-session-id'})
         raise
 
+def migrate_bill_due_dates(db, batch_size=BILL_MIGRATION_BATCH_SIZE):
+    """
+    Rewrite bill due dates stored as 'YYYY-MM-DD' strings as BSON dates.
+    
+    Each update matches the original string, so a bill edited concurrently is
+    left for the next run. Unparseable strings are logged and left in place.
+    
+    Args:
+        db: MongoDB database instance
+        batch_size: Number of updates per bulk_write
+    
+    Returns:
+        dict: migrated and invalid bill counts
+    """
+    migrated = invalid = 0
+    operations = []
+    for bill in db.bills.find({'due_date': {'$type': 'string'}}, {'due_date': 1}).batch_size(batch_size):
+        try:
+            due_date = to_due_datetime(bill['due_date'])
+        except ValueError:
+            invalid += 1
+            logger.warning(f"Invalid due_date format for bill {bill['_id']}: {bill['due_date']}",
+                           extra={'session_id': 'no-session-id'})
+            continue
+        operations.append(UpdateOne({'_id': bill['_id'], 'due_date': bill['due_date']}, {'$set': {'due_date': due_date}}))
+        if len(operations) >= batch_size:
+            migrated += db.bills.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        migrated += db.bills.bulk_write(operations, ordered=False).modified_count
+    if migrated or invalid:
+        logger.info(f"Migrated {migrated} bill due dates to BSON dates, skipped {invalid} invalid values",
+                    extra={'session_id': 'no-session-id'})
+    return {'migrated': migrated, 'invalid': invalid}
+
 def get_bills(db, filter_kwargs):
     """
     Retrieve bill records based on filter criteria.
@@ -1401,6 +1531,7 @@ def create_budget(db, budget_data):
         if not all(field in budget_data for field in required_fields):
             raise ValueError(trans('general_missing_budget_fields', default='Missing required budget fields'))
         result = db.budgets.insert_one(budget_data)
+        record_document_activity(db, 'budgets', budget_data)
         logger.info(f"{trans('general_budget_created', default='Created budget record with ID')}: {result.inserted_id}", 
                    extra={'session_id': budget_data.get('session_id', 'no-session-id')})
         return str(result.inserted_id)
@@ -1424,7 +1555,9 @@ def create_bill(db, bill_data):
         required_fields = ['user_id', 'bill_name', 'amount', 'due_date', 'status']
         if not all(field in bill_data for field in required_fields):
             raise ValueError(trans('general_missing_bill_fields', default='Missing required bill fields'))
+        bill_data['due_date'] = to_due_datetime(bill_data['due_date'])
         result = db.bills.insert_one(bill_data)
+        record_document_activity(db, 'bills', bill_data)
         logger.info(f"{trans('general_bill_created', default='Created bill record with ID')}: {result.inserted_id}", 
                    extra={'session_id': bill_data.get('session_id', 'no-session-id')})
         return str(result.inserted_id)
@@ -1491,6 +1624,8 @@ def create_record(db, record_data):
         if not all(field in record_data for field in required_fields):
             raise ValueError(trans('general_missing_record_fields', default='Missing required record fields'))
         result = db.records.insert_one(record_data)
+        record_document_activity(db, 'records', record_data)
+        apply_record_change(db, new_doc=record_data)
         logger.info(f"{trans('general_record_created', default='Created record with ID')}: {result.inserted_id}", 
                    extra={'session_id': record_data.get('session_id', 'no-session-id')})
         return str(result.inserted_id)
@@ -1533,6 +1668,8 @@ def create_cashflow(db, cashflow_data):
         if not all(field in cashflow_data for field in required_fields):
             raise ValueError(trans('general_missing_cashflow_fields', default='Missing required cashflow fields'))
         result = db.cashflows.insert_one(cashflow_data)
+        record_document_activity(db, 'cashflows', cashflow_data)
+        apply_cashflow_change(db, new_doc=cashflow_data)
         logger.info(f"{trans('general_cashflow_created', default='Created cashflow record with ID')}: {result.inserted_id}", 
                    extra={'session_id': cashflow_data.get('session_id', 'no-session-id')})
         return str(result.inserted_id)
@@ -1541,23 +1678,106 @@ def create_cashflow(db, cashflow_data):
                     exc_info=True, extra={'session_id': cashflow_data.get('session_id', 'no-session-id')})
         raise
 
-def get_ficore_credit_transactions(db, filter_kwargs):
+def get_credit_history_page(db, filter_kwargs, before=None, per_page=CREDIT_HISTORY_PAGE_SIZE):
     """
-    Retrieve ficore credit transaction records based on filter criteria.
+    Retrieve one page of credit transactions, newest first, from
+    ficore_credit_transactions and the legacy credit_transactions collection.
+    
+    Pages are keyed on (date, _id) rather than skipped. Each collection is
+    sorted and limited on its (user_id, date, _id) or (date, _id) index before
+    $unionWith merges the two, so a page reads at most 2 * (per_page + 1)
+    documents however long the ledger grows.
     
     Args:
         db: MongoDB database instance
         filter_kwargs: Dictionary of filter criteria
-    
-    Returns:
-        list: List of ficore credit transaction records
-    """
-    try:
-        return list(db.ficore_credit_transactions.find(filter_kwargs).sort('date', DESCENDING))
+        before: (date, _id) of the last transaction on the previous page, or None for the first page
+        per_page: Transactions per page (default: CREDIT_HISTORY_PAGE_SIZE)
+    
+    Returns:
+        tuple: (list of transaction records, (date, _id) to pass as before for the next page or None)
+    """
+    match = dict(filter_kwargs)
+    if before is None:
+        match['date'] = {'$type': 'date'}
+    else:
+        before_date, before_id = before
+        match['date'] = {'$lte': before_date}
+        match['$or'] = [{'date': {'$lt': before_date}}, {'_id': {'$lt': before_id}}]
+    branch = [
+        {'$match': match},
+        {'$sort': {'date': DESCENDING, '_id': DESCENDING}},
+        {'$limit': per_page + 1}
+    ]
+    try:
+        transactions = list(db.ficore_credit_transactions.aggregate(branch + [
+            {'$unionWith': {'coll': 'credit_transactions', 'pipeline': branch}},
+            {'$sort': {'date': DESCENDING, '_id': DESCENDING}},
+            {'$limit': per_page + 1}
+        ]))
     except Exception as e:
         logger.error(f"{trans('credits_transactions_fetch_error', default='Error getting ficore credit transactions')}: {str(e)}", 
                     exc_info=True, extra={'session_id': 'no-session-id'})
         raise
+    if len(transactions) <= per_page:
+        return transactions, None
+    transactions = transactions[:per_page]
+    return transactions, (transactions[-1]['date'], transactions[-1]['_id'])
+
+def migrate_legacy_credit_transactions(db, batch_size=CREDIT_MIGRATION_BATCH_SIZE):
+    """
+    Fold legacy credit transactions into ficore_credit_transactions.
+    
+    Rows in the legacy credit_transactions collection are copied with their
+    _id and then deleted, so a run interrupted between the two is simply
+    repeated. Rows without a BSON date are logged and left in place. Spends
+    written by the personal tools before the credit ledger carried
+    'timestamp' and 'action' instead of 'date', 'type' and 'ref'; they are
+    given those fields so they show up in the history.
+    
+    Both kinds of row predate the collection validator, so it is bypassed.
+    
+    Args:
+        db: MongoDB database instance
+        batch_size: Number of rows per bulk_write
+    
+    Returns:
+        dict: moved and invalid legacy rows, and dated pre-ledger spends
+    """
+    dated = db.ficore_credit_transactions.update_many(
+        {'date': {'$exists': False}, 'timestamp': {'$type': 'date'}},
+        [{'$set': {
+            'date': '$timestamp',
+            'type': {'$ifNull': ['$type', 'spend']},
+            'ref': {'$ifNull': ['$ref', '$action']}
+        }}],
+        bypass_document_validation=True
+    ).modified_count
+    moved = invalid = 0
+    if 'credit_transactions' in db.list_collection_names():
+        batch = []
+        for transaction in db.credit_transactions.find({'date': {'$type': 'date'}}).batch_size(batch_size):
+            batch.append(transaction)
+            if len(batch) >= batch_size:
+                moved += _move_credit_transactions(db, batch)
+                batch = []
+        if batch:
+            moved += _move_credit_transactions(db, batch)
+        invalid = db.credit_transactions.count_documents({})
+        if invalid:
+            logger.warning(f"{invalid} legacy credit transactions have no valid date and were not migrated",
+                           extra={'session_id': 'no-session-id'})
+    if moved or dated:
+        logger.info(f"Moved {moved} legacy credit transactions into ficore_credit_transactions, dated {dated} earlier spends",
+                    extra={'session_id': 'no-session-id'})
+    return {'moved': moved, 'invalid': invalid, 'dated': dated}
+
+def _move_credit_transactions(db, transactions):
+    db.ficore_credit_transactions.bulk_write(
+        [ReplaceOne({'_id': transaction['_id']}, transaction, upsert=True) for transaction in transactions],
+        ordered=False, bypass_document_validation=True
+    )
+    return db.credit_transactions.delete_many({'_id': {'$in': [transaction['_id'] for transaction in transactions]}}).deleted_count
 
 def create_ficore_credit_transaction(db, transaction_data):
     """
@@ -1575,6 +1795,7 @@ def create_ficore_credit_transaction(db, transaction_data):
         if not all(field in transaction_data for field in required_fields):
             raise ValueError(trans('credits_missing_transaction_fields', default='Missing required ficore credit transaction fields'))
         result = db.ficore_credit_transactions.insert_one(transaction_data)
+        record_document_activity(db, 'ficore_credit_transactions', transaction_data)
         logger.info(f"{trans('credits_transaction_created', default='Created ficore credit transaction with ID')}: {result.inserted_id}", 
                    extra={'session_id': transaction_data.get('session_id', 'no-session-id')})
         return str(result.inserted_id)
@@ -1647,8 +1868,7 @@ def update_user(db, user_id, update_data):
         if result.modified_count > 0:
             logger.info(f"{trans('general_user_updated', default='Updated user with ID')}: {user_id}", 
                        extra={'session_id': 'no-session-id'})
-            get_user.cache_clear()
-            get_user_by_email.cache_clear()
+            invalidate_user(user_id)
             return True
         logger.info(f"{trans('general_user_no_change', default='No changes made to user with ID')}: {user_id}", 
                    extra={'session_id': 'no-session-id'})
@@ -1873,6 +2093,7 @@ def create_shopping_item(db, item_data):
         if not all(field in item_data for field in required_fields):
             raise ValueError(trans('general_missing_shopping_item_fields', default='Missing required shopping item fields'))
         result = db.shopping_items.insert_one(item_data)
+        record_document_activity(db, 'shopping_items', item_data)
         logger.info(f"{trans('general_shopping_item_created', default='Created shopping item with ID')}: {result.inserted_id}", 
                    extra={'session_id': item_data.get('session_id', 'no-session-id')})
         return str(result.inserted_id)
@@ -1937,6 +2158,7 @@ def update_shopping_item(db, item_id, update_data):
             {'$set': update_data}
         )
         if result.modified_count > 0:
+            record_document_activity(db, 'shopping_items', db.shopping_items.find_one({'_id': ObjectId(item_id)}), action='bought' if update_data.get('status') == 'bought' else 'updated')
             logger.info(f"{trans('general_shopping_item_updated', default='Updated shopping item with ID')}: {item_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -1962,11 +2184,15 @@ def update_record(db, record_id, update_data):
     """
     try:
         update_data['updated_at'] = datetime.utcnow()
+        old_record = db.records.find_one({'_id': ObjectId(record_id)})
         result = db.records.update_one(
             {'_id': ObjectId(record_id)},
             {'$set': update_data}
         )
         if result.modified_count > 0:
+            updated_record = db.records.find_one({'_id': ObjectId(record_id)})
+            record_document_activity(db, 'records', updated_record, action='updated')
+            apply_record_change(db, old_record, updated_record)
             logger.info(f"{trans('general_record_updated', default='Updated record with ID')}: {record_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -1992,11 +2218,15 @@ def update_cashflow(db, cashflow_id, update_data):
     """
     try:
         update_data['updated_at'] = datetime.utcnow()
+        old_cashflow = db.cashflows.find_one({'_id': ObjectId(cashflow_id)})
         result = db.cashflows.update_one(
             {'_id': ObjectId(cashflow_id)},
             {'$set': update_data}
         )
         if result.modified_count > 0:
+            updated_cashflow = db.cashflows.find_one({'_id': ObjectId(cashflow_id)})
+            record_document_activity(db, 'cashflows', updated_cashflow, action='updated')
+            apply_cashflow_change(db, old_cashflow, updated_cashflow)
             logger.info(f"{trans('general_cashflow_updated', default='Updated cashflow record with ID')}: {cashflow_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2055,6 +2285,7 @@ def update_budget(db, budget_id, update_data):
             {'$set': update_data}
         )
         if result.modified_count > 0:
+            record_document_activity(db, 'budgets', db.budgets.find_one({'_id': ObjectId(budget_id)}), action='updated')
             logger.info(f"{trans('general_budget_updated', default='Updated budget record with ID')}: {budget_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2079,11 +2310,14 @@ def update_bill(db, bill_id, update_data):
         bool: True if updated, False if not found or no changes made
     """
     try:
+        if 'due_date' in update_data:
+            update_data['due_date'] = to_due_datetime(update_data['due_date'])
         result = db.bills.update_one(
             {'_id': ObjectId(bill_id)},
             {'$set': update_data}
         )
         if result.modified_count > 0:
+            record_document_activity(db, 'bills', db.bills.find_one({'_id': ObjectId(bill_id)}), action='updated')
             logger.info(f"{trans('general_bill_updated', default='Updated bill record with ID')}: {bill_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2252,8 +2486,9 @@ def delete_shopping_item(db, item_id):
         bool: True if deleted, False if not found
     """
     try:
-        result = db.shopping_items.delete_one({'_id': ObjectId(item_id)})
-        if result.deleted_count > 0:
+        deleted_doc = db.shopping_items.find_one_and_delete({'_id': ObjectId(item_id)})
+        if deleted_doc:
+            record_document_activity(db, 'shopping_items', deleted_doc, action='deleted')
             logger.info(f"{trans('general_shopping_item_deleted', default='Deleted shopping item with ID')}: {item_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2277,8 +2512,10 @@ def delete_record(db, record_id):
         bool: True if deleted, False if not found
     """
     try:
-        result = db.records.delete_one({'_id': ObjectId(record_id)})
-        if result.deleted_count > 0:
+        deleted_doc = db.records.find_one_and_delete({'_id': ObjectId(record_id)})
+        if deleted_doc:
+            record_document_activity(db, 'records', deleted_doc, action='deleted')
+            apply_record_change(db, old_doc=deleted_doc)
             logger.info(f"{trans('general_record_deleted', default='Deleted record with ID')}: {record_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2302,8 +2539,10 @@ def delete_cashflow(db, cashflow_id):
         bool: True if deleted, False if not found
     """
     try:
-        result = db.cashflows.delete_one({'_id': ObjectId(cashflow_id)})
-        if result.deleted_count > 0:
+        deleted_doc = db.cashflows.find_one_and_delete({'_id': ObjectId(cashflow_id)})
+        if deleted_doc:
+            record_document_activity(db, 'cashflows', deleted_doc, action='deleted')
+            apply_cashflow_change(db, old_doc=deleted_doc)
             logger.info(f"{trans('general_cashflow_deleted', default='Deleted cashflow record with ID')}: {cashflow_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2406,8 +2645,7 @@ def delete_user(db, user_id):
         if result.deleted_count > 0:
             logger.info(f"{trans('general_user_deleted', default='Deleted user with ID')}: {user_id}", 
                        extra={'session_id': 'no-session-id'})
-            get_user.cache_clear()
-            get_user_by_email.cache_clear()
+            invalidate_user(user_id)
             return True
         logger.info(f"{trans('general_user_not_found', default='User not found with ID')}: {user_id}", 
                    extra={'session_id': 'no-session-id'})
@@ -2429,8 +2667,9 @@ def delete_budget(db, budget_id):
         bool: True if deleted, False if not found
     """
     try:
-        result = db.budgets.delete_one({'_id': ObjectId(budget_id)})
-        if result.deleted_count > 0:
+        deleted_doc = db.budgets.find_one_and_delete({'_id': ObjectId(budget_id)})
+        if deleted_doc:
+            record_document_activity(db, 'budgets', deleted_doc, action='deleted')
             logger.info(f"{trans('general_budget_deleted', default='Deleted budget record with ID')}: {budget_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2454,8 +2693,9 @@ def delete_bill(db, bill_id):
         bool: True if deleted, False if not found
     """
     try:
-        result = db.bills.delete_one({'_id': ObjectId(bill_id)})
-        if result.deleted_count > 0:
+        deleted_doc = db.bills.find_one_and_delete({'_id': ObjectId(bill_id)})
+        if deleted_doc:
+            record_document_activity(db, 'bills', deleted_doc, action='deleted')
             logger.info(f"{trans('general_bill_deleted', default='Deleted bill record with ID')}: {bill_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2634,6 +2874,7 @@ def create_shopping_list(db, list_data):
             raise ValueError(trans('general_missing_shopping_list_fields', default='Missing required shopping list fields'))
         list_data['_id'] = str(uuid.uuid4())
         result = db.shopping_lists.insert_one(list_data)
+        record_document_activity(db, 'shopping_lists', list_data)
         logger.info(f"{trans('general_shopping_list_created', default='Created shopping list with ID')}: {list_data['_id']}", 
                    extra={'session_id': list_data.get('session_id', 'no-session-id')})
         return str(list_data['_id'])
@@ -2661,6 +2902,7 @@ def update_shopping_list(db, list_id, update_data):
             {'$set': update_data}
         )
         if result.modified_count > 0:
+            record_document_activity(db, 'shopping_lists', db.shopping_lists.find_one({'_id': list_id}), action='updated')
             logger.info(f"{trans('general_shopping_list_updated', default='Updated shopping list with ID')}: {list_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2686,8 +2928,9 @@ def delete_shopping_list(db, list_id):
     try:
         # Delete associated shopping items
         db.shopping_items.delete_many({'list_id': list_id})
-        result = db.shopping_lists.delete_one({'_id': list_id})
-        if result.deleted_count > 0:
+        deleted_doc = db.shopping_lists.find_one_and_delete({'_id': list_id})
+        if deleted_doc:
+            record_document_activity(db, 'shopping_lists', deleted_doc, action='deleted')
             logger.info(f"{trans('general_shopping_list_deleted', default='Deleted shopping list with ID')}: {list_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2717,6 +2960,70 @@ def get_shopping_lists(db, filter_kwargs):
                     exc_info=True, extra={'session_id': 'no-session-id'})
         raise
 
+def get_shopping_lists_page(db, filter_kwargs, page=1, per_page=SHOPPING_LISTS_PAGE_SIZE):
+    """
+    Retrieve one page of shopping lists, newest first.
+    
+    Args:
+        db: MongoDB database instance
+        filter_kwargs: Dictionary of filter criteria
+        page: 1-based page number
+        per_page: Lists per page (default: SHOPPING_LISTS_PAGE_SIZE)
+    
+    Returns:
+        tuple: (list of shopping list records, whether a further page exists)
+    """
+    try:
+        lists = list(db.shopping_lists.find(filter_kwargs)
+                     .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+                     .skip((max(page, 1) - 1) * per_page)
+                     .limit(per_page + 1))
+        return lists[:per_page], len(lists) > per_page
+    except Exception as e:
+        logger.error(f"{trans('general_shopping_lists_fetch_error', default='Error getting shopping lists')}: {str(e)}", 
+                    exc_info=True, extra={'session_id': 'no-session-id'})
+        raise
+
+def get_shopping_items_by_list(db, list_ids):
+    """
+    Retrieve the items of several shopping lists with one aggregation, with per-list totals.
+    
+    Items are matched with a single $in on list_id and sorted newest first,
+    which the (list_id, created_at) index serves, then grouped per list.
+    
+    Args:
+        db: MongoDB database instance
+        list_ids: Shopping list IDs (strings or ObjectIds)
+    
+    Returns:
+        dict: list_id -> {'items', 'item_count', 'items_total', 'bought_total'}, where
+              the totals are sums of price * quantity; lists without items get empty entries
+    """
+    list_ids = [str(list_id) for list_id in list_ids]
+    grouped = {list_id: {'items': [], 'item_count': 0, 'items_total': 0.0, 'bought_total': 0.0} for list_id in list_ids}
+    if not list_ids:
+        return grouped
+    line_total = {'$multiply': [{'$ifNull': ['$price', 0]}, {'$ifNull': ['$quantity', 1]}]}
+    try:
+        for group in db.shopping_items.aggregate([
+            {'$match': {'list_id': {'$in': list_ids}}},
+            {'$sort': {'list_id': ASCENDING, 'created_at': DESCENDING}},
+            {'$group': {
+                '_id': '$list_id',
+                'items': {'$push': '$$ROOT'},
+                'item_count': {'$sum': 1},
+                'items_total': {'$sum': line_total},
+                'bought_total': {'$sum': {'$cond': [{'$eq': ['$status', 'bought']}, line_total, 0]}}
+            }}
+        ]):
+            list_id = group.pop('_id')
+            grouped[list_id] = {**group, 'items_total': float(group['items_total']), 'bought_total': float(group['bought_total'])}
+        return grouped
+    except Exception as e:
+        logger.error(f"{trans('general_shopping_items_fetch_error', default='Error getting shopping items')}: {str(e)}", 
+                    exc_info=True, extra={'session_id': 'no-session-id'})
+        raise
+
 def to_dict_shopping_list(record):
     """Convert shopping list record to dictionary."""
     if not record:
@@ -2830,6 +3137,7 @@ def create_food_order(db, order_data):
             raise ValueError(trans('general_missing_food_order_fields', default='Missing required food order fields'))
         order_data['_id'] = ObjectId()
         result = db.food_orders.insert_one(order_data)
+        record_document_activity(db, 'food_orders', order_data)
         logger.info(f"{trans('general_food_order_created', default='Created food order with ID')}: {result.inserted_id}", 
                    extra={'session_id': order_data.get('session_id', 'no-session-id')})
         return str(result.inserted_id)
@@ -2875,6 +3183,7 @@ def update_food_order(db, order_id, update_data):
             {'$set': update_data}
         )
         if result.modified_count > 0:
+            record_document_activity(db, 'food_orders', db.food_orders.find_one({'_id': ObjectId(order_id)}), action='updated')
             logger.info(f"{trans('general_food_order_updated', default='Updated food order with ID')}: {order_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
@@ -2898,8 +3207,9 @@ def delete_food_order(db, order_id):
         bool: True if deleted, False if not found
     """
     try:
-        result = db.food_orders.delete_one({'_id': ObjectId(order_id)})
-        if result.deleted_count > 0:
+        deleted_doc = db.food_orders.find_one_and_delete({'_id': ObjectId(order_id)})
+        if deleted_doc:
+            record_document_activity(db, 'food_orders', deleted_doc, action='deleted')
             logger.info(f"{trans('general_food_order_deleted', default='Deleted food order with ID')}: {order_id}", 
                        extra={'session_id': 'no-session-id'})
             return True
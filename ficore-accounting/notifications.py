@@ -0,0 +1,186 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger('ficore_app')
+
+NOTIFICATION_WORKERS = int(os.getenv('NOTIFICATION_WORKERS', 8))
+HTTP_POOL_SIZE = int(os.getenv('NOTIFICATION_HTTP_POOL_SIZE', 10))
+# Retries for connection errors, 429 and 503; sleeps backoff_factor * 2 ** (retry - 1), honouring Retry-After.
+# Sends are POSTs, so only failures where the provider did not act on the request are retried:
+# read timeouts and other 5xx may already have delivered the message.
+HTTP_RETRIES = int(os.getenv('NOTIFICATION_HTTP_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv('NOTIFICATION_HTTP_BACKOFF', 1))
+RETRY_STATUSES = (429, 503)
+
+# Requests per second allowed per provider (0 disables the limit)
+PROVIDER_RATE_LIMITS = {
+    'mailersend': float(os.getenv('MAILERSEND_RATE_LIMIT', 10)),
+    'sms': float(os.getenv('SMS_RATE_LIMIT', 5)),
+    'whatsapp': float(os.getenv('WHATSAPP_RATE_LIMIT', 5))
+}
+
+CHANNEL_PROVIDERS = {
+    'email': 'mailersend',
+    'sms': 'sms',
+    'whatsapp': 'whatsapp'
+}
+
+_sessions = {}
+_rate_limiters = {}
+_lock = threading.Lock()
+
+class RateLimiter:
+    """Thread-safe token bucket allowing rate calls per second, in bursts of up to one second's worth."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def get_http_session(provider):
+    """
+    Return the process-wide requests.Session for a provider.
+
+    Sessions keep a pool of up to HTTP_POOL_SIZE keep-alive connections and
+    retry connection errors and RETRY_STATUSES with exponential backoff. Read
+    errors are not retried, since the provider may already have sent the message.
+    """
+    session = _sessions.get(provider)
+    if session is None:
+        with _lock:
+            session = _sessions.get(provider)
+            if session is None:
+                retry = Retry(
+                    total=HTTP_RETRIES,
+                    read=0,
+                    backoff_factor=HTTP_BACKOFF_FACTOR,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset(['POST']),
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[provider] = session
+    return session
+
+def get_rate_limiter(provider):
+    """Return the process-wide RateLimiter for a provider."""
+    limiter = _rate_limiters.get(provider)
+    if limiter is None:
+        with _lock:
+            limiter = _rate_limiters.setdefault(provider, RateLimiter(PROVIDER_RATE_LIMITS.get(provider, 0)))
+    return limiter
+
+class NotificationDispatcher:
+    """
+    Send notifications concurrently on a bounded worker pool.
+
+    Each send waits on its provider's rate limiter and runs inside an app
+    context. flush() waits for everything submitted so far and writes one
+    delivery result per send to the results collection with insert_many.
+
+    Usage:
+        with NotificationDispatcher(app, db) as dispatcher:
+            dispatcher.submit('sms', send_sms_reminder, record, phone, message)
+            counts = dispatcher.flush()
+    """
+
+    def __init__(self, app, db, collection='bill_reminders', max_workers=NOTIFICATION_WORKERS):
+        """
+        Args:
+            app: Flask application instance
+            db: MongoDB database instance
+            collection: Collection delivery results are written to (default: bill_reminders)
+            max_workers: Concurrent sends (default: NOTIFICATION_WORKERS)
+        """
+        self.app = app
+        self.db = db
+        self.collection = collection
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='notification')
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self, channel, send, args, kwargs):
+        with self.app.app_context():
+            get_rate_limiter(CHANNEL_PROVIDERS[channel]).acquire()
+            try:
+                return send(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Error sending {channel} notification: {str(e)}", exc_info=True,
+                             extra={'session_id': 'no-session-id'})
+                return False, {'error': str(e)}
+
+    def submit(self, channel, send, record, *args, **kwargs):
+        """
+        Queue a send.
+
+        Args:
+            channel: 'email', 'sms' or 'whatsapp'
+            send: Callable returning (success, response)
+            record: Fields stored with the delivery result
+            *args, **kwargs: Passed to send
+        """
+        future = self.executor.submit(self._run, channel, send, args, kwargs)
+        self.pending.append((future, channel, record))
+
+    def flush(self):
+        """
+        Wait for queued sends and bulk-write their delivery results.
+
+        Returns:
+            dict: delivered and failed counts
+        """
+        counts = {'delivered': 0, 'failed': 0}
+        results = []
+        for future, channel, record in self.pending:
+            success, response = future.result()
+            counts['delivered' if success else 'failed'] += 1
+            results.append({
+                **record,
+                'notification_type': channel,
+                'delivered': success,
+                'response': response,
+                'sent_at': datetime.utcnow()
+            })
+        self.pending = []
+        if results:
+            self.db[self.collection].insert_many(results, ordered=False)
+        return counts
+
+    def close(self):
+        """Flush outstanding sends and stop the worker pool."""
+        try:
+            self.flush()
+        finally:
+            self.executor.shutdown(wait=True)
@@ -9,7 +9,9 @@ from datetime import datetime, date, timedelta
 from translations import trans
 from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
-from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, log_tool_usage, check_ficore_credit_balance
+from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, log_tool_usage, check_ficore_credit_balance, to_due_datetime, parse_due_date
+from credit_ledger import debit_credits
+from activity_feed import record_document_activity
 from session_utils import create_anonymous_session
 from decimal import Decimal, InvalidOperation
 import re
@@ -188,41 +190,6 @@ def calculate_next_due_date(due_date, frequency):
         return due_date + timedelta(days=90)
     return due_date
 
-def deduct_ficore_credits(db, user_id, amount, action, bill_id=None):
-    """Deduct Ficore Credits from user balance and log the transaction."""
-    try:
-        user = db.users.find_one({'_id': user_id})
-        if not user:
-            current_app.logger.error(f"User {user_id} not found for credit deduction", extra={'session_id': session.get('sid', 'unknown')})
-            return False
-        current_balance = user.get('ficore_credit_balance', 0)
-        if current_balance < amount:
-            current_app.logger.warning(f"Insufficient credits for user {user_id}: required {amount}, available {current_balance}", extra={'session_id': session.get('sid', 'unknown')})
-            return False
-        result = db.users.update_one(
-            {'_id': user_id},
-            {'$inc': {'ficore_credit_balance': -amount}}
-        )
-        if result.modified_count == 0:
-            current_app.logger.error(f"Failed to deduct {amount} credits for user {user_id}", extra={'session_id': session.get('sid', 'unknown')})
-            return False
-        transaction = {
-            '_id': ObjectId(),
-            'user_id': user_id,
-            'action': action,
-            'amount': -amount,
-            'bill_id': str(bill_id) if bill_id else None,
-            'timestamp': datetime.utcnow(),
-            'session_id': session.get('sid', 'unknown'),
-            'status': 'completed'
-        }
-        db.ficore_credit_transactions.insert_one(transaction)
-        current_app.logger.info(f"Deducted {amount} Ficore Credits for {action} by user {user_id}", extra={'session_id': session.get('sid', 'unknown')})
-        return True
-    except Exception as e:
-        current_app.logger.error(f"Error deducting {amount} Ficore Credits for {action} by user {user_id}: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-        return False
-
 class BillForm(FlaskForm):
     bill_name = StringField(
         trans('bill_bill_name', default='Bill Name'),
@@ -500,7 +467,7 @@ def main():
                             'first_name': current_user.get_first_name() if current_user.is_authenticated else '',
                             'bill_name': cleaned_data['bill_name'],
                             'amount': float(cleaned_data['amount']),
-                            'due_date': cleaned_data['due_date'].isoformat(),
+                            'due_date': to_due_datetime(cleaned_data['due_date']),
                             'frequency': cleaned_data['frequency'],
                             'category': cleaned_data['category'],
                             'status': cleaned_data['status'],
@@ -508,13 +475,16 @@ def main():
                             'reminder_days': cleaned_data['reminder_days'],
                             'created_at': datetime.utcnow()
                         }
-                        bills_collection.insert_one(bill_data)
+                        def insert_bill(mongo_session):
+                            bills_collection.insert_one(bill_data, session=mongo_session)
                         if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 1, 'add_bill', bill_id):
-                                bills_collection.delete_one({'_id': bill_id})
+                            if not debit_credits(db, current_user.id, 1, 'add_bill', write=insert_bill, bill_id=bill_id):
                                 current_app.logger.error(f"Failed to deduct Ficore Credit for adding bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
                                 flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for adding bill.'), 'danger')
                                 return redirect(url_for('personal.bill.main', tab='add-bill'))
+                        else:
+                            insert_bill(None)
+                        record_document_activity(db, 'bills', bill_data)
                         current_app.logger.info(f"Bill {bill_id} added successfully for user {bill_data['user_email']}", extra={'session_id': session.get('sid', 'unknown')})
                         flash(trans('bill_added_success', default='Bill added successfully!'), 'success')
                         if cleaned_data['send_email'] and bill_data['user_email']:
@@ -526,13 +496,13 @@ def main():
                                     logger=current_app.logger,
                                     to_email=bill_data['user_email'],
                                     subject=subject,
-                                    template_name=config['template'],
+                                    template_key='bill_reminder',
                                     data={
                                         'first_name': bill_data['first_name'],
                                         'bills': [{
                                             'bill_name': bill_data['bill_name'],
                                             'amount': format_currency(bill_data['amount']),
-                                            'due_date': bill_data['due_date'],
+                                            'due_date': cleaned_data['due_date'].isoformat(),
                                             'category': bill_data['category'],
                                             'status': bill_data['status']
                                         }],
@@ -601,12 +571,16 @@ def main():
                                 'reminder_days': cleaned_data['reminder_days'],
                                 'updated_at': datetime.utcnow()
                             }
-                            bills_collection.update_one({'_id': ObjectId(bill_id), **filter_kwargs}, {'$set': update_data})
+                            def update_bill(mongo_session):
+                                bills_collection.update_one({'_id': ObjectId(bill_id), **filter_kwargs}, {'$set': update_data}, session=mongo_session)
                             if current_user.is_authenticated and not is_admin():
-                                if not deduct_ficore_credits(db, current_user.id, 1, 'update_bill', bill_id):
+                                if not debit_credits(db, current_user.id, 1, 'update_bill', write=update_bill, bill_id=bill_id):
                                     current_app.logger.error(f"Failed to deduct Ficore Credit for updating bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
                                     flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for updating bill.'), 'danger')
                                     return redirect(url_for('personal.bill.main', tab='manage-bills'))
+                            else:
+                                update_bill(None)
+                            record_document_activity(db, 'bills', {**bill, **update_data}, action='updated')
                             current_app.logger.info(f"Bill {bill_id} updated successfully", extra={'session_id': session.get('sid', 'unknown')})
                             flash(trans('bill_updated_success', default='Bill updated successfully!'), 'success')
                             if cleaned_data['amount'] > 100000:
@@ -633,12 +607,16 @@ def main():
                             session_id=session.get('sid', 'unknown'),
                             action='delete_bill'
                         )
-                        bills_collection.delete_one({'_id': ObjectId(bill_id), **filter_kwargs})
+                        def delete_bill(mongo_session):
+                            bills_collection.delete_one({'_id': ObjectId(bill_id), **filter_kwargs}, session=mongo_session)
                         if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 1, 'delete_bill', bill_id):
+                            if not debit_credits(db, current_user.id, 1, 'delete_bill', write=delete_bill, bill_id=bill_id):
                                 current_app.logger.error(f"Failed to deduct Ficore Credit for deleting bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
                                 flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for deleting bill.'), 'danger')
                                 return redirect(url_for('personal.bill.main', tab='manage-bills'))
+                        else:
+                            delete_bill(None)
+                        record_document_activity(db, 'bills', bill, action='deleted')
                         current_app.logger.info(f"Bill {bill_id} deleted successfully", extra={'session_id': session.get('sid', 'unknown')})
                         flash(trans('bill_deleted_success', default='Bill deleted successfully!'), 'success')
                     except Exception as e:
@@ -655,35 +633,40 @@ def main():
                             session_id=session.get('sid', 'unknown'),
                             action='toggle_bill_status'
                         )
-                        bills_collection.update_one({'_id': ObjectId(bill_id), **filter_kwargs}, {'$set': {'status': new_status, 'updated_at': datetime.utcnow()}})
+                        def toggle_bill(mongo_session):
+                            bills_collection.update_one({'_id': ObjectId(bill_id), **filter_kwargs}, {'$set': {'status': new_status, 'updated_at': datetime.utcnow()}}, session=mongo_session)
                         if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 1, 'toggle_bill_status', bill_id):
+                            if not debit_credits(db, current_user.id, 1, 'toggle_bill_status', write=toggle_bill, bill_id=bill_id):
                                 current_app.logger.error(f"Failed to deduct Ficore Credit for toggling status of bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
                                 flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for toggling bill status.'), 'danger')
                                 return redirect(url_for('personal.bill.main', tab='manage-bills'))
+                        else:
+                            toggle_bill(None)
                         if new_status == 'paid' and bill['frequency'] != 'one-time':
                             try:
-                                due_date = bill['due_date']
-                                if isinstance(due_date, str):
-                                    due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
+                                due_date = parse_due_date(bill['due_date'])
                                 new_due_date = calculate_next_due_date(due_date, bill['frequency'])
                                 new_bill = bill.copy()
                                 new_bill['_id'] = ObjectId()
-                                new_bill['due_date'] = new_due_date.isoformat()
+                                new_bill['due_date'] = to_due_datetime(new_due_date)
                                 new_bill['status'] = 'unpaid'
                                 new_bill['created_at'] = datetime.utcnow()
-                                bills_collection.insert_one(new_bill)
+                                def insert_recurring_bill(mongo_session):
+                                    bills_collection.insert_one(new_bill, session=mongo_session)
                                 if current_user.is_authenticated and not is_admin():
-                                    if not deduct_ficore_credits(db, current_user.id, 1, 'add_recurring_bill', new_bill['_id']):
-                                        bills_collection.delete_one({'_id': new_bill['_id']})
+                                    if not debit_credits(db, current_user.id, 1, 'add_recurring_bill', write=insert_recurring_bill, bill_id=new_bill['_id']):
                                         current_app.logger.error(f"Failed to deduct Ficore Credit for adding recurring bill {new_bill['_id']} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
                                         flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for adding recurring bill.'), 'danger')
                                         return redirect(url_for('personal.bill.main', tab='manage-bills'))
+                                else:
+                                    insert_recurring_bill(None)
+                                record_document_activity(db, 'bills', new_bill)
                                 current_app.logger.info(f"Recurring bill {new_bill['_id']} created for {bill['bill_name']}", extra={'session_id': session.get('sid', 'unknown')})
                                 flash(trans('bill_new_recurring_bill_success', default='New recurring bill created for {bill_name}.').format(bill_name=bill['bill_name']), 'success')
                             except Exception as e:
                                 current_app.logger.error(f"Error creating recurring bill: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
                                 flash(trans('bill_recurring_failed', default='Failed to create recurring bill.'), 'warning')
+                        record_document_activity(db, 'bills', {**bill, 'status': new_status}, action='updated')
                         current_app.logger.info(f"Bill {bill_id} status toggled to {new_status}", extra={'session_id': session.get('sid', 'unknown')})
                         flash(trans('bill_status_toggled_success', default='Bill status toggled successfully!'), 'success')
                     except Exception as e:
@@ -705,12 +688,7 @@ def main():
         for bill in bills:
             bill_id = str(bill['_id'])
             try:
-                due_date = bill['due_date']
-                if isinstance(due_date, str):
-                    due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-                elif not isinstance(due_date, date):
-                    current_app.logger.warning(f"Invalid due_date for bill {bill_id}: {bill.get('due_date')}", extra={'session_id': session.get('sid', 'unknown')})
-                    due_date = today
+                due_date = parse_due_date(bill['due_date'])
             except (ValueError, TypeError) as e:
                 current_app.logger.warning(f"Invalid due_date for bill {bill_id}: {bill.get('due_date')}, error: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
                 due_date = today
@@ -845,7 +823,7 @@ def summary():
         bills_collection = db.bills
         today = date.today()
         pipeline = [
-            {'$match': {**filter_kwargs, 'status': {'$ne': 'paid'}, 'due_date': {'$gte': today.isoformat()}}},
+            {'$match': {**filter_kwargs, 'status': {'$ne': 'paid'}, 'due_date': {'$gte': to_due_datetime(today)}}},
             {'$group': {'_id': None, 'totalUpcomingBills': {'$sum': '$amount'}}}
         ]
         result = list(bills_collection.aggregate(pipeline))
@@ -5,6 +5,8 @@ from wtforms import FloatField, IntegerField, SubmitField
 from wtforms.validators import DataRequired, NumberRange, ValidationError
 from flask_login import current_user, login_required
 from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, check_ficore_credit_balance
+from credit_ledger import debit_credits
+from activity_feed import record_document_activity
 from datetime import datetime
 import re
 from translations import trans
@@ -65,36 +67,6 @@ def custom_login_required(f):
         return redirect(url_for('users.login', next=request.url))
     return decorated_function
 
-def deduct_ficore_credits(db, user_id, amount, action, budget_id=None):
-    """Deduct Ficore Credits from user balance and log the transaction."""
-    try:
-        user = db.users.find_one({'_id': user_id})
-        if not user:
-            return False
-        current_balance = user.get('ficore_credit_balance', 0)
-        if current_balance < amount:
-            return False
-        result = db.users.update_one(
-            {'_id': user_id},
-            {'$inc': {'ficore_credit_balance': -amount}}
-        )
-        if result.modified_count == 0:
-            return False
-        transaction = {
-            '_id': ObjectId(),
-            'user_id': user_id,
-            'action': action,
-            'amount': -amount,
-            'budget_id': str(budget_id) if budget_id else None,
-            'timestamp': datetime.utcnow(),
-            'session_id': session.get('sid', 'unknown'),
-            'status': 'completed'
-        }
-        db.ficore_credit_transactions.insert_one(transaction)
-        return True
-    except Exception:
-        return False
-
 class CommaSeparatedIntegerField(IntegerField):
     def process_formdata(self, valuelist):
         if valuelist:
@@ -284,13 +256,16 @@ def main():
                 }
                 current_app.logger.debug(f"Saving budget data: {budget_data}", extra={'session_id': session['sid']})
                 try:
-                    db.budgets.insert_one(budget_data)
+                    def insert_budget(mongo_session):
+                        db.budgets.insert_one(budget_data, session=mongo_session)
                     if current_user.is_authenticated and not is_admin():
-                        if not deduct_ficore_credits(db, current_user.id, 1, 'create_budget', budget_id):
-                            db.budgets.delete_one({'_id': budget_id})  # Rollback on failure
+                        if not debit_credits(db, current_user.id, 1, 'create_budget', write=insert_budget, budget_id=budget_id):
                             current_app.logger.error(f"Failed to deduct Ficore Credit for creating budget {budget_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
                             flash(trans('budget_credit_deduction_failed', default='Failed to deduct Ficore Credit for creating budget.'), 'danger')
                             return redirect(url_for('personal.budget.main', tab='create-budget'))
+                    else:
+                        insert_budget(None)
+                    record_document_activity(db, 'budgets', budget_data)
                     current_app.logger.info(f"Budget {budget_id} saved successfully to MongoDB for session {session['sid']}", extra={'session_id': session['sid']})
                     flash(trans("budget_completed_success", default='Budget created successfully!'), "success")
                     return redirect(url_for('personal.budget.main', tab='dashboard'))
@@ -357,18 +332,24 @@ def main():
                         session_id=session.get('sid', 'unknown'),
                         action='delete_budget'
                     )
-                    result = db.budgets.delete_one({'_id': ObjectId(budget_id), **filter_criteria})
-                    if result.deleted_count > 0:
-                        if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 1, 'delete_budget', budget_id):
-                                current_app.logger.error(f"Failed to deduct Ficore Credit for deleting budget {budget_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                                flash(trans('budget_credit_deduction_failed', default='Failed to deduct Ficore Credit for deleting budget.'), 'danger')
-                                return redirect(url_for('personal.budget.main', tab='dashboard'))
-                        current_app.logger.info(f"Deleted budget ID {budget_id} for session {session['sid']}", extra={'session_id': session['sid']})
-                        flash(trans("budget_deleted_success", default='Budget deleted successfully!'), "success")
+                    def delete_budget(mongo_session):
+                        result = db.budgets.delete_one({'_id': ObjectId(budget_id), **filter_criteria}, session=mongo_session)
+                        if not result.deleted_count:
+                            # Aborts the debit's transaction so a vanished budget is not charged
+                            raise LookupError(budget_id)
+                    if current_user.is_authenticated and not is_admin():
+                        if not debit_credits(db, current_user.id, 1, 'delete_budget', write=delete_budget, budget_id=budget_id):
+                            current_app.logger.error(f"Failed to deduct Ficore Credit for deleting budget {budget_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
+                            flash(trans('budget_credit_deduction_failed', default='Failed to deduct Ficore Credit for deleting budget.'), 'danger')
+                            return redirect(url_for('personal.budget.main', tab='dashboard'))
                     else:
-                        current_app.logger.warning(f"Budget ID {budget_id} not found for session {session['sid']}", extra={'session_id': session['sid']})
-                        flash(trans("budget_not_found", default='Budget not found.'), "danger")
+                        delete_budget(None)
+                    record_document_activity(db, 'budgets', budget, action='deleted')
+                    current_app.logger.info(f"Deleted budget ID {budget_id} for session {session['sid']}", extra={'session_id': session['sid']})
+                    flash(trans("budget_deleted_success", default='Budget deleted successfully!'), "success")
+                except LookupError:
+                    current_app.logger.warning(f"Budget ID {budget_id} not found for session {session['sid']}", extra={'session_id': session['sid']})
+                    flash(trans("budget_not_found", default='Budget not found.'), "danger")
                 except Exception as e:
                     current_app.logger.error(f"Failed to delete budget ID {budget_id} for session {session['sid']}: {str(e)}", extra={'session_id': session['sid']})
                     flash(trans("budget_delete_failed", default='Error deleting budget.'), "danger")
@@ -5,17 +5,17 @@ from wtforms import StringField, FloatField, IntegerField, SubmitField
 from wtforms.validators import DataRequired, NumberRange, ValidationError, Email
 from flask_login import current_user, login_required
 from datetime import datetime, timedelta
-from bson import ObjectId
-from pymongo import errors
 from utils import get_mongo_db, requires_role, logger, clean_currency, check_ficore_credit_balance, is_admin, format_date, format_currency
+from credit_ledger import debit_credits
+from activity_feed import record_document_activity
+from delayed_deletions import schedule_deletion, DELETION_CREDIT_COST
+from vendor_locator import nearest_vendors, VENDOR_RESULTS_LIMIT, MAX_VENDOR_RESULTS, VENDOR_SEARCH_RADIUS_KM, MAX_VENDOR_SEARCH_RADIUS_KM
 from translations import trans
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 from io import BytesIO
-from contextlib import nullcontext
-import threading
 import uuid
 import geocoder
 import traceback
@@ -31,61 +31,6 @@ food_order_bp = Blueprint(
 
 csrf = CSRFProtect()
 
-def deduct_ficore_credits(db, user_id, amount, action, order_id=None, mongo_session=None):
-    try:
-        if amount <= 0:
-            logger.error(f"Invalid deduction amount {amount} for user {user_id}, action: {action}", 
-                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return False
-        user = db.users.find_one({'_id': user_id}, session=mongo_session)
-        if not user:
-            logger.error(f"User {user_id} not found for credit deduction, action: {action}", 
-                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return False
-        current_balance = user.get('ficore_credit_balance', 0)
-        if current_balance < amount:
-            logger.warning(f"Insufficient credits for user {user_id}: required {amount}, available {current_balance}, action: {action}", 
-                          extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return False
-        session_to_use = mongo_session if mongo_session else db.client.start_session()
-        owns_session = not mongo_session
-        try:
-            with session_to_use.start_transaction() if not mongo_session else nullcontext():
-                result = db.users.update_one(
-                    {'_id': user_id},
-                    {'$inc': {'ficore_credit_balance': -amount}},
-                    session=session_to_use
-                )
-                if result.modified_count == 0:
-                    logger.error(f"Failed to deduct {amount} credits for user {user_id}, action: {action}: No documents modified", 
-                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                    raise ValueError(f"Failed to update user balance for {user_id}")
-                transaction = {
-                    '_id': ObjectId(),
-                    'user_id': user_id,
-                    'action': action,
-                    'amount': -amount,
-                    'order_id': str(order_id) if order_id else None,
-                    'timestamp': datetime.utcnow(),
-                    'session_id': session.get('sid', 'no-session-id'),
-                    'status': 'completed'
-                }
-                db.ficore_credit_transactions.insert_one(transaction, session=session_to_use)
-            logger.info(f"Deducted {amount} Ficore Credits for {action} by user {user_id}", 
-                        extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return True
-        except (ValueError, errors.PyMongoError) as e:
-            logger.error(f"Transaction aborted for user {user_id}, action: {action}: {str(e)}", 
-                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr, 'stack_trace': traceback.format_exc()})
-            return False
-        finally:
-            if owns_session:
-                session_to_use.end_session()
-    except Exception as e:
-        logger.error(f"Unexpected error deducting {amount} Ficore Credits for {action} by user {user_id}: {str(e)}", 
-                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr, 'stack_trace': traceback.format_exc()})
-        return False
-
 def send_order_to_vendor(order):
     try:
         logger.info(f"Order {order['id']} sent to vendor {order['vendor']}: {order}", 
@@ -235,16 +180,17 @@ def main():
                     'status': 'submitted'
                 }
                 try:
-                    with db.client.start_session() as mongo_session:
-                        with mongo_session.start_transaction():
-                            db.FoodOrder.insert_one(order_data, session=mongo_session)
-                            if current_user.is_authenticated and not is_admin():
-                                if not deduct_ficore_credits(db, current_user.id, 0.1, 'create_food_order', order_data['id'], mongo_session):
-                                    db.FoodOrder.delete_one({'id': order_data['id']}, session=mongo_session)
-                                    logger.error(f"Failed to deduct 0.1 Ficore Credits for creating order {order_data['id']}", 
-                                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                                    flash(trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for creating order.'), 'danger')
-                                    return redirect(url_for('personal.food_order.main', tab='create-order'))
+                    def create_order(mongo_session):
+                        db.FoodOrder.insert_one(order_data, session=mongo_session)
+                    if current_user.is_authenticated and not is_admin():
+                        if not debit_credits(db, current_user.id, 0.1, 'create_food_order', write=create_order, order_id=order_data['id']):
+                            logger.error(f"Failed to deduct 0.1 Ficore Credits for creating order {order_data['id']}", 
+                                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                            flash(trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for creating order.'), 'danger')
+                            return redirect(url_for('personal.food_order.main', tab='create-order'))
+                    else:
+                        create_order(None)
+                    record_document_activity(db, 'FoodOrder', order_data)
                     send_order_to_vendor(order_data)
                     logger.info(f"Created food order {order_data['id']} for user {current_user.id if current_user.is_authenticated else 'anonymous'}", 
                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
@@ -281,33 +227,26 @@ def main():
                     'category': 'Uncategorized'
                 }
                 try:
-                    with db.client.start_session() as mongo_session:
-                        with mongo_session.start_transaction():
-                            result = db.FoodOrder.update_one(
-                                {'id': order_id},
-                                {
-                                    '$push': {'items': item_data},
-                                    '$set': {
-                                        'total_cost': order['total_cost'] + (item_data['quantity'] * item_data['price']),
-                                        'updated_at': datetime.utcnow()
-                                    }
-                                },
-                                session=mongo_session
-                            )
-                            if current_user.is_authenticated and not is_admin():
-                                if not deduct_ficore_credits(db, current_user.id, 0.1, 'add_food_order_item', item_data['item_id'], mongo_session):
-                                    db.FoodOrder.update_one(
-                                        {'id': order_id},
-                                        {
-                                            '$pull': {'items': {'item_id': item_data['item_id']}},
-                                            '$set': {'updated_at': datetime.utcnow()}
-                                        },
-                                        session=mongo_session
-                                    )
-                                    logger.error(f"Failed to deduct 0.1 Ficore Credits for adding item {item_data['item_id']} to order {order_id}", 
-                                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                                    flash(trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for adding item.'), 'danger')
-                                    return redirect(url_for('personal.food_order.main', tab='dashboard'))
+                    def add_item(mongo_session):
+                        db.FoodOrder.update_one(
+                            {'id': order_id},
+                            {
+                                '$push': {'items': item_data},
+                                '$set': {
+                                    'total_cost': order['total_cost'] + (item_data['quantity'] * item_data['price']),
+                                    'updated_at': datetime.utcnow()
+                                }
+                            },
+                            session=mongo_session
+                        )
+                    if current_user.is_authenticated and not is_admin():
+                        if not debit_credits(db, current_user.id, 0.1, 'add_food_order_item', write=add_item, order_id=item_data['item_id']):
+                            logger.error(f"Failed to deduct 0.1 Ficore Credits for adding item {item_data['item_id']} to order {order_id}", 
+                                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                            flash(trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for adding item.'), 'danger')
+                            return redirect(url_for('personal.food_order.main', tab='dashboard'))
+                    else:
+                        add_item(None)
                     send_order_to_vendor(db.FoodOrder.find_one({'id': order_id}))
                     flash(trans('food_order_item_added', default='Item added successfully!'), 'success')
                     return redirect(url_for('personal.food_order.main', tab='dashboard'))
@@ -333,18 +272,13 @@ def main():
                                       extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
                         flash(trans('food_order_insufficient_credits', default='Insufficient Ficore Credits to delete an order. Please purchase more credits.'), 'danger')
                         return redirect(url_for('agents_bp.manage_credits'))
-                deletion_data = {
-                    'order_id': order_id,
-                    'user_id': str(current_user.id) if current_user.is_authenticated else None,
-                    'session_id': session['sid'],
-                    'created_at': datetime.utcnow(),
-                    'expires_at': datetime.utcnow() + timedelta(seconds=20)
-                }
                 try:
-                    with db.client.start_session() as mongo_session:
-                        with mongo_session.start_transaction():
-                            db.pending_deletions.insert_one(deletion_data, session=mongo_session)
-                            threading.Thread(target=process_delayed_deletion, args=(order_id, current_user.id if current_user.is_authenticated else None)).start()
+                    schedule_deletion(
+                        db, 'food_order', order_id,
+                        user_id=current_user.id if current_user.is_authenticated else None,
+                        session_id=session['sid'],
+                        credit_cost=DELETION_CREDIT_COST if current_user.is_authenticated and not is_admin() else 0
+                    )
                     logger.info(f"Initiated delayed deletion for food order {order_id}", 
                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
                     flash(trans('food_order_deletion_initiated', default='Food order deletion initiated. Will delete in 20 seconds.'), 'success')
@@ -479,24 +413,22 @@ def get_nearest_vendor():
         except ValueError:
             logger.error(f"Invalid location format: {location}", extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
             return jsonify({'error': trans('food_order_invalid_location', default='Invalid location format')}), 400
-        db = get_mongo_db()
-        vendors = db.vendors.find()
-        nearest_vendor = None
-        min_distance = float('inf')
-        for vendor in vendors:
-            vendor_loc = vendor.get('location', {})
-            if 'lat' not in vendor_loc or 'lng' not in vendor_loc:
-                continue
-            distance = ((lat - vendor_loc['lat'])**2 + (lng - vendor_loc['lng'])**2)**0.5
-            if distance < min_distance:
-                min_distance = distance
-                nearest_vendor = vendor['name']
-        if nearest_vendor:
-            logger.info(f"Found nearest vendor {nearest_vendor} for location {location}", 
+        try:
+            limit = min(max(int(request.args.get('limit', VENDOR_RESULTS_LIMIT)), 1), MAX_VENDOR_RESULTS)
+            radius_km = min(max(float(request.args.get('radius_km', VENDOR_SEARCH_RADIUS_KM)), 0.1), MAX_VENDOR_SEARCH_RADIUS_KM)
+        except ValueError:
+            return jsonify({'error': trans('general_invalid_input', default='Invalid input')}), 400
+        try:
+            vendors = nearest_vendors(get_mongo_db(), lat, lng, limit=limit, radius_km=radius_km)
+        except ValueError:
+            logger.error(f"Location out of range: {location}", extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+            return jsonify({'error': trans('food_order_invalid_location', default='Invalid location format')}), 400
+        if vendors:
+            logger.info(f"Found {len(vendors)} vendors within {radius_km}km of {location}, nearest {vendors[0]['name']}", 
                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return jsonify({'vendor': nearest_vendor})
+            return jsonify({'vendor': vendors[0]['name'], 'vendors': vendors})
         else:
-            logger.warning(f"No vendors found near location {location}", 
+            logger.warning(f"No vendors found within {radius_km}km of {location}", 
                           extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
             return jsonify({'error': trans('food_order_no_vendors', default='No vendors found nearby')}), 404
     except Exception as e:
@@ -554,16 +486,17 @@ def reorder(order_id):
             'status': 'submitted'
         }
         try:
-            with db.client.start_session() as mongo_session:
-                with mongo_session.start_transaction():
-                    db.FoodOrder.insert_one(new_order, session=mongo_session)
-                    if current_user.is_authenticated and not is_admin():
-                        if not deduct_ficore_credits(db, current_user.id, 0.1, 'reorder_food_order', new_order['id'], mongo_session):
-                            db.FoodOrder.delete_one({'id': new_order['id']}, session=mongo_session)
-                            logger.error(f"Failed to deduct 0.1 Ficore Credits for reordering order {new_order['id']}", 
-                                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                            flash(trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for reordering.'), 'danger')
-                            return redirect(url_for('personal.food_order.main', tab='dashboard'))
+            def insert_order(mongo_session):
+                db.FoodOrder.insert_one(new_order, session=mongo_session)
+            if current_user.is_authenticated and not is_admin():
+                if not debit_credits(db, current_user.id, 0.1, 'reorder_food_order', write=insert_order, order_id=new_order['id']):
+                    logger.error(f"Failed to deduct 0.1 Ficore Credits for reordering order {new_order['id']}", 
+                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                    flash(trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for reordering.'), 'danger')
+                    return redirect(url_for('personal.food_order.main', tab='dashboard'))
+            else:
+                insert_order(None)
+            record_document_activity(db, 'FoodOrder', new_order)
             send_order_to_vendor(new_order)
             logger.info(f"Reordered order {order_id} as new order {new_order['id']} for user {current_user.id if current_user.is_authenticated else 'anonymous'}", 
                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
@@ -616,41 +549,28 @@ def manage_items(order_id):
             logger.warning(f"Item {item_id} not found in order {order_id}", 
                           extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
             return jsonify({'error': trans('food_order_item_not_found', default='Item not found')}), 404
-        original_item = items[item_index].copy()
         items[item_index][field] = int(value) if field == 'quantity' else float(value) if field == 'price' else value
         total_cost = sum(item['quantity'] * item['price'] for item in items)
         try:
-            with db.client.start_session() as mongo_session:
-                with mongo_session.start_transaction():
-                    result = db.FoodOrder.update_one(
-                        {'id': order_id},
-                        {
-                            '$set': {
-                                'items': items,
-                                'total_cost': total_cost,
-                                'updated_at': datetime.utcnow()
-                            }
-                        },
-                        session=mongo_session
-                    )
-                    if current_user.is_authenticated and not is_admin() and field != 'notes':
-                        if not deduct_ficore_credits(db, current_user.id, 0.1, 'update_food_order_item', item_id, mongo_session):
-                            items[item_index] = original_item
-                            total_cost = sum(item['quantity'] * item['price'] for item in items)
-                            db.FoodOrder.update_one(
-                                {'id': order_id},
-                                {
-                                    '$set': {
-                                        'items': items,
-                                        'total_cost': total_cost,
-                                        'updated_at': datetime.utcnow()
-                                    }
-                                },
-                                session=mongo_session
-                            )
-                            logger.error(f"Failed to deduct 0.1 Ficore Credits for updating item {item_id} in order {order_id}", 
-                                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                            return jsonify({'error': trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for updating item.')}), 500
+            def update_items(mongo_session):
+                db.FoodOrder.update_one(
+                    {'id': order_id},
+                    {
+                        '$set': {
+                            'items': items,
+                            'total_cost': total_cost,
+                            'updated_at': datetime.utcnow()
+                        }
+                    },
+                    session=mongo_session
+                )
+            if current_user.is_authenticated and not is_admin() and field != 'notes':
+                if not debit_credits(db, current_user.id, 0.1, 'update_food_order_item', write=update_items, order_id=item_id):
+                    logger.error(f"Failed to deduct 0.1 Ficore Credits for updating item {item_id} in order {order_id}", 
+                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                    return jsonify({'error': trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for updating item.')}), 500
+            else:
+                update_items(None)
             send_order_to_vendor(db.FoodOrder.find_one({'id': order_id}))
             logger.info(f"Updated item {item_id} in order {order_id}", 
                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
@@ -707,82 +627,80 @@ def export_order_pdf(order_id):
                 'category': item.get('category', 'Uncategorized')
             } for item in order.get('items', [])]
         }
-        with db.client.start_session() as mongo_session:
-            with mongo_session.start_transaction():
-                buffer = BytesIO()
-                p = canvas.Canvas(buffer, pagesize=A4)
-                header_height = 0.7
-                extra_space = 0.2
-                row_height = 0.3
-                bottom_margin = 0.5
-                max_y = 10.5
-                title_y = max_y - header_height - extra_space
-                page_height = (max_y - bottom_margin) * inch
-                rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
-                total_cost = float(order_data['orders'][0]['total_cost'])
-                def draw_order_headers(y):
-                    p.setFillColor(colors.black)
-                    p.drawString(1 * inch, y * inch, trans('general_date', default='Date'))
-                    p.drawString(2 * inch, y * inch, trans('food_order_name', default='Order Name'))
-                    p.drawString(3.5 * inch, y * inch, trans('food_order_vendor', default='Vendor'))
-                    p.drawString(4.5 * inch, y * inch, trans('food_order_phone', default='Phone'))
-                    p.drawString(5.5 * inch, y * inch, trans('food_order_location', default='Location'))
-                    return y - row_height
-                def draw_item_headers(y):
-                    p.setFillColor(colors.black)
-                    p.drawString(1 * inch, y * inch, trans('food_order_item_name', default='Item Name'))
-                    p.drawString(2.5 * inch, y * inch, trans('food_order_quantity', default='Quantity'))
-                    p.drawString(3.3 * inch, y * inch, trans('food_order_price', default='Price'))
-                    p.drawString(4.0 * inch, y * inch, trans('food_order_notes', default='Notes'))
-                    p.drawString(5.5 * inch, y * inch, trans('food_order_category', default='Category'))
-                    return y - row_height
-                p.setFont("Helvetica", 12)
-                p.drawString(1 * inch, title_y * inch, trans('food_order_report', default='Food Order Report'))
-                p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {format_date(datetime.utcnow())}")
+        buffer = BytesIO()
+        p = canvas.Canvas(buffer, pagesize=A4)
+        header_height = 0.7
+        extra_space = 0.2
+        row_height = 0.3
+        bottom_margin = 0.5
+        max_y = 10.5
+        title_y = max_y - header_height - extra_space
+        page_height = (max_y - bottom_margin) * inch
+        rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
+        total_cost = float(order_data['orders'][0]['total_cost'])
+        def draw_order_headers(y):
+            p.setFillColor(colors.black)
+            p.drawString(1 * inch, y * inch, trans('general_date', default='Date'))
+            p.drawString(2 * inch, y * inch, trans('food_order_name', default='Order Name'))
+            p.drawString(3.5 * inch, y * inch, trans('food_order_vendor', default='Vendor'))
+            p.drawString(4.5 * inch, y * inch, trans('food_order_phone', default='Phone'))
+            p.drawString(5.5 * inch, y * inch, trans('food_order_location', default='Location'))
+            return y - row_height
+        def draw_item_headers(y):
+            p.setFillColor(colors.black)
+            p.drawString(1 * inch, y * inch, trans('food_order_item_name', default='Item Name'))
+            p.drawString(2.5 * inch, y * inch, trans('food_order_quantity', default='Quantity'))
+            p.drawString(3.3 * inch, y * inch, trans('food_order_price', default='Price'))
+            p.drawString(4.0 * inch, y * inch, trans('food_order_notes', default='Notes'))
+            p.drawString(5.5 * inch, y * inch, trans('food_order_category', default='Category'))
+            return y - row_height
+        p.setFont("Helvetica", 12)
+        p.drawString(1 * inch, title_y * inch, trans('food_order_report', default='Food Order Report'))
+        p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {format_date(datetime.utcnow())}")
+        y = title_y - 0.6
+        p.setFont("Helvetica", 10)
+        y = draw_order_headers(y)
+        row_count = 0
+        order_info = order_data['orders'][0]
+        p.drawString(1 * inch, y * inch, format_date(order_info['created_at']))
+        p.drawString(2 * inch, y * inch, order_info['name'])
+        p.drawString(3.5 * inch, y * inch, order_info['vendor'])
+        p.drawString(4.5 * inch, y * inch, order_info['phone'])
+        p.drawString(5.5 * inch, y * inch, order_info['location'])
+        y -= row_height
+        row_count += 1
+        y -= 0.5
+        p.drawString(1 * inch, y * inch, trans('food_order_items', default='Items'))
+        y -= row_height
+        y = draw_item_headers(y)
+        for item in order_data['items']:
+            if row_count + 1 >= rows_per_page:
+                p.showPage()
                 y = title_y - 0.6
-                p.setFont("Helvetica", 10)
-                y = draw_order_headers(y)
-                row_count = 0
-                order_info = order_data['orders'][0]
-                p.drawString(1 * inch, y * inch, format_date(order_info['created_at']))
-                p.drawString(2 * inch, y * inch, order_info['name'])
-                p.drawString(3.5 * inch, y * inch, order_info['vendor'])
-                p.drawString(4.5 * inch, y * inch, order_info['phone'])
-                p.drawString(5.5 * inch, y * inch, order_info['location'])
-                y -= row_height
-                row_count += 1
-                y -= 0.5
-                p.drawString(1 * inch, y * inch, trans('food_order_items', default='Items'))
-                y -= row_height
                 y = draw_item_headers(y)
-                for item in order_data['items']:
-                    if row_count + 1 >= rows_per_page:
-                        p.showPage()
-                        y = title_y - 0.6
-                        y = draw_item_headers(y)
-                        row_count = 0
-                    p.drawString(1 * inch, y * inch, item['name'][:20])
-                    p.drawString(2.5 * inch, y * inch, str(item['quantity']))
-                    p.drawString(3.3 * inch, y * inch, format_currency(item['price']))
-                    p.drawString(4.0 * inch, y * inch, item['notes'][:20])
-                    p.drawString(5.5 * inch, y * inch, trans(item['category'], default=item['category']))
-                    y -= row_height
-                    row_count += 1
-                if row_count + 1 <= rows_per_page:
-                    y -= row_height
-                    p.drawString(1 * inch, y * inch, f"{trans('food_order_total_cost', default='Total Cost')}: {format_currency(total_cost)}")
-                else:
-                    p.showPage()
-                    y = title_y - 0.6
-                    p.drawString(1 * inch, y * inch, f"{trans('food_order_total_cost', default='Total Cost')}: {format_currency(total_cost)}")
-                p.save()
-                buffer.seek(0)
-                if current_user.is_authenticated and not is_admin():
-                    if not deduct_ficore_credits(db, current_user.id, 0.1, 'export_food_order_pdf', order_id, mongo_session):
-                        logger.error(f"Failed to deduct 0.1 Ficore Credits for exporting order {order_id} to PDF by user {current_user.id}", 
-                                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                        flash(trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for exporting order to PDF.'), 'danger')
-                        return redirect(url_for('personal.food_order.main', tab='dashboard'))
+                row_count = 0
+            p.drawString(1 * inch, y * inch, item['name'][:20])
+            p.drawString(2.5 * inch, y * inch, str(item['quantity']))
+            p.drawString(3.3 * inch, y * inch, format_currency(item['price']))
+            p.drawString(4.0 * inch, y * inch, item['notes'][:20])
+            p.drawString(5.5 * inch, y * inch, trans(item['category'], default=item['category']))
+            y -= row_height
+            row_count += 1
+        if row_count + 1 <= rows_per_page:
+            y -= row_height
+            p.drawString(1 * inch, y * inch, f"{trans('food_order_total_cost', default='Total Cost')}: {format_currency(total_cost)}")
+        else:
+            p.showPage()
+            y = title_y - 0.6
+            p.drawString(1 * inch, y * inch, f"{trans('food_order_total_cost', default='Total Cost')}: {format_currency(total_cost)}")
+        p.save()
+        buffer.seek(0)
+        if current_user.is_authenticated and not is_admin():
+            if not debit_credits(db, current_user.id, 0.1, 'export_food_order_pdf', order_id=order_id):
+                logger.error(f"Failed to deduct 0.1 Ficore Credits for exporting order {order_id} to PDF by user {current_user.id}", 
+                             extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                flash(trans('food_order_credit_deduction_failed', default='Failed to deduct Ficore Credits for exporting order to PDF.'), 'danger')
+                return redirect(url_for('personal.food_order.main', tab='dashboard'))
         logger.info(f"Exported food order {order_id} to PDF for user {current_user.id}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': f'attachment;filename=food_order_{order_id}.pdf'})
@@ -792,35 +710,6 @@ def export_order_pdf(order_id):
         flash(trans('food_order_export_error', default='Error exporting food order to PDF.'), 'danger')
         return redirect(url_for('personal.food_order.main', tab='dashboard'))
 
-def process_delayed_deletion(order_id, user_id):
-    db = get_mongo_db()
-    try:
-        with db.client.start_session() as mongo_session:
-            with mongo_session.start_transaction():
-                pending = db.pending_deletions.find_one({'order_id': order_id, 'user_id': str(user_id) if user_id else None}, session=mongo_session)
-                if not pending:
-                    return
-                order = db.FoodOrder.find_one({'id': order_id, 'user_id': str(user_id) if user_id else None}, session=mongo_session)
-                if not order:
-                    db.pending_deletions.delete_one({'order_id': order_id}, session=mongo_session)
-                    return
-                result = db.FoodOrder.delete_one({'id': order_id}, session=mongo_session)
-                if result.deleted_count == 0:
-                    logger.error(f"Failed to delete food order {order_id}: No documents deleted", 
-                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                    raise ValueError(f"Failed to delete food order {order_id}")
-                db.pending_deletions.delete_one({'order_id': order_id}, session=mongo_session)
-                if user_id and not is_admin():
-                    if not deduct_ficore_credits(db, user_id, 0.5, 'delete_food_order', order_id, mongo_session):
-                        logger.error(f"Failed to deduct 0.5 Ficore Credits for deleting order {order_id} by user {user_id}", 
-                                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                        raise ValueError(f"Failed to deduct Ficore Credits for deleting order {order_id}")
-        logger.info(f"Completed delayed deletion of food order {order_id}", 
-                    extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-    except Exception as e:
-        logger.error(f"Error in delayed deletion of order {order_id}: {str(e)}", 
-                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-
 @food_order_bp.errorhandler(CSRFError)
 def handle_csrf_error(e):
     logger.error(f"CSRF error on {request.path}: {e.description}", 
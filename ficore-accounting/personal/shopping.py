@@ -4,22 +4,23 @@ from flask_wtf.csrf import CSRFProtect, CSRFError
 from wtforms import StringField, FloatField, IntegerField, SelectField, SubmitField
 from wtforms.validators import DataRequired, NumberRange, ValidationError, Email
 from flask_login import current_user, login_required
-from datetime import datetime, timedelta
+from datetime import datetime
 from helpers.branding_helpers import draw_ficore_pdf_header
 from bson import ObjectId
-from pymongo import errors
-from utils import get_mongo_db, requires_role, logger, clean_currency, check_ficore_credit_balance, is_admin, format_date, format_currency
+from utils import get_mongo_db, requires_role, logger, clean_currency, check_ficore_credit_balance, is_admin, format_date, format_currency, run_in_transaction
+from credit_ledger import debit_credits
+from activity_feed import record_document_activity
 from translations import trans
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 from io import BytesIO
-from contextlib import nullcontext
-import threading
 import re
 import uuid
-from models import log_tool_usage
+import traceback
+from models import log_tool_usage, get_shopping_lists_page, get_shopping_items_by_list
+from delayed_deletions import schedule_deletion, DELETION_CREDIT_COST
 from session_utils import create_anonymous_session
 
 shopping_bp = Blueprint(
@@ -48,61 +49,6 @@ def auto_categorize_item(item_name):
             return category
     return 'other'
 
-def deduct_ficore_credits(db, user_id, amount, action, item_id=None, mongo_session=None):
-    try:
-        if amount <= 0:
-            logger.error(f"Invalid deduction amount {amount} for user {user_id}, action: {action}", 
-                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return False
-        user = db.users.find_one({'_id': user_id}, session=mongo_session)
-        if not user:
-            logger.error(f"User {user_id} not found for credit deduction, action: {action}", 
-                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return False
-        current_balance = user.get('ficore_credit_balance', 0)
-        if current_balance < amount:
-            logger.warning(f"Insufficient credits for user {user_id}: required {amount}, available {current_balance}, action: {action}", 
-                          extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return False
-        session_to_use = mongo_session if mongo_session else db.client.start_session()
-        owns_session = not mongo_session
-        try:
-            with session_to_use.start_transaction() if not mongo_session else nullcontext():
-                result = db.users.update_one(
-                    {'_id': user_id},
-                    {'$inc': {'ficore_credit_balance': -amount}},
-                    session=session_to_use
-                )
-                if result.modified_count == 0:
-                    logger.error(f"Failed to deduct {amount} credits for user {user_id}, action: {action}: No documents modified", 
-                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                    raise ValueError(f"Failed to update user balance for {user_id}")
-                transaction = {
-                    '_id': ObjectId(),
-                    'user_id': user_id,
-                    'action': action,
-                    'amount': -amount,
-                    'item_id': str(item_id) if item_id else None,
-                    'timestamp': datetime.utcnow(),
-                    'session_id': session.get('sid', 'no-session-id'),
-                    'status': 'completed'
-                }
-                db.ficore_credit_transactions.insert_one(transaction, session=session_to_use)
-            logger.info(f"Deducted {amount} Ficore Credits for {action} by user {user_id}", 
-                        extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-            return True
-        except (ValueError, errors.PyMongoError) as e:
-            logger.error(f"Transaction aborted for user {user_id}, action: {action}: {str(e)}", 
-                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr, 'stack_trace': traceback.format_exc()})
-            return False
-        finally:
-            if owns_session:
-                session_to_use.end_session()
-    except Exception as e:
-        logger.error(f"Unexpected error deducting {amount} Ficore Credits for {action} by user {user_id}: {str(e)}", 
-                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr, 'stack_trace': traceback.format_exc()})
-        return False
-
 def custom_login_required(f):
     from functools import wraps
     @wraps(f)
@@ -112,6 +58,41 @@ def custom_login_required(f):
         return redirect(url_for('users.login', next=request.url))
     return decorated_function
 
+def list_view(shopping_list, group):
+    """
+    Build the template dict for a shopping list.
+
+    Args:
+        shopping_list: shopping_lists document
+        group: The list's entry from get_shopping_items_by_list
+    """
+    return {
+        'id': str(shopping_list['_id']),
+        'name': shopping_list.get('name'),
+        'budget': format_currency(shopping_list.get('budget', 0.0)),
+        'budget_raw': float(shopping_list.get('budget', 0.0)),
+        'total_spent': format_currency(shopping_list.get('total_spent', 0.0)),
+        'total_spent_raw': float(shopping_list.get('total_spent', 0.0)),
+        'status': shopping_list.get('status', 'active'),
+        'created_at': shopping_list.get('created_at').strftime('%Y-%m-%d') if shopping_list.get('created_at') else 'N/A',
+        'collaborators': shopping_list.get('collaborators', []),
+        'item_count': group['item_count'],
+        'items_total': format_currency(group['items_total']),
+        'items_total_raw': group['items_total'],
+        'bought_total_raw': group['bought_total'],
+        'items': [{
+            'id': str(item['_id']),
+            'name': item.get('name'),
+            'quantity': item.get('quantity', 1),
+            'price': format_currency(item.get('price', 0.0)),
+            'price_raw': float(item.get('price', 0.0)),
+            'category': item.get('category', 'other'),
+            'status': item.get('status', 'to_buy'),
+            'store': item.get('store', 'Unknown'),
+            'frequency': item.get('frequency', 7)
+        } for item in group['items']]
+    }
+
 class ShoppingListForm(FlaskForm):
     name = StringField(
         trans('shopping_list_name', default='List Name'),
@@ -313,16 +294,17 @@ def main():
                     'status': 'active'
                 }
                 try:
-                    with db.client.start_session() as mongo_session:
-                        with mongo_session.start_transaction():
-                            db.shopping_lists.insert_one(list_data, session=mongo_session)
-                            if current_user.is_authenticated and not is_admin():
-                                if not deduct_ficore_credits(db, current_user.id, 0.1, 'create_shopping_list', list_data['_id'], mongo_session):
-                                    db.shopping_lists.delete_one({'_id': list_data['_id']}, session=mongo_session)
-                                    logger.error(f"Failed to deduct 0.1 Ficore Credits for creating list {list_data['_id']} by user {current_user.id}", 
-                                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                                    flash(trans('shopping_credit_deduction_failed', default='Failed to deduct Ficore Credits for creating list.'), 'danger')
-                                    return redirect(url_for('personal.shopping.main', tab='create-list'))
+                    def create_list(mongo_session):
+                        db.shopping_lists.insert_one(list_data, session=mongo_session)
+                    if current_user.is_authenticated and not is_admin():
+                        if not debit_credits(db, current_user.id, 0.1, 'create_shopping_list', write=create_list, item_id=list_data['_id']):
+                            logger.error(f"Failed to deduct 0.1 Ficore Credits for creating list {list_data['_id']} by user {current_user.id}", 
+                                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                            flash(trans('shopping_credit_deduction_failed', default='Failed to deduct Ficore Credits for creating list.'), 'danger')
+                            return redirect(url_for('personal.shopping.main', tab='create-list'))
+                    else:
+                        create_list(None)
+                    record_document_activity(db, 'shopping_lists', list_data)
                     logger.info(f"Created shopping list {list_data['_id']} for user {current_user.id if current_user.is_authenticated else 'anonymous'}", 
                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
                     flash(trans('shopping_list_created', default='Shopping list created successfully!'), 'success')
@@ -363,21 +345,22 @@ def main():
                     'updated_at': datetime.utcnow()
                 }
                 try:
-                    with db.client.start_session() as mongo_session:
-                        with mongo_session.start_transaction():
-                            db.shopping_items.insert_one(item_data, session=mongo_session)
-                            db.shopping_lists.update_one(
-                                {'_id': ObjectId(list_id)},
-                                {'$inc': {'total_spent': float(item_form.price.data * item_form.quantity.data)}, '$set': {'updated_at': datetime.utcnow()}},
-                                session=mongo_session
-                            )
-                            if current_user.is_authenticated and not is_admin():
-                                if not deduct_ficore_credits(db, current_user.id, 0.1, 'add_shopping_item', item_data['_id'], mongo_session):
-                                    db.shopping_items.delete_one({'_id': item_data['_id']}, session=mongo_session)
-                                    logger.error(f"Failed to deduct 0.1 Ficore Credits for adding item {item_data['_id']} to list {list_id}", 
-                                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                                    flash(trans('shopping_credit_deduction_failed', default='Failed to deduct Ficore Credits for adding item.'), 'danger')
-                                    return redirect(url_for('personal.shopping.main', tab='dashboard'))
+                    def add_item(mongo_session):
+                        db.shopping_items.insert_one(item_data, session=mongo_session)
+                        db.shopping_lists.update_one(
+                            {'_id': ObjectId(list_id)},
+                            {'$inc': {'total_spent': float(item_form.price.data * item_form.quantity.data)}, '$set': {'updated_at': datetime.utcnow()}},
+                            session=mongo_session
+                        )
+                    if current_user.is_authenticated and not is_admin():
+                        if not debit_credits(db, current_user.id, 0.1, 'add_shopping_item', write=add_item, item_id=item_data['_id']):
+                            logger.error(f"Failed to deduct 0.1 Ficore Credits for adding item {item_data['_id']} to list {list_id}", 
+                                         extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                            flash(trans('shopping_credit_deduction_failed', default='Failed to deduct Ficore Credits for adding item.'), 'danger')
+                            return redirect(url_for('personal.shopping.main', tab='dashboard'))
+                    else:
+                        run_in_transaction(db, add_item)
+                    record_document_activity(db, 'shopping_items', item_data, action='bought' if item_data['status'] == 'bought' else 'created')
                     flash(trans('shopping_item_added', default='Item added successfully!'), 'success')
                     return redirect(url_for('personal.shopping.main', tab='dashboard'))
                 except Exception as e:
@@ -427,18 +410,13 @@ def main():
                                       extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
                         flash(trans('shopping_insufficient_credits', default='Insufficient Ficore Credits to delete a list. Please purchase more credits.'), 'danger')
                         return redirect(url_for('agents_bp.manage_credits'))
-                deletion_data = {
-                    'list_id': list_id,
-                    'user_id': str(current_user.id) if current_user.is_authenticated else None,
-                    'session_id': session['sid'],
-                    'created_at': datetime.utcnow(),
-                    'expires_at': datetime.utcnow() + timedelta(seconds=20)
-                }
                 try:
-                    with db.client.start_session() as mongo_session:
-                        with mongo_session.start_transaction():
-                            db.pending_deletions.insert_one(deletion_data, session=mongo_session)
-                            threading.Thread(target=process_delayed_deletion, args=(list_id, current_user.id if current_user.is_authenticated else None)).start()
+                    schedule_deletion(
+                        db, 'shopping_list', list_id,
+                        user_id=current_user.id if current_user.is_authenticated else None,
+                        session_id=session['sid'],
+                        credit_cost=DELETION_CREDIT_COST if current_user.is_authenticated and not is_admin() else 0
+                    )
                     logger.info(f"Initiated delayed deletion for shopping list {list_id}", 
                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
                     flash(trans('shopping_list_deletion_initiated', default='Shopping list deletion initiated. Will delete in 20 seconds.'), 'success')
@@ -458,13 +436,10 @@ def main():
                     flash(trans('shopping_list_not_found', default='Shopping list not found or you are not the owner.'), 'danger')
                     return redirect(url_for('personal.shopping.main', tab='dashboard'))
                 try:
-                    with db.client.start_session() as mongo_session:
-                        with mongo_session.start_transaction():
-                            db.shopping_lists.update_one(
-                                {'_id': ObjectId(list_id)},
-                                {'$set': {'status': 'saved', 'updated_at': datetime.utcnow()}},
-                                session=mongo_session
-                            )
+                    db.shopping_lists.update_one(
+                        {'_id': ObjectId(list_id)},
+                        {'$set': {'status': 'saved', 'updated_at': datetime.utcnow()}}
+                    )
                     logger.info(f"Saved shopping list {list_id} for user {current_user.id if current_user.is_authenticated else 'anonymous'}", 
                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
                     flash(trans('shopping_list_saved', default='Shopping list saved successfully!'), 'success')
@@ -474,32 +449,12 @@ def main():
                     flash(trans('shopping_list_error', default='Error saving shopping list.'), 'danger')
                 return redirect(url_for('personal.shopping.main', tab='dashboard'))
 
-        lists = list(db.shopping_lists.find(filter_criteria).sort('created_at', -1).limit(10))
+        page = max(request.args.get('page', 1, type=int) or 1, 1)
+        lists, has_next = get_shopping_lists_page(db, filter_criteria, page=page)
+        groups = get_shopping_items_by_list(db, [lst['_id'] for lst in lists])
         lists_dict = {}
         for lst in lists:
-            list_items = list(db.shopping_items.find({'list_id': str(lst['_id'])}))
-            list_data = {
-                'id': str(lst['_id']),
-                'name': lst.get('name'),
-                'budget': format_currency(lst.get('budget', 0.0)),
-                'budget_raw': float(lst.get('budget', 0.0)),
-                'total_spent': format_currency(lst.get('total_spent', 0.0)),
-                'total_spent_raw': float(lst.get('total_spent', 0.0)),
-                'status': lst.get('status', 'active'),
-                'created_at': lst.get('created_at').strftime('%Y-%m-%d') if lst.get('created_at') else 'N/A',
-                'collaborators': lst.get('collaborators', []),
-                'items': [{
-                    'id': str(item['_id']),
-                    'name': item.get('name'),
-                    'quantity': item.get('quantity', 1),
-                    'price': format_currency(item.get('price', 0.0)),
-                    'price_raw': float(item.get('price', 0.0)),
-                    'category': item.get('category', 'other'),
-                    'status': item.get('status', 'to_buy'),
-                    'store': item.get('store', 'Unknown'),
-                    'frequency': item.get('frequency', 7)
-                } for item in list_items]
-            }
+            list_data = list_view(lst, groups[str(lst['_id'])])
             lists_dict[list_data['id']] = list_data
             if not latest_list or (lst.get('created_at') and (latest_list['created_at'] == 'N/A' or lst.get('created_at') > datetime.strptime(latest_list['created_at'], '%Y-%m-%d'))):
                 latest_list = list_data
@@ -553,6 +508,8 @@ def main():
             share_form=share_form,
             edit_form=edit_form,
             lists=lists_dict,
+            page=page,
+            has_next=has_next,
             latest_list=latest_list,
             items=items,
             categories=categories,
@@ -615,25 +572,27 @@ def edit_list(list_id):
                     return redirect(url_for('agents_bp.manage_credits'))
             
             try:
-                with db.client.start_session() as mongo_session:
-                    with mongo_session.start_transaction():
-                        db.shopping_lists.update_one(
-                            {'_id': ObjectId(list_id)},
-                            {
-                                '$set': {
-                                    'name': edit_form.name.data,
-                                    'budget': edit_form.budget.data,
-                                    'updated_at': datetime.utcnow()
-                                }
-                            },
-                            session=mongo_session
-                        )
-                        if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 0.1, 'edit_shopping_list', list_id, mongo_session):
-                                logger.error(f"Failed to deduct 0.1 Ficore Credits for editing list {list_id} by user {current_user.id}", 
-                                             extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                                flash(trans('shopping_credit_deduction_failed', default='Failed to deduct Ficore Credits for editing list.'), 'danger')
-                                return redirect(url_for('personal.shopping.main', tab='manage-list'))
+                def update_list(mongo_session):
+                    db.shopping_lists.update_one(
+                        {'_id': ObjectId(list_id)},
+                        {
+                            '$set': {
+                                'name': edit_form.name.data,
+                                'budget': edit_form.budget.data,
+                                'updated_at': datetime.utcnow()
+                            }
+                        },
+                        session=mongo_session
+                    )
+                if current_user.is_authenticated and not is_admin():
+                    if not debit_credits(db, current_user.id, 0.1, 'edit_shopping_list', write=update_list, item_id=list_id):
+                        logger.error(f"Failed to deduct 0.1 Ficore Credits for editing list {list_id} by user {current_user.id}", 
+                                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                        flash(trans('shopping_credit_deduction_failed', default='Failed to deduct Ficore Credits for editing list.'), 'danger')
+                        return redirect(url_for('personal.shopping.main', tab='manage-list'))
+                else:
+                    update_list(None)
+                record_document_activity(db, 'shopping_lists', {**shopping_list, 'name': edit_form.name.data, 'budget': edit_form.budget.data}, action='updated')
                 logger.info(f"Updated shopping list {list_id} for user {current_user.id}", 
                             extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
                 flash(trans('shopping_list_updated', default='Shopping list updated successfully!'), 'success')
@@ -653,28 +612,7 @@ def edit_list(list_id):
             item_form=ShoppingItemForm(),
             share_form=ShareListForm(),
             edit_form=edit_form,
-            lists={str(shopping_list['_id']): {
-                'id': str(shopping_list['_id']),
-                'name': shopping_list.get('name'),
-                'budget': format_currency(shopping_list.get('budget', 0.0)),
-                'budget_raw': float(shopping_list.get('budget', 0.0)),
-                'total_spent': format_currency(shopping_list.get('total_spent', 0.0)),
-                'total_spent_raw': float(shopping_list.get('total_spent', 0.0)),
-                'status': shopping_list.get('status', 'active'),
-                'created_at': shopping_list.get('created_at').strftime('%Y-%m-%d') if shopping_list.get('created_at') else 'N/A',
-                'collaborators': shopping_list.get('collaborators', []),
-                'items': [{
-                    'id': str(item['_id']),
-                    'name': item.get('name'),
-                    'quantity': item.get('quantity', 1),
-                    'price': format_currency(item.get('price', 0.0)),
-                    'price_raw': float(item.get('price', 0.0)),
-                    'category': item.get('category', 'other'),
-                    'status': item.get('status', 'to_buy'),
-                    'store': item.get('store', 'Unknown'),
-                    'frequency': item.get('frequency', 7)
-                } for item in db.shopping_items.find({'list_id': str(shopping_list['_id'])})]
-            }},
+            lists={str(shopping_list['_id']): list_view(shopping_list, get_shopping_items_by_list(db, [shopping_list['_id']])[str(shopping_list['_id'])])},
             latest_list=None,
             items=[],
             categories={},
@@ -725,7 +663,7 @@ def export_list_pdf(list_id):
             logger.error(f"Failed to log PDF export: {str(e)}", 
                          extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
             flash(trans('shopping_log_error', default='Error logging PDF export. Continuing with export.'), 'warning')
-        items = db.shopping_items.find({'list_id': list_id}).sort('created_at', -1)
+        group = get_shopping_items_by_list(db, [list_id])[list_id]
         shopping_data = {
             'lists': [{
                 'name': shopping_list.get('name'),
@@ -742,101 +680,99 @@ def export_list_pdf(list_id):
                 'status': i.get('status', 'to_buy'),
                 'store': i.get('store', 'Unknown'),
                 'created_at': i.get('created_at')
-            } for i in items]
+            } for i in group['items']]
         }
-        with db.client.start_session() as mongo_session:
-            with mongo_session.start_transaction():
-                buffer = BytesIO()
-                p = canvas.Canvas(buffer, pagesize=A4)
-                header_height = 0.7
-                extra_space = 0.2
-                row_height = 0.3
-                bottom_margin = 0.5
-                max_y = 10.5
-                title_y = max_y - header_height - extra_space
-                page_height = (max_y - bottom_margin) * inch
-                rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
-                total_budget = float(shopping_data['lists'][0]['budget'])
-                total_spent = float(shopping_data['lists'][0]['total_spent'])
-                total_price = sum(float(item['price']) * item['quantity'] for item in shopping_data['items'])
-                def draw_list_headers(y):
-                    p.setFillColor(colors.black)
-                    p.drawString(1 * inch, y * inch, trans('general_date', default='Date'))
-                    p.drawString(2 * inch, y * inch, trans('general_list_name', default='List Name'))
-                    p.drawString(3.5 * inch, y * inch, trans('general_budget', default='Budget'))
-                    p.drawString(4.5 * inch, y * inch, trans('general_total_spent', default='Total Spent'))
-                    p.drawString(5.5 * inch, y * inch, trans('general_collaborators', default='Collaborators'))
-                    return y - row_height
-                def draw_item_headers(y):
-                    p.setFillColor(colors.black)
-                    p.drawString(1 * inch, y * inch, trans('general_date', default='Date'))
-                    p.drawString(2 * inch, y * inch, trans('general_item_name', default='Item Name'))
-                    p.drawString(3 * inch, y * inch, trans('general_quantity', default='Quantity'))
-                    p.drawString(3.8 * inch, y * inch, trans('general_price', default='Price'))
-                    p.drawString(4.5 * inch, y * inch, trans('general_status', default='Status'))
-                    p.drawString(5.2 * inch, y * inch, trans('general_category', default='Category'))
-                    p.drawString(6 * inch, y * inch, trans('general_store', default='Store'))
-                    return y - row_height
+        buffer = BytesIO()
+        p = canvas.Canvas(buffer, pagesize=A4)
+        header_height = 0.7
+        extra_space = 0.2
+        row_height = 0.3
+        bottom_margin = 0.5
+        max_y = 10.5
+        title_y = max_y - header_height - extra_space
+        page_height = (max_y - bottom_margin) * inch
+        rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
+        total_budget = float(shopping_data['lists'][0]['budget'])
+        total_spent = float(shopping_data['lists'][0]['total_spent'])
+        total_price = group['items_total']
+        def draw_list_headers(y):
+            p.setFillColor(colors.black)
+            p.drawString(1 * inch, y * inch, trans('general_date', default='Date'))
+            p.drawString(2 * inch, y * inch, trans('general_list_name', default='List Name'))
+            p.drawString(3.5 * inch, y * inch, trans('general_budget', default='Budget'))
+            p.drawString(4.5 * inch, y * inch, trans('general_total_spent', default='Total Spent'))
+            p.drawString(5.5 * inch, y * inch, trans('general_collaborators', default='Collaborators'))
+            return y - row_height
+        def draw_item_headers(y):
+            p.setFillColor(colors.black)
+            p.drawString(1 * inch, y * inch, trans('general_date', default='Date'))
+            p.drawString(2 * inch, y * inch, trans('general_item_name', default='Item Name'))
+            p.drawString(3 * inch, y * inch, trans('general_quantity', default='Quantity'))
+            p.drawString(3.8 * inch, y * inch, trans('general_price', default='Price'))
+            p.drawString(4.5 * inch, y * inch, trans('general_status', default='Status'))
+            p.drawString(5.2 * inch, y * inch, trans('general_category', default='Category'))
+            p.drawString(6 * inch, y * inch, trans('general_store', default='Store'))
+            return y - row_height
+        draw_ficore_pdf_header(p, current_user, y_start=max_y)
+        p.setFont("Helvetica", 12)
+        p.drawString(1 * inch, title_y * inch, trans('shopping_list_report', default='Shopping List Report'))
+        p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {format_date(datetime.utcnow())}")
+        y = title_y - 0.6
+        p.setFont("Helvetica", 10)
+        y = draw_list_headers(y)
+        row_count = 0
+        list_data = shopping_data['lists'][0]
+        p.drawString(1 * inch, y * inch, format_date(list_data['created_at']))
+        p.drawString(2 * inch, y * inch, list_data['name'])
+        p.drawString(3.5 * inch, y * inch, format_currency(list_data['budget']))
+        p.drawString(4.5 * inch, y * inch, format_currency(list_data['total_spent']))
+        p.drawString(5.5 * inch, y * inch, ', '.join(list_data['collaborators']) or 'None')
+        y -= row_height
+        row_count += 1
+        y -= 0.5
+        p.drawString(1 * inch, y * inch, trans('shopping_items', default='Items'))
+        y -= row_height
+        y = draw_item_headers(y)
+        for item in shopping_data['items']:
+            if row_count + 1 >= rows_per_page:
+                p.showPage()
                 draw_ficore_pdf_header(p, current_user, y_start=max_y)
-                p.setFont("Helvetica", 12)
-                p.drawString(1 * inch, title_y * inch, trans('shopping_list_report', default='Shopping List Report'))
-                p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {format_date(datetime.utcnow())}")
                 y = title_y - 0.6
-                p.setFont("Helvetica", 10)
-                y = draw_list_headers(y)
-                row_count = 0
-                list_data = shopping_data['lists'][0]
-                p.drawString(1 * inch, y * inch, format_date(list_data['created_at']))
-                p.drawString(2 * inch, y * inch, list_data['name'])
-                p.drawString(3.5 * inch, y * inch, format_currency(list_data['budget']))
-                p.drawString(4.5 * inch, y * inch, format_currency(list_data['total_spent']))
-                p.drawString(5.5 * inch, y * inch, ', '.join(list_data['collaborators']) or 'None')
-                y -= row_height
-                row_count += 1
-                y -= 0.5
-                p.drawString(1 * inch, y * inch, trans('shopping_items', default='Items'))
-                y -= row_height
                 y = draw_item_headers(y)
-                for item in shopping_data['items']:
-                    if row_count + 1 >= rows_per_page:
-                        p.showPage()
-                        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-                        y = title_y - 0.6
-                        y = draw_item_headers(y)
-                        row_count = 0
-                    p.drawString(1 * inch, y * inch, format_date(item['created_at']))
-                    p.drawString(2 * inch, y * inch, item['name'][:20])
-                    p.drawString(3 * inch, y * inch, str(item['quantity']))
-                    p.drawString(3.8 * inch, y * inch, format_currency(item['price']))
-                    p.drawString(4.5 * inch, y * inch, trans(item['status'], default=item['status']))
-                    p.drawString(5.2 * inch, y * inch, trans(item['category'], default=item['category']))
-                    p.drawString(6 * inch, y * inch, item['store'][:15])
-                    y -= row_height
-                    row_count += 1
-                if row_count + 3 <= rows_per_page:
-                    y -= row_height
-                    p.drawString(1 * inch, y * inch, f"{trans('reports_total_budget', default='Total Budget')}: {format_currency(total_budget)}")
-                    y -= row_height
-                    p.drawString(1 * inch, y * inch, f"{trans('reports_total_spent', default='Total Spent')}: {format_currency(total_spent)}")
-                    y -= row_height
-                    p.drawString(1 * inch, y * inch, f"{trans('reports_total_price', default='Total Price')}: {format_currency(total_price)}")
-                else:
-                    p.showPage()
-                    draw_ficore_pdf_header(p, current_user, y_start=max_y)
-                    y = title_y - 0.6
-                    p.drawString(1 * inch, y * inch, f"{trans('reports_total_budget', default='Total Budget')}: {format_currency(total_budget)}")
-                    y -= row_height
-                    p.drawString(1 * inch, y * inch, f"{trans('reports_total_spent', default='Total Spent')}: {format_currency(total_spent)}")
-                    y -= row_height
-                    p.drawString(1 * inch, y * inch, f"{trans('reports_total_price', default='Total Price')}: {format_currency(total_price)}")
-                p.save()
-                buffer.seek(0)
-                if current_user.is_authenticated and not is_admin():
-                    if not deduct_ficore_credits(db, current_user.id, 0.1, 'export_shopping_list_pdf', list_id, mongo_session):
-                        logger.error(f"Failed to deduct 0.1 Ficore Credits for exporting list {list_id} to PDF by user {current_user.id}", 
-                                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                        flash(trans('shopping_credit_deduction_failed', default='Failed to deduct Ficore Credits for exporting list to PDF.'), 'danger')
-                        return redirect(url_for('personal.shopping.main', tab='dashboard'))
+                row_count = 0
+            p.drawString(1 * inch, y * inch, format_date(item['created_at']))
+            p.drawString(2 * inch, y * inch, item['name'][:20])
+            p.drawString(3 * inch, y * inch, str(item['quantity']))
+            p.drawString(3.8 * inch, y * inch, format_currency(item['price']))
+            p.drawString(4.5 * inch, y * inch, trans(item['status'], default=item['status']))
+            p.drawString(5.2 * inch, y * inch, trans(item['category'], default=item['category']))
+            p.drawString(6 * inch, y * inch, item['store'][:15])
+            y -= row_height
+            row_count += 1
+        if row_count + 3 <= rows_per_page:
+            y -= row_height
+            p.drawString(1 * inch, y * inch, f"{trans('reports_total_budget', default='Total Budget')}: {format_currency(total_budget)}")
+            y -= row_height
+            p.drawString(1 * inch, y * inch, f"{trans('reports_total_spent', default='Total Spent')}: {format_currency(total_spent)}")
+            y -= row_height
+            p.drawString(1 * inch, y * inch, f"{trans('reports_total_price', default='Total Price')}: {format_currency(total_price)}")
+        else:
+            p.showPage()
+            draw_ficore_pdf_header(p, current_user, y_start=max_y)
+            y = title_y - 0.6
+            p.drawString(1 * inch, y * inch, f"{trans('reports_total_budget', default='Total Budget')}: {format_currency(total_budget)}")
+            y -= row_height
+            p.drawString(1 * inch, y * inch, f"{trans('reports_total_spent', default='Total Spent')}: {format_currency(total_spent)}")
+            y -= row_height
+            p.drawString(1 * inch, y * inch, f"{trans('reports_total_price', default='Total Price')}: {format_currency(total_price)}")
+        p.save()
+        buffer.seek(0)
+        if current_user.is_authenticated and not is_admin():
+            if not debit_credits(db, current_user.id, 0.1, 'export_shopping_list_pdf', item_id=list_id):
+                logger.error(f"Failed to deduct 0.1 Ficore Credits for exporting list {list_id} to PDF by user {current_user.id}", 
+                             extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+                flash(trans('shopping_credit_deduction_failed', default='Failed to deduct Ficore Credits for exporting list to PDF.'), 'danger')
+                return redirect(url_for('personal.shopping.main', tab='dashboard'))
         logger.info(f"Exported shopping list {list_id} to PDF for user {current_user.id}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': f'attachment;filename=shopping_list_{list_id}.pdf'})
@@ -846,36 +782,6 @@ def export_list_pdf(list_id):
         flash(trans('shopping_export_error', default='Error exporting shopping list to PDF.'), 'danger')
         return redirect(url_for('personal.shopping.main', tab='dashboard'))
 
-def process_delayed_deletion(list_id, user_id):
-    db = get_mongo_db()
-    try:
-        with db.client.start_session() as mongo_session:
-            with mongo_session.start_transaction():
-                pending = db.pending_deletions.find_one({'_id': ObjectId(list_id), 'user_id': str(user_id) if user_id else None}, session=mongo_session)
-                if not pending:
-                    return
-                shopping_list = db.shopping_lists.find_one({'_id': ObjectId(list_id), 'user_id': str(user_id) if user_id else None}, session=mongo_session)
-                if not shopping_list:
-                    db.pending_deletions.delete_one({'list_id': list_id}, session=mongo_session)
-                    return
-                db.shopping_items.delete_many({'list_id': list_id}, session=mongo_session)
-                result = db.shopping_lists.delete_one({'_id': ObjectId(list_id)}, session=mongo_session)
-                if result.deleted_count == 0:
-                    logger.error(f"Failed to delete shopping list {list_id}: No documents deleted", 
-                                 extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                    raise ValueError(f"Failed to delete shopping list {list_id}")
-                db.pending_deletions.delete_one({'list_id': list_id}, session=mongo_session)
-                if user_id and not is_admin():
-                    if not deduct_ficore_credits(db, user_id, 0.5, 'delete_shopping_list', list_id, mongo_session):
-                        logger.error(f"Failed to deduct 0.5 Ficore Credits for deleting list {list_id} by user {user_id}", 
-                                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-                        raise ValueError(f"Failed to deduct Ficore Credits for deleting list {list_id}")
-        logger.info(f"Completed delayed deletion of shopping list {list_id}", 
-                    extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-    except Exception as e:
-        logger.error(f"Error in delayed deletion of list {list_id}: {str(e)}", 
-                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-
 @shopping_bp.errorhandler(CSRFError)
 def handle_csrf_error(e):
     logger.error(f"CSRF error on {request.path}: {e.description}", 
@@ -2,6 +2,9 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from translations import trans
 import utils
+from credit_ledger import debit_credits
+from activity_feed import record_document_activity
+from balances import apply_cashflow_change
 from bson import ObjectId
 from datetime import datetime
 from flask_wtf import FlaskForm
@@ -134,16 +137,9 @@ def generate_pdf(id):
         p.drawString(inch, inch, "This document serves as an official receipt generated by FiCore Records.")
         p.showPage()
         p.save()
-        if not utils.is_admin():
-            user_query = utils.get_user_query(str(current_user.id))
-            db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -1}})
-            db.ficore_credit_transactions.insert_one({
-                'user_id': str(current_user.id),
-                'amount': -1,
-                'type': 'spend',
-                'date': datetime.utcnow(),
-                'ref': f"Receipt PDF generated for {receipt['party_name']} (Ficore Credits)"
-            })
+        if not utils.is_admin() and not debit_credits(db, current_user.id, 1, 'generate_receipt_pdf', ref=f"Receipt PDF generated for {receipt['party_name']} (Ficore Credits)", cashflow_id=id):
+            flash(trans('debtors_insufficient_credits', default='Insufficient credits to generate receipt'), 'danger')
+            return redirect(url_for('credits.request_credits'))
         buffer.seek(0)
         return Response(
             buffer.getvalue(),
@@ -171,6 +167,7 @@ def add():
             db = utils.get_mongo_db()
             receipt_date = datetime(form.date.data.year, form.date.data.month, form.date.data.day)
             cashflow = {
+                '_id': ObjectId(),
                 'user_id': str(current_user.id),
                 'type': 'receipt',
                 'party_name': form.party_name.data,
@@ -182,17 +179,17 @@ def add():
                 'created_at': receipt_date,
                 'updated_at': datetime.utcnow()
             }
-            db.cashflows.insert_one(cashflow)
+            def insert_cashflow(mongo_session):
+                db.cashflows.insert_one(cashflow, session=mongo_session)
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -1}})
-                db.ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -1,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': f"Receipt creation: {cashflow['party_name']} (Ficore Credits)"
-                })
+                if not debit_credits(db, current_user.id, 1, 'add_receipt', ref=f"Receipt creation: {cashflow['party_name']} (Ficore Credits)",
+                                     write=insert_cashflow, cashflow_id=cashflow['_id']):
+                    flash(trans('debtors_insufficient_credits', default='Insufficient credits to add a receipt. Request more credits.'), 'danger')
+                    return redirect(url_for('credits.request_credits'))
+            else:
+                insert_cashflow(None)
+            record_document_activity(db, 'cashflows', cashflow)
+            apply_cashflow_change(db, new_doc=cashflow)
             flash(trans('receipts_add_success', default='Receipt added successfully'), 'success')
             return redirect(url_for('receipts.index'))
         except Exception as e:
@@ -239,6 +236,8 @@ def edit(id):
                     'updated_at': datetime.utcnow()
                 }
                 db.cashflows.update_one({'_id': ObjectId(id)}, {'$set': updated_cashflow})
+                record_document_activity(db, 'cashflows', {**receipt, **updated_cashflow}, action='updated')
+                apply_cashflow_change(db, receipt, {**receipt, **updated_cashflow})
                 flash(trans('receipts_edit_success', default='Receipt updated successfully'), 'success')
                 return redirect(url_for('receipts.index'))
             except Exception as e:
@@ -263,8 +262,10 @@ def delete(id):
     try:
         db = utils.get_mongo_db()
         query = {'_id': ObjectId(id), 'type': 'receipt'} if utils.is_admin() else {'_id': ObjectId(id), 'user_id': str(current_user.id), 'type': 'receipt'}
-        result = db.cashflows.delete_one(query)
-        if result.deleted_count:
+        deleted_cashflow = db.cashflows.find_one_and_delete(query)
+        if deleted_cashflow:
+            record_document_activity(db, 'cashflows', deleted_cashflow, action='deleted')
+            apply_cashflow_change(db, old_doc=deleted_cashflow)
             flash(trans('receipts_delete_success', default='Receipt deleted successfully'), 'success')
         else:
             flash(trans('receipts_record_not_found', default='Cashflow not found'), 'danger')
@@ -309,16 +310,11 @@ def share():
         # Assuming utils.send_message handles the communication
         success = utils.send_message(recipient=recipient, message=message, type=share_type)
         if success:
-            if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(user_query, {'$inc': {'ficore_credit_balance': -2}})
-                db.ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -2,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': f"Receipt shared with {recipient} via {share_type} (Ficore Credits)"
-                })
+            if not utils.is_admin() and not debit_credits(db, current_user.id, 2, 'share_receipt', ref=f"Receipt shared with {recipient} via {share_type} (Ficore Credits)", cashflow_id=receipt_id):
+                return jsonify({
+                    'success': False,
+                    'message': trans('debtors_insufficient_credits', default='Insufficient credits to share receipt')
+                }), 403
             return jsonify({'success': True})
         else:
             return jsonify({
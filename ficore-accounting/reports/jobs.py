@@ -0,0 +1,246 @@
+import csv
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from bson import ObjectId
+from gridfs import GridFS
+from pymongo import ReturnDocument
+from utils import get_mongo_db
+from credit_ledger import debit_credits
+
+logger = logging.getLogger('ficore_app')
+
+REPORT_JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', 2))
+REPORT_ARTIFACT_TTL_HOURS = int(os.getenv('REPORT_ARTIFACT_TTL_HOURS', 24))
+# Queued jobs older than this, or running jobs older than the stall limit, are requeued
+REPORT_JOB_QUEUE_GRACE = timedelta(minutes=5)
+REPORT_JOB_STALL_LIMIT = timedelta(minutes=30)
+ARTIFACT_SPOOL_MAX_MEMORY = 1024 * 1024
+
+REPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'pdf': 'application/pdf'
+}
+
+# report_type -> {'builder': fn(db, job, user) -> file object, 'roles': [...], 'credit_cost': int}
+REPORT_BUILDERS = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+class _AlreadyCharged(Exception):
+    """Raised inside the charge transaction when another run already charged the job."""
+
+def register_report_builder(report_type, builder, roles, credit_cost=1):
+    """
+    Register a report that can be generated in the background.
+
+    Args:
+        report_type: Name used in the job document and API
+        builder: Callable(db, job, user) returning a binary file object positioned at 0
+        roles: Roles allowed to request the report (admins are always allowed)
+        credit_cost: Ficore Credits charged to non-admin users when the job succeeds
+    """
+    REPORT_BUILDERS[report_type] = {'builder': builder, 'roles': roles, 'credit_cost': credit_cost}
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=REPORT_JOB_WORKERS, thread_name_prefix='report-job')
+    return _executor
+
+def write_csv_artifact(rows):
+    """
+    Write CSV rows to a spooled binary temp file.
+
+    Args:
+        rows: Iterable of CSV rows (lists)
+
+    Returns:
+        SpooledTemporaryFile positioned at 0
+    """
+    artifact = tempfile.SpooledTemporaryFile(max_size=ARTIFACT_SPOOL_MAX_MEMORY)
+    text = io.TextIOWrapper(artifact, encoding='utf-8', newline='')
+    writer = csv.writer(text, lineterminator='\n')
+    for row in rows:
+        writer.writerow(row)
+    text.flush()
+    text.detach()
+    artifact.seek(0)
+    return artifact
+
+def enqueue_report_job(app, user_id, report_type, output_format, params, is_admin=False):
+    """
+    Record a report job and hand it to the worker pool.
+
+    Args:
+        app: Flask application instance
+        user_id: ID of the requesting user
+        report_type: Registered report type
+        output_format: 'csv' or 'pdf'
+        params: Report filters stored on the job
+        is_admin: Whether the requester is an admin (admins are not charged)
+
+    Returns:
+        str: ID of the job
+    """
+    if report_type not in REPORT_BUILDERS:
+        raise ValueError(f"Unknown report type: {report_type}")
+    if output_format not in REPORT_MIMETYPES:
+        raise ValueError(f"Unsupported report format: {output_format}")
+    db = get_mongo_db()
+    job = {
+        'user_id': str(user_id),
+        'report_type': report_type,
+        'format': output_format,
+        'params': params,
+        'is_admin': is_admin,
+        'status': 'queued',
+        'credit_cost': 0 if is_admin else REPORT_BUILDERS[report_type]['credit_cost'],
+        'credits_charged': False,
+        'created_at': datetime.utcnow()
+    }
+    job_id = db.report_jobs.insert_one(job).inserted_id
+    _get_executor().submit(run_report_job, app, job_id)
+    logger.info(f"Queued {report_type} {output_format} report job {job_id} for user {user_id}",
+                extra={'session_id': 'no-session-id'})
+    return str(job_id)
+
+def _charge_credits(db, job):
+    """
+    Deduct the job's credit cost exactly once.
+
+    Returns:
+        bool: False if the user's balance no longer covers the cost
+    """
+    if not job.get('credit_cost'):
+        return True
+    def claim(mongo_session):
+        claimed = db.report_jobs.update_one(
+            {'_id': job['_id'], 'credits_charged': False},
+            {'$set': {'credits_charged': True}},
+            session=mongo_session
+        )
+        if not claimed.modified_count:
+            raise _AlreadyCharged()
+    try:
+        return debit_credits(db, job['user_id'], job['credit_cost'], 'generate_report',
+                             ref=f"Report generation: {job['report_type']} ({job['format']}) job {job['_id']}",
+                             write=claim, session_id='no-session-id', report_job_id=job['_id']) is not None
+    except _AlreadyCharged:
+        return True
+
+def run_report_job(app, job_id):
+    """
+    Build a queued report, store it in GridFS and charge credits on success.
+
+    The job is claimed with an atomic queued -> running transition, so a job
+    submitted twice (e.g. by the requeue sweep) only runs once.
+    """
+    with app.app_context():
+        db = get_mongo_db()
+        job = db.report_jobs.find_one_and_update(
+            {'_id': ObjectId(job_id), 'status': 'queued'},
+            {'$set': {'status': 'running', 'started_at': datetime.utcnow()}, '$inc': {'attempts': 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not job:
+            return
+        try:
+            from models import get_user
+            user = get_user(db, job['user_id'])
+            builder = REPORT_BUILDERS[job['report_type']]['builder']
+            artifact = builder(db, job, user)
+            filename = f"{job['report_type']}_{job['_id']}.{job['format']}"
+            try:
+                file_id = GridFS(db).put(
+                    artifact,
+                    filename=filename,
+                    content_type=REPORT_MIMETYPES[job['format']],
+                    metadata={'user_id': job['user_id'], 'report_job_id': job['_id']}
+                )
+            finally:
+                artifact.close()
+            if not _charge_credits(db, job):
+                GridFS(db).delete(file_id)
+                raise ValueError('Insufficient Ficore Credits')
+            db.report_jobs.update_one(
+                {'_id': job['_id']},
+                {'$set': {
+                    'status': 'completed',
+                    'file_id': file_id,
+                    'filename': filename,
+                    'completed_at': datetime.utcnow()
+                }}
+            )
+            logger.info(f"Completed report job {job['_id']} ({job['report_type']} {job['format']})",
+                        extra={'session_id': 'no-session-id'})
+        except Exception as e:
+            logger.error(f"Report job {job['_id']} failed: {str(e)}", exc_info=True,
+                         extra={'session_id': 'no-session-id'})
+            db.report_jobs.update_one(
+                {'_id': job['_id']},
+                {'$set': {'status': 'failed', 'error': str(e), 'completed_at': datetime.utcnow()}}
+            )
+
+def get_report_job(db, job_id, user_id=None):
+    """
+    Fetch a job, optionally restricted to its owner.
+
+    Returns:
+        dict or None
+    """
+    query = {'_id': ObjectId(job_id)}
+    if user_id is not None:
+        query['user_id'] = str(user_id)
+    return db.report_jobs.find_one(query)
+
+def requeue_stale_report_jobs(app):
+    """
+    Resubmit jobs lost by a restarted worker: queued jobs nobody picked up and
+    running jobs that exceeded the stall limit.
+    """
+    with app.app_context():
+        db = get_mongo_db()
+        now = datetime.utcnow()
+        stale = db.report_jobs.find({'$or': [
+            {'status': 'queued', 'created_at': {'$lt': now - REPORT_JOB_QUEUE_GRACE}},
+            {'status': 'running', 'started_at': {'$lt': now - REPORT_JOB_STALL_LIMIT}}
+        ]}, {'_id': 1})
+        requeued = 0
+        for job in stale:
+            db.report_jobs.update_one({'_id': job['_id'], 'status': {'$in': ['queued', 'running']}},
+                                      {'$set': {'status': 'queued'}})
+            _get_executor().submit(run_report_job, app, job['_id'])
+            requeued += 1
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale report jobs", extra={'session_id': 'no-session-id'})
+        return requeued
+
+def cleanup_report_artifacts(app):
+    """Delete report artifacts and job records older than REPORT_ARTIFACT_TTL_HOURS."""
+    with app.app_context():
+        db = get_mongo_db()
+        fs = GridFS(db)
+        cutoff = datetime.utcnow() - timedelta(hours=REPORT_ARTIFACT_TTL_HOURS)
+        expired = list(db.report_jobs.find(
+            {'status': {'$in': ['completed', 'failed']}, 'completed_at': {'$lt': cutoff}},
+            {'_id': 1, 'file_id': 1}
+        ))
+        for job in expired:
+            if job.get('file_id'):
+                try:
+                    fs.delete(job['file_id'])
+                except Exception as e:
+                    logger.error(f"Failed to delete report artifact {job['file_id']}: {str(e)}",
+                                 extra={'session_id': 'no-session-id'})
+        if expired:
+            db.report_jobs.delete_many({'_id': {'$in': [job['_id'] for job in expired]}})
+        logger.info(f"Removed {len(expired)} expired report jobs", extra={'session_id': 'no-session-id'})
+        return len(expired)
@@ -1,25 +1,31 @@
-from flask import Blueprint, session, request, render_template, redirect, url_for, flash, jsonify, current_app, Response
+from flask import Blueprint, session, request, render_template, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context, send_file, abort
 from flask_login import login_required, current_user
 from translations import trans
 import utils
+from credit_ledger import debit_credits
 from bson import ObjectId
 from datetime import datetime, date
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
 from reportlab.lib.units import inch
-from io import BytesIO, StringIO
+from io import StringIO
 from flask_wtf import FlaskForm
 from wtforms import DateField, StringField, SubmitField, SelectField
 from wtforms.validators import Optional
 import csv
 import logging
-from helpers.branding_helpers import draw_ficore_pdf_header, ficore_csv_header
+from helpers.branding_helpers import ficore_csv_header
+from helpers.pdf_report import PDFReport
+from gridfs import GridFS
+from reports.jobs import REPORT_BUILDERS, register_report_builder, enqueue_report_job, get_report_job, write_csv_artifact
 
 logger = logging.getLogger(__name__)
 
 reports_bp = Blueprint('reports', __name__, url_prefix='/reports')
 
+# Rows fetched per Mongo round trip for exports, and written per streamed CSV chunk
+EXPORT_BATCH_SIZE = 500
+# Users per page of the admin customer report
+CUSTOMER_REPORT_PAGE_SIZE = 1000
+
 class ReportForm(FlaskForm):
     start_date = DateField(trans('reports_start_date', default='Start Date'), validators=[Optional()])
     end_date = DateField(trans('reports_end_date', default='End Date'), validators=[Optional()])
@@ -192,6 +198,159 @@ def to_dict_shopping_suggestion(record):
         'updated_at': utils.format_date(record.get('updated_at'), format_type='iso') if record.get('updated_at') else None
     }
 
+def stream_csv(rows, filename):
+    """
+    Return a CSV download that writes rows as they are produced.
+
+    Rows are flushed every EXPORT_BATCH_SIZE rows, so memory stays bounded by one
+    chunk regardless of the export size. The generator runs inside the request
+    context, so current_user and trans() remain available while streaming.
+
+    Args:
+        rows: Iterable of CSV rows (lists)
+        filename: Download file name
+    """
+    def generate():
+        buffer = StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        pending = 0
+        for row in rows:
+            writer.writerow(row)
+            pending += 1
+            if pending >= EXPORT_BATCH_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                pending = 0
+        if pending:
+            yield buffer.getvalue()
+    return Response(stream_with_context(generate()), mimetype='text/csv', headers={'Content-Disposition': f'attachment;filename={filename}'})
+
+def get_cashflow_totals(db, query):
+    """Return (receipts, payments) totals for cashflows matching query."""
+    totals = {row['_id']: row['total'] for row in db.cashflows.aggregate([
+        {'$match': query},
+        {'$group': {'_id': '$type', 'total': {'$sum': '$amount'}}}
+    ])}
+    return totals.get('receipt', 0), totals.get('payment', 0)
+
+def build_budget_performance(budgets, actual_income, actual_expenses):
+    """Yield budget performance rows for each budget document."""
+    for budget in budgets:
+        budget_dict = to_dict_budget(budget)
+        budget_dict['actual_income'] = actual_income
+        budget_dict['actual_expenses'] = actual_expenses
+        budget_dict['income_variance'] = actual_income - budget_dict['income']
+        budget_dict['expense_variance'] = actual_expenses - (budget_dict['fixed_expenses'] + budget_dict['variable_expenses'])
+        yield budget_dict
+
+def _latest_budgets(db, user_ids):
+    return {row['_id']: row['budget'] for row in db.budgets.aggregate([
+        {'$match': {'user_id': {'$in': user_ids}}},
+        {'$sort': {'user_id': 1, 'created_at': -1}},
+        {'$group': {'_id': '$user_id', 'budget': {'$first': '$$ROOT'}}}
+    ])}
+
+def _bill_status_counts(db, user_ids):
+    counts = {}
+    for row in db.bills.aggregate([
+        {'$match': {'user_id': {'$in': user_ids}}},
+        {'$group': {'_id': {'user_id': '$user_id', 'status': '$status'}, 'count': {'$sum': 1}}}
+    ]):
+        counts.setdefault(row['_id']['user_id'], {})[row['_id'].get('status')] = row['count']
+    return counts
+
+def _lessons_completed(db, user_ids):
+    return {row['_id']: row['total'] for row in db.learning_materials.aggregate([
+        {'$match': {'user_id': {'$in': user_ids}}},
+        {'$group': {'_id': '$user_id', 'total': {'$sum': {'$size': {'$ifNull': ['$lessons_completed', []]}}}}}
+    ])}
+
+def _next_tax_reminders(db, user_ids, now):
+    return {row['_id']: row['reminder'] for row in db.tax_reminders.aggregate([
+        {'$match': {'user_id': {'$in': user_ids}, 'due_date': {'$gte': now}}},
+        {'$sort': {'user_id': 1, 'due_date': 1}},
+        {'$group': {'_id': '$user_id', 'reminder': {'$first': '$$ROOT'}}}
+    ])}
+
+def to_dict_customer_report(user, budget=None, bill_counts=None, lessons_completed=0, tax_reminder=None):
+    """Flatten a user and its pre-grouped related data into report columns."""
+    budget = to_dict_budget(budget)
+    bill_counts = bill_counts or {}
+    tax_reminder = to_dict_tax_reminder(tax_reminder)
+    return {
+        'username': user['_id'],
+        'email': user.get('email', ''),
+        'role': user.get('role', ''),
+        'ficore_credit_balance': user.get('ficore_credit_balance', 0),
+        'language': user.get('language', 'en'),
+        'budget_income': budget['income'] if budget['income'] is not None else '-',
+        'budget_fixed_expenses': budget['fixed_expenses'] if budget['fixed_expenses'] is not None else '-',
+        'budget_variable_expenses': budget['variable_expenses'] if budget['variable_expenses'] is not None else '-',
+        'budget_surplus_deficit': budget['surplus_deficit'] if budget['surplus_deficit'] is not None else '-',
+        'pending_bills': bill_counts.get('pending', 0),
+        'paid_bills': bill_counts.get('paid', 0),
+        'overdue_bills': bill_counts.get('overdue', 0),
+        'lessons_completed': lessons_completed,
+        'next_tax_due_date': utils.format_date(tax_reminder['due_date']) if tax_reminder['due_date'] else '-',
+        'next_tax_amount': tax_reminder['amount'] if tax_reminder['amount'] is not None else '-'
+    }
+
+def get_customer_report_page(db, role=None, after=None, limit=CUSTOMER_REPORT_PAGE_SIZE, has_lessons=None):
+    """
+    Build one page of the admin customer report.
+
+    Users are paged by _id. For each page, every related collection is grouped
+    once with an indexed {'user_id': {'$in': page_ids}} match and joined back in
+    memory, instead of running correlated $lookup sub-pipelines per user.
+
+    Args:
+        db: MongoDB database instance
+        role: Optional role filter
+        after: Return users with _id greater than this (keyset cursor)
+        limit: Users per page
+        has_lessons: Whether learning_materials exists (looked up when None)
+
+    Returns:
+        tuple: (list of report rows, _id to pass as after for the next page or None)
+    """
+    query = {'role': role} if role else {}
+    if after is not None:
+        query['_id'] = {'$gt': after}
+    projection = {'_id': 1, 'email': 1, 'role': 1, 'ficore_credit_balance': 1, 'language': 1}
+    users = list(db.users.find(query, projection).sort('_id', 1).limit(limit))
+    if not users:
+        return [], None
+    user_ids = [user['_id'] for user in users]
+    if has_lessons is None:
+        has_lessons = 'learning_materials' in db.list_collection_names()
+    budgets = _latest_budgets(db, user_ids)
+    bill_counts = _bill_status_counts(db, user_ids)
+    lessons = _lessons_completed(db, user_ids) if has_lessons else {}
+    tax_reminders = _next_tax_reminders(db, user_ids, datetime.utcnow())
+    rows = [
+        to_dict_customer_report(
+            user,
+            budgets.get(user['_id']),
+            bill_counts.get(user['_id']),
+            lessons.get(user['_id'], 0),
+            tax_reminders.get(user['_id'])
+        )
+        for user in users
+    ]
+    next_after = user_ids[-1] if len(users) == limit else None
+    return rows, next_after
+
+def iter_customer_report(db, role=None, page_size=CUSTOMER_REPORT_PAGE_SIZE):
+    """Yield every customer report row, one page of users at a time."""
+    has_lessons = 'learning_materials' in db.list_collection_names()
+    after = None
+    while True:
+        rows, after = get_customer_report_page(db, role, after, page_size, has_lessons)
+        yield from rows
+        if after is None:
+            break
+
 @reports_bp.route('/')
 @login_required
 @utils.requires_role(['personal', 'trader'])
@@ -227,25 +386,24 @@ def profit_loss():
             if form.end_date.data:
                 end_datetime = datetime.combine(form.end_date.data, datetime.max.time())
                 query['created_at'] = query.get('created_at', {}) | {'$lte': end_datetime}
-            cashflows = [to_dict_cashflow(cf) for cf in db.cashflows.find(query).sort('created_at', -1)]
             output_format = request.form.get('format', 'html')
-            if output_format == 'pdf':
-                return generate_profit_loss_pdf(cashflows)
-            elif output_format == 'csv':
-                return generate_profit_loss_csv(cashflows)
-            if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(
-                    user_query,
-                    {'$inc': {'ficore_credit_balance': -1}}
+            if output_format in ('csv', 'pdf') and 'user_id' not in query:
+                # Unscoped admin exports can span every cashflow; build them in the background
+                job_id = enqueue_report_job(
+                    current_app._get_current_object(), current_user.id, 'profit_loss', output_format,
+                    date_range_params(form.start_date.data, form.end_date.data), is_admin=True
                 )
-                db.ficore_ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -1,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': 'Profit/Loss report generation (Ficore Credits)'
-                })
+                return render_report_job(job_id)
+            cursor = db.cashflows.find(query).sort('created_at', -1)
+            if output_format == 'csv':
+                return generate_profit_loss_csv(to_dict_cashflow(cf) for cf in cursor.batch_size(EXPORT_BATCH_SIZE))
+            elif output_format == 'pdf':
+                return generate_profit_loss_pdf(to_dict_cashflow(cf) for cf in cursor.batch_size(EXPORT_BATCH_SIZE))
+            cashflows = [to_dict_cashflow(cf) for cf in cursor]
+            if not utils.is_admin():
+                if not debit_credits(db, current_user.id, 1, 'generate_report', ref='Profit/Loss report generation (Ficore Credits)'):
+                    flash(trans('debtors_insufficient_credits', default='Insufficient credits to generate a report. Request more credits.'), 'danger')
+                    return redirect(url_for('credits.request_credits'))
         except Exception as e:
             logger.error(f"Error generating profit/loss report for user {current_user.id}: {str(e)}", exc_info=True)
             flash(trans('reports_generation_error', default='An error occurred'), 'danger')
@@ -285,25 +443,17 @@ def debtors_creditors():
                 query['created_at'] = query.get('created_at', {}) | {'$lte': end_datetime}
             if form.record_type.data:
                 query['type'] = form.record_type.data
-            records = [to_dict_record(r) for r in db.records.find(query).sort('created_at', -1)]
+            cursor = db.records.find(query).sort('created_at', -1)
             output_format = request.form.get('format', 'html')
-            if output_format == 'pdf':
-                return generate_debtors_creditors_pdf(records)
-            elif output_format == 'csv':
-                return generate_debtors_creditors_csv(records)
+            if output_format == 'csv':
+                return generate_debtors_creditors_csv(to_dict_record(r) for r in cursor.batch_size(EXPORT_BATCH_SIZE))
+            elif output_format == 'pdf':
+                return generate_debtors_creditors_pdf(to_dict_record(r) for r in cursor.batch_size(EXPORT_BATCH_SIZE))
+            records = [to_dict_record(r) for r in cursor]
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(
-                    user_query,
-                    {'$inc': {'ficore_credit_balance': -1}}
-                )
-                db.ficore_ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -1,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': 'Debtors/Creditors report generation (Ficore Credits)'
-                })
+                if not debit_credits(db, current_user.id, 1, 'generate_report', ref='Debtors/Creditors report generation (Ficore Credits)'):
+                    flash(trans('debtors_insufficient_credits', default='Insufficient credits to generate a report. Request more credits.'), 'danger')
+                    return redirect(url_for('credits.request_credits'))
         except Exception as e:
             logger.error(f"Error generating debtors/creditors report for user {current_user.id}: {str(e)}", exc_info=True)
             flash(trans('reports_generation_error', default='An error occurred'), 'danger')
@@ -343,25 +493,17 @@ def tax_obligations():
                 query['due_date'] = query.get('due_date', {}) | {'$lte': end_datetime}
             if form.status.data:
                 query['status'] = form.status.data
-            tax_reminders = [to_dict_tax_reminder(tr) for tr in db.tax_reminders.find(query).sort('due_date', 1)]
+            cursor = db.tax_reminders.find(query).sort('due_date', 1)
             output_format = request.form.get('format', 'html')
-            if output_format == 'pdf':
-                return generate_tax_obligations_pdf(tax_reminders)
-            elif output_format == 'csv':
-                return generate_tax_obligations_csv(tax_reminders)
+            if output_format == 'csv':
+                return generate_tax_obligations_csv(to_dict_tax_reminder(tr) for tr in cursor.batch_size(EXPORT_BATCH_SIZE))
+            elif output_format == 'pdf':
+                return generate_tax_obligations_pdf(to_dict_tax_reminder(tr) for tr in cursor.batch_size(EXPORT_BATCH_SIZE))
+            tax_reminders = [to_dict_tax_reminder(tr) for tr in cursor]
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(
-                    user_query,
-                    {'$inc': {'ficore_credit_balance': -1}}
-                )
-                db.ficore_ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -1,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': 'Tax Obligations report generation (Ficore Credits)'
-                })
+                if not debit_credits(db, current_user.id, 1, 'generate_report', ref='Tax Obligations report generation (Ficore Credits)'):
+                    flash(trans('debtors_insufficient_credits', default='Insufficient credits to generate a report. Request more credits.'), 'danger')
+                    return redirect(url_for('credits.request_credits'))
         except Exception as e:
             logger.error(f"Error generating tax obligations report for user {current_user.id}: {str(e)}", exc_info=True)
             flash(trans('reports_generation_error', default='An error occurred'), 'danger')
@@ -403,52 +545,26 @@ def budget_performance():
                 end_datetime = datetime.combine(form.end_date.data, datetime.max.time())
                 budget_query['created_at'] = budget_query.get('created_at', {}) | {'$lte': end_datetime}
                 cashflow_query['created_at'] = cashflow_query.get('created_at', {}) | {'$lte': end_datetime}
-            budgets = list(db.budgets.find(budget_query).sort('created_at', -1))
-            cashflows = [to_dict_cashflow(cf) for cf in db.cashflows.find(cashflow_query).sort('created_at', -1)]
-            for budget in budgets:
-                budget_dict = to_dict_budget(budget)
-                actual_income = sum(cf['amount'] for cf in cashflows if cf['type'] == 'receipt')
-                actual_expenses = sum(cf['amount'] for cf in cashflows if cf['type'] == 'payment')
-                budget_dict['actual_income'] = actual_income
-                budget_dict['actual_expenses'] = actual_expenses
-                budget_dict['income_variance'] = actual_income - budget_dict['income']
-                budget_dict['expense_variance'] = actual_expenses - (budget_dict['fixed_expenses'] + budget_dict['variable_expenses'])
-                budget_data.append(budget_dict)
+            cursor = db.budgets.find(budget_query).sort('created_at', -1)
+            actual_income, actual_expenses = get_cashflow_totals(db, cashflow_query)
             output_format = request.form.get('format', 'html')
-            if output_format == 'pdf':
-                return generate_budget_performance_pdf(budget_data)
-            elif output_format == 'csv':
-                return generate_budget_performance_csv(budget_data)
+            if output_format == 'csv':
+                return generate_budget_performance_csv(build_budget_performance(cursor.batch_size(EXPORT_BATCH_SIZE), actual_income, actual_expenses))
+            elif output_format == 'pdf':
+                return generate_budget_performance_pdf(build_budget_performance(cursor.batch_size(EXPORT_BATCH_SIZE), actual_income, actual_expenses))
+            budget_data = list(build_budget_performance(cursor, actual_income, actual_expenses))
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(
-                    user_query,
-                    {'$inc': {'ficore_credit_balance': -1}}
-                )
-                db.ficore_ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -1,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': 'Budget Performance report generation (Ficore Credits)'
-                })
+                if not debit_credits(db, current_user.id, 1, 'generate_report', ref='Budget Performance report generation (Ficore Credits)'):
+                    flash(trans('debtors_insufficient_credits', default='Insufficient credits to generate a report. Request more credits.'), 'danger')
+                    return redirect(url_for('credits.request_credits'))
         except Exception as e:
             logger.error(f"Error generating budget performance report for user {current_user.id}: {str(e)}", exc_info=True)
             flash(trans('reports_generation_error', default='An error occurred'), 'danger')
     else:
         try:
             db = utils.get_mongo_db()
-            budgets = list(db.budgets.find(query).sort('created_at', -1))
-            cashflows = [to_dict_cashflow(cf) for cf in db.cashflows.find(query).sort('created_at', -1)]
-            for budget in budgets:
-                budget_dict = to_dict_budget(budget)
-                actual_income = sum(cf['amount'] for cf in cashflows if cf['type'] == 'receipt')
-                actual_expenses = sum(cf['amount'] for cf in cashflows if cf['type'] == 'payment')
-                budget_dict['actual_income'] = actual_income
-                budget_dict['actual_expenses'] = actual_expenses
-                budget_dict['income_variance'] = actual_income - budget_dict['income']
-                budget_dict['expense_variance'] = actual_expenses - (budget_dict['fixed_expenses'] + budget_dict['variable_expenses'])
-                budget_data.append(budget_dict)
+            actual_income, actual_expenses = get_cashflow_totals(db, query)
+            budget_data = list(build_budget_performance(db.budgets.find(query).sort('created_at', -1), actual_income, actual_expenses))
         except Exception as e:
             logger.error(f"Error fetching budget data for user {current_user.id}: {str(e)}", exc_info=True)
             flash(trans('reports_generation_error', default='An error occurred'), 'danger')
@@ -486,28 +602,27 @@ def shopping_report():
                 list_query['created_at'] = list_query.get('created_at', {}) | {'$lte': end_datetime}
                 item_query['created_at'] = item_query.get('created_at', {}) | {'$lte': end_datetime}
                 suggestion_query['created_at'] = suggestion_query.get('created_at', {}) | {'$lte': end_datetime}
-            lists = [to_dict_shopping_list(lst) for lst in db.shopping_lists.find(list_query).sort('created_at', -1)]
-            items = [to_dict_shopping_item(item) for item in db.shopping_items.find(item_query).sort('created_at', -1)]
-            suggestions = [to_dict_shopping_suggestion(sug) for sug in db.shopping_suggestions.find(suggestion_query).sort('created_at', -1)]
-            shopping_data = {'lists': lists, 'items': items, 'suggestions': suggestions}
+            list_cursor = db.shopping_lists.find(list_query).sort('created_at', -1)
+            item_cursor = db.shopping_items.find(item_query).sort('created_at', -1)
+            suggestion_cursor = db.shopping_suggestions.find(suggestion_query).sort('created_at', -1)
             output_format = form.format.data
-            if output_format == 'pdf':
-                return generate_shopping_report_pdf(shopping_data)
-            elif output_format == 'csv':
-                return generate_shopping_report_csv(shopping_data)
+            if output_format in ('csv', 'pdf'):
+                export_data = {
+                    'lists': (to_dict_shopping_list(lst) for lst in list_cursor.batch_size(EXPORT_BATCH_SIZE)),
+                    'items': (to_dict_shopping_item(item) for item in item_cursor.batch_size(EXPORT_BATCH_SIZE)),
+                    'suggestions': (to_dict_shopping_suggestion(sug) for sug in suggestion_cursor.batch_size(EXPORT_BATCH_SIZE))
+                }
+                if output_format == 'csv':
+                    return generate_shopping_report_csv(export_data)
+                return generate_shopping_report_pdf(export_data)
+            lists = [to_dict_shopping_list(lst) for lst in list_cursor]
+            items = [to_dict_shopping_item(item) for item in item_cursor]
+            suggestions = [to_dict_shopping_suggestion(sug) for sug in suggestion_cursor]
+            shopping_data = {'lists': lists, 'items': items, 'suggestions': suggestions}
             if not utils.is_admin():
-                user_query = utils.get_user_query(str(current_user.id))
-                db.users.update_one(
-                    user_query,
-                    {'$inc': {'ficore_credit_balance': -1}}
-                )
-                db.ficore_ficore_credit_transactions.insert_one({
-                    'user_id': str(current_user.id),
-                    'amount': -1,
-                    'type': 'spend',
-                    'date': datetime.utcnow(),
-                    'ref': 'Shopping Report generation (Ficore Credits)'
-                })
+                if not debit_credits(db, current_user.id, 1, 'generate_report', ref='Shopping Report generation (Ficore Credits)'):
+                    flash(trans('debtors_insufficient_credits', default='Insufficient credits to generate a report. Request more credits.'), 'danger')
+                    return redirect(url_for('credits.request_credits'))
         except Exception as e:
             logger.error(f"Error generating shopping report for user {current_user.id}: {str(e)}", exc_info=True)
             flash(trans('reports_generation_error', default='An error occurred'), 'danger')
@@ -537,423 +652,135 @@ def customer_reports():
     if form.validate_on_submit():
         role = form.role.data if form.role.data else None
         report_format = form.format.data
+        if report_format == 'html':
+            return redirect(url_for('reports.customer_reports', format='html', role=role))
+        try:
+            job_id = enqueue_report_job(
+                current_app._get_current_object(), current_user.id, 'customer_report', report_format,
+                {'role': role}, is_admin=True
+            )
+            return render_report_job(job_id)
+        except Exception as e:
+            logger.error(f"Error generating customer report: {str(e)}", exc_info=True)
+            flash('An error occurred while generating the report', 'danger')
+    elif request.method == 'GET' and request.args.get('format') == 'html':
+        # The HTML view is paged with GET query params so the Next link can carry the cursor and role filter
+        role = request.args.get('role') or None
         try:
             db = utils.get_mongo_db()
-            pipeline = [
-                {'$match': {'role': role}} if role else {},
-                {'$lookup': {
-                    'from': 'budgets',
-                    'let': {'user_id': '$_id'},
-                    'pipeline': [
-                        {'$match': {'$expr': {'$eq': ['$user_id', '$$user_id']}}},
-                        {'$sort': {'created_at': -1}},
-                        {'$limit': 1}
-                    ],
-                    'as': 'latest_budget'
-                }},
-                {'$lookup': {
-                    'from': 'bills',
-                    'let': {'user_id': '$_id'},
-                    'pipeline': [
-                        {'$match': {'$expr': {'$eq': ['$user_id', '$$user_id']}}},
-                        {'$group': {
-                            '_id': '$status',
-                            'count': {'$sum': 1}
-                        }}
-                    ],
-                    'as': 'bill_status_counts'
-                }},
-                {'$lookup': {
-                    'from': 'learning_materials',
-                    'let': {'user_id': '$_id'},
-                    'pipeline': [
-                        {'$match': {'$expr': {'$eq': ['$user_id', '$$user_id']}}},
-                        {'$group': {
-                            '_id': None,
-                            'total_lessons_completed': {'$sum': {'$size': '$lessons_completed'}}
-                        }}
-                    ],
-                    'as': 'learning_progress'
-                }},
-                {'$lookup': {
-                    'from': 'tax_reminders',
-                    'let': {'user_id': '$_id'},
-                    'pipeline': [
-                        {'$match': {'$expr': {'$eq': ['$user_id', '$$user_id']}, 'due_date': {'$gte': datetime.utcnow()}}},
-                        {'$sort': {'due_date': 1}},
-                        {'$limit': 1}
-                    ],
-                    'as': 'next_tax_reminder'
-                }},
-            ]
-            users = list(db.users.aggregate(pipeline))
-            report_data = []
-            for user in users:
-                budget = to_dict_budget(user['latest_budget'][0] if user['latest_budget'] else None)
-                bill_counts = {status['_id']: status['count'] for status in user['bill_status_counts']} if user['bill_status_counts'] else {'pending': 0, 'paid': 0, 'overdue': 0}
-                learning_progress = user['learning_progress'][0]['total_lessons_completed'] if user['learning_progress'] else 0
-                tax_reminder = to_dict_tax_reminder(user['next_tax_reminder'][0] if user['next_tax_reminder'] else None)
-                data = {
-                    'username': user['_id'],
-                    'email': user.get('email', ''),
-                    'role': user.get('role', ''),
-                    'ficore_credit_balance': user.get('ficore_credit_balance', 0),
-                    'language': user.get('language', 'en'),
-                    'budget_income': budget['income'] if budget['income'] is not None else '-',
-                    'budget_fixed_expenses': budget['fixed_expenses'] if budget['fixed_expenses'] is not None else '-',
-                    'budget_variable_expenses': budget['variable_expenses'] if budget['variable_expenses'] is not None else '-',
-                    'budget_surplus_deficit': budget['surplus_deficit'] if budget['surplus_deficit'] is not None else '-',
-                    'pending_bills': bill_counts.get('pending', 0),
-                    'paid_bills': bill_counts.get('paid', 0),
-                    'overdue_bills': bill_counts.get('overdue', 0),
-                    'lessons_completed': learning_progress,
-                    'next_tax_due_date': utils.format_date(tax_reminder['due_date']) if tax_reminder['due_date'] else '-',
-                    'next_tax_amount': tax_reminder['amount'] if tax_reminder['amount'] is not None else '-'
-                }
-                report_data.append(data)
-            if report_format == 'html':
-                return render_template('reports/customer_reports.html', report_data=report_data, title='Facore Credits')
-            elif report_format == 'pdf':
-                return generate_customer_report_pdf(report_data)
-            elif report_format == 'csv':
-                return generate_customer_report_csv(report_data)
+            report_data, next_after = get_customer_report_page(db, role, request.args.get('after') or None)
+            return render_template('reports/customer_reports.html', report_data=report_data, next_after=next_after,
+                                   role=role, is_first_page=not request.args.get('after'), title='Facore Credits')
         except Exception as e:
             logger.error(f"Error generating customer report: {str(e)}", exc_info=True)
             flash('An error occurred while generating the report', 'danger')
     return render_template('reports/customer_reports_form.html', form=form, title='Generate Customer Report')
 
-def generate_profit_loss_pdf(cashflows):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    # Page setup
-    header_height = 0.7
-    extra_space = 0.2
-    row_height = 0.3
-    bottom_margin = 0.5
-    max_y = 10.5
-    title_y = max_y - header_height - extra_space
-    page_height = (max_y - bottom_margin) * inch
-    rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
-
-    def draw_table_headers(y):
-        p.setFillColor(colors.black)
-        p.drawString(1 * inch, y * inch, trans('general_date', default='Date'))
-        p.drawString(2.5 * inch, y * inch, trans('general_party_name', default='Party Name'))
-        p.drawString(4 * inch, y * inch, trans('general_type', default='Type'))
-        p.drawString(5 * inch, y * inch, trans('general_amount', default='Amount'))
-        return y - row_height
-
-    # Initialize first page
-    draw_ficore_pdf_header(p, current_user, y_start=max_y)
-    p.setFont("Helvetica", 12)
-    p.drawString(1 * inch, title_y * inch, trans('reports_profit_loss_report', default='Profit/Loss Report'))
-    p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {utils.format_date(datetime.utcnow())}")
-    y = title_y - 0.6
-    y = draw_table_headers(y)
-
+def build_profit_loss_pdf(cashflows, user):
+    report = PDFReport(user, trans('reports_profit_loss_report', default='Profit/Loss Report'))
+    report.start_table(
+        [trans('general_date', default='Date'), trans('general_party_name', default='Party Name'), trans('general_type', default='Type'), trans('general_amount', default='Amount')],
+        [1 * inch, 2.5 * inch, 4 * inch, 5 * inch]
+    )
     total_income = 0
     total_expense = 0
-    row_count = 0
-
     for t in cashflows:
-        if row_count >= rows_per_page:
-            p.showPage()
-            draw_ficore_pdf_header(p, current_user, y_start=max_y)
-            y = title_y - 0.6
-            y = draw_table_headers(y)
-            row_count = 0
-
-        p.drawString(1 * inch, y * inch, utils.format_date(t['created_at']))
-        p.drawString(2.5 * inch, y * inch, t['party_name'])
-        p.drawString(4 * inch, y * inch, trans(t['type'], default=t['type']))
-        p.drawString(5 * inch, y * inch, utils.format_currency(t['amount']))
+        report.add_row([utils.format_date(t['created_at']), t['party_name'], trans(t['type'], default=t['type']), utils.format_currency(t['amount'])])
         if t['type'] == 'receipt':
             total_income += t['amount']
         else:
             total_expense += t['amount']
-        y -= row_height
-        row_count += 1
-
-    # Draw totals on the same page if there's space
-    if row_count + 3 <= rows_per_page:
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_income', default='Total Income')}: {utils.format_currency(total_income)}")
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_expense', default='Total Expense')}: {utils.format_currency(total_expense)}")
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_net_profit', default='Net Profit')}: {utils.format_currency(total_income - total_expense)}")
-    else:
-        p.showPage()
-        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-        y = title_y - 0.6
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_income', default='Total Income')}: {utils.format_currency(total_income)}")
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_expense', default='Total Expense')}: {utils.format_currency(total_expense)}")
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_net_profit', default='Net Profit')}: {utils.format_currency(total_income - total_expense)}")
-
-    p.save()
-    buffer.seek(0)
-    return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=profit_loss.pdf'})
+    report.add_totals([
+        f"{trans('reports_total_income', default='Total Income')}: {utils.format_currency(total_income)}",
+        f"{trans('reports_total_expense', default='Total Expense')}: {utils.format_currency(total_expense)}",
+        f"{trans('reports_net_profit', default='Net Profit')}: {utils.format_currency(total_income - total_expense)}"
+    ])
+    return report
 
-def generate_profit_loss_csv(cashflows):
-    output = []
-    output.extend(ficore_csv_header(current_user))
-    output.append([trans('general_date', default='Date'), trans('general_party_name', default='Party Name'), trans('general_type', default='Type'), trans('general_amount', default='Amount')])
+def generate_profit_loss_pdf(cashflows):
+    return build_profit_loss_pdf(cashflows, current_user).response('profit_loss.pdf')
+
+def profit_loss_csv_rows(cashflows, user):
+    yield from ficore_csv_header(user)
+    yield [trans('general_date', default='Date'), trans('general_party_name', default='Party Name'), trans('general_type', default='Type'), trans('general_amount', default='Amount')]
     total_income = 0
     total_expense = 0
     for t in cashflows:
-        output.append([utils.format_date(t['created_at']), t['party_name'], trans(t['type'], default=t['type']), utils.format_currency(t['amount'])])
+        yield [utils.format_date(t['created_at']), t['party_name'], trans(t['type'], default=t['type']), utils.format_currency(t['amount'])]
         if t['type'] == 'receipt':
             total_income += t['amount']
         else:
             total_expense += t['amount']
-    output.append(['', '', '', f"{trans('reports_total_income', default='Total Income')}: {utils.format_currency(total_income)}"])
-    output.append(['', '', '', f"{trans('reports_total_expense', default='Total Expense')}: {utils.format_currency(total_expense)}"])
-    output.append(['', '', '', f"{trans('reports_net_profit', default='Net Profit')}: {utils.format_currency(total_income - total_expense)}"])
-    buffer = StringIO()
-    writer = csv.writer(buffer, lineterminator='\n')
-    writer.writerows(output)
-    buffer.seek(0)
-    return Response(buffer.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=profit_loss.csv'})
+    yield ['', '', '', f"{trans('reports_total_income', default='Total Income')}: {utils.format_currency(total_income)}"]
+    yield ['', '', '', f"{trans('reports_total_expense', default='Total Expense')}: {utils.format_currency(total_expense)}"]
+    yield ['', '', '', f"{trans('reports_net_profit', default='Net Profit')}: {utils.format_currency(total_income - total_expense)}"]
 
-def generate_debtors_creditors_pdf(records):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    # Page setup
-    header_height = 0.7
-    extra_space = 0.2
-    row_height = 0.3
-    bottom_margin = 0.5
-    max_y = 10.5
-    title_y = max_y - header_height - extra_space
-    page_height = (max_y - bottom_margin) * inch
-    rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
-
-    def draw_table_headers(y):
-        p.setFillColor(colors.black)
-        p.drawString(1 * inch, y * inch, trans('general_date', default='Date'))
-        p.drawString(2.5 * inch, y * inch, trans('general_name', default='Name'))
-        p.drawString(4 * inch, y * inch, trans('general_type', default='Type'))
-        p.drawString(5 * inch, y * inch, trans('general_amount_owed', default='Amount Owed'))
-        p.drawString(6.5 * inch, y * inch, trans('general_description', default='Description'))
-        return y - row_height
-
-    # Initialize first page
-    draw_ficore_pdf_header(p, current_user, y_start=max_y)
-    p.setFont("Helvetica", 12)
-    p.drawString(1 * inch, title_y * inch, trans('reports_debtors_creditors_report', default='Debtors/Creditors Report'))
-    p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {utils.format_date(datetime.utcnow())}")
-    y = title_y - 0.6
-    y = draw_table_headers(y)
+def generate_profit_loss_csv(cashflows):
+    return stream_csv(profit_loss_csv_rows(cashflows, current_user), 'profit_loss.csv')
 
+def generate_debtors_creditors_pdf(records):
+    report = PDFReport(current_user, trans('reports_debtors_creditors_report', default='Debtors/Creditors Report'))
+    report.start_table(
+        [trans('general_date', default='Date'), trans('general_name', default='Name'), trans('general_type', default='Type'), trans('general_amount_owed', default='Amount Owed'), trans('general_description', default='Description')],
+        [1 * inch, 2.5 * inch, 4 * inch, 5 * inch, 6.5 * inch]
+    )
     total_debtors = 0
     total_creditors = 0
-    row_count = 0
-
     for r in records:
-        if row_count >= rows_per_page:
-            p.showPage()
-            draw_ficore_pdf_header(p, current_user, y_start=max_y)
-            y = title_y - 0.6
-            y = draw_table_headers(y)
-            row_count = 0
-
-        p.drawString(1 * inch, y * inch, utils.format_date(r['created_at']))
-        p.drawString(2.5 * inch, y * inch, r['name'])
-        p.drawString(4 * inch, y * inch, trans(r['type'], default=r['type']))
-        p.drawString(5 * inch, y * inch, utils.format_currency(r['amount_owed']))
-        p.drawString(6.5 * inch, y * inch, r.get('description', '')[:20])
+        report.add_row([utils.format_date(r['created_at']), r['name'], trans(r['type'], default=r['type']), utils.format_currency(r['amount_owed']), r.get('description', '')[:20]])
         if r['type'] == 'debtor':
             total_debtors += r['amount_owed']
         else:
             total_creditors += r['amount_owed']
-        y -= row_height
-        row_count += 1
-
-    if row_count + 2 <= rows_per_page:
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_debtors', default='Total Debtors')}: {utils.format_currency(total_debtors)}")
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_creditors', default='Total Creditors')}: {utils.format_currency(total_creditors)}")
-    else:
-        p.showPage()
-        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-        y = title_y - 0.6
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_debtors', default='Total Debtors')}: {utils.format_currency(total_debtors)}")
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_creditors', default='Total Creditors')}: {utils.format_currency(total_creditors)}")
-
-    p.save()
-    buffer.seek(0)
-    return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=debtors_creditors.pdf'})
+    report.add_totals([
+        f"{trans('reports_total_debtors', default='Total Debtors')}: {utils.format_currency(total_debtors)}",
+        f"{trans('reports_total_creditors', default='Total Creditors')}: {utils.format_currency(total_creditors)}"
+    ])
+    return report.response('debtors_creditors.pdf')
 
 def generate_debtors_creditors_csv(records):
-    output = []
-    output.extend(ficore_csv_header(current_user))
-    output.append([trans('general_date', default='Date'), trans('general_name', default='Name'), trans('general_type', default='Type'), trans('general_amount_owed', default='Amount Owed'), trans('general_description', default='Description')])
-    total_debtors = 0
-    total_creditors = 0
-    for r in records:
-        output.append([utils.format_date(r['created_at']), r['name'], trans(r['type'], default=r['type']), utils.format_currency(r['amount_owed']), r.get('description', '')])
-        if r['type'] == 'debtor':
-            total_debtors += r['amount_owed']
-        else:
-            total_creditors += r['amount_owed']
-    output.append(['', '', '', f"{trans('reports_total_debtors', default='Total Debtors')}: {utils.format_currency(total_debtors)}", ''])
-    output.append(['', '', '', f"{trans('reports_total_creditors', default='Total Creditors')}: {utils.format_currency(total_creditors)}", ''])
-    buffer = StringIO()
-    writer = csv.writer(buffer, lineterminator='\n')
-    writer.writerows(output)
-    buffer.seek(0)
-    return Response(buffer.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=debtors_creditors.csv'})
+    def rows():
+        yield from ficore_csv_header(current_user)
+        yield [trans('general_date', default='Date'), trans('general_name', default='Name'), trans('general_type', default='Type'), trans('general_amount_owed', default='Amount Owed'), trans('general_description', default='Description')]
+        total_debtors = 0
+        total_creditors = 0
+        for r in records:
+            yield [utils.format_date(r['created_at']), r['name'], trans(r['type'], default=r['type']), utils.format_currency(r['amount_owed']), r.get('description', '')]
+            if r['type'] == 'debtor':
+                total_debtors += r['amount_owed']
+            else:
+                total_creditors += r['amount_owed']
+        yield ['', '', '', f"{trans('reports_total_debtors', default='Total Debtors')}: {utils.format_currency(total_debtors)}", '']
+        yield ['', '', '', f"{trans('reports_total_creditors', default='Total Creditors')}: {utils.format_currency(total_creditors)}", '']
+    return stream_csv(rows(), 'debtors_creditors.csv')
 
 def generate_tax_obligations_pdf(tax_reminders):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    # Page setup
-    header_height = 0.7
-    extra_space = 0.2
-    row_height = 0.3
-    bottom_margin = 0.5
-    max_y = 10.5
-    title_y = max_y - header_height - extra_space
-    page_height = (max_y - bottom_margin) * inch
-    rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
-
-    def draw_table_headers(y):
-        p.setFillColor(colors.black)
-        p.drawString(1 * inch, y * inch, trans('general_due_date', default='Due Date'))
-        p.drawString(2.5 * inch, y * inch, trans('general_tax_type', default='Tax Type'))
-        p.drawString(4 * inch, y * inch, trans('general_amount', default='Amount'))
-        p.drawString(5 * inch, y * inch, trans('general_status', default='Status'))
-        return y - row_height
-
-    # Initialize first page
-    draw_ficore_pdf_header(p, current_user, y_start=max_y)
-    p.setFont("Helvetica", 12)
-    p.drawString(1 * inch, title_y * inch, trans('reports_tax_obligations_report', default='Tax Obligations Report'))
-    p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {utils.format_date(datetime.utcnow())}")
-    y = title_y - 0.6
-    y = draw_table_headers(y)
-
+    report = PDFReport(current_user, trans('reports_tax_obligations_report', default='Tax Obligations Report'))
+    report.start_table(
+        [trans('general_due_date', default='Due Date'), trans('general_tax_type', default='Tax Type'), trans('general_amount', default='Amount'), trans('general_status', default='Status')],
+        [1 * inch, 2.5 * inch, 4 * inch, 5 * inch]
+    )
     total_amount = 0
-    row_count = 0
-
     for tr in tax_reminders:
-        if row_count >= rows_per_page:
-            p.showPage()
-            draw_ficore_pdf_header(p, current_user, y_start=max_y)
-            y = title_y - 0.6
-            y = draw_table_headers(y)
-            row_count = 0
-
-        p.drawString(1 * inch, y * inch, utils.format_date(tr['due_date']))
-        p.drawString(2.5 * inch, y * inch, tr['tax_type'])
-        p.drawString(4 * inch, y * inch, utils.format_currency(tr['amount']))
-        p.drawString(5 * inch, y * inch, trans(tr['status'], default=tr['status']))
+        report.add_row([utils.format_date(tr['due_date']), tr['tax_type'], utils.format_currency(tr['amount']), trans(tr['status'], default=tr['status'])])
         total_amount += tr['amount']
-        y -= row_height
-        row_count += 1
-
-    if row_count + 1 <= rows_per_page:
-        y -= row_height
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_tax_amount', default='Total Tax Amount')}: {utils.format_currency(total_amount)}")
-    else:
-        p.showPage()
-        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-        y = title_y - 0.6
-        p.drawString(1 * inch, y * inch, f"{trans('reports_total_tax_amount', default='Total Tax Amount')}: {utils.format_currency(total_amount)}")
-
-    p.save()
-    buffer.seek(0)
-    return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=tax_obligations.pdf'})
+    report.add_totals([f"{trans('reports_total_tax_amount', default='Total Tax Amount')}: {utils.format_currency(total_amount)}"])
+    return report.response('tax_obligations.pdf')
 
 def generate_tax_obligations_csv(tax_reminders):
-    output = []
-    output.extend(ficore_csv_header(current_user))
-    output.append([trans('general_due_date', default='Due Date'), trans('general_tax_type', default='Tax Type'), trans('general_amount', default='Amount'), trans('general_status', default='Status')])
-    total_amount = 0
-    for tr in tax_reminders:
-        output.append([utils.format_date(tr['due_date']), tr['tax_type'], utils.format_currency(tr['amount']), trans(tr['status'], default=tr['status'])])
-        total_amount += tr['amount']
-    output.append(['', '', f"{trans('reports_total_tax_amount', default='Total Tax Amount')}: {utils.format_currency(total_amount)}", ''])
-    buffer = StringIO()
-    writer = csv.writer(buffer, lineterminator='\n')
-    writer.writerows(output)
-    buffer.seek(0)
-    return Response(buffer.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=tax_obligations.csv'})
+    def rows():
+        yield from ficore_csv_header(current_user)
+        yield [trans('general_due_date', default='Due Date'), trans('general_tax_type', default='Tax Type'), trans('general_amount', default='Amount'), trans('general_status', default='Status')]
+        total_amount = 0
+        for tr in tax_reminders:
+            yield [utils.format_date(tr['due_date']), tr['tax_type'], utils.format_currency(tr['amount']), trans(tr['status'], default=tr['status'])]
+            total_amount += tr['amount']
+        yield ['', '', f"{trans('reports_total_tax_amount', default='Total Tax Amount')}: {utils.format_currency(total_amount)}", '']
+    return stream_csv(rows(), 'tax_obligations.csv')
 
 def generate_budget_performance_pdf(budget_data):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    # Page setup
-    header_height = 0.7
-    extra_space = 0.2
-    row_height = 0.3
-    bottom_margin = 0.5
-    max_y = 10.5
-    title_y = max_y - header_height - extra_space
-    page_height = (max_y - bottom_margin) * inch
-    rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
-
-    def draw_table_headers(y):
-        p.setFillColor(colors.black)
-        headers = [
-            trans('general_date', default='Date'),
-            trans('general_income', default='Income'),
-            trans('general_actual_income', default='Actual Income'),
-            trans('general_income_variance', default='Income Variance'),
-            trans('general_fixed_expenses', default='Fixed Expenses'),
-            trans('general_variable_expenses', default='Variable Expenses'),
-            trans('general_actual_expenses', default='Actual Expenses'),
-            trans('general_expense_variance', default='Expense Variance')
-        ]
-        x_positions = [1 * inch + i * 0.9 * inch for i in range(len(headers))]
-        for header, x in zip(headers, x_positions):
-            p.drawString(x, y * inch, header)
-        return y - row_height, x_positions
-
-    # Initialize first page
-    draw_ficore_pdf_header(p, current_user, y_start=max_y)
-    p.setFont("Helvetica", 10)
-    p.drawString(1 * inch, title_y * inch, trans('reports_budget_performance_report', default='Budget Performance Report'))
-    p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {utils.format_date(datetime.utcnow())}")
-    y = title_y - 0.6
-    y, x_positions = draw_table_headers(y)
-
-    row_count = 0
-    for bd in budget_data:
-        if row_count >= rows_per_page:
-            p.showPage()
-            draw_ficore_pdf_header(p, current_user, y_start=max_y)
-            y = title_y - 0.6
-            y, x_positions = draw_table_headers(y)
-            row_count = 0
-
-        values = [
-            utils.format_date(bd['created_at']),
-            utils.format_currency(bd['income']),
-            utils.format_currency(bd['actual_income']),
-            utils.format_currency(bd['income_variance']),
-            utils.format_currency(bd['fixed_expenses']),
-            utils.format_currency(bd['variable_expenses']),
-            utils.format_currency(bd['actual_expenses']),
-            utils.format_currency(bd['expense_variance'])
-        ]
-        for value, x in zip(values, x_positions):
-            p.drawString(x, y * inch, value)
-        y -= row_height
-        row_count += 1
-
-    p.save()
-    buffer.seek(0)
-    return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=budget_performance.pdf'})
-
-def generate_budget_performance_csv(budget_data):
-    output = []
-    output.extend(ficore_csv_header(current_user))
-    output.append([
+    report = PDFReport(current_user, trans('reports_budget_performance_report', default='Budget Performance Report'), font_size=10)
+    headers = [
         trans('general_date', default='Date'),
         trans('general_income', default='Income'),
         trans('general_actual_income', default='Actual Income'),
@@ -962,9 +789,10 @@ def generate_budget_performance_csv(budget_data):
         trans('general_variable_expenses', default='Variable Expenses'),
         trans('general_actual_expenses', default='Actual Expenses'),
         trans('general_expense_variance', default='Expense Variance')
-    ])
+    ]
+    report.start_table(headers, [1 * inch + i * 0.9 * inch for i in range(len(headers))])
     for bd in budget_data:
-        output.append([
+        report.add_row([
             utils.format_date(bd['created_at']),
             utils.format_currency(bd['income']),
             utils.format_currency(bd['actual_income']),
@@ -974,365 +802,234 @@ def generate_budget_performance_csv(budget_data):
             utils.format_currency(bd['actual_expenses']),
             utils.format_currency(bd['expense_variance'])
         ])
-    buffer = StringIO()
-    writer = csv.writer(buffer, lineterminator='\n')
-    writer.writerows(output)
-    buffer.seek(0)
-    return Response(buffer.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=budget_performance.csv'})
+    return report.response('budget_performance.pdf')
+
+def generate_budget_performance_csv(budget_data):
+    def rows():
+        yield from ficore_csv_header(current_user)
+        yield [
+            trans('general_date', default='Date'),
+            trans('general_income', default='Income'),
+            trans('general_actual_income', default='Actual Income'),
+            trans('general_income_variance', default='Income Variance'),
+            trans('general_fixed_expenses', default='Fixed Expenses'),
+            trans('general_variable_expenses', default='Variable Expenses'),
+            trans('general_actual_expenses', default='Actual Expenses'),
+            trans('general_expense_variance', default='Expense Variance')
+        ]
+        for bd in budget_data:
+            yield [
+                utils.format_date(bd['created_at']),
+                utils.format_currency(bd['income']),
+                utils.format_currency(bd['actual_income']),
+                utils.format_currency(bd['income_variance']),
+                utils.format_currency(bd['fixed_expenses']),
+                utils.format_currency(bd['variable_expenses']),
+                utils.format_currency(bd['actual_expenses']),
+                utils.format_currency(bd['expense_variance'])
+            ]
+    return stream_csv(rows(), 'budget_performance.csv')
 
 def generate_shopping_report_pdf(shopping_data):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    # Page setup
-    header_height = 0.7
-    extra_space = 0.2
-    row_height = 0.3
+    report = PDFReport(current_user, trans('reports_shopping_report', default='Shopping Report'), font_size=10)
     section_space = 0.5
-    bottom_margin = 0.5
-    max_y = 10.5
-    title_y = max_y - header_height - extra_space
-    page_height = (max_y - bottom_margin) * inch
-    rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
-
-    def draw_list_headers(y):
-        p.setFont("Helvetica", 10)
-        headers = [
+
+    # Shopping Lists Section
+    report.start_table(
+        [
             trans('general_date', default='Date'),
             trans('shopping_list_name', default='List Name'),
             trans('shopping_budget', default='Budget'),
             trans('shopping_total_spent', default='Total Spent'),
             trans('shopping_collaborators', default='Collaborators')
-        ]
-        x_positions = [1 * inch, 2 * inch, 3.5 * inch, 4.5 * inch, 5.5 * inch]
-        for header, x in zip(headers, x_positions):
-            p.drawString(x, y * inch, header)
-        return y - row_height, x_positions
-
-    def draw_item_headers(y):
-        p.setFont("Helvetica", 10)
-        headers = [
-            trans('general_date', default='Date'),
-            trans('shopping_item_name', default='Item Name'),
-            trans('shopping_quantity', default='Quantity'),
-            trans('shopping_price', default='Price'),
-            trans('shopping_status', default='Status'),
-            trans('shopping_category', default='Category'),
-            trans('shopping_store', default='Store')
-        ]
-        x_positions = [1 * inch, 2 * inch, 3 * inch, 3.5 * inch, 4 * inch, 4.8 * inch, 5.5 * inch]
-        for header, x in zip(headers, x_positions):
-            p.drawString(x, y * inch, header)
-        return y - row_height, x_positions
-
-    def draw_suggestion_headers(y):
-        p.setFont("Helvetica", 10)
-        headers = [
-            trans('general_date', default='Date'),
-            trans('shopping_item_name', default='Item Name'),
-            trans('shopping_quantity', default='Quantity'),
-            trans('shopping_price', default='Price'),
-            trans('shopping_status', default='Status'),
-            trans('shopping_category', default='Category')
-        ]
-        x_positions = [1 * inch, 2 * inch, 3 * inch, 3.5 * inch, 4 * inch, 4.8 * inch]
-        for header, x in zip(headers, x_positions):
-            p.drawString(x, y * inch, header)
-        return y - row_height, x_positions
-
-    # Initialize first page
-    draw_ficore_pdf_header(p, current_user, y_start=max_y)
-    p.setFont("Helvetica", 12)
-    p.drawString(1 * inch, title_y * inch, trans('reports_shopping_report', default='Shopping Report'))
-    p.drawString(1 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {utils.format_date(datetime.utcnow())}")
-    y = title_y - 0.6
-
-    # Shopping Lists Section
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(1 * inch, y * inch, trans('shopping_lists', default='Shopping Lists'))
-    y -= row_height
-    y, x_positions = draw_list_headers(y)
-    total_budget = 0
-    total_spent = 0
-    row_count = 0
-
-    for lst in shopping_data['lists']:
-        if row_count >= rows_per_page:
-            p.showPage()
-            draw_ficore_pdf_header(p, current_user, y_start=max_y)
-            y = title_y - 0.6
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(1 * inch, y * inch, trans('shopping_lists', default='Shopping Lists'))
-            y -= row_height
-            y, x_positions = draw_list_headers(y)
-            row_count = 0
-
-        p.drawString(x_positions[0], y * inch, utils.format_date(lst['created_at']))
-        p.drawString(x_positions[1], y * inch, lst['name'][:20])
-        p.drawString(x_positions[2], y * inch, utils.format_currency(lst['budget']))
-        p.drawString(x_positions[3], y * inch, utils.format_currency(lst['total_spent']))
-        p.drawString(x_positions[4], y * inch, ', '.join(lst['collaborators'])[:20])
-        total_budget += lst['budget']
-        total_spent += lst['total_spent']
-        y -= row_height
-        row_count += 1
-
-    if row_count + 2 <= rows_per_page:
-        y -= row_height
-        p.drawString(x_positions[0], y * inch, f"{trans('shopping_total_budget', default='Total Budget')}: {utils.format_currency(total_budget)}")
-        y -= row_height
-        p.drawString(x_positions[0], y * inch, f"{trans('shopping_total_spent', default='Total Spent')}: {utils.format_currency(total_spent)}")
-    else:
-        p.showPage()
-        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-        y = title_y - 0.6
-        p.drawString(x_positions[0], y * inch, f"{trans('shopping_total_budget', default='Total Budget')}: {utils.format_currency(total_budget)}")
-        y -= row_height
-        p.drawString(x_positions[0], y * inch, f"{trans('shopping_total_spent', default='Total Spent')}: {utils.format_currency(total_spent)}")
-    y -= section_space
-
-    # Shopping Items Section
-    if row_count + 3 >= rows_per_page:
-        p.showPage()
-        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-        y = title_y - 0.6
-        row_count = 0
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(1 * inch, y * inch, trans('shopping_items', default='Shopping Items'))
-    y -= row_height
-    y, x_positions = draw_item_headers(y)
-    row_count += 2
-
-    total_price = 0
-    for item in shopping_data['items']:
-        if row_count >= rows_per_page:
-            p.showPage()
-            draw_ficore_pdf_header(p, current_user, y_start=max_y)
-            y = title_y - 0.6
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(1 * inch, y * inch, trans('shopping_items', default='Shopping Items'))
-            y -= row_height
-            y, x_positions = draw_item_headers(y)
-            row_count = 0
-
-        p.drawString(x_positions[0], y * inch, utils.format_date(item['created_at']))
-        p.drawString(x_positions[1], y * inch, item['name'][:20])
-        p.drawString(x_positions[2], y * inch, str(item['quantity']))
-        p.drawString(x_positions[3], y * inch, utils.format_currency(item['price']))
-        p.drawString(x_positions[4], y * inch, trans(item['status'], default=item['status']))
-        p.drawString(x_positions[5], y * inch, item['category'][:15])
-        p.drawString(x_positions[6], y * inch, item['store'][:15])
-        total_price += item['price'] * item['quantity']
-        y -= row_height
-        row_count += 1
-
-    if row_count + 1 <= rows_per_page:
-        y -= row_height
-        p.drawString(x_positions[0], y * inch, f"{trans('shopping_total_price', default='Total Price')}: {utils.format_currency(total_price)}")
-    else:
-        p.showPage()
-        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-        y = title_y - 0.6
-        p.drawString(x_positions[0], y * inch, f"{trans('shopping_total_price', default='Total Price')}: {utils.format_currency(total_price)}")
-    y -= section_space
-
-    # Suggestions Section
-    if row_count + 3 >= rows_per_page:
-        p.showPage()
-        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-        y = title_y - 0.6
-        row_count = 0
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(1 * inch, y * inch, trans('shopping_suggestions', default='Suggestions'))
-    y -= row_height
-    y, x_positions = draw_suggestion_headers(y)
-    row_count += 2
-
-    total_suggestion_price = 0
-    for sug in shopping_data['suggestions']:
-        if row_count >= rows_per_page:
-            p.showPage()
-            draw_ficore_pdf_header(p, current_user, y_start=max_y)
-            y = title_y - 0.6
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(1 * inch, y * inch, trans('shopping_suggestions', default='Suggestions'))
-            y -= row_height
-            y, x_positions = draw_suggestion_headers(y)
-            row_count = 0
-
-        p.drawString(x_positions[0], y * inch, utils.format_date(sug['created_at']))
-        p.drawString(x_positions[1], y * inch, sug['name'][:20])
-        p.drawString(x_positions[2], y * inch, str(sug['quantity']))
-        p.drawString(x_positions[3], y * inch, utils.format_currency(sug['price']))
-        p.drawString(x_positions[4], y * inch, trans(sug['status'], default=sug['status']))
-        p.drawString(x_positions[5], y * inch, sug['category'][:15])
-        total_suggestion_price += sug['price'] * sug['quantity']
-        y -= row_height
-        row_count += 1
-
-    if row_count + 1 <= rows_per_page:
-        y -= row_height
-        p.drawString(x_positions[0], y * inch, f"{trans('shopping_total_suggestion_price', default='Total Suggestion Price')}: {utils.format_currency(total_suggestion_price)}")
-    else:
-        p.showPage()
-        draw_ficore_pdf_header(p, current_user, y_start=max_y)
-        y = title_y - 0.6
-        p.drawString(x_positions[0], y * inch, f"{trans('shopping_total_suggestion_price', default='Total Suggestion Price')}: {utils.format_currency(total_suggestion_price)}")
-
-    p.save()
-    buffer.seek(0)
-    return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=shopping_report.pdf'})
-
-def generate_shopping_report_csv(shopping_data):
-    output = []
-    output.extend(ficore_csv_header(current_user))
-    
-    # Shopping Lists Section
-    output.append([trans('shopping_lists', default='Shopping Lists')])
-    output.append([
-        trans('general_date', default='Date'),
-        trans('shopping_list_name', default='List Name'),
-        trans('shopping_budget', default='Budget'),
-        trans('shopping_total_spent', default='Total Spent'),
-        trans('shopping_collaborators', default='Collaborators')
-    ])
+        ],
+        [1 * inch, 2 * inch, 3.5 * inch, 4.5 * inch, 5.5 * inch],
+        section_title=trans('shopping_lists', default='Shopping Lists')
+    )
     total_budget = 0
     total_spent = 0
     for lst in shopping_data['lists']:
-        output.append([
+        report.add_row([
             utils.format_date(lst['created_at']),
-            lst['name'],
+            lst['name'][:20],
             utils.format_currency(lst['budget']),
             utils.format_currency(lst['total_spent']),
-            ', '.join(lst['collaborators'])
+            ', '.join(lst['collaborators'])[:20]
         ])
         total_budget += lst['budget']
         total_spent += lst['total_spent']
-    output.append(['', '', f"{trans('shopping_total_budget', default='Total Budget')}: {utils.format_currency(total_budget)}", f"{trans('shopping_total_spent', default='Total Spent')}: {utils.format_currency(total_spent)}", ''])
-    output.append([])
+    report.add_totals([
+        f"{trans('shopping_total_budget', default='Total Budget')}: {utils.format_currency(total_budget)}",
+        f"{trans('shopping_total_spent', default='Total Spent')}: {utils.format_currency(total_spent)}"
+    ])
+    report.add_space(section_space)
 
     # Shopping Items Section
-    output.append([trans('shopping_items', default='Shopping Items')])
-    output.append([
-        trans('general_date', default='Date'),
-        trans('shopping_item_name', default='Item Name'),
-        trans('shopping_quantity', default='Quantity'),
-        trans('shopping_price', default='Price'),
-        trans('shopping_status', default='Status'),
-        trans('shopping_category', default='Category'),
-        trans('shopping_store', default='Store')
-    ])
+    report.start_table(
+        [
+            trans('general_date', default='Date'),
+            trans('shopping_item_name', default='Item Name'),
+            trans('shopping_quantity', default='Quantity'),
+            trans('shopping_price', default='Price'),
+            trans('shopping_status', default='Status'),
+            trans('shopping_category', default='Category'),
+            trans('shopping_store', default='Store')
+        ],
+        [1 * inch, 2 * inch, 3 * inch, 3.5 * inch, 4 * inch, 4.8 * inch, 5.5 * inch],
+        section_title=trans('shopping_items', default='Shopping Items')
+    )
     total_price = 0
     for item in shopping_data['items']:
-        output.append([
+        report.add_row([
             utils.format_date(item['created_at']),
-            item['name'],
+            item['name'][:20],
             item['quantity'],
             utils.format_currency(item['price']),
             trans(item['status'], default=item['status']),
-            item['category'],
-            item['store']
+            item['category'][:15],
+            item['store'][:15]
         ])
         total_price += item['price'] * item['quantity']
-    output.append(['', '', '', f"{trans('shopping_total_price', default='Total Price')}: {utils.format_currency(total_price)}", '', '', ''])
-    output.append([])
+    report.add_totals([f"{trans('shopping_total_price', default='Total Price')}: {utils.format_currency(total_price)}"])
+    report.add_space(section_space)
 
     # Suggestions Section
-    output.append([trans('shopping_suggestions', default='Suggestions')])
-    output.append([
-        trans('general_date', default='Date'),
-        trans('shopping_item_name', default='Item Name'),
-        trans('shopping_quantity', default='Quantity'),
-        trans('shopping_price', default='Price'),
-        trans('shopping_status', default='Status'),
-        trans('shopping_category', default='Category')
-    ])
+    report.start_table(
+        [
+            trans('general_date', default='Date'),
+            trans('shopping_item_name', default='Item Name'),
+            trans('shopping_quantity', default='Quantity'),
+            trans('shopping_price', default='Price'),
+            trans('shopping_status', default='Status'),
+            trans('shopping_category', default='Category')
+        ],
+        [1 * inch, 2 * inch, 3 * inch, 3.5 * inch, 4 * inch, 4.8 * inch],
+        section_title=trans('shopping_suggestions', default='Suggestions')
+    )
     total_suggestion_price = 0
     for sug in shopping_data['suggestions']:
-        output.append([
+        report.add_row([
             utils.format_date(sug['created_at']),
-            sug['name'],
+            sug['name'][:20],
             sug['quantity'],
             utils.format_currency(sug['price']),
             trans(sug['status'], default=sug['status']),
-            sug['category']
+            sug['category'][:15]
         ])
         total_suggestion_price += sug['price'] * sug['quantity']
-    output.append(['', '', '', f"{trans('shopping_total_suggestion_price', default='Total Suggestion Price')}: {utils.format_currency(total_suggestion_price)}", '', ''])
+    report.add_totals([f"{trans('shopping_total_suggestion_price', default='Total Suggestion Price')}: {utils.format_currency(total_suggestion_price)}"])
+    return report.response('shopping_report.pdf')
 
-    buffer = StringIO()
-    writer = csv.writer(buffer, lineterminator='\n')
-    writer.writerows(output)
-    buffer.seek(0)
-    return Response(buffer.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=shopping_report.csv'})
+def generate_shopping_report_csv(shopping_data):
+    def rows():
+        yield from ficore_csv_header(current_user)
+    
+        # Shopping Lists Section
+        yield [trans('shopping_lists', default='Shopping Lists')]
+        yield [
+            trans('general_date', default='Date'),
+            trans('shopping_list_name', default='List Name'),
+            trans('shopping_budget', default='Budget'),
+            trans('shopping_total_spent', default='Total Spent'),
+            trans('shopping_collaborators', default='Collaborators')
+        ]
+        total_budget = 0
+        total_spent = 0
+        for lst in shopping_data['lists']:
+            yield [
+                utils.format_date(lst['created_at']),
+                lst['name'],
+                utils.format_currency(lst['budget']),
+                utils.format_currency(lst['total_spent']),
+                ', '.join(lst['collaborators'])
+            ]
+            total_budget += lst['budget']
+            total_spent += lst['total_spent']
+        yield ['', '', f"{trans('shopping_total_budget', default='Total Budget')}: {utils.format_currency(total_budget)}", f"{trans('shopping_total_spent', default='Total Spent')}: {utils.format_currency(total_spent)}", '']
+        yield []
+
+        # Shopping Items Section
+        yield [trans('shopping_items', default='Shopping Items')]
+        yield [
+            trans('general_date', default='Date'),
+            trans('shopping_item_name', default='Item Name'),
+            trans('shopping_quantity', default='Quantity'),
+            trans('shopping_price', default='Price'),
+            trans('shopping_status', default='Status'),
+            trans('shopping_category', default='Category'),
+            trans('shopping_store', default='Store')
+        ]
+        total_price = 0
+        for item in shopping_data['items']:
+            yield [
+                utils.format_date(item['created_at']),
+                item['name'],
+                item['quantity'],
+                utils.format_currency(item['price']),
+                trans(item['status'], default=item['status']),
+                item['category'],
+                item['store']
+            ]
+            total_price += item['price'] * item['quantity']
+        yield ['', '', '', f"{trans('shopping_total_price', default='Total Price')}: {utils.format_currency(total_price)}", '', '', '']
+        yield []
 
-def generate_customer_report_pdf(report_data):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    # Page setup
-    header_height = 0.7
-    extra_space = 0.2
-    row_height = 0.2
-    bottom_margin = 0.5
-    max_y = 10.5
-    title_y = max_y - header_height - extra_space
-    page_height = (max_y - bottom_margin) * inch
-    rows_per_page = int((page_height - (title_y - 0.6) * inch) / (row_height * inch))
-
-    def draw_table_headers(y):
-        p.setFillColor(colors.black)
-        headers = [
-            'Username', 'Email', 'Role', 'Credits', 'Lang',
-            'Income', 'Fixed Exp', 'Var Exp', 'Surplus',
-            'Pending Bills', 'Paid Bills', 'Overdue Bills',
-            'Lessons', 'Tax Due', 'Tax Amt'
+        # Suggestions Section
+        yield [trans('shopping_suggestions', default='Suggestions')]
+        yield [
+            trans('general_date', default='Date'),
+            trans('shopping_item_name', default='Item Name'),
+            trans('shopping_quantity', default='Quantity'),
+            trans('shopping_price', default='Price'),
+            trans('shopping_status', default='Status'),
+            trans('shopping_category', default='Category')
         ]
-        x_positions = [0.5 * inch + i * 0.3 * inch for i in range(len(headers))]
-        for header, x in zip(headers, x_positions):
-            p.drawString(x, y * inch, header)
-        return y - row_height, x_positions
-
-    # Initialize first page
-    draw_ficore_pdf_header(p, current_user, y_start=max_y)
-    p.setFont("Helvetica", 8)
-    p.drawString(0.5 * inch, title_y * inch, trans('reports_customer_report', default='Customer Report'))
-    p.drawString(0.5 * inch, (title_y - 0.3) * inch, f"{trans('reports_generated_on', default='Generated on')}: {utils.format_date(datetime.utcnow())}")
-    y = title_y - 0.6
-    y, x_positions = draw_table_headers(y)
-
-    row_count = 0
-    for data in report_data:
-        if row_count >= rows_per_page:
-            p.showPage()
-            draw_ficore_pdf_header(p, current_user, y_start=max_y)
-            y = title_y - 0.6
-            y, x_positions = draw_table_headers(y)
-            row_count = 0
+        total_suggestion_price = 0
+        for sug in shopping_data['suggestions']:
+            yield [
+                utils.format_date(sug['created_at']),
+                sug['name'],
+                sug['quantity'],
+                utils.format_currency(sug['price']),
+                trans(sug['status'], default=sug['status']),
+                sug['category']
+            ]
+            total_suggestion_price += sug['price'] * sug['quantity']
+        yield ['', '', '', f"{trans('shopping_total_suggestion_price', default='Total Suggestion Price')}: {utils.format_currency(total_suggestion_price)}", '', '']
 
+    return stream_csv(rows(), 'shopping_report.csv')
+
+def build_customer_report_pdf(report_data, user):
+    report = PDFReport(user, trans('reports_customer_report', default='Customer Report'), font_size=8, row_height=0.2, margin_x=0.5)
+    headers = [
+        'Username', 'Email', 'Role', 'Credits', 'Lang',
+        'Income', 'Fixed Exp', 'Var Exp', 'Surplus',
+        'Pending Bills', 'Paid Bills', 'Overdue Bills',
+        'Lessons', 'Tax Due', 'Tax Amt'
+    ]
+    report.start_table(headers, [0.5 * inch + i * 0.3 * inch for i in range(len(headers))])
+    for data in report_data:
         values = [
-            data['username'], data['email'], data['role'], str(data['ficore_credit_balance']), data['language'],
-            str(data['budget_income']), str(data['budget_fixed_expenses']), str(data['budget_variable_expenses']), str(data['budget_surplus_deficit']),
-            str(data['pending_bills']), str(data['paid_bills']), str(data['overdue_bills']),
-            str(data['lessons_completed']), data['next_tax_due_date'], str(data['next_tax_amount'])
+            data['username'], data['email'], data['role'], data['ficore_credit_balance'], data['language'],
+            data['budget_income'], data['budget_fixed_expenses'], data['budget_variable_expenses'], data['budget_surplus_deficit'],
+            data['pending_bills'], data['paid_bills'], data['overdue_bills'],
+            data['lessons_completed'], data['next_tax_due_date'], data['next_tax_amount']
         ]
-        for value, x in zip(values, x_positions):
-            p.drawString(x, y * inch, str(value)[:15])
-        y -= row_height
-        row_count += 1
+        report.add_row([str(value)[:15] for value in values])
+    return report
 
-    p.save()
-    buffer.seek(0)
-    return Response(buffer, mimetype='application/pdf', headers={'Content-Disposition': 'attachment;filename=customer_report.pdf'})
+def generate_customer_report_pdf(report_data):
+    return build_customer_report_pdf(report_data, current_user).response('customer_report.pdf')
 
-def generate_customer_report_csv(report_data):
-    output = []
-    output.extend(ficore_csv_header(current_user))
+def customer_report_csv_rows(report_data, user):
+    yield from ficore_csv_header(user)
     headers = [
         'Username', 'Email', 'Role', 'Ficore Credit Balance', 'Language',
         'Budget Income', 'Budget Fixed Expenses', 'Budget Variable Expenses', 'Budget Surplus/Deficit',
         'Pending Bills', 'Paid Bills', 'Overdue Bills',
         'Lessons Completed', 'Next Tax Due Date', 'Next Tax Amount'
     ]
-    output.append(headers)
+    yield headers
     for data in report_data:
         row = [
             data['username'], data['email'], data['role'], data['ficore_credit_balance'], data['language'],
@@ -1340,9 +1037,120 @@ def generate_customer_report_csv(report_data):
             data['pending_bills'], data['paid_bills'], data['overdue_bills'],
             data['lessons_completed'], data['next_tax_due_date'], data['next_tax_amount']
         ]
-        output.append(row)
-    buffer = StringIO()
-    writer = csv.writer(buffer, lineterminator='\n')
-    writer.writerows(output)
-    buffer.seek(0)
-    return Response(buffer.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment;filename=customer_report.csv'})
+        yield row
+
+def generate_customer_report_csv(report_data):
+    return stream_csv(customer_report_csv_rows(report_data, current_user), 'customer_report.csv')
+
+def date_range_params(start_date, end_date):
+    """Convert optional form dates into an inclusive datetime range for a report job."""
+    return {
+        'start_date': datetime.combine(start_date, datetime.min.time()) if start_date else None,
+        'end_date': datetime.combine(end_date, datetime.max.time()) if end_date else None
+    }
+
+def build_profit_loss_artifact(db, job, user):
+    query = {} if job['is_admin'] else {'user_id': job['user_id']}
+    params = job.get('params', {})
+    if params.get('start_date'):
+        query['created_at'] = {'$gte': params['start_date']}
+    if params.get('end_date'):
+        query['created_at'] = query.get('created_at', {}) | {'$lte': params['end_date']}
+    cashflows = (to_dict_cashflow(cf) for cf in db.cashflows.find(query).sort('created_at', -1).batch_size(EXPORT_BATCH_SIZE))
+    if job['format'] == 'csv':
+        return write_csv_artifact(profit_loss_csv_rows(cashflows, user))
+    return build_profit_loss_pdf(cashflows, user).finish()
+
+def build_customer_report_artifact(db, job, user):
+    report_data = iter_customer_report(db, job.get('params', {}).get('role'))
+    if job['format'] == 'csv':
+        return write_csv_artifact(customer_report_csv_rows(report_data, user))
+    return build_customer_report_pdf(report_data, user).finish()
+
+register_report_builder('profit_loss', build_profit_loss_artifact, roles=['trader'])
+register_report_builder('customer_report', build_customer_report_artifact, roles=['admin'])
+
+def to_dict_report_job(job):
+    result = {
+        'id': str(job['_id']),
+        'report_type': job['report_type'],
+        'format': job['format'],
+        'status': job['status'],
+        'created_at': utils.format_date(job.get('created_at'), format_type='iso'),
+        'completed_at': utils.format_date(job.get('completed_at'), format_type='iso') if job.get('completed_at') else None,
+        'status_url': url_for('reports.report_job_status', job_id=str(job['_id']))
+    }
+    if job['status'] == 'completed':
+        result['download_url'] = url_for('reports.download_report_job', job_id=str(job['_id']))
+    elif job['status'] == 'failed':
+        result['error'] = trans('reports_generation_error', default='An error occurred')
+    return result
+
+def render_report_job(job_id):
+    """Render the page that polls a background report job until it can be downloaded."""
+    return render_template(
+        'reports/report_job.html',
+        job_id=job_id,
+        status_url=url_for('reports.report_job_status', job_id=job_id),
+        title=utils.trans('reports_job_title', default='Preparing Report', lang=session.get('lang', 'en'))
+    )
+
+def _find_own_report_job(db, job_id):
+    if not ObjectId.is_valid(job_id):
+        return None
+    return get_report_job(db, job_id, None if utils.is_admin() else current_user.id)
+
+@reports_bp.route('/jobs', methods=['POST'])
+@login_required
+@utils.requires_role(['personal', 'trader', 'admin'])
+def create_report_job():
+    """Queue a CSV or PDF report to be built in the background."""
+    data = request.get_json(silent=True) or request.form
+    report_type = data.get('report_type')
+    output_format = data.get('format', 'csv')
+    entry = REPORT_BUILDERS.get(report_type)
+    if not entry or output_format not in ('csv', 'pdf'):
+        return jsonify({'error': trans('reports_invalid_request', default='Invalid report request')}), 400
+    if not utils.is_admin() and current_user.role not in entry['roles']:
+        return jsonify({'error': trans('general_access_denied', default='Access denied')}), 403
+    if not utils.is_admin() and not utils.check_ficore_credit_balance(entry['credit_cost']):
+        return jsonify({'error': trans('debtors_insufficient_credits', default='Insufficient credits to generate a report. Request more credits.')}), 402
+    try:
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date() if data.get('start_date') else None
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None
+    except ValueError:
+        return jsonify({'error': trans('reports_invalid_request', default='Invalid report request')}), 400
+    params = date_range_params(start_date, end_date)
+    if data.get('role'):
+        params['role'] = data['role']
+    try:
+        job_id = enqueue_report_job(
+            current_app._get_current_object(), current_user.id, report_type, output_format, params,
+            is_admin=utils.is_admin()
+        )
+        job = get_report_job(utils.get_mongo_db(), job_id)
+        return jsonify(to_dict_report_job(job)), 202
+    except Exception as e:
+        logger.error(f"Error queueing {report_type} report for user {current_user.id}: {str(e)}", exc_info=True)
+        return jsonify({'error': trans('reports_generation_error', default='An error occurred')}), 500
+
+@reports_bp.route('/jobs/<job_id>')
+@login_required
+def report_job_status(job_id):
+    """Return the status of a background report job."""
+    job = _find_own_report_job(utils.get_mongo_db(), job_id)
+    if not job:
+        return jsonify({'error': trans('reports_job_not_found', default='Report not found')}), 404
+    return jsonify(to_dict_report_job(job))
+
+@reports_bp.route('/jobs/<job_id>/download')
+@login_required
+def download_report_job(job_id):
+    """Stream a finished report artifact from GridFS."""
+    db = utils.get_mongo_db()
+    job = _find_own_report_job(db, job_id)
+    if not job or job['status'] != 'completed':
+        abort(404)
+    grid_out = GridFS(db).get(job['file_id'])
+    return send_file(grid_out, mimetype=grid_out.content_type, as_attachment=True,
+                     download_name=f"{job['report_type']}.{job['format']}")
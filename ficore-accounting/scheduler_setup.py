@@ -1,32 +1,56 @@
 import atexit
 import signal
 import sys
+import socket
+import threading
+import uuid
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.mongodb import MongoDBJobStore
 from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+from pymongo.errors import DuplicateKeyError, PyMongoError
 from datetime import datetime, date, timedelta
-from flask import url_for
-from mailersend_email import send_email, trans, EMAIL_CONFIG
 import time
 import psutil
 import os
-from utils import get_mongo_db, send_sms_reminder, send_whatsapp_reminder, logger
+from utils import get_mongo_db, logger, to_due_datetime
+from models import migrate_bill_due_dates
+from balances import reconcile_user_balances
+from bill_reminders import send_due_bill_reminders
+from reports.jobs import requeue_stale_report_jobs, cleanup_report_artifacts
+from delayed_deletions import process_due_deletions, DELETION_POLL_SECONDS
+from job_metrics import record_job_run
+
+def _record_run(app, job_name, started_at, duration, memory_start, memory_end, result=None, error=None):
+    try:
+        with app.app_context():
+            record_job_run(get_mongo_db(), job_name, started_at, duration, memory_start, memory_end, result=result, error=error)
+    except Exception as e:
+        logger.error(f"Failed to record metrics for job '{job_name}': {str(e)}")
 
 def log_job_metrics(job_name):
-    """Log duration and memory usage for a job."""
+    """
+    Log duration and memory usage for a job, plus any counts it returns as a dict,
+    and record the run in job_runs (see job_metrics). The job's first argument
+    must be the app.
+    """
     def decorator(func):
-        def wrapper(*args, **kwargs):
+        def wrapper(app, *args, **kwargs):
+            started_at = datetime.utcnow()
             start_time = time.time()
             process = psutil.Process(os.getpid())
             start_memory = process.memory_info().rss / 1024 / 1024  # MB
             try:
-                result = func(*args, **kwargs)
+                result = func(app, *args, **kwargs)
                 duration = time.time() - start_time
                 end_memory = process.memory_info().rss / 1024 / 1024  # MB
+                counts = ''.join(f", {key}={value}" for key, value in result.items()) if isinstance(result, dict) else ''
                 logger.info(
                     f"Job '{job_name}' completed: duration={duration:.2f}s, "
-                    f"memory_start={start_memory:.2f}MB, memory_end={end_memory:.2f}MB"
+                    f"memory_start={start_memory:.2f}MB, memory_end={end_memory:.2f}MB{counts}"
                 )
+                _record_run(app, job_name, started_at, duration, start_memory, end_memory, result=result)
                 return result
             except Exception as e:
                 duration = time.time() - start_time
@@ -36,170 +60,41 @@ def log_job_metrics(job_name):
                     f"memory_start={start_memory:.2f}MB, memory_end={end_memory:.2f}MB",
                     exc_info=True
                 )
+                _record_run(app, job_name, started_at, duration, start_memory, end_memory, error=e)
                 raise
+        wrapper.__name__ = func.__name__
         return wrapper
     return decorator
 
 @log_job_metrics('update_overdue_status')
 def update_overdue_status(app):
-    """Update status to overdue for past-due bills."""
+    """Mark pending and unpaid bills due before today as overdue with a single update_many."""
     with app.app_context():
         try:
             db = get_mongo_db()
-            bills_collection = db.bills
-            today = date.today()
-            bills = bills_collection.find({'status': {'$in': ['pending', 'unpaid']}})
-            updated_count = 0
-            for bill in bills:
-                bill_due_date = bill.get('due_date')
-                if isinstance(bill_due_date, str):
-                    try:
-                        bill_due_date = datetime.strptime(bill_due_date, '%Y-%m-%d').date()
-                    except ValueError:
-                        logger.warning(f"Invalid due_date format for bill {bill.get('_id')}: {bill_due_date}")
-                        continue
-                if bill_due_date < today:
-                    bills_collection.update_one(
-                        {'_id': bill['_id']},
-                        {'$set': {'status': 'overdue'}}
-                    )
-                    updated_count += 1
-            logger.info(f"Updated {updated_count} overdue bill statuses")
+            # Convert any string due dates written since startup so the $lt filter sees them
+            migration = migrate_bill_due_dates(db)
+            result = db.bills.update_many(
+                {'status': {'$in': ['pending', 'unpaid']}, 'due_date': {'$lt': to_due_datetime(date.today())}},
+                {'$set': {'status': 'overdue', 'updated_at': datetime.utcnow()}}
+            )
+            logger.info(f"Updated {result.modified_count} overdue bill statuses")
+            return {
+                'items': result.modified_count + migration['migrated'],
+                'overdue_updated': result.modified_count,
+                'due_dates_migrated': migration['migrated'],
+                'due_dates_invalid': migration['invalid']
+            }
         except Exception as e:
             logger.error(f"Error in update_overdue_status: {str(e)}", exc_info=True)
             raise
 
 @log_job_metrics('send_bill_reminders')
 def send_bill_reminders(app):
-    """Send reminders for upcoming and overdue bills via email, SMS, and WhatsApp in batches."""
+    """Send reminders for bills inside their reminder window, resuming from today's checkpoint."""
     with app.app_context():
         try:
-            db = get_mongo_db()
-            bills_collection = db.bills
-            bill_reminders_collection = db.bill_reminders
-            users_collection = db.users
-            today = date.today()
-            user_bills = {}
-            max_notifications_per_run = 10  # Limit to 10 notifications (email/SMS/WhatsApp) per job execution
-            notification_count = 0
-
-            bills = bills_collection.find().limit(100)  # Process up to 100 bills per run
-            for bill in bills:
-                email = bill.get('user_email')
-                phone = bill.get('user_phone')
-                user = users_collection.find_one({'email': email}, {'lang': 1, 'phone': 1})
-                lang = user.get('lang', 'en') if user else 'en'
-                phone = user.get('phone') or phone  # Prefer user profile phone number
-                if bill.get('send_notifications'):
-                    reminder_window = today + timedelta(days=bill.get('reminder_days', 7))
-                    bill_due_date = bill.get('due_date')
-                    if isinstance(bill_due_date, str):
-                        try:
-                            bill_due_date = datetime.strptime(bill_due_date, '%Y-%m-%d').date()
-                        except ValueError:
-                            logger.warning(f"Invalid due_date format for bill {bill.get('_id')}: {bill_due_date}")
-                            continue
-                    if (bill['status'] in ['pending', 'overdue'] or 
-                        (today <= bill_due_date <= reminder_window)):
-                        if email not in user_bills:
-                            user_bills[email] = {
-                                'first_name': bill.get('first_name', 'User'),
-                                'phone': phone,
-                                'bills': [],
-                                'lang': lang,
-                                'send_email': bill.get('send_email', False),
-                                'send_sms': bill.get('send_sms', False),
-                                'send_whatsapp': bill.get('send_whatsapp', False)
-                            }
-                        user_bills[email]['bills'].append({
-                            'bill_name': bill['bill_name'],
-                            'amount': bill['amount'],
-                            'due_date': bill_due_date.strftime('%Y-%m-%d'),
-                            'category': trans(f"bill_category_{bill['category']}", lang=lang),
-                            'status': trans(f"bill_status_{bill['status']}", lang=lang)
-                        })
-
-            for email, data in user_bills.items():
-                if notification_count >= max_notifications_per_run:
-                    logger.info(f"Reached max notifications ({max_notifications_per_run}), stopping")
-                    break
-                try:
-                    reminder_data = {
-                        'email': email,
-                        'first_name': data['first_name'],
-                        'phone': data['phone'],
-                        'bills': data['bills'],
-                        'lang': data['lang'],
-                        'sent_at': datetime.utcnow(),
-                        'cta_url': url_for('bill.dashboard', _external=True),
-                        'unsubscribe_url': url_for('bill.unsubscribe', email=email, _external=True)
-                    }
-
-                    # Send email reminder
-                    if data['send_email'] and email:
-                        config = EMAIL_CONFIG.get("bill_reminder", {})
-                        subject = trans(config.get("subject_key", "bill_reminder_subject"), lang=data['lang'])
-                        send_email(
-                            app=app,
-                            logger=logger,
-                            to_email=email,
-                            subject=subject,
-                            template_name=config.get("template", "bill_reminder.html"),
-                            data=reminder_data,
-                            lang=data['lang']
-                        )
-                        bill_reminders_collection.insert_one({
-                            **reminder_data,
-                            'notification_type': 'email'
-                        })
-                        logger.info(f"Sent bill reminder email to {email} and saved to bill_reminders")
-                        notification_count += 1
-
-                    # Send SMS reminder
-                    if data['send_sms'] and data['phone'] and notification_count < max_notifications_per_run:
-                        sms_message = trans(
-                            "bill_reminder_sms",
-                            lang=data['lang'],
-                            bill_count=len(data['bills']),
-                            due_date=data['bills'][0]['due_date']
-                        )
-                        success, response = send_sms_reminder(data['phone'], sms_message)
-                        if success:
-                            bill_reminders_collection.insert_one({
-                                **reminder_data,
-                                'notification_type': 'sms',
-                                'response': response
-                            })
-                            logger.info(f"Sent bill reminder SMS to {data['phone']} and saved to bill_reminders")
-                            notification_count += 1
-                        else:
-                            logger.error(f"Failed to send SMS to {data['phone']}: {response.get('error')}")
-
-                    # Send WhatsApp reminder
-                    if data['send_whatsapp'] and data['phone'] and notification_count < max_notifications_per_run:
-                        whatsapp_message = trans(
-                            "bill_reminder_whatsapp",
-                            lang=data['lang'],
-                            bill_count=len(data['bills']),
-                            due_date=data['bills'][0]['due_date']
-                        )
-                        success, response = send_whatsapp_reminder(data['phone'], whatsapp_message)
-                        if success:
-                            bill_reminders_collection.insert_one({
-                                **reminder_data,
-                                'notification_type': 'whatsapp',
-                                'response': response
-                            })
-                            logger.info(f"Sent bill reminder WhatsApp to {data['phone']} and saved to bill_reminders")
-                            notification_count += 1
-                        else:
-                            logger.error(f"Failed to send WhatsApp to {data['phone']}: {response.get('error')}")
-
-                except Exception as e:
-                    logger.error(f"Failed to send reminders to {email}: {str(e)}", exc_info=True)
-                    continue
-
-            logger.info(f"Sent {notification_count} bill reminder notifications (email/SMS/WhatsApp)")
+            return send_due_bill_reminders(app, get_mongo_db())
         except Exception as e:
             logger.error(f"Error in send_bill_reminders: {str(e)}", exc_info=True)
             raise
@@ -213,16 +108,208 @@ def cleanup_expired_sessions(app):
             expiry_threshold = datetime.utcnow() - timedelta(hours=1)
             result = db.sessions.delete_many({'expiration': {'$lt': expiry_threshold}})
             logger.info(f"Cleaned up {result.deleted_count} expired sessions from MongoDB")
+            return result.deleted_count
         except Exception as e:
             logger.error(f"Failed to clean up expired sessions: {str(e)}")
             raise
 
+@log_job_metrics('reconcile_user_balances')
+def reconcile_balances(app):
+    """Rebuild drifted business balance snapshots from records and cashflows."""
+    with app.app_context():
+        try:
+            db = get_mongo_db()
+            result = reconcile_user_balances(db)
+            logger.info(f"Balance reconciliation checked {result['checked']} users, repaired {result['repaired']}, removed {result['removed']}")
+            return {'items': result['checked'], **result}
+        except Exception as e:
+            logger.error(f"Failed to reconcile user balances: {str(e)}")
+            raise
+
+@log_job_metrics('process_pending_deletions')
+def process_pending_deletions(app):
+    """Delete shopping lists and food orders whose deletion delay has passed."""
+    with app.app_context():
+        try:
+            return process_due_deletions(get_mongo_db())
+        except Exception as e:
+            logger.error(f"Failed to process pending deletions: {str(e)}")
+            raise
+
+# job_id -> (function(app), interval trigger kwargs, description)
+SCHEDULED_JOBS = {
+    'overdue_status': (update_overdue_status, {'days': 1}, 'Update overdue bill statuses daily'),
+    'bill_reminders': (send_bill_reminders, {'hours': 1}, 'Send bill reminders hourly until the day is complete'),
+    'cleanup_expired_sessions': (cleanup_expired_sessions, {'hours': 6}, 'Clean up expired sessions every 6 hours'),
+    'reconcile_user_balances': (reconcile_balances, {'days': 1}, 'Reconcile business balance snapshots daily'),
+    'pending_deletions': (process_pending_deletions, {'seconds': DELETION_POLL_SECONDS},
+                          'Run due shopping list and food order deletions'),
+    'requeue_stale_report_jobs': (log_job_metrics('requeue_stale_report_jobs')(requeue_stale_report_jobs), {'minutes': 10},
+                                  'Requeue stalled background report jobs every 10 minutes'),
+    'cleanup_report_artifacts': (log_job_metrics('cleanup_report_artifacts')(cleanup_report_artifacts), {'hours': 6},
+                                 'Remove expired report artifacts every 6 hours')
+}
+
+SCHEDULER_JOBS_COLLECTION = 'scheduler_jobs'
+SCHEDULER_LEASE_ID = 'scheduler'
+SCHEDULER_LEASE_SECONDS = int(os.getenv('SCHEDULER_LEASE_SECONDS', 60))
+
+_leader = None
+
+def run_scheduled_job(job_id):
+    """
+    Entry point stored in the job store for every scheduled job.
+
+    Jobs are persisted by reference, so they cannot hold the app or a closure;
+    the app comes from this process's SchedulerLeader. The lease is checked
+    again before running so a leader that has just lost it does not run a
+    job the new leader will also run.
+    """
+    leader = _leader
+    if leader is None or not leader.is_leader():
+        logger.warning(f"Skipping scheduled job '{job_id}': this process does not hold the scheduler lease")
+        return
+    job_func = SCHEDULED_JOBS[job_id][0]
+    safe_job_wrapper(job_func, leader.app)()
+
+def _create_scheduler(db, instance_id):
+    """Start a scheduler on the shared Mongo job store and register every job in SCHEDULED_JOBS."""
+    jobstores = {
+        'default': MongoDBJobStore(database=db.name, collection=SCHEDULER_JOBS_COLLECTION, client=db.client)
+    }
+    executors = {
+        'default': ThreadPoolExecutor(max_workers=10)
+    }
+    # Runs missed while no process was leading are caught up once, however late
+    job_defaults = {'coalesce': True, 'max_instances': 1, 'misfire_grace_time': None}
+    scheduler = BackgroundScheduler(jobstores=jobstores, executors=executors, job_defaults=job_defaults, timezone='UTC')
+
+    def record_job_event(event):
+        try:
+            db[SCHEDULER_JOBS_COLLECTION].update_one(
+                {'_id': event.job_id},
+                {'$set': {
+                    'last_run_at': event.scheduled_run_time,
+                    'last_finished_at': datetime.utcnow(),
+                    'last_status': 'failed' if event.exception else 'succeeded',
+                    'last_error': str(event.exception) if event.exception else None,
+                    'last_instance': instance_id
+                }}
+            )
+        except Exception as e:
+            logger.error(f"Failed to record run of scheduled job '{event.job_id}': {str(e)}")
+
+    scheduler.add_listener(record_job_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+    # Start paused so existing jobs can be looked up in the store before they are (re)added
+    scheduler.start(paused=True)
+    for job_id, (job_func, interval, description) in SCHEDULED_JOBS.items():
+        trigger = IntervalTrigger(**interval)
+        existing = scheduler.get_job(job_id)
+        options = {}
+        if existing and str(existing.trigger) == str(trigger):
+            # Keep the persisted schedule; replacing it would push next_run_time out on every failover
+            options['next_run_time'] = existing.next_run_time
+        scheduler.add_job(
+            func=run_scheduled_job,
+            trigger=trigger,
+            args=[job_id],
+            id=job_id,
+            name=description,
+            replace_existing=True,
+            **options
+        )
+    scheduler.resume()
+    logger.info("Scheduler started with jobs: %s", scheduler.get_jobs())
+    return scheduler
+
+class SchedulerLeader:
+    """
+    Lease-based leader election over the scheduler_leases collection.
+
+    Every process runs a renewal thread, and only the process holding the lease
+    runs the scheduler. A leader that fails to renew stops its scheduler, and a
+    dead leader's lease expires after SCHEDULER_LEASE_SECONDS, after which the
+    next process to renew takes over with the persisted job schedule.
+    """
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.scheduler = None
+        self.lease_expires_at = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='scheduler-leader', daemon=True)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def is_leader(self):
+        """Whether this process holds an unexpired lease."""
+        return self.lease_expires_at is not None and datetime.utcnow() < self.lease_expires_at
+
+    def _acquire_lease(self):
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=SCHEDULER_LEASE_SECONDS)
+        try:
+            self.db.scheduler_leases.find_one_and_update(
+                {'_id': SCHEDULER_LEASE_ID, '$or': [{'holder': self.instance_id}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'holder': self.instance_id, 'expires_at': expires_at, 'renewed_at': now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Another process holds an unexpired lease
+            self.lease_expires_at = None
+            return False
+        self.lease_expires_at = expires_at
+        return True
+
+    def _stop_scheduler(self):
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                leading = self._acquire_lease()
+            except PyMongoError as e:
+                logger.error(f"Failed to renew scheduler lease: {str(e)}")
+                leading = self.is_leader()
+            try:
+                if leading and self.scheduler is None:
+                    logger.info(f"Acquired scheduler lease as {self.instance_id}")
+                    self.scheduler = _create_scheduler(self.db, self.instance_id)
+                elif not leading and self.scheduler is not None:
+                    logger.warning(f"Lost scheduler lease, stopping scheduler on {self.instance_id}")
+                    self._stop_scheduler()
+            except Exception as e:
+                logger.error(f"Scheduler leadership change failed: {str(e)}", exc_info=True)
+            self._stop_event.wait(SCHEDULER_LEASE_SECONDS / 3)
+
+    def start(self):
+        self._thread.start()
+
+    def shutdown(self, wait=True):
+        """Stop competing for the lease, stop the scheduler and release the lease for immediate failover."""
+        self._stop_event.set()
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join(timeout=5 if wait else 0)
+        self._stop_scheduler()
+        if self.lease_expires_at is not None:
+            try:
+                self.db.scheduler_leases.delete_one({'_id': SCHEDULER_LEASE_ID, 'holder': self.instance_id})
+            except PyMongoError as e:
+                logger.error(f"Failed to release scheduler lease: {str(e)}")
+            self.lease_expires_at = None
+        logger.info("Scheduler leader shut down")
+
 def handle_shutdown(signum, frame):
     """Handle shutdown signals."""
     logger.info(f"Received signal {signum}, shutting down scheduler")
-    scheduler = app.config.get('SCHEDULER')
-    if scheduler:
-        scheduler.shutdown()
+    if _leader:
+        _leader.shutdown()
         logger.info("Scheduler shut down gracefully")
     sys.exit(0)
 
@@ -239,56 +326,36 @@ def safe_job_wrapper(job_func, app):
     return wrapper
 
 def init_scheduler(app, mongo):
-    """Initialize the background scheduler."""
-    if os.environ.get('WERKZEUG_RUN_MAIN') != 'true' and not app.config.get('TESTING'):
-        logger.info("Skipping scheduler initialization in worker process")
+    """
+    Start competing for the scheduler lease in this process.
+
+    Every gunicorn worker and instance calls this; exactly one of them runs
+    the jobs at a time. Set SCHEDULER_ENABLED=false to keep a process out of
+    the election entirely.
+
+    Args:
+        app: Flask application instance
+        mongo: MongoDB database holding the job store and lease
+
+    Returns:
+        SchedulerLeader or None if disabled
+    """
+    global _leader
+    if os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'false':
+        logger.info("Scheduler disabled by SCHEDULER_ENABLED")
         return None
 
     try:
-        jobstores = {
-            'default': MemoryJobStore()
-        }
-        executors = {
-            'default': ThreadPoolExecutor(max_workers=10)
-        }
-        scheduler = BackgroundScheduler(jobstores=jobstores, executors=executors)
-        scheduler.add_job(
-            func=safe_job_wrapper(update_overdue_status, app),
-            trigger='interval',
-            days=1,
-            id='overdue_status',
-            name='Update overdue bill statuses daily',
-            replace_existing=True,
-            max_instances=1
-        )
-        scheduler.add_job(
-            func=safe_job_wrapper(send_bill_reminders, app),
-            trigger='interval',
-            days=1,
-            id='bill_reminders',
-            name='Send bill reminders daily',
-            replace_existing=True,
-            max_instances=1
-        )
-        scheduler.add_job(
-            func=safe_job_wrapper(cleanup_expired_sessions, app),
-            trigger='interval',
-            hours=6,
-            id='cleanup_expired_sessions',
-            name='Clean up expired sessions every 6 hours',
-            replace_existing=True,
-            max_instances=1
-        )
-        scheduler.start()
-        app.config['SCHEDULER'] = scheduler
-        logger.info("Scheduler started with jobs: %s", scheduler.get_jobs())
+        _leader = SchedulerLeader(app, mongo)
+        _leader.start()
+        logger.info(f"Scheduler leader election started as {_leader.instance_id}")
 
         # Register shutdown handlers
-        atexit.register(lambda: scheduler.shutdown() if app.config.get('SCHEDULER') else None)
+        atexit.register(lambda: _leader.shutdown() if _leader else None)
         signal.signal(signal.SIGTERM, handle_shutdown)
         signal.signal(signal.SIGINT, handle_shutdown)
 
-        return scheduler
+        return _leader
     except Exception as e:
         logger.error(f"Failed to initialize scheduler: {str(e)}", exc_info=True)
         raise RuntimeError(f"Scheduler initialization failed: {str(e)}")
@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify, send_file
 from flask_login import login_required, current_user
-from translations import trans
+from translations import trans, set_session_language
 from utils import trans_function, requires_role, is_valid_email, format_currency, get_mongo_db, is_admin, get_user_query, initialize_tools_with_urls
+from user_cache import invalidate_user
 from bson import ObjectId
 from datetime import datetime
 from flask_wtf import FlaskForm
@@ -194,6 +195,7 @@ def profile():
                         'email': form.email.data or ''
                     }
                 db.users.update_one(user_query, {'$set': update_data})
+                invalidate_user(user['_id'])
                 flash(trans('general_profile_updated', default='Profile updated successfully'), 'success')
                 logger.info(f"Profile updated for user: {user_id}")
                 return redirect(url_for('settings.profile'))
@@ -274,6 +276,7 @@ def upload_profile_picture():
                 'profile_picture': str(file_id),
                 'updated_at': datetime.utcnow()
             }})
+            invalidate_user(user['_id'])
 
             return jsonify({
                 "success": True,
@@ -351,11 +354,12 @@ def language():
         form = LanguageForm(data={'language': user.get('language', 'en')})
         if form.validate_on_submit():
             try:
-                session['lang'] = form.language.data
+                set_session_language(form.language.data)
                 db.users.update_one(
                     user_query,
                     {'$set': {'language': form.language.data, 'updated_at': datetime.utcnow()}}
                 )
+                invalidate_user(user['_id'])
                 flash(trans('general_language_updated', default='Language updated successfully'), 'success')
                 return redirect(url_for('settings.index'))
             except Exception as e:
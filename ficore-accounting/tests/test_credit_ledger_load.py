@@ -0,0 +1,67 @@
+"""
+Concurrent debits against a real MongoDB replica set.
+
+Set MONGO_TEST_URI to a replica set (transactions need one), e.g.
+mongodb://localhost:27017/?replicaSet=rs0. The test creates and drops its
+own database.
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+pytest.importorskip('flask')
+pymongo = pytest.importorskip('pymongo')
+
+MONGO_TEST_URI = os.getenv('MONGO_TEST_URI')
+pytestmark = pytest.mark.skipif(not MONGO_TEST_URI, reason='MONGO_TEST_URI is not set')
+
+STARTING_BALANCE = 50
+DEBIT_ATTEMPTS = 200
+WORKERS = 32
+
+@pytest.fixture
+def db():
+    client = pymongo.MongoClient(MONGO_TEST_URI)
+    name = f"ficore_ledger_test_{uuid.uuid4().hex[:8]}"
+    database = client[name]
+    # Collections cannot be created inside a transaction on older servers
+    for collection in ('users', 'ficore_credit_transactions', 'activity_events'):
+        database.create_collection(collection)
+    yield database
+    client.drop_database(name)
+    client.close()
+
+def test_concurrent_debits_never_overdraw(db):
+    from credit_ledger import debit_credits, get_balance
+    from user_cache import credit_balance_cache
+
+    user_id = 'load_test_user'
+    db.users.insert_one({'_id': user_id, 'ficore_credit_balance': STARTING_BALANCE})
+    credit_balance_cache.invalidate(user_id)
+
+    def debit(attempt):
+        return debit_credits(db, user_id, 1, 'load_test', session_id='load-test', attempt=attempt)
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        results = list(pool.map(debit, range(DEBIT_ATTEMPTS)))
+
+    succeeded = [result for result in results if result is not None]
+    assert len(succeeded) == STARTING_BALANCE
+    assert db.users.find_one({'_id': user_id})['ficore_credit_balance'] == 0
+    assert db.ficore_credit_transactions.count_documents({'user_id': user_id, 'action': 'load_test'}) == STARTING_BALANCE
+    credit_balance_cache.invalidate(user_id)
+    assert get_balance(db, user_id) == 0
+
+def test_failed_debit_rolls_back_write(db):
+    from credit_ledger import debit_credits
+
+    user_id = 'broke_user'
+    db.users.insert_one({'_id': user_id, 'ficore_credit_balance': 0})
+
+    def write(mongo_session):
+        db.users.update_one({'_id': user_id}, {'$set': {'touched': True}}, session=mongo_session)
+
+    assert debit_credits(db, user_id, 1, 'load_test', write=write, session_id='load-test') is None
+    assert 'touched' not in db.users.find_one({'_id': user_id})
+    assert db.ficore_credit_transactions.count_documents({'user_id': user_id}) == 0
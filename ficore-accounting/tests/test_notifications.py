@@ -0,0 +1,163 @@
+"""
+Notification delivery against a local http.server standing in for the
+MailerSend, SMS and WhatsApp APIs.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+flask = pytest.importorskip('flask')
+pytest.importorskip('requests')
+
+import notifications
+from notifications import NotificationDispatcher
+
+class ProviderStub:
+    """Records every POST and answers with scripted statuses per path (then 200)."""
+
+    def __init__(self):
+        self.calls = []
+        self.statuses = {}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with stub.lock:
+                    stub.calls.append((self.path, time.monotonic(), body))
+                    scripted = stub.statuses.get(self.path)
+                    status = scripted.pop(0) if scripted else 200
+                payload = json.dumps({'success': 200 <= status < 300}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def calls_to(self, path):
+        with self.lock:
+            return [call for call in self.calls if call[0] == path]
+
+class RecordingCollection:
+    def __init__(self):
+        self.documents = []
+
+    def insert_many(self, documents, ordered=True):
+        self.documents.extend(documents)
+
+@pytest.fixture
+def stub():
+    provider = ProviderStub()
+    provider.thread.start()
+    yield provider
+    provider.server.shutdown()
+    provider.server.server_close()
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    # Sessions and limiters are process-wide; rebuild them with test settings
+    monkeypatch.setattr(notifications, 'HTTP_BACKOFF_FACTOR', 0)
+    monkeypatch.setattr(notifications, '_sessions', {})
+    monkeypatch.setattr(notifications, '_rate_limiters', {})
+
+@pytest.fixture
+def app(stub, tmp_path):
+    (tmp_path / 'budget_email.html').write_text('<p>{{ name }}</p>')
+    app = flask.Flask(__name__, template_folder=str(tmp_path))
+    app.config.update(
+        SMS_API_URL=f"{stub.url}/sms",
+        SMS_API_KEY='sms-key',
+        WHATSAPP_API_URL=f"{stub.url}/whatsapp",
+        WHATSAPP_API_KEY='whatsapp-key'
+    )
+    return app
+
+@pytest.fixture
+def mailersend_env(stub, monkeypatch):
+    monkeypatch.setenv('MAILERSEND_API_TOKEN', 'token')
+    monkeypatch.setenv('MAILERSEND_FROM_EMAIL', 'noreply@example.com')
+    monkeypatch.setenv('MAILERSEND_API_URL', f"{stub.url}/v1/email")
+    monkeypatch.delenv('GMAIL_EMAIL', raising=False)
+    monkeypatch.delenv('GMAIL_PASSWORD', raising=False)
+
+def test_mailersend_retries_503_and_429(app, stub, mailersend_env):
+    from mailersend_email import send_email
+
+    stub.statuses['/v1/email'] = [503, 429, 202]
+    with app.app_context():
+        send_email(app, notifications.logger, 'user@example.com', 'Budget', 'budget', {'name': 'Ada'})
+    calls = stub.calls_to('/v1/email')
+    assert len(calls) == 3
+    assert calls[-1][2]['to'] == [{'email': 'user@example.com'}]
+
+def test_mailersend_gives_up_after_configured_retries(app, stub, mailersend_env):
+    from mailersend_email import send_email
+
+    stub.statuses['/v1/email'] = [503] * (notifications.HTTP_RETRIES + 1)
+    with app.app_context(), pytest.raises(RuntimeError):
+        send_email(app, notifications.logger, 'user@example.com', 'Budget', 'budget', {'name': 'Ada'})
+    assert len(stub.calls_to('/v1/email')) == notifications.HTTP_RETRIES + 1
+
+@pytest.mark.parametrize('channel', ['sms', 'whatsapp'])
+def test_sms_and_whatsapp_retry_503_and_429(app, stub, channel):
+    from utils import send_sms_reminder, send_whatsapp_reminder
+
+    send = send_sms_reminder if channel == 'sms' else send_whatsapp_reminder
+    stub.statuses[f"/{channel}"] = [503, 429]
+    with app.app_context():
+        success, response = send('08012345678', 'Your bill is due')
+    assert success is True
+    assert response == {'success': True}
+    assert len(stub.calls_to(f"/{channel}")) == 3
+
+@pytest.mark.parametrize('status', [500, 502, 504])
+def test_ambiguous_5xx_is_not_retried(app, stub, status):
+    from utils import send_sms_reminder
+
+    # The provider may have sent the message before failing; a retry could send it twice
+    stub.statuses['/sms'] = [status]
+    with app.app_context():
+        success, _ = send_sms_reminder('08012345678', 'Your bill is due')
+    assert success is False
+    assert len(stub.calls_to('/sms')) == 1
+
+def test_rate_limiter_spaces_calls(app, stub, monkeypatch):
+    from utils import send_whatsapp_reminder
+
+    rate, sends = 4, 10
+    monkeypatch.setitem(notifications.PROVIDER_RATE_LIMITS, 'whatsapp', rate)
+    with NotificationDispatcher(app, {'bill_reminders': RecordingCollection()}, max_workers=sends) as dispatcher:
+        for index in range(sends):
+            dispatcher.submit('whatsapp', send_whatsapp_reminder, {'bill_id': index}, '08012345678', 'Due')
+        dispatcher.flush()
+    times = sorted(call[1] for call in stub.calls_to('/whatsapp'))
+    assert len(times) == sends
+    # One second's worth goes out as a burst; the rest at most rate per second
+    assert times[-1] - times[0] >= (sends - rate) / rate * 0.9
+
+def test_flush_writes_one_row_per_send(app, stub):
+    from utils import send_sms_reminder, send_whatsapp_reminder
+
+    stub.statuses['/sms'] = [400]
+    results = RecordingCollection()
+    with NotificationDispatcher(app, {'bill_reminders': results}) as dispatcher:
+        dispatcher.submit('sms', send_sms_reminder, {'bill_id': 'a'}, '08011111111', 'Due')
+        dispatcher.submit('sms', send_sms_reminder, {'bill_id': 'b'}, '08022222222', 'Due')
+        dispatcher.submit('whatsapp', send_whatsapp_reminder, {'bill_id': 'c'}, '08033333333', 'Due')
+        counts = dispatcher.flush()
+        assert dispatcher.flush() == {'delivered': 0, 'failed': 0}
+    assert counts == {'delivered': 2, 'failed': 1}
+    assert len(results.documents) == 3
+    assert sorted(row['bill_id'] for row in results.documents) == ['a', 'b', 'c']
+    assert {row['notification_type'] for row in results.documents} == {'sms', 'whatsapp'}
+    assert all('sent_at' in row for row in results.documents)
@@ -0,0 +1,50 @@
+"""
+The compiled translation table against the per-call prefix scan it replaced,
+for every key in every module, in English and Hausa.
+"""
+import pytest
+
+pytest.importorskip('flask')
+
+import translations
+from translations import (GENERAL_SPECIFIC_KEYS, KEY_PREFIX_TO_MODULE, SUPPORTED_LANGUAGES, compile_translations,
+                          trans, translation_modules)
+
+def prefix_scan(key, lang, default=None):
+    """The lookup trans() did on every call before the table was compiled."""
+    module_name = 'general'
+    for prefix, mod in KEY_PREFIX_TO_MODULE.items():
+        if key.startswith(prefix):
+            module_name = mod
+            break
+    if key in GENERAL_SPECIFIC_KEYS:
+        module_name = 'general'
+    module = translation_modules.get(module_name, translation_modules['general'])
+    translation = module.get(lang, {}).get(key)
+    if translation is None:
+        translation = module.get('en', {}).get(key, default or key)
+    return translation
+
+@pytest.fixture(scope='module')
+def all_keys():
+    keys = set()
+    for module in translation_modules.values():
+        for lang in SUPPORTED_LANGUAGES:
+            keys.update(module.get(lang, {}))
+    return sorted(keys)
+
+@pytest.mark.parametrize('lang', SUPPORTED_LANGUAGES)
+def test_trans_matches_prefix_scan_for_every_key(all_keys, lang):
+    mismatches = [key for key in all_keys if trans(key, lang=lang) != prefix_scan(key, lang)]
+    assert not mismatches, f"{len(mismatches)} keys differ, e.g. {mismatches[:5]}"
+
+@pytest.mark.parametrize('lang', SUPPORTED_LANGUAGES)
+def test_cached_table_matches_fresh_compile(lang):
+    # Whatever COMPILED_TRANSLATIONS loaded (marshal cache or compile) equals a fresh compile
+    assert translations.COMPILED_TRANSLATIONS[lang] == compile_translations()[lang]
+
+@pytest.mark.parametrize('lang', SUPPORTED_LANGUAGES)
+def test_missing_key_falls_back_like_prefix_scan(lang):
+    for key in ('bill_no_such_key', 'no_prefix_no_such_key'):
+        assert trans(key, lang=lang) == prefix_scan(key, lang) == key
+        assert trans(key, lang=lang, default='Fallback') == prefix_scan(key, lang, 'Fallback') == 'Fallback'
@@ -0,0 +1,63 @@
+"""
+VendorGrid, the in-process fallback for nearest_vendors, checked against a
+full haversine scan, including searches that cross the poles and the
+antimeridian.
+"""
+import heapq
+import random
+import pytest
+
+pytest.importorskip('pymongo')
+
+from vendor_locator import VendorGrid, haversine_m
+
+def full_scan(vendors, lat, lng, limit, radius_m):
+    matches = [(haversine_m(lat, lng, vendor_lat, vendor_lng), name) for name, vendor_lat, vendor_lng in vendors]
+    return [(name, distance) for distance, name in heapq.nsmallest(limit, [m for m in matches if m[0] <= radius_m])]
+
+def scatter(rng, count, lat_range, lng_range, prefix):
+    return [(f"{prefix}{index}", rng.uniform(*lat_range), rng.uniform(*lng_range)) for index in range(count)]
+
+@pytest.fixture(scope='module')
+def vendors():
+    rng = random.Random(20)
+    return (
+        scatter(rng, 2000, (-90, 90), (-180, 180), 'world')
+        + scatter(rng, 500, (4, 14), (3, 15), 'nigeria')
+        + scatter(rng, 300, (88.5, 90), (-180, 180), 'north')
+        + scatter(rng, 300, (-90, -88.5), (-180, 180), 'south')
+        + scatter(rng, 300, (-60, 60), (178.5, 180), 'east')
+        + scatter(rng, 300, (-60, 60), (-180, -178.5), 'west')
+        + [('north_pole', 90.0, 0.0), ('south_pole', -90.0, 45.0), ('antimeridian', 10.0, 180.0)]
+    )
+
+QUERIES = [
+    (9.06, 7.49),        # Abuja
+    (6.52, 3.38),        # Lagos
+    (89.95, 10.0),       # next to the north pole
+    (90.0, -120.0),      # on the north pole
+    (-89.9, 170.0),      # next to the south pole
+    (0.0, 179.99),       # east of the antimeridian
+    (0.0, -179.99),      # west of the antimeridian
+    (10.0, 180.0),
+    (-10.0, -180.0),
+    (45.0, 0.0),
+]
+
+@pytest.mark.parametrize('cell_degrees', [0.1, 1.0, 7.0])
+@pytest.mark.parametrize('radius_km', [5, 25, 200])
+def test_grid_matches_full_scan(vendors, cell_degrees, radius_km):
+    grid = VendorGrid(vendors, cell_degrees=cell_degrees)
+    radius_m = radius_km * 1000
+    for lat, lng in QUERIES:
+        assert grid.nearest(lat, lng, 20, radius_m) == full_scan(vendors, lat, lng, 20, radius_m), (lat, lng)
+
+def test_grid_crosses_antimeridian():
+    grid = VendorGrid([('east', 0.0, 179.95), ('west', 0.0, -179.95), ('far', 0.0, 170.0)], cell_degrees=0.1)
+    names = [name for name, _ in grid.nearest(0.0, -179.99, 5, 25000)]
+    assert names == ['west', 'east']
+
+def test_grid_crosses_pole():
+    grid = VendorGrid([('near', 89.95, 0.0), ('opposite', 89.95, 180.0), ('far', 80.0, 0.0)], cell_degrees=0.1)
+    names = [name for name, _ in grid.nearest(89.99, 90.0, 5, 25000)]
+    assert sorted(names) == ['near', 'opposite']
@@ -1,4 +1,12 @@
+import gzip
+import hashlib
+import importlib
+import json
 import logging
+import marshal
+import os
+import time
+from collections.abc import Mapping
 from flask import session, has_request_context, g, request
 from typing import Dict, Optional, Union
 import threading
@@ -29,55 +37,72 @@ logger = SessionAdapter(root_logger, {})
 logged_missing_keys = set()
 lock = threading.Lock()
 
-# Import translation modules
-try:
-    # Personal Finance Tools
-    from .personal_finance.bill_translations import BILL_TRANSLATIONS
-    from .personal_finance.budget_translations import BUDGET_TRANSLATIONS
-    from .personal_finance.shopping_translations import SHOPPING_TRANSLATIONS
-    from .personal_finance.food_order_translations import FOOD_ORDER_TRANSLATIONS
-    
-    # Accounting Tools
-    from .accounting_tools.admin_translations import ADMIN_TRANSLATIONS
-    from .accounting_tools.agents_translations import AGENTS_TRANSLATIONS
-    from .accounting_tools.ficore_credits_translations import FICORE_CREDITS_TRANSLATIONS
-    from .accounting_tools.creditors_translations import CREDITORS_TRANSLATIONS
-    from .accounting_tools.debtors_translations import DEBTORS_TRANSLATIONS
-    from .accounting_tools.payments_translations import PAYMENTS_TRANSLATIONS
-    from .accounting_tools.receipts_translations import RECEIPTS_TRANSLATIONS
-    from .accounting_tools.reports_translations import REPORTS_TRANSLATIONS
-    
-    # General Tools
-    from .general_tools.general_translations import GENERAL_TRANSLATIONS
-    from .general_tools.tax_translations import TAX_TRANSLATIONS
-    
-except ImportError as e:
-    logger.error(f"Failed to import translation module: {str(e)}", exc_info=True)
-    raise
+SUPPORTED_LANGUAGES = ('en', 'ha')
 
-# Map module names to translation dictionaries
-translation_modules = {
+# Map module names to (submodule, dictionary name); modules are imported on first use
+TRANSLATION_MODULE_PATHS = {
     # Personal Finance
-    'bill': BILL_TRANSLATIONS,
-    'budget': BUDGET_TRANSLATIONS,
-    'shopping': SHOPPING_TRANSLATIONS,
-    'food_order': FOOD_ORDER_TRANSLATIONS,
+    'bill': ('personal_finance.bill_translations', 'BILL_TRANSLATIONS'),
+    'budget': ('personal_finance.budget_translations', 'BUDGET_TRANSLATIONS'),
+    'shopping': ('personal_finance.shopping_translations', 'SHOPPING_TRANSLATIONS'),
+    'food_order': ('personal_finance.food_order_translations', 'FOOD_ORDER_TRANSLATIONS'),
     
     # Accounting Tools
-    'admin': ADMIN_TRANSLATIONS,
-    'agents': AGENTS_TRANSLATIONS,
-    'credits': FICORE_CREDITS_TRANSLATIONS,
-    'creditors': CREDITORS_TRANSLATIONS,
-    'debtors': DEBTORS_TRANSLATIONS,
-    'payments': PAYMENTS_TRANSLATIONS,
-    'receipts': RECEIPTS_TRANSLATIONS,
-    'reports': REPORTS_TRANSLATIONS,
+    'admin': ('accounting_tools.admin_translations', 'ADMIN_TRANSLATIONS'),
+    'agents': ('accounting_tools.agents_translations', 'AGENTS_TRANSLATIONS'),
+    'credits': ('accounting_tools.ficore_credits_translations', 'FICORE_CREDITS_TRANSLATIONS'),
+    'creditors': ('accounting_tools.creditors_translations', 'CREDITORS_TRANSLATIONS'),
+    'debtors': ('accounting_tools.debtors_translations', 'DEBTORS_TRANSLATIONS'),
+    'payments': ('accounting_tools.payments_translations', 'PAYMENTS_TRANSLATIONS'),
+    'receipts': ('accounting_tools.receipts_translations', 'RECEIPTS_TRANSLATIONS'),
+    'reports': ('accounting_tools.reports_translations', 'REPORTS_TRANSLATIONS'),
     
     # General Tools
-    'general': GENERAL_TRANSLATIONS,
-    'tax': TAX_TRANSLATIONS,
+    'general': ('general_tools.general_translations', 'GENERAL_TRANSLATIONS'),
+    'tax': ('general_tools.tax_translations', 'TAX_TRANSLATIONS'),
 }
 
+class LazyTranslationModules(Mapping):
+    """
+    Read-only mapping of module name to translation dictionary.
+
+    Each translation module is imported the first time its dictionary is
+    accessed; membership tests and iteration over names import nothing.
+    """
+
+    def __init__(self, paths: Dict[str, tuple]):
+        self.paths = paths
+        self.loaded = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Dict[str, Dict[str, str]]:
+        translations = self.loaded.get(name)
+        if translations is None:
+            submodule, attribute = self.paths[name]
+            with self.lock:
+                translations = self.loaded.get(name)
+                if translations is None:
+                    try:
+                        translations = getattr(importlib.import_module(f'.{submodule}', __name__), attribute)
+                    except ImportError as e:
+                        logger.error(f"Failed to import translation module '{name}': {str(e)}", exc_info=True)
+                        raise
+                    self.loaded[name] = translations
+                    counts = ', '.join(f"{lang}={len(translations.get(lang, {}))}" for lang in SUPPORTED_LANGUAGES)
+                    logger.debug(f"Loaded translation module '{name}' ({counts})")
+        return translations
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.paths
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+translation_modules = LazyTranslationModules(TRANSLATION_MODULE_PATHS)
+
 # Map key prefixes to module names
 KEY_PREFIX_TO_MODULE = {
     # Personal Finance prefixes
@@ -120,11 +145,281 @@ GENERAL_SPECIFIC_KEYS = {
     'Upload', 'Back', 'Next', 'Previous', 'Continue', 'Finish', 'Close', 'Open'
 }
 
-# Log loaded translations
-for module_name, translations in translation_modules.items():
-    for lang in ['en', 'ha']:
-        lang_dict = translations.get(lang, {})
-        logger.info(f"Loaded {len(lang_dict)} translations for module '{module_name}', lang='{lang}'")
+def module_for_key(key: str) -> str:
+    """Return the name of the module a key is looked up in, by prefix (default 'general')."""
+    if key in GENERAL_SPECIFIC_KEYS:
+        return 'general'
+    for prefix, mod in KEY_PREFIX_TO_MODULE.items():
+        if key.startswith(prefix):
+            return mod
+    return 'general'
+
+def compile_translations() -> Dict[str, Dict[str, tuple]]:
+    """
+    Flatten all translation modules into one lookup table per language.
+
+    Each key is resolved once to the module its prefix selects, with the English
+    text already substituted where the language has no entry. Entries are
+    (text, needs_format): needs_format is False for strings without braces, so
+    trans() skips str.format for them even when kwargs are passed.
+
+    Returns:
+        {lang: {key: (text, needs_format)}}
+    """
+    keys = set()
+    for module in translation_modules.values():
+        for lang in SUPPORTED_LANGUAGES:
+            keys.update(module.get(lang, {}))
+    compiled = {lang: {} for lang in SUPPORTED_LANGUAGES}
+    for key in keys:
+        module = translation_modules.get(module_for_key(key), translation_modules['general'])
+        en_text = module.get('en', {}).get(key)
+        for lang in SUPPORTED_LANGUAGES:
+            text = module.get(lang, {}).get(key)
+            if text is None:
+                text = en_text
+            if text is not None:
+                compiled[lang][key] = (text, '{' in text or '}' in text)
+    return compiled
+
+# Compiled tables are cached as marshal files named after a fingerprint of the sources
+COMPILED_CACHE_DIR = os.getenv('TRANSLATIONS_CACHE_DIR', os.path.join(os.path.dirname(__file__), '__pycache__'))
+COMPILED_CACHE_FORMAT = 1
+
+def _sources_fingerprint() -> Optional[str]:
+    """Hash of the translation sources' sizes and mtimes, or None if a source file is missing."""
+    digest = hashlib.sha256(f"{COMPILED_CACHE_FORMAT}:{marshal.version}".encode())
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.abspath(__file__)] + [
+        os.path.join(base_dir, *submodule.split('.')) + '.py' for submodule, _ in TRANSLATION_MODULE_PATHS.values()
+    ]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+class CompiledTranslations(Mapping):
+    """
+    lang -> {key: (text, needs_format)}, loaded per language on first use.
+
+    A language's table is read from its marshal cache file when one matches
+    the current sources, which avoids importing the translation modules at
+    all. Otherwise every module is imported, compile_translations() runs and
+    the tables are written to the cache for the next worker.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.load_stats = {}
+        self.lock = threading.Lock()
+        self.fingerprint = _sources_fingerprint()
+
+    def _cache_path(self, lang: str) -> Optional[str]:
+        if self.fingerprint is None:
+            return None
+        return os.path.join(COMPILED_CACHE_DIR, f"translations_{lang}.{self.fingerprint}.marshal")
+
+    def _read_cache(self, lang: str) -> Optional[Dict[str, tuple]]:
+        path = self._cache_path(lang)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as cache_file:
+                return marshal.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable translation cache '{path}': {str(e)}")
+            return None
+
+    def _write_cache(self, compiled: Dict[str, Dict[str, tuple]]) -> None:
+        try:
+            os.makedirs(COMPILED_CACHE_DIR, exist_ok=True)
+            for lang, table in compiled.items():
+                path = self._cache_path(lang)
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                with open(temp_path, 'wb') as cache_file:
+                    marshal.dump(table, cache_file)
+                os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write translation cache to '{COMPILED_CACHE_DIR}': {str(e)}")
+
+    def _load(self, lang: str) -> Dict[str, tuple]:
+        started = time.perf_counter()
+        table = self._read_cache(lang)
+        if table is not None:
+            self.tables[lang] = table
+            source = 'cache'
+        else:
+            compiled = compile_translations()
+            if self.fingerprint is not None:
+                self._write_cache(compiled)
+            # The modules are imported now anyway, so keep every language
+            for compiled_lang, compiled_table in compiled.items():
+                self.tables.setdefault(compiled_lang, compiled_table)
+            source = 'compiled'
+        self.load_stats[lang] = {
+            'keys': len(self.tables[lang]),
+            'source': source,
+            'seconds': round(time.perf_counter() - started, 4)
+        }
+        logger.info(f"Loaded {len(self.tables[lang])} translation keys for lang='{lang}' from {source} "
+                    f"in {self.load_stats[lang]['seconds']}s")
+        return self.tables[lang]
+
+    def __getitem__(self, lang: str) -> Dict[str, tuple]:
+        table = self.tables.get(lang)
+        if table is None:
+            if lang not in SUPPORTED_LANGUAGES:
+                raise KeyError(lang)
+            with self.lock:
+                table = self.tables.get(lang) or self._load(lang)
+        return table
+
+    def __contains__(self, lang: object) -> bool:
+        return lang in SUPPORTED_LANGUAGES
+
+    def __iter__(self):
+        return iter(SUPPORTED_LANGUAGES)
+
+    def __len__(self) -> int:
+        return len(SUPPORTED_LANGUAGES)
+
+COMPILED_TRANSLATIONS = CompiledTranslations()
+
+def get_translation_load_stats() -> Dict[str, object]:
+    """
+    What this worker has loaded so far.
+
+    Returns:
+        dict with 'modules' (translation modules imported) and 'languages'
+        ({lang: {'keys', 'source', 'seconds'}} for each table loaded)
+    """
+    return {
+        'modules': sorted(translation_modules.loaded),
+        'languages': dict(COMPILED_TRANSLATIONS.load_stats)
+    }
+
+def _log_once(log_key: str, level: int, message: str) -> None:
+    """Log a translation problem the first time it is seen."""
+    with lock:
+        if log_key in logged_missing_keys:
+            return
+        logged_missing_keys.add(log_key)
+    current_logger = g.get('logger', logger) if has_request_context() else logger
+    session_id = session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'
+    current_logger.log(level, message, extra={'session_id': session_id})
+
+def _translate(key: str, lang: str, default: Optional[str], kwargs: Optional[dict]) -> str:
+    """Look a key up in COMPILED_TRANSLATIONS for lang and apply kwargs formatting."""
+    table = COMPILED_TRANSLATIONS.get(lang)
+    if table is None:
+        _log_once(f"invalid_language_{lang}", logging.WARNING, f"Invalid language '{lang}', falling back to 'en'")
+        lang = 'en'
+        table = COMPILED_TRANSLATIONS['en']
+
+    entry = table.get(key)
+    if entry is None:
+        _log_once(key, logging.WARNING,
+                  f"Missing translation for key='{key}' in module '{module_for_key(key)}', lang='{lang}'")
+        translation, needs_format = default or key, True
+    else:
+        translation, needs_format = entry
+
+    # Apply string formatting with fallback for missing kwargs
+    if kwargs and needs_format:
+        try:
+            return translation.format(**kwargs)
+        except KeyError as e:
+            _log_once(f"formatting_error_{key}_{lang}", logging.ERROR,
+                      f"Formatting error for key='{key}', lang='{lang}', kwargs={kwargs}, error='Missing key: {str(e)}'")
+            return translation  # Return unformatted string as fallback
+        except ValueError as e:
+            _log_once(f"formatting_error_{key}_{lang}", logging.ERROR,
+                      f"Formatting failed for key='{key}', lang='{lang}', kwargs={kwargs}, error='Invalid format: {str(e)}'")
+            return translation  # Return unformatted string as fallback
+    return translation
+
+class RequestTranslator:
+    """
+    Translator bound to one request's language.
+
+    Created on first use in a request and kept on g, so session['lang'] is
+    read once per request. Results without formatting kwargs are memoized for
+    the rest of the request; hits, misses and uncached (formatted) calls are
+    counted and aggregated per endpoint in TRANSLATION_STATS.
+    """
+
+    __slots__ = ('lang', 'cache', 'hits', 'misses', 'uncached')
+
+    def __init__(self, lang: str):
+        if lang not in COMPILED_TRANSLATIONS:
+            _log_once(f"invalid_language_{lang}", logging.WARNING, f"Invalid language '{lang}', falling back to 'en'")
+            lang = 'en'
+        self.lang = lang
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def __call__(self, key: str, default: Optional[str] = None, lang: Optional[str] = None, **kwargs: str) -> str:
+        if lang is not None and lang != self.lang:
+            return _translate(key, lang, default, kwargs)
+        if kwargs:
+            self.uncached += 1
+            return _translate(key, self.lang, default, kwargs)
+        cache_key = (key, default)
+        translation = self.cache.get(cache_key)
+        if translation is None:
+            self.misses += 1
+            translation = self.cache[cache_key] = _translate(key, self.lang, default, None)
+        else:
+            self.hits += 1
+        return translation
+
+def get_request_translator() -> Optional[RequestTranslator]:
+    """Return the current request's translator, creating it on first use (None outside a request)."""
+    if not has_request_context():
+        return None
+    translator = g.get('translator')
+    if translator is None:
+        translator = g.translator = RequestTranslator(session.get('lang', 'en'))
+    return translator
+
+def set_session_language(lang: str) -> None:
+    """Store the user's language in the session and rebind this request's translator to it."""
+    session['lang'] = lang
+    g.pop('translator', None)
+
+# endpoint -> {'requests', 'hits', 'misses', 'uncached'}
+TRANSLATION_STATS = {}
+stats_lock = threading.Lock()
+
+def record_translation_stats(endpoint: Optional[str], translator: RequestTranslator) -> None:
+    """Add one request's translator counters to TRANSLATION_STATS."""
+    with stats_lock:
+        stats = TRANSLATION_STATS.setdefault(endpoint or 'unknown', {'requests': 0, 'hits': 0, 'misses': 0, 'uncached': 0})
+        stats['requests'] += 1
+        stats['hits'] += translator.hits
+        stats['misses'] += translator.misses
+        stats['uncached'] += translator.uncached
+
+def get_translation_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Per-endpoint translation counters with their memo hit rate.
+
+    Returns:
+        {endpoint: {'requests', 'hits', 'misses', 'uncached', 'hit_rate'}}
+    """
+    with stats_lock:
+        snapshot = {endpoint: dict(stats) for endpoint, stats in TRANSLATION_STATS.items()}
+    for stats in snapshot.values():
+        calls = stats['hits'] + stats['misses'] + stats['uncached']
+        stats['hit_rate'] = round(stats['hits'] / calls, 3) if calls else None
+    return snapshot
 
 def trans(key: str, lang: Optional[str] = None, default: Optional[str] = None, **kwargs: str) -> str:
     """
@@ -141,82 +436,17 @@ def trans(key: str, lang: Optional[str] = None, default: Optional[str] = None, *
         Applies string formatting with kwargs if provided, with fallback for missing keys.
     
     Notes:
-        - Uses session['lang'] if lang is None and request context exists.
+        - Inside a request, calls for the request's language go through the
+          memoizing RequestTranslator, so templates, forms and flash messages share it.
+        - Looks the key up in COMPILED_TRANSLATIONS, loaded per language on first use.
         - Logs warnings for missing translations only once per key.
         - Logs errors for formatting failures but returns unformatted string as fallback.
         - Uses g.logger if available, else the default logger.
-        - Checks general translations for common UI elements without prefixes.
     """
-    current_logger = g.get('logger', logger) if has_request_context() else logger
-    session_id = session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'
-
-    # Default to session language or 'en'
-    if lang is None:
-        lang = session.get('lang', 'en') if has_request_context() else 'en'
-    if lang not in ['en', 'ha']:
-        with lock:
-            if f"invalid_language_{lang}" not in logged_missing_keys:
-                logged_missing_keys.add(f"invalid_language_{lang}")
-                current_logger.warning(f"Invalid language '{lang}', falling back to 'en'", extra={'session_id': session_id})
-        lang = 'en'
-
-    # Determine module based on key prefix or specific keys
-    module_name = 'general'  # Default to general
-    
-    # Check for specific prefix mappings
-    for prefix, mod in KEY_PREFIX_TO_MODULE.items():
-        if key.startswith(prefix):
-            module_name = mod
-            break
-    
-    # Check for general-specific keys (common UI elements)
-    if key in GENERAL_SPECIFIC_KEYS:
-        module_name = 'general'
-
-    module = translation_modules.get(module_name, translation_modules['general'])
-    lang_dict = module.get(lang, {})
-
-    # Get translation
-    translation = lang_dict.get(key)
-
-    # Fallback to English, then default, then key
-    if translation is None:
-        en_dict = module.get('en', {})
-        translation = en_dict.get(key, default or key)
-        if translation == default or translation == key:
-            with lock:
-                if key not in logged_missing_keys:
-                    logged_missing_keys.add(key)
-                    current_logger.warning(
-                        f"Missing translation for key='{key}' in module '{module_name}', lang='{lang}'",
-                        extra={'session_id': session_id}
-                    )
-
-    # Apply string formatting with fallback for missing kwargs
-    if kwargs:
-        try:
-            return translation.format(**kwargs)
-        except KeyError as e:
-            with lock:
-                error_key = f"formatting_error_{key}_{lang}"
-                if error_key not in logged_missing_keys:
-                    logged_missing_keys.add(error_key)
-                    current_logger.error(
-                        f"Formatting error for key='{key}', lang='{lang}', kwargs={kwargs}, error='Missing key: {str(e)}'",
-                        extra={'session_id': session_id}
-                    )
-            return translation  # Return unformatted string as fallback
-        except ValueError as e:
-            with lock:
-                error_key = f"formatting_error_{key}_{lang}"
-                if error_key not in logged_missing_keys:
-                    logged_missing_keys.add(error_key)
-                    current_logger.error(
-                        f"Formatting failed for key='{key}', lang='{lang}', kwargs={kwargs}, error='Invalid format: {str(e)}'",
-                        extra={'session_id': session_id}
-                    )
-            return translation  # Return unformatted string as fallback
-    return translation
+    translator = get_request_translator()
+    if translator is not None and (lang is None or lang == translator.lang):
+        return translator(key, default=default, **kwargs)
+    return _translate(key, lang or 'en', default, kwargs)
 
 def get_translations(lang: Optional[str] = None) -> Dict[str, callable]:
     """
@@ -244,7 +474,50 @@ def get_all_translations() -> Dict[str, Dict[str, Dict[str, str]]]:
     Returns:
         A dictionary with module names as keys and their translation dictionaries as values.
     """
-    return translation_modules.copy()
+    return dict(translation_modules)
+
+# (lang, module names or None) -> payload dict, built on first request
+TRANSLATION_PAYLOADS = {}
+payloads_lock = threading.Lock()
+
+def build_translation_payload(lang: str, modules: Optional[tuple] = None) -> Dict[str, Union[bytes, str]]:
+    """
+    Serialize the merged translations for a language, as served by /api/translations/<lang>.
+
+    Args:
+        lang: Language code
+        modules: Module names to include, in merge order (default: all modules)
+
+    Returns:
+        dict with 'body' (UTF-8 JSON), 'gzip' (gzipped body) and 'etag' (content hash)
+    """
+    result = {}
+    for module_name in modules or translation_modules:
+        result.update(translation_modules[module_name].get(lang, {}))
+    body = json.dumps({'translations': result}, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return {
+        'body': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'etag': hashlib.sha256(body).hexdigest()[:32]
+    }
+
+def get_translation_payload(lang: str, modules: Optional[list] = None) -> Dict[str, Union[bytes, str]]:
+    """
+    Return the cached payload for a language and optional module subset.
+
+    Args:
+        lang: Supported language code
+        modules: Module names (validated by the caller against translation_modules)
+    """
+    # Keep the full-payload merge order; subsets follow the same order
+    cache_key = (lang, tuple(name for name in translation_modules if name in modules) if modules else None)
+    payload = TRANSLATION_PAYLOADS.get(cache_key)
+    if payload is None:
+        with payloads_lock:
+            payload = TRANSLATION_PAYLOADS.get(cache_key)
+            if payload is None:
+                payload = TRANSLATION_PAYLOADS[cache_key] = build_translation_payload(*cache_key)
+    return payload
 
 def get_module_translations(module_name: str, lang: Optional[str] = None) -> Dict[str, str]:
     """
@@ -281,4 +554,17 @@ def register_translation(app):
             # Default to 'en' or use request headers/user settings as needed
             session['lang'] = request.accept_languages.best_match(['en', 'ha'], 'en')
 
-__all__ = ['trans', 'get_translations', 'get_all_translations', 'get_module_translations', 'register_translation']
+    @app.after_request
+    def collect_translation_stats(response):
+        translator = g.get('translator')
+        if translator is not None:
+            record_translation_stats(request.endpoint, translator)
+            logger.debug(
+                f"Translations for {request.endpoint}: hits={translator.hits}, misses={translator.misses}, "
+                f"uncached={translator.uncached}"
+            )
+        return response
+
+__all__ = ['trans', 'get_translations', 'get_all_translations', 'get_module_translations', 'register_translation',
+           'get_request_translator', 'set_session_language', 'get_translation_stats', 'get_translation_payload',
+           'get_translation_load_stats', 'translation_modules']
@@ -20,6 +20,7 @@ SHOPPING_TRANSLATIONS = {
         'shopping_email_placeholder': 'Enter email address',
         'shopping_email_invalid': 'Invalid email address',
         'shopping_list_details': 'List Details',
+        'shopping_items_total': 'Items Total',
         'shopping_amount_max': 'Amount exceeds maximum allowed',
         'shopping_amount_positive': 'Amount must be positive',
         'shopping_frequency_max': 'Frequency exceeds maximum allowed',
@@ -278,6 +279,7 @@ SHOPPING_TRANSLATIONS = {
         'shopping_email_placeholder': 'Shigar da adireshin imel',
         'shopping_email_invalid': 'Adireshin imel ba daidai ba ne',
         'shopping_list_details': 'Bayanin Jeri',
+        'shopping_items_total': 'Jimlar Kayayyaki',
         'shopping_amount_max': 'Adadin ya wuce adadin da aka yarda',
         'shopping_amount_positive': 'Adadin dole ne ya zama tabbatacce',
         'shopping_frequency_max': 'Yawan ya wuce adadin da aka yarda',
@@ -0,0 +1,246 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_request_context
+from utils import get_mongo_db
+
+logger = logging.getLogger('ficore_app')
+
+# Fields read through the Flask-Login User proxy and templates
+USER_DOCUMENT_PROJECTION = {
+    '_id': 1,
+    'email': 1,
+    'display_name': 1,
+    'role': 1,
+    'is_active': 1,
+    'is_admin': 1,
+    'language': 1,
+    'setup_complete': 1,
+    'personal_details': 1,
+    'referral_code': 1,
+    'profile_picture': 1,
+    'created_at': 1,
+    'ficore_credit_balance': 1
+}
+
+def _request_cache():
+    if not has_request_context():
+        return None
+    if '_user_documents' not in g:
+        g._user_documents = {}
+    return g._user_documents
+
+def load_user_document(user_id, db=None):
+    """
+    Load a user document once per request with the template projection.
+
+    Args:
+        user_id: ID of the user
+        db: MongoDB database instance (optional)
+
+    Returns:
+        dict: Projected user document or None if not found
+    """
+    cache = _request_cache()
+    if cache is not None and user_id in cache:
+        return cache[user_id]
+    if db is None:
+        db = get_mongo_db()
+    user_doc = db.users.find_one({'_id': user_id}, USER_DOCUMENT_PROJECTION)
+    if cache is not None:
+        cache[user_id] = user_doc
+    return user_doc
+
+def get_user_field(user_id, key, default=None):
+    """
+    Read a single user field, served from the request copy when projected.
+
+    Args:
+        user_id: ID of the user
+        key: Field name
+        default: Value returned when the field or user is missing
+
+    Returns:
+        The field value or default
+    """
+    if key in USER_DOCUMENT_PROJECTION:
+        user_doc = load_user_document(user_id)
+    else:
+        user_doc = get_mongo_db().users.find_one({'_id': user_id}, {key: 1})
+    return user_doc.get(key, default) if user_doc else default
+
+def invalidate_user(user_id):
+    """
+    Drop cached copies of a user document after a write to that user.
+
+    Args:
+        user_id: ID of the user whose document changed
+    """
+    user_id = str(user_id)
+    cache = _request_cache()
+    if cache is not None:
+        cache.pop(user_id, None)
+    user_object_cache.invalidate(user_id)
+    credit_balance_cache.invalidate(user_id)
+
+class TTLCache:
+    """
+    Process-wide LRU cache whose entries expire after ttl seconds.
+
+    Keys are normalised to strings, so callers may pass user IDs as str or
+    ObjectId. The least recently used entry is evicted once maxsize is reached.
+    """
+
+    def __init__(self, ttl=60, maxsize=1024):
+        """
+        Args:
+            ttl: Seconds an entry stays valid (default: 60)
+            maxsize: Maximum number of cached entries (default: 1024)
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None on a miss or expired entry.
+        """
+        key = str(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Cache value under key, replacing any previous entry.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        key = str(key)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._added(key, value)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key):
+        """
+        Drop the cached value for key.
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            if self._remove(str(key)):
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._removed(key, entry[0])
+        return True
+
+    def _added(self, key, value):
+        """Called with the lock held after an entry is stored."""
+
+    def _removed(self, key, value):
+        """Called with the lock held after an entry is dropped."""
+
+    def get_stats(self):
+        """
+        Return a snapshot of cache counters.
+
+        Returns:
+            dict: size, ttl, maxsize, hits, misses, expired, evictions, invalidations, hit_ratio
+        """
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'size': len(self._entries),
+                'ttl': self.ttl,
+                'maxsize': self.maxsize,
+                **self._stats,
+                'hit_ratio': round(self._stats['hits'] / lookups, 3) if lookups else None
+            }
+
+class TTLUserCache(TTLCache):
+    """
+    Process-wide cache of User objects keyed by user ID, with an email index.
+
+    Writes to a user must call invalidate(); the TTL only bounds how stale
+    another worker process can be.
+    """
+
+    def __init__(self, ttl=60, maxsize=1024):
+        super().__init__(ttl=ttl, maxsize=maxsize)
+        self._email_index = {}
+
+    def get_by_email(self, email):
+        """
+        Return the cached User for email, or None on a miss or expired entry.
+        """
+        with self._lock:
+            user_id = self._email_index.get(email.lower())
+            if user_id is None:
+                self._stats['misses'] += 1
+                return None
+        return self.get(user_id)
+
+    def put(self, user):
+        """
+        Cache a User object under its ID and email.
+
+        Args:
+            user: models.User instance
+        """
+        if user is not None:
+            super().put(user.id, user)
+
+    def _added(self, user_id, user):
+        if user.email:
+            self._email_index[user.email.lower()] = user_id
+
+    def _removed(self, user_id, user):
+        email = user.email
+        if email and self._email_index.get(email.lower()) == user_id:
+            del self._email_index[email.lower()]
+
+user_object_cache = TTLUserCache(
+    ttl=int(os.getenv('USER_CACHE_TTL', 60)),
+    maxsize=int(os.getenv('USER_CACHE_MAXSIZE', 1024))
+)
+
+# Ficore Credit balances keyed by user ID. The credit ledger stores the balance
+# it wrote after every debit, and invalidate_user() drops it after any other
+# write to the user. The short TTL bounds how stale a balance written by
+# another worker process can be.
+credit_balance_cache = TTLCache(
+    ttl=float(os.getenv('CREDIT_BALANCE_CACHE_TTL', 5)),
+    maxsize=int(os.getenv('CREDIT_BALANCE_CACHE_MAXSIZE', 4096))
+)
@@ -13,7 +13,8 @@ import re
 import random
 from itsdangerous import URLSafeTimedSerializer
 import utils
-from translations import trans
+from translations import trans, set_session_language
+from user_cache import invalidate_user
 
 logger = logging.getLogger(__name__)
 
@@ -333,7 +334,7 @@ def login():
                         from app import User
                         user_obj = User(user['_id'], user['email'], user.get('display_name'), user.get('role', 'personal'))
                         login_user(user_obj, remember=True)
-                        session['lang'] = user.get('language', 'en')
+                        set_session_language(user.get('language', 'en'))
                         session.pop('is_anonymous', None)
                         session['is_anonymous'] = False
                         log_audit_action('login_without_2fa', {'user_id': username, 'reason': 'email_failure_test_mode'})
@@ -349,7 +350,7 @@ def login():
             from app import User
             user_obj = User(user['_id'], user['email'], user.get('display_name'), user.get('role', 'personal'))
             login_user(user_obj, remember=True)
-            session['lang'] = user.get('language', 'en')
+            set_session_language(user.get('language', 'en'))
             session.pop('is_anonymous', None)
             session['is_anonymous'] = False
             log_audit_action('login', {'user_id': username})
@@ -394,7 +395,7 @@ def verify_2fa():
                 login_user(user_obj, remember=True)                
                 session.pop('is_anonymous', None)
                 session['is_anonymous'] = False
-                session['lang'] = user.get('language', 'en')
+                set_session_language(user.get('language', 'en'))
                 db.users.update_one(
                     {'_id': username},
                     {'$unset': {'otp': '', 'otp_expiry': ''}}
@@ -490,7 +491,7 @@ def signup():
             from app import User
             user_obj = User(username, email, username, role)
             login_user(user_obj, remember=True)
-            session['lang'] = language
+            set_session_language(language)
             session.pop('is_anonymous', None)
             session['is_anonymous'] = False
             logger.info(f"New user created and logged in: {username} (role: {role}). Session: {session}")
@@ -623,6 +624,7 @@ def setup_wizard():
                     }
                 }
             )
+            invalidate_user(user_id)
             log_audit_action('complete_setup_wizard', {'user_id': user_id, 'updated_by': current_user.id})
             logger.info(f"Business setup completed for user: {user_id} by {current_user.id}")
             flash(trans('general_business_setup_success', default='Business setup completed'), 'success')
@@ -668,6 +670,7 @@ def personal_setup_wizard():
                     }
                 }
             )
+            invalidate_user(user_id)
             log_audit_action('complete_personal_setup_wizard', {'user_id': user_id, 'updated_by': current_user.id})
             logger.info(f"Personal setup completed for user: {user_id} by {current_user.id}")
             flash(trans('general_personal_setup_success', default='Personal setup completed'), 'success')
@@ -715,6 +718,7 @@ def agent_setup_wizard():
                     }
                 }
             )
+            invalidate_user(user_id)
             log_audit_action('complete_agent_setup_wizard', {'user_id': user_id, 'updated_by': current_user.id})
             logger.info(f"Agent setup completed for user: {user_id} by {current_user.id}")
             flash(trans('agents_setup_success', default='Agent setup completed'), 'success')
@@ -754,7 +758,7 @@ def logout():
         session.clear()
         
         # Preserve language and create new anonymous session
-        session['lang'] = lang
+        set_session_language(lang)
         utils.create_anonymous_session()  # Create new anonymous session with new sid
         logger.info(f"New anonymous session created after logout: {session['sid']}")
         
@@ -3,15 +3,15 @@ import logging
 import uuid
 import os
 import certifi
-from datetime import datetime
+from datetime import datetime, date
 from flask import session, has_request_context, current_app, url_for, request
 from flask_mail import Mail
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from db_manager import MongoConnectionManager
 from translations import trans
-import requests
+from notifications import get_http_session
 from werkzeug.routing import BuildError
 import time
 from wtforms import ValidationError
@@ -973,54 +973,65 @@ def is_valid_email(email):
 
 def get_mongo_db():
     """
-    Get MongoDB database instance with retry logic.
+    Get MongoDB database instance from the process-wide connection manager.
+    
+    The manager pings only on a background interval or after a reported failure,
+    so this is a cheap attribute lookup on the hot path.
     
     Returns:
         Database object
     """
-    max_retries = 3
-    retry_delay = 1
-    for attempt in range(max_retries):
-        try:
-            with current_app.app_context():
-                if 'mongo' not in current_app.extensions:
-                    mongo_uri = os.getenv('MONGO_URI')
-                    if not mongo_uri:
-                        logger.error("MONGO_URI environment variable not set",
-                                    extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr if has_request_context() else 'unknown'})
-                        raise RuntimeError("MONGO_URI environment variable not set")
-                    
-                    client = MongoClient(
-                        mongo_uri,
-                        serverSelectionTimeoutMS=5000,
-                        tls=True,
-                        tlsCAFile=certifi.where() if os.getenv('MONGO_CA_FILE') is None else os.getenv('MONGO_CA_FILE'),
-                        maxPoolSize=50,
-                        minPoolSize=5
-                    )
-                    client.admin.command('ping')
-                    current_app.extensions['mongo'] = client
-                    logger.info("MongoDB client initialized successfully in utils.get_mongo_db",
-                               extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr if has_request_context() else 'unknown'})
+    with current_app.app_context():
+        manager = current_app.extensions.get('mongo_manager')
+        if manager is None:
+            if 'mongo' not in current_app.extensions:
+                mongo_uri = os.getenv('MONGO_URI')
+                if not mongo_uri:
+                    logger.error("MONGO_URI environment variable not set",
+                                extra={'session_id': session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id', 'ip_address': request.remote_addr if has_request_context() else 'unknown'})
+                    raise RuntimeError("MONGO_URI environment variable not set")
                 
-                db = current_app.extensions['mongo']['ficodb']
-                db.command('ping')
-                return db
-        except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-            logger.warning(
-                f"Attempt {attempt + 1}/{max_retries} failed to connect to MongoDB: {str(e)}",
+                client = MongoClient(
+                    mongo_uri,
+                    serverSelectionTimeoutMS=5000,
+                    tls=True,
+                    tlsCAFile=certifi.where() if os.getenv('MONGO_CA_FILE') is None else os.getenv('MONGO_CA_FILE'),
+                    maxPoolSize=50,
+                    minPoolSize=5
+                )
+                current_app.extensions['mongo'] = client
+                logger.info("MongoDB client initialized successfully in utils.get_mongo_db",
+                           extra={'session_id': session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id', 'ip_address': request.remote_addr if has_request_context() else 'unknown'})
+            manager = MongoConnectionManager(current_app.extensions['mongo'])
+            current_app.extensions['mongo_manager'] = manager
+        try:
+            return manager.get_db()
+        except RuntimeError as e:
+            logger.error(
+                f"Failed to connect to MongoDB: {str(e)}",
                 exc_info=True,
-                extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr if has_request_context() else 'unknown'}
+                extra={'session_id': session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id', 'ip_address': request.remote_addr if has_request_context() else 'unknown'}
             )
-            if attempt == max_retries - 1:
-                logger.error(
-                    f"Failed to connect to MongoDB after {max_retries} attempts: {str(e)}",
-                    exc_info=True,
-                    extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr if has_request_context() else 'unknown'}
-                )
-                raise RuntimeError(f"Failed to connect to MongoDB: {str(e)}")
-            time.sleep(retry_delay)
-    raise RuntimeError("Failed to connect to MongoDB after retries")
+            raise
+
+def run_in_transaction(db, callback):
+    """
+    Run callback(mongo_session) in a MongoDB transaction with the driver's retry loop.
+    
+    with_transaction retries the whole callback on TransientTransactionError
+    (e.g. a WriteConflict with a concurrent transaction on the same document)
+    and retries the commit on UnknownTransactionCommitResult, so callback must
+    be safe to run more than once.
+    
+    Args:
+        db: MongoDB database instance
+        callback: Function taking the session; its return value is returned
+    
+    Returns:
+        The callback's return value from the attempt that committed
+    """
+    with db.client.start_session() as mongo_session:
+        return mongo_session.with_transaction(callback)
 
 def close_mongo_db():
     """
@@ -1081,6 +1092,9 @@ def requires_role(role):
 def check_ficore_credit_balance(required_amount=1, user_id=None):
     """
     Check if user has sufficient Ficore Credit balance.
+
+    The balance is read through credit_ledger.get_balance, so repeated checks
+    within the cache TTL do not touch the users collection.
     
     Args:
         required_amount: Required credit amount (default: 1)
@@ -1099,12 +1113,8 @@ def check_ficore_credit_balance(required_amount=1, user_id=None):
             db = get_mongo_db()
             if db is None:
                 return False
-            user_query = get_user_query(user_id)
-            user = db.users.find_one(user_query)
-            if not user:
-                return False
-            credit_balance = user.get('ficore_credit_balance', 0)
-            return credit_balance >= required_amount
+            from credit_ledger import has_balance
+            return has_balance(db, user_id, required_amount)
     except Exception as e:
         logger.error(f"{trans('general_ficore_credit_balance_check_error', default='Error checking Ficore Credit balance for user')} {user_id}: {str(e)}", exc_info=True)
         return False
@@ -1204,6 +1214,35 @@ def format_date(date_obj, lang=None, format_type='short'):
         logger.warning(f"{trans('general_date_format_error', default='Error formatting date')} {date_obj}: {str(e)}")
         return str(date_obj) if date_obj else ''
 
+def to_due_datetime(value):
+    """
+    Normalize a due date to its stored form: a naive UTC datetime at midnight.
+    
+    Args:
+        value: date, datetime or 'YYYY-MM-DD' string (legacy bill documents)
+    
+    Returns:
+        datetime: Midnight of the due date
+    
+    Raises:
+        ValueError: If a string is not in YYYY-MM-DD format
+        TypeError: If value is of any other type
+    """
+    if isinstance(value, date):  # includes datetime
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d')
+    raise TypeError(f"Invalid due date type: {type(value).__name__}")
+
+def parse_due_date(value):
+    """
+    Read a stored due date (datetime or legacy string) as a date.
+    
+    Raises:
+        ValueError, TypeError: As to_due_datetime
+    """
+    return to_due_datetime(value).date()
+
 def sanitize_input(input_string, max_length=None):
     """
     Sanitize user input to prevent XSS and other attacks.
@@ -1328,7 +1367,7 @@ def send_sms_reminder(recipient, message):
                 'message': message,
                 'api_key': sms_api_key
             }
-            response = requests.post(sms_api_url, json=payload, timeout=10)
+            response = get_http_session('sms').post(sms_api_url, json=payload, timeout=10)
             response_data = response.json()
             if response.status_code == 200 and response_data.get('success', False):
                 logger.info(f"SMS sent to {recipient}")
@@ -1368,7 +1407,7 @@ def send_whatsapp_reminder(recipient, message):
                 'text': message,
                 'api_key': whatsapp_api_key
             }
-            response = requests.post(whatsapp_api_url, json=payload, timeout=10)
+            response = get_http_session('whatsapp').post(whatsapp_api_url, json=payload, timeout=10)
             response_data = response.json()
             if response.status_code == 200 and response_data.get('success', False):
                 logger.info(f"WhatsApp message sent to {recipient}")
@@ -1394,83 +1433,19 @@ def get_recent_activities(user_id=None, is_admin_user=False, db=None, session_id
     Returns:
         list: List of recent activity records
     """
+    from activity_feed import get_activity_feed
     if db is None:
         db = get_mongo_db()
     
-    query = {} if is_admin_user else {'user_id': str(user_id)} if user_id else {'session_id': session_id} if session_id else {}
+    query = {} if is_admin_user else {'user_id': str(user_id)} if user_id else {'session_id': session_id, 'user_id': None} if session_id else {}
     
     try:
-        activities = []
-        
-        # Fetch recent bills
-        bills = db.bills.find(query).sort('created_at', -1).limit(5)
-        for bill in bills:
-            if not bill.get('created_at') or not bill.get('bill_name'):
-                logger.warning(f"Skipping invalid bill record: {bill.get('_id')}", extra={'session_id': session_id or 'unknown', 'ip': request.remote_addr or 'unknown'})
-                continue
-            activities.append({
-                'type': 'bill',
-                'description': trans('recent_activity_bill_added', default='Added bill: {name}', name=bill.get('bill_name', 'Unknown')),
-                'timestamp': bill.get('created_at', datetime.utcnow()).isoformat(),
-                'details': {
-                    'amount': bill.get('amount', 0),
-                    'due_date': bill.get('due_date', 'N/A'),
-                    'status': bill.get('status', 'Unknown')
-                },
-                'icon': 'bi-receipt'
-            })
-
-        # Fetch recent budgets
-        budgets = db.budgets.find(query).sort('created_at', -1).limit(5)
-        for budget in budgets:
-            activities.append({
-                'type': 'budget',
-                'description': trans('recent_activity_budget_created', default='Created budget with income: {amount}', amount=budget.get('income', 0)),
-                'timestamp': budget.get('created_at', datetime.utcnow()).isoformat(),
-                'details': {
-                    'income': budget.get('income', 0),
-                    'surplus_deficit': budget.get('surplus_deficit', 0)
-                },
-                'icon': 'bi-cash-coin'
-            })
-
-        # Fetch recent shopping lists
-        shopping_lists = db.shopping_lists.find(query).sort('created_at', -1).limit(5)
-        for list_item in shopping_lists:
-            activities.append({
-                'type': 'shopping_list',
-                'description': trans('recent_activity_shopping_list_created', default='Created shopping list: {name}', name=list_item.get('name', 'Unknown')),
-                'timestamp': list_item.get('created_at', datetime.utcnow()).isoformat(),
-                'details': {
-                    'budget': list_item.get('budget', 0),
-                    'total_spent': list_item.get('total_spent', 0)
-                },
-                'icon': 'bi-cart'
-            })
-
-        # Fetch recent shopping items
-        shopping_items = db.shopping_items.find(query).sort('created_at', -1).limit(5)
-        for item in shopping_items:
-            activities.append({
-                'type': 'shopping_item',
-                'description': trans('recent_activity_shopping_item_added', default='Added shopping item: {name}', name=item.get('name', 'Unknown')),
-                'timestamp': item.get('created_at', datetime.utcnow()).isoformat(),
-                'details': {
-                    'quantity': item.get('quantity', 0),
-                    'price': item.get('price', 0),
-                    'status': item.get('status', 'to_buy')
-                },
-                'icon': 'bi-check-circle'
-            })
-
-        activities.sort(key=lambda x: x['timestamp'], reverse=True)
-        
+        activities, _ = get_activity_feed(db, query, limit=limit)
         logger.debug(
             f"Fetched {len(activities)} recent activities for {'user ' + str(user_id) if user_id else 'session ' + str(session_id) if session_id else 'all'}",
             extra={'session_id': session_id or 'unknown', 'ip': request.remote_addr or 'unknown'}
         )
-        
-        return activities[:limit]
+        return activities
     except Exception as e:
         logger.error(
             f"Failed to fetch recent activities: {str(e)}",
@@ -1499,7 +1474,7 @@ def get_all_recent_activities(user_id=None, is_admin_user=False, db=None, sessio
 __all__ = [
     'login_manager', 'clean_currency', 'log_tool_usage', 'flask_session', 'csrf', 'babel', 'compress', 'limiter',
     'get_limiter', 'create_anonymous_session', 'trans_function', 'is_valid_email',
-    'get_mongo_db', 'close_mongo_db', 'get_mail', 'requires_role', 'check_ficore_credit_balance',
+    'get_mongo_db', 'run_in_transaction', 'close_mongo_db', 'get_mail', 'requires_role', 'check_ficore_credit_balance',
     'get_user_query', 'is_admin', 'format_currency', 'format_date', 'sanitize_input',
     'generate_unique_id', 'validate_required_fields', 'get_user_language',
     'log_user_action', 'send_sms_reminder', 'send_whatsapp_reminder',
@@ -0,0 +1,221 @@
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger('ficore_app')
+
+# Vendors are stored with a GeoJSON point under a 2dsphere index:
+#   {'name', 'geo_location': {'type': 'Point', 'coordinates': [lng, lat]}, ...}
+# Older documents only have 'location': {'lat', 'lng'}; migrate_vendor_locations()
+# adds geo_location to them.
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_M / 180
+
+VENDOR_SEARCH_RADIUS_KM = float(os.getenv('VENDOR_SEARCH_RADIUS_KM', 25))
+MAX_VENDOR_SEARCH_RADIUS_KM = 200
+VENDOR_RESULTS_LIMIT = 5
+MAX_VENDOR_RESULTS = 20
+VENDOR_MIGRATION_BATCH_SIZE = 1000
+
+# In-process fallback used when $geoNear fails (e.g. the 2dsphere index is missing)
+VENDOR_GRID_CELL_DEGREES = float(os.getenv('VENDOR_GRID_CELL_DEGREES', 0.1))
+VENDOR_GRID_TTL = int(os.getenv('VENDOR_GRID_TTL', 300))
+
+def to_geo_point(lat, lng):
+    """
+    Build a GeoJSON point from latitude and longitude.
+
+    Raises:
+        ValueError: If either value is not a number or is out of range.
+    """
+    lat, lng = float(lat), float(lng)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(f"Coordinates out of range: {lat},{lng}")
+    return {'type': 'Point', 'coordinates': [lng, lat]}
+
+def vendor_lat_lng(vendor):
+    """Return a vendor's (lat, lng) from geo_location or the legacy location field, or None."""
+    point = vendor.get('geo_location')
+    if point and len(point.get('coordinates') or []) == 2:
+        lng, lat = point['coordinates']
+        return lat, lng
+    location = vendor.get('location') or {}
+    if 'lat' in location and 'lng' in location:
+        try:
+            return float(location['lat']), float(location['lng'])
+        except (TypeError, ValueError):
+            return None
+    return None
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters between two points given in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+class VendorGrid:
+    """
+    Vendors bucketed into cells of cell_degrees of latitude by about
+    cell_degrees of longitude.
+
+    A query visits only the cells overlapping the bounding box of the search
+    circle (or every non-empty cell, when that is fewer) and ranks the vendors
+    found there by haversine distance.
+    """
+
+    def __init__(self, vendors, cell_degrees=VENDOR_GRID_CELL_DEGREES):
+        """
+        Args:
+            vendors: Iterable of (name, lat, lng)
+            cell_degrees: Cell size in degrees (default: VENDOR_GRID_CELL_DEGREES)
+        """
+        self.cell_degrees = cell_degrees
+        self.lng_cells = math.ceil(360 / cell_degrees)
+        # Columns must tile 360 degrees exactly for the antimeridian wrap to line up
+        self.lng_cell_degrees = 360 / self.lng_cells
+        self.cells = {}
+        self.size = 0
+        for name, lat, lng in vendors:
+            self.cells.setdefault(self._cell(lat, lng), []).append((name, lat, lng))
+            self.size += 1
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_degrees), math.floor((lng + 180) / self.lng_cell_degrees) % self.lng_cells)
+
+    def _candidate_cells(self, lat, lng, radius_m):
+        dlat = radius_m / METERS_PER_DEGREE_LAT
+        lat_lo, lat_hi = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        # Longitude degrees shrink with latitude; use the widest span in the box
+        min_cos = min(math.cos(math.radians(lat_lo)), math.cos(math.radians(lat_hi)))
+        dlng = 180.0 if min_cos <= 0 else min(180.0, dlat / min_cos)
+        row_lo, row_hi = math.floor(lat_lo / self.cell_degrees), math.floor(lat_hi / self.cell_degrees)
+        col_lo = math.floor((lng - dlng + 180) / self.lng_cell_degrees)
+        col_hi = math.floor((lng + dlng + 180) / self.lng_cell_degrees)
+        cols = min(self.lng_cells, col_hi - col_lo + 1)
+        if (row_hi - row_lo + 1) * cols > len(self.cells):
+            return list(self.cells)
+        return [(row, (col_lo + offset) % self.lng_cells)
+                for row in range(row_lo, row_hi + 1) for offset in range(cols)]
+
+    def nearest(self, lat, lng, limit, radius_m):
+        """
+        Return up to limit vendors within radius_m, nearest first.
+
+        Returns:
+            list: (name, distance_m) tuples
+        """
+        matches = []
+        for cell in self._candidate_cells(lat, lng, radius_m):
+            for name, vendor_lat, vendor_lng in self.cells.get(cell, ()):
+                distance = haversine_m(lat, lng, vendor_lat, vendor_lng)
+                if distance <= radius_m:
+                    matches.append((distance, name))
+        return [(name, distance) for distance, name in heapq.nsmallest(limit, matches)]
+
+_grid = None
+_grid_built_at = 0.0
+_grid_lock = threading.Lock()
+
+def get_vendor_grid(db):
+    """Return this process's VendorGrid, rebuilding it from the vendors collection every VENDOR_GRID_TTL seconds."""
+    global _grid, _grid_built_at
+    with _grid_lock:
+        if _grid is None or time.monotonic() - _grid_built_at > VENDOR_GRID_TTL:
+            vendors = []
+            for vendor in db.vendors.find({}, {'name': 1, 'geo_location': 1, 'location': 1}):
+                lat_lng = vendor_lat_lng(vendor)
+                if vendor.get('name') and lat_lng is not None:
+                    vendors.append((vendor['name'], *lat_lng))
+            _grid = VendorGrid(vendors)
+            _grid_built_at = time.monotonic()
+            logger.info(f"Built vendor grid with {_grid.size} vendors in {len(_grid.cells)} cells",
+                        extra={'session_id': 'no-session-id'})
+        return _grid
+
+def nearest_vendors(db, lat, lng, limit=VENDOR_RESULTS_LIMIT, radius_km=VENDOR_SEARCH_RADIUS_KM):
+    """
+    Find the vendors nearest to a point.
+
+    Uses $geoNear on the geo_location 2dsphere index. If the query fails,
+    for example because the index has not been built, the in-process
+    VendorGrid is used instead.
+
+    Args:
+        db: MongoDB database instance
+        lat: Latitude in degrees
+        lng: Longitude in degrees
+        limit: Maximum vendors to return (default: VENDOR_RESULTS_LIMIT)
+        radius_km: Search radius in kilometers (default: VENDOR_SEARCH_RADIUS_KM)
+
+    Returns:
+        list: {'name', 'distance_km'} dicts, nearest first
+
+    Raises:
+        ValueError: If the coordinates are out of range.
+    """
+    point = to_geo_point(lat, lng)
+    radius_m = radius_km * 1000
+    try:
+        results = [(vendor.get('name'), vendor['distance_m']) for vendor in db.vendors.aggregate([
+            {'$geoNear': {
+                'near': point,
+                'key': 'geo_location',
+                'distanceField': 'distance_m',
+                'maxDistance': radius_m,
+                'spherical': True
+            }},
+            {'$limit': limit},
+            {'$project': {'_id': 0, 'name': 1, 'distance_m': 1}}
+        ])]
+    except OperationFailure as e:
+        logger.warning(f"$geoNear vendor lookup failed, using in-process grid: {str(e)}",
+                       extra={'session_id': 'no-session-id'})
+        results = get_vendor_grid(db).nearest(lat, lng, limit, radius_m)
+    return [{'name': name, 'distance_km': round(distance / 1000, 2)} for name, distance in results]
+
+def migrate_vendor_locations(db, batch_size=VENDOR_MIGRATION_BATCH_SIZE):
+    """
+    Add a GeoJSON geo_location to vendors that only have a legacy {'lat', 'lng'} location.
+
+    Vendors with missing or out-of-range coordinates are logged and left unchanged.
+
+    Args:
+        db: MongoDB database instance
+        batch_size: Number of updates per bulk_write
+
+    Returns:
+        dict: migrated and invalid vendor counts
+    """
+    migrated = invalid = 0
+    operations = []
+    cursor = db.vendors.find(
+        {'geo_location': {'$exists': False}, 'location': {'$exists': True}},
+        {'location': 1}
+    ).batch_size(batch_size)
+    for vendor in cursor:
+        location = vendor.get('location') or {}
+        try:
+            point = to_geo_point(location['lat'], location['lng'])
+        except (KeyError, TypeError, ValueError):
+            invalid += 1
+            logger.warning(f"Invalid location for vendor {vendor['_id']}: {location}", extra={'session_id': 'no-session-id'})
+            continue
+        operations.append(UpdateOne({'_id': vendor['_id'], 'geo_location': {'$exists': False}},
+                                    {'$set': {'geo_location': point}}))
+        if len(operations) >= batch_size:
+            migrated += db.vendors.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        migrated += db.vendors.bulk_write(operations, ordered=False).modified_count
+    if migrated or invalid:
+        logger.info(f"Added GeoJSON locations to {migrated} vendors, skipped {invalid} invalid locations",
+                    extra={'session_id': 'no-session-id'})
+    return {'migrated': migrated, 'invalid': invalid}